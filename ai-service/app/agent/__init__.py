@@ -1,35 +1,40 @@
 """
 Agent 模块
 
-包含所有 AI Agent 实现。
+包含所有 AI Agent 实现。Agent 类在首次访问时才导入所在子模块（见 app.lazy）。
 """
 
-from app.agent.requirement_analysis_agent import (
-    RequirementAnalysisAgent,
-    AnalysisResult,
-)
-from app.agent.test_design_agent import (
-    TestDesignAgent,
-    TestCaseDesign,
-)
-from app.agent.quality_review_agent import (
-    QualityReviewAgent,
-    ReviewResult,
-)
-from app.agent.impact_analysis_agent import (
-    ImpactAnalysisAgent,
-    ImpactReport,
-)
-from app.agent.test_engineer_agent import (
-    TestEngineerAgent,
-    AgentResponse,
-    TaskType,
-)
-from app.agent.conversation_manager import (
-    ConversationManager,
-    Conversation,
-    Message,
-)
+from typing import TYPE_CHECKING
+
+from app.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from app.agent.requirement_analysis_agent import (
+        RequirementAnalysisAgent,
+        AnalysisResult,
+    )
+    from app.agent.test_design_agent import (
+        TestDesignAgent,
+        TestCaseDesign,
+    )
+    from app.agent.quality_review_agent import (
+        QualityReviewAgent,
+        ReviewResult,
+    )
+    from app.agent.impact_analysis_agent import (
+        ImpactAnalysisAgent,
+        ImpactReport,
+    )
+    from app.agent.test_engineer_agent import (
+        TestEngineerAgent,
+        AgentResponse,
+        TaskType,
+    )
+    from app.agent.conversation_manager import (
+        ConversationManager,
+        Conversation,
+        Message,
+    )
 
 __all__ = [
     'RequirementAnalysisAgent',
@@ -47,3 +52,20 @@ __all__ = [
     'Conversation',
     'Message',
 ]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'RequirementAnalysisAgent': 'app.agent.requirement_analysis_agent',
+    'AnalysisResult': 'app.agent.requirement_analysis_agent',
+    'TestDesignAgent': 'app.agent.test_design_agent',
+    'TestCaseDesign': 'app.agent.test_design_agent',
+    'QualityReviewAgent': 'app.agent.quality_review_agent',
+    'ReviewResult': 'app.agent.quality_review_agent',
+    'ImpactAnalysisAgent': 'app.agent.impact_analysis_agent',
+    'ImpactReport': 'app.agent.impact_analysis_agent',
+    'TestEngineerAgent': 'app.agent.test_engineer_agent',
+    'AgentResponse': 'app.agent.test_engineer_agent',
+    'TaskType': 'app.agent.test_engineer_agent',
+    'ConversationManager': 'app.agent.conversation_manager',
+    'Conversation': 'app.agent.conversation_manager',
+    'Message': 'app.agent.conversation_manager',
+})
@@ -12,7 +12,7 @@ from dataclasses import dataclass, field
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """对话消息"""
     role: str  # 'user' 或 'assistant'
@@ -40,7 +40,7 @@ class Message:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Conversation:
     """对话"""
     conversation_id: str
@@ -5,18 +5,31 @@
 """
 
 import logging
-import json
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
 
+from ..context_packing import Passage, format_passages, pack_passages
+from ..deadline import DeadlineExceeded
+from ..models import SlottedModel
+from ..serialization import JSONDecodeError, loads
 from ..integration.brconnector_client import BRConnectorClient, BRConnectorError
 
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class ImpactReport:
+def _case_details(passage: Passage) -> List[str]:
+    """现有测试用例的附加行：模块和优先级"""
+    case = passage.document
+    metadata = case.get('metadata') or {}
+    return [
+        f"模块: {case.get('module') or metadata.get('module') or 'N/A'}",
+        f"优先级: {case.get('priority') or metadata.get('priority') or 'N/A'}",
+    ]
+
+
+@dataclass(slots=True)
+class ImpactReport(SlottedModel):
     """影响分析报告"""
     summary: str  # 影响摘要
     affected_modules: List[str]  # 受影响的模块列表
@@ -25,17 +38,6 @@ class ImpactReport:
     recommendations: List[str]  # 建议措施
     change_type: str  # 变更类型：feature_add, feature_modify, feature_remove, bug_fix
     
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return {
-            'summary': self.summary,
-            'affected_modules': self.affected_modules,
-            'affected_test_cases': self.affected_test_cases,
-            'risk_level': self.risk_level,
-            'recommendations': self.recommendations,
-            'change_type': self.change_type
-        }
-    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ImpactReport':
         """从字典创建"""
@@ -60,6 +62,12 @@ class ImpactAnalysisAgent:
     - 提供建议措施
     """
     
+    # 参考资料的 token 预算；现有用例主要看标题、模块和优先级，摘录较短、数量较多
+    PRD_BUDGET_TOKENS = 500
+    TEST_CASE_BUDGET_TOKENS = 600
+    MAX_TEST_CASES = 8
+    TEST_CASE_EXCERPT_TOKENS = 40
+    
     def __init__(self, brconnector_client: BRConnectorClient):
         """
         初始化影响分析 Agent
@@ -94,21 +102,23 @@ class ImpactAnalysisAgent:
         self.logger.info(f"开始分析变更影响，变更描述长度: {len(change_description)} 字符")
         
         # 准备历史 PRD 上下文
-        prd_context = ""
-        if related_prds:
-            prd_context = "相关历史 PRD：\n"
-            for i, prd in enumerate(related_prds[:3], 1):  # 最多使用前 3 个
-                prd_context += f"\n{i}. {prd.get('title', 'N/A')}\n"
-                prd_context += f"   内容摘要: {prd.get('content', 'N/A')[:200]}...\n"
+        prd_context = format_passages(
+            "相关历史 PRD：",
+            pack_passages(change_description, related_prds, budget_tokens=self.PRD_BUDGET_TOKENS)
+        )
         
         # 准备现有测试用例上下文
-        testcase_context = ""
-        if existing_test_cases:
-            testcase_context = "现有测试用例：\n"
-            for i, case in enumerate(existing_test_cases[:5], 1):  # 最多使用前 5 个
-                testcase_context += f"\n{i}. {case.get('title', 'N/A')}\n"
-                testcase_context += f"   模块: {case.get('module', 'N/A')}\n"
-                testcase_context += f"   优先级: {case.get('priority', 'N/A')}\n"
+        testcase_context = format_passages(
+            "现有测试用例：",
+            pack_passages(
+                change_description,
+                existing_test_cases,
+                budget_tokens=self.TEST_CASE_BUDGET_TOKENS,
+                max_passages=self.MAX_TEST_CASES,
+                excerpt_tokens=self.TEST_CASE_EXCERPT_TOKENS
+            ),
+            details=_case_details
+        )
         
         # 构建提示词
         prompt = f"""你是一个专业的测试工程师，负责分析需求变更对现有系统的影响。
@@ -160,10 +170,10 @@ class ImpactAnalysisAgent:
             
             return report
             
-        except BRConnectorError as e:
+        except (BRConnectorError, DeadlineExceeded) as e:
             self.logger.error(f"LLM 调用失败: {e}")
             raise
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
+        except (JSONDecodeError, KeyError, ValueError) as e:
             self.logger.error(f"解析 LLM 响应失败: {e}")
             raise ValueError(f"无法解析 LLM 响应: {str(e)}")
     
@@ -197,13 +207,13 @@ class ImpactAnalysisAgent:
         
         # 解析 JSON
         try:
-            data = json.loads(content)
-        except json.JSONDecodeError:
+            data = loads(content)
+        except JSONDecodeError:
             # 如果直接解析失败，尝试查找 JSON 对象
             import re
             json_match = re.search(r'\{.*\}', content, re.DOTALL)
             if json_match:
-                data = json.loads(json_match.group())
+                data = loads(json_match.group())
             else:
                 raise ValueError("响应中未找到有效的 JSON")
         
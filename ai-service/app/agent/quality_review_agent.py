@@ -4,19 +4,24 @@
 负责审查测试用例的质量和完整性。
 """
 
-import json
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import List, Dict, Any, Tuple, Optional
+from app.deadline import DeadlineExceeded
+from app.models import SlottedModel
+from app.serialization import JSONDecodeError, dumps_prompt, loads
 from app.integration.brconnector_client import BRConnectorClient, BRConnectorError
 from app.agent.requirement_analysis_agent import AnalysisResult
 from app.agent.test_design_agent import TestCaseDesign
 
 logger = logging.getLogger(__name__)
 
+# 整体质量从低到高
+QUALITY_LEVELS = ('needs_improvement', 'good', 'excellent')
 
-@dataclass
-class ReviewResult:
+
+@dataclass(slots=True)
+class ReviewResult(SlottedModel):
     """质量审查结果"""
     coverage_score: int  # 覆盖率评分 (0-100)
     issues: List[str]  # 发现的问题
@@ -25,10 +30,6 @@ class ReviewResult:
     rejected_cases: List[Tuple[int, str]]  # 拒绝的测试用例（索引，原因）
     overall_quality: str  # 整体质量: 'excellent' | 'good' | 'needs_improvement'
     
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return asdict(self)
-    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ReviewResult':
         """从字典创建"""
@@ -116,7 +117,12 @@ class QualityReviewAgent:
 - coverage_score 应该是 0-100 的整数
 - approved_cases 是通过审查的测试用例索引数组
 - rejected_cases 是 [索引, 原因] 对的数组
-- overall_quality 应该是 'excellent', 'good', 或 'needs_improvement'"""
+- overall_quality 应该是 'excellent', 'good', 或 'needs_improvement'{batch_note}"""
+    
+    # 分批审查时附加的说明
+    BATCH_NOTE = """
+- 以上只是全部测试用例中的一批，其余用例单独审查。coverage_score 只评估本批用例对其涉及的功能点
+  的覆盖和质量，不要因为本批未覆盖其他功能点而扣分；索引按本批从 0 开始"""
     
     def __init__(self, brconnector_client: BRConnectorClient):
         """
@@ -132,7 +138,8 @@ class QualityReviewAgent:
         self,
         test_cases: List[TestCaseDesign],
         requirement: str,
-        analysis: AnalysisResult
+        analysis: AnalysisResult,
+        partial: bool = False
     ) -> ReviewResult:
         """
         审查测试用例的质量和完整性
@@ -141,6 +148,7 @@ class QualityReviewAgent:
             test_cases: 测试用例设计列表
             requirement: 原始需求描述
             analysis: 需求分析结果
+            partial: test_cases 是否只是全部用例中的一批（见 merge_reviews）
             
         Returns:
             审查结果
@@ -167,9 +175,10 @@ class QualityReviewAgent:
         
         # 构建提示词
         prompt = self.REVIEW_PROMPT_TEMPLATE.format(
-            test_cases=json.dumps(test_cases_data, ensure_ascii=False, indent=2),
+            test_cases=dumps_prompt(test_cases_data),
             requirement=requirement,
-            analysis=json.dumps(analysis.to_dict(), ensure_ascii=False, indent=2)
+            analysis=dumps_prompt(analysis.to_dict()),
+            batch_note=self.BATCH_NOTE if partial else ""
         )
         
         try:
@@ -196,7 +205,7 @@ class QualityReviewAgent:
             
             return review_result
         
-        except BRConnectorError as e:
+        except (BRConnectorError, DeadlineExceeded) as e:
             self.logger.error(f"LLM 调用失败: {e}")
             raise
         except Exception as e:
@@ -231,7 +240,7 @@ class QualityReviewAgent:
                 json_str = json_str[start:end].strip()
             
             # 解析 JSON
-            data = json.loads(json_str)
+            data = loads(json_str)
             
             # 验证和标准化字段
             if 'coverage_score' not in data:
@@ -278,10 +287,59 @@ class QualityReviewAgent:
             
             return ReviewResult.from_dict(data)
         
-        except json.JSONDecodeError as e:
+        except JSONDecodeError as e:
             self.logger.error(f"JSON 解析失败: {e}")
             self.logger.debug(f"原始响应: {raw_result[:500]}...")
             raise ValueError(f"无法解析 LLM 响应为 JSON: {e}")
         except Exception as e:
             self.logger.error(f"解析审查结果失败: {e}")
             raise ValueError(f"解析审查结果失败: {e}")
+
+
+def merge_reviews(batches: List[Tuple[int, int, ReviewResult]]) -> ReviewResult:
+    """
+    合并分批审查的结果
+    
+    每批审查结果中的用例索引是批内索引，合并时加上批次偏移量换算为全局索引，
+    超出批次范围的索引被丢弃。覆盖率评分按批次用例数加权平均，整体质量取各批最低值，
+    问题和建议去重后按批次顺序排列。
+    
+    Args:
+        batches: (批次第一个用例的全局索引, 批次用例数, 审查结果) 列表
+        
+    Returns:
+        合并后的审查结果
+    """
+    approved: List[int] = []
+    rejected: List[Tuple[int, str]] = []
+    issues: Dict[str, None] = {}
+    suggestions: Dict[str, None] = {}
+    weighted_score = 0
+    total = 0
+    
+    for offset, size, result in sorted(batches, key=lambda batch: batch[0]):
+        approved.extend(offset + index for index in result.approved_cases if 0 <= index < size)
+        rejected.extend(
+            (offset + index, reason) for index, reason in result.rejected_cases if 0 <= index < size
+        )
+        issues.update(dict.fromkeys(result.issues))
+        suggestions.update(dict.fromkeys(result.suggestions))
+        weighted_score += result.coverage_score * size
+        total += size
+    
+    # 无法识别的质量等级（如审查失败时的 'unknown'）视为最低
+    qualities = [result.overall_quality for _, _, result in batches]
+    quality = min(
+        qualities,
+        key=lambda level: QUALITY_LEVELS.index(level) if level in QUALITY_LEVELS else -1,
+        default='unknown'
+    )
+    
+    return ReviewResult(
+        coverage_score=round(weighted_score / total) if total else 0,
+        issues=list(issues),
+        suggestions=list(suggestions),
+        approved_cases=approved,
+        rejected_cases=rejected,
+        overall_quality=quality
+    )
@@ -4,17 +4,20 @@
 负责从自然语言需求中提取结构化信息，为测试设计提供基础。
 """
 
-import json
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Dict, Any, List, Optional
+from app.context_packing import format_passages, pack_passages
+from app.deadline import DeadlineExceeded
+from app.models import SlottedModel
+from app.serialization import JSONDecodeError, loads
 from app.integration.brconnector_client import BRConnectorClient, BRConnectorError
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class AnalysisResult:
+@dataclass(slots=True)
+class AnalysisResult(SlottedModel):
     """需求分析结果"""
     functional_points: List[str]  # 功能点
     business_rules: List[str]  # 业务规则
@@ -23,10 +26,6 @@ class AnalysisResult:
     exception_conditions: List[str]  # 异常条件
     constraints: List[str]  # 约束条件
     
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return asdict(self)
-    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'AnalysisResult':
         """从字典创建"""
@@ -45,6 +44,9 @@ class RequirementAnalysisAgent:
     - 为测试设计提供结构化需求
     """
     
+    # 历史 PRD 参考资料的 token 预算
+    CONTEXT_BUDGET_TOKENS = 600
+    
     # Prompt 模板
     SYSTEM_PROMPT = """你是一位资深的需求分析专家，擅长从自然语言需求中提取结构化信息。
 
@@ -64,8 +66,6 @@ class RequirementAnalysisAgent:
 需求描述：
 {requirement}
 
-{historical_context}
-
 请提供结构化的分析结果，使用以下 JSON 格式：
 
 ```json
@@ -122,21 +122,16 @@ class RequirementAnalysisAgent:
         """
         self.logger.info(f"开始分析需求，长度: {len(requirement)} 字符")
         
-        # 准备历史上下文
+        # 准备历史上下文（作为可缓存的前缀块放在提示词之前发送）
         historical_context = ""
-        if context and 'historical_prds' in context:
-            prds = context['historical_prds']
-            if prds:
-                historical_context = "参考历史 PRD：\n"
-                for i, prd in enumerate(prds[:3], 1):  # 最多使用前 3 个
-                    historical_context += f"\n{i}. {prd.get('title', 'N/A')}\n"
-                    historical_context += f"   {prd.get('content', '')[:200]}...\n"
+        if context and context.get('historical_prds'):
+            historical_context = format_passages(
+                "参考历史 PRD：",
+                pack_passages(requirement, context['historical_prds'], budget_tokens=self.CONTEXT_BUDGET_TOKENS)
+            )
         
         # 构建提示词
-        prompt = self.ANALYSIS_PROMPT_TEMPLATE.format(
-            requirement=requirement,
-            historical_context=historical_context
-        )
+        prompt = self.ANALYSIS_PROMPT_TEMPLATE.format(requirement=requirement)
         
         try:
             # 调用 LLM
@@ -144,6 +139,7 @@ class RequirementAnalysisAgent:
             response = await self.llm.chat_simple(
                 prompt=prompt,
                 system=self.SYSTEM_PROMPT,
+                cached_context=historical_context or None,
                 temperature=0.3,  # 较低温度以获得更一致的结果
                 max_tokens=2000
             )
@@ -160,7 +156,7 @@ class RequirementAnalysisAgent:
             
             return analysis_result
         
-        except BRConnectorError as e:
+        except (BRConnectorError, DeadlineExceeded) as e:
             self.logger.error(f"LLM 调用失败: {e}")
             raise
         except Exception as e:
@@ -195,7 +191,7 @@ class RequirementAnalysisAgent:
                 json_str = json_str[start:end].strip()
             
             # 解析 JSON
-            data = json.loads(json_str)
+            data = loads(json_str)
             
             # 验证必需字段
             required_fields = [
@@ -217,7 +213,7 @@ class RequirementAnalysisAgent:
             
             return AnalysisResult.from_dict(data)
         
-        except json.JSONDecodeError as e:
+        except JSONDecodeError as e:
             self.logger.error(f"JSON 解析失败: {e}")
             self.logger.debug(f"原始响应: {raw_result[:500]}...")
             raise ValueError(f"无法解析 LLM 响应为 JSON: {e}")
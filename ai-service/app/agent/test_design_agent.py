@@ -4,37 +4,109 @@
 负责基于需求分析结果设计全面的测试用例。
 """
 
-import json
 import logging
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from app.context_packing import format_passages, pack_passages
+from app.deadline import DeadlineExceeded
+from app.serialization import JSONDecodeError, dumps_prompt, loads
+from app.models import CaseType, Priority, SlottedModel, intern_label
 from app.integration.brconnector_client import BRConnectorClient, BRConnectorError
 from app.agent.requirement_analysis_agent import AnalysisResult
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class TestCaseDesign:
+@dataclass(slots=True)
+class TestCaseDesign(SlottedModel):
     """测试用例设计"""
     title: str  # 标题
     preconditions: str  # 前置条件
     steps: List[str]  # 测试步骤
     expected_result: str  # 预期结果
-    priority: str  # 优先级: 'high' | 'medium' | 'low'
-    type: str  # 类型: 'functional' | 'boundary' | 'exception' | 'security' | 'performance'
+    priority: str  # 优先级: Priority（无法识别的值保留为字符串）
+    type: str  # 类型: CaseType，以及 'security' | 'performance' 等字符串
     rationale: str  # 设计理由
     
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
-        return asdict(self)
-    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'TestCaseDesign':
         """从字典创建"""
         return cls(**data)
 
 
+class JsonArrayItemParser:
+    """
+    增量解析流式输出中的 JSON 数组，每个顶层对象元素完整后立即返回
+    
+    数组前的文本（如 markdown 代码块标记）会被忽略；无法解析的元素记录警告后跳过。
+    """
+    
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._finished = False
+        self._item_start: Optional[int] = None
+    
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        追加一段文本
+        
+        Args:
+            chunk: 新到达的文本
+            
+        Returns:
+            本次新完成的数组元素
+        """
+        if self._finished:
+            return []
+        text = self._text + chunk
+        items = []
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif not self._started:
+                if ch == '[':
+                    self._started = True
+                    self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '[{':
+                if self._depth == 1 and ch == '{':
+                    self._item_start = i
+                self._depth += 1
+            elif ch in ']}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finished = True
+                    break
+                if self._depth == 1 and ch == '}' and self._item_start is not None:
+                    try:
+                        items.append(loads(text[self._item_start:i + 1]))
+                    except JSONDecodeError as e:
+                        logger.warning(f"跳过无法解析的数组元素: {e}")
+                    self._item_start = None
+            i += 1
+        
+        # 只保留未完成元素的文本
+        keep_from = i if self._item_start is None else self._item_start
+        self._text = text[keep_from:]
+        self._pos = i - keep_from
+        if self._item_start is not None:
+            self._item_start = 0
+        return items
+
+
 class TestDesignAgent:
     """
     测试设计专家 Agent
@@ -103,6 +175,61 @@ class TestDesignAgent:
 - 优先级应该合理分配
 - 类型应该正确分类"""
     
+    # 快速模式：一次调用同时完成需求分析和测试设计
+    FAST_SYSTEM_PROMPT = """你是一位资深的测试专家，同时负责需求分析和测试设计。
+
+你的任务是先从需求中提取功能点、业务规则、输入输出规格、异常条件和约束条件，
+再基于分析结果设计覆盖主流程、异常流程、边界值、安全和性能的测试用例。
+
+每个测试用例包含 title、preconditions、steps、expected_result、priority（High/Medium/Low）、
+type（Functional/Boundary/Exception/Security/Performance）和 rationale。
+
+请以一个 JSON 对象输出分析结果和测试用例。"""
+    
+    FAST_PROMPT_TEMPLATE = """请分析以下需求并设计测试用例：
+
+需求描述：
+{requirement}
+
+请使用以下 JSON 格式输出：
+
+```json
+{{
+  "analysis": {{
+    "functional_points": ["功能点1", ...],
+    "business_rules": ["规则1", ...],
+    "input_specs": {{"参数名": {{"type": "类型", "required": true}}}},
+    "output_specs": {{"返回值": {{"type": "类型", "description": "描述"}}}},
+    "exception_conditions": ["异常1", ...],
+    "constraints": ["约束1", ...]
+  }},
+  "test_cases": [
+    {{
+      "title": "测试用例标题",
+      "preconditions": "前置条件描述",
+      "steps": ["步骤1", "步骤2"],
+      "expected_result": "预期结果描述",
+      "priority": "high",
+      "type": "functional",
+      "rationale": "设计理由"
+    }}
+  ]
+}}
+```
+
+注意：
+- 测试用例应覆盖所有功能点和异常条件
+- 步骤应该清晰、可操作，预期结果应该具体、可衡量"""
+    
+    # 分析结果的字段（快速模式缺失时使用默认值）
+    ANALYSIS_FIELDS = (
+        'functional_points', 'business_rules', 'input_specs',
+        'output_specs', 'exception_conditions', 'constraints'
+    )
+    
+    # 历史资料参考的 token 预算（快速模式下 PRD 和用例各占一半）
+    CONTEXT_BUDGET_TOKENS = 600
+    
     def __init__(self, brconnector_client: BRConnectorClient):
         """
         初始化测试设计 Agent
@@ -136,21 +263,7 @@ class TestDesignAgent:
             f"开始设计测试用例，功能点数: {len(analysis.functional_points)}"
         )
         
-        # 准备历史测试用例上下文
-        historical_context = ""
-        if historical_cases:
-            historical_context = "参考历史测试用例：\n"
-            for i, case in enumerate(historical_cases[:3], 1):  # 最多使用前 3 个
-                historical_context += f"\n{i}. {case.get('title', 'N/A')}\n"
-                if 'steps' in case:
-                    steps_preview = case['steps'][:2] if isinstance(case['steps'], list) else []
-                    historical_context += f"   步骤: {', '.join(str(s) for s in steps_preview)}...\n"
-        
-        # 构建提示词
-        prompt = self.DESIGN_PROMPT_TEMPLATE.format(
-            analysis=json.dumps(analysis.to_dict(), ensure_ascii=False, indent=2),
-            historical_cases=historical_context
-        )
+        prompt = self._build_design_prompt(analysis, historical_cases)
         
         try:
             # 调用 LLM
@@ -171,13 +284,173 @@ class TestDesignAgent:
             
             return test_designs
         
-        except BRConnectorError as e:
+        except (BRConnectorError, DeadlineExceeded) as e:
             self.logger.error(f"LLM 调用失败: {e}")
             raise
         except Exception as e:
             self.logger.error(f"测试设计失败: {e}")
             raise ValueError(f"测试设计失败: {e}") from e
     
+    async def design_tests_stream(
+        self,
+        analysis: AnalysisResult,
+        historical_cases: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncIterator[TestCaseDesign]:
+        """
+        流式设计测试用例：LLM 输出中每完成一个测试用例就立即产出
+        
+        提示词与 design_tests 相同，调用方可以在后续用例生成期间处理已产出的用例
+        （如流水线质量审查）。
+        
+        Args:
+            analysis: 需求分析结果
+            historical_cases: 可选的历史测试用例
+            
+        Yields:
+            测试用例设计
+            
+        Raises:
+            BRConnectorError: 如果 LLM 调用失败
+            ValueError: 如果没有产出有效的测试用例
+        """
+        self.logger.info(
+            f"开始流式设计测试用例，功能点数: {len(analysis.functional_points)}"
+        )
+        prompt = self._build_design_prompt(analysis, historical_cases)
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        
+        parser = JsonArrayItemParser()
+        position = 0
+        produced = 0
+        try:
+            async for chunk in self.llm.chat_stream(messages, temperature=0.5, max_tokens=4000):
+                for item in parser.feed(chunk):
+                    design = self._design_from_item(position, item)
+                    position += 1
+                    if design is not None:
+                        produced += 1
+                        yield design
+        except (BRConnectorError, DeadlineExceeded) as e:
+            self.logger.error(f"LLM 调用失败: {e}")
+            raise
+        
+        if not produced:
+            raise ValueError("测试设计失败: 没有有效的测试用例")
+        self.logger.info(f"流式测试设计完成: 生成 {produced} 个测试用例")
+    
+    def _build_design_prompt(
+        self,
+        analysis: AnalysisResult,
+        historical_cases: Optional[List[Dict[str, Any]]]
+    ) -> str:
+        """构建测试设计提示词"""
+        # 准备历史测试用例上下文
+        # 用功能点和业务规则作为查询，挑选最相关的用例片段
+        query = "\n".join([*analysis.functional_points, *analysis.business_rules])
+        historical_context = format_passages(
+            "参考历史测试用例：",
+            pack_passages(query, historical_cases, budget_tokens=self.CONTEXT_BUDGET_TOKENS)
+        )
+        
+        # 构建提示词
+        return self.DESIGN_PROMPT_TEMPLATE.format(
+            analysis=dumps_prompt(analysis.to_dict()),
+            historical_cases=historical_context
+        )
+    
+    async def draft_tests(
+        self,
+        requirement: str,
+        historical_prds: Optional[List[Dict[str, Any]]] = None,
+        historical_cases: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[AnalysisResult, List[TestCaseDesign]]:
+        """
+        快速模式：一次 LLM 调用完成需求分析和测试设计
+        
+        Args:
+            requirement: 需求描述
+            historical_prds: 可选的历史 PRD
+            historical_cases: 可选的历史测试用例
+            
+        Returns:
+            (需求分析结果, 测试用例设计列表)
+            
+        Raises:
+            BRConnectorError: 如果 LLM 调用失败
+            ValueError: 如果无法解析 LLM 响应
+        """
+        self.logger.info(f"开始快速生成测试用例，需求长度: {len(requirement)} 字符")
+        
+        # PRD 和用例各占一半预算
+        budget = self.CONTEXT_BUDGET_TOKENS // 2
+        prds_context = format_passages(
+            "参考历史 PRD：", pack_passages(requirement, historical_prds, budget_tokens=budget)
+        )
+        cases_context = format_passages(
+            "参考历史测试用例：", pack_passages(requirement, historical_cases, budget_tokens=budget)
+        )
+        
+        prompt = self.FAST_PROMPT_TEMPLATE.format(requirement=requirement)
+        # 历史资料作为可缓存的前缀块放在提示词之前发送
+        historical_context = "\n".join(part for part in (prds_context, cases_context) if part)
+        
+        try:
+            response = await self.llm.chat_simple(
+                prompt=prompt,
+                system=self.FAST_SYSTEM_PROMPT,
+                cached_context=historical_context or None,
+                temperature=0.4,
+                max_tokens=5000
+            )
+            
+            self.logger.debug(f"收到 LLM 响应，长度: {len(response)} 字符")
+            
+            analysis, test_designs = self._parse_draft(response)
+            
+            self.logger.info(
+                f"快速生成完成: {len(analysis.functional_points)} 个功能点, "
+                f"{len(test_designs)} 个测试用例"
+            )
+            
+            return analysis, test_designs
+        
+        except (BRConnectorError, DeadlineExceeded) as e:
+            self.logger.error(f"LLM 调用失败: {e}")
+            raise
+        except Exception as e:
+            self.logger.error(f"快速生成失败: {e}")
+            raise ValueError(f"快速生成失败: {e}") from e
+    
+    def _parse_draft(self, raw_result: str) -> Tuple[AnalysisResult, List[TestCaseDesign]]:
+        """
+        解析快速模式的 LLM 输出
+        
+        Args:
+            raw_result: LLM 的原始响应
+            
+        Returns:
+            (需求分析结果, 测试用例设计列表)
+            
+        Raises:
+            ValueError: 如果无法解析响应
+        """
+        data = self._load_json(raw_result)
+        if not isinstance(data, dict) or not isinstance(data.get('test_cases'), list):
+            raise ValueError("响应应该是包含 analysis 和 test_cases 的对象")
+        
+        analysis_data = data.get('analysis')
+        if not isinstance(analysis_data, dict):
+            analysis_data = {}
+        analysis = AnalysisResult.from_dict({
+            field: analysis_data.get(field, {} if field.endswith('_specs') else [])
+            for field in self.ANALYSIS_FIELDS
+        })
+        
+        return analysis, self._designs_from_items(data['test_cases'])
+    
     def _parse_test_designs(self, raw_result: str) -> List[TestCaseDesign]:
         """
         解析 LLM 输出为测试用例设计列表
@@ -192,93 +465,134 @@ class TestDesignAgent:
             ValueError: 如果无法解析响应
         """
         try:
-            # 尝试提取 JSON（可能在 markdown 代码块中）
-            json_str = raw_result.strip()
-            
-            # 如果响应包含 markdown 代码块，提取其中的 JSON
-            if "```json" in json_str:
-                start = json_str.find("```json") + 7
-                end = json_str.find("```", start)
-                if end == -1:
-                    # 没有找到结束标记，取到字符串末尾
-                    json_str = json_str[start:].strip()
-                else:
-                    json_str = json_str[start:end].strip()
-            elif "```" in json_str:
-                start = json_str.find("```") + 3
-                end = json_str.find("```", start)
-                if end == -1:
-                    json_str = json_str[start:].strip()
-                else:
-                    json_str = json_str[start:end].strip()
-            
-            # 尝试修复常见的 JSON 问题
-            # 1. 移除可能的 BOM 和控制字符
-            json_str = json_str.replace('\ufeff', '').replace('\x00', '')
-            
-            # 2. 如果 JSON 不完整（缺少结束括号），尝试修复
-            if json_str.count('[') > json_str.count(']'):
-                json_str += ']' * (json_str.count('[') - json_str.count(']'))
-            if json_str.count('{') > json_str.count('}'):
-                json_str += '}' * (json_str.count('{') - json_str.count('}'))
-            
-            # 解析 JSON
-            try:
-                data = json.loads(json_str)
-            except json.JSONDecodeError as e:
-                self.logger.error(f"JSON 解析失败: {e}")
-                self.logger.debug(f"原始响应: {raw_result[:500]}...")
-                self.logger.debug(f"提取的 JSON: {json_str[:500]}...")
-                raise ValueError(f"无法解析 LLM 响应为 JSON: {e}")
+            data = self._load_json(raw_result)
             
             # 确保是列表
             if not isinstance(data, list):
                 raise ValueError("响应应该是测试用例数组")
             
-            # 转换为 TestCaseDesign 对象
-            test_designs = []
-            for i, item in enumerate(data):
-                try:
-                    # 验证必需字段
-                    required_fields = [
-                        'title', 'preconditions', 'steps',
-                        'expected_result', 'priority', 'type'
-                    ]
-                    
-                    for field in required_fields:
-                        if field not in item:
-                            self.logger.warning(
-                                f"测试用例 {i} 缺少字段 '{field}'，跳过"
-                            )
-                            continue
-                    
-                    # 添加默认 rationale（如果缺失）
-                    if 'rationale' not in item:
-                        item['rationale'] = ""
-                    
-                    # 标准化优先级和类型
-                    item['priority'] = item['priority'].lower()
-                    item['type'] = item['type'].lower()
-                    
-                    # 确保 steps 是列表
-                    if not isinstance(item['steps'], list):
-                        item['steps'] = [str(item['steps'])]
-                    
-                    test_designs.append(TestCaseDesign.from_dict(item))
-                
-                except Exception as e:
-                    self.logger.warning(f"跳过无效的测试用例 {i}: {e}")
-                    continue
+            return self._designs_from_items(data)
+        
+        except Exception as e:
+            self.logger.error(f"解析测试设计失败: {e}")
+            raise ValueError(f"解析测试设计失败: {e}")
+    
+    def _load_json(self, raw_result: str) -> Any:
+        """
+        从 LLM 响应中提取并解析 JSON（可能在 markdown 代码块中，可能被截断）
+        
+        Args:
+            raw_result: LLM 的原始响应
             
-            if not test_designs:
-                raise ValueError("没有有效的测试用例")
+        Returns:
+            解析后的 JSON 数据
             
-            return test_designs
+        Raises:
+            ValueError: 如果无法解析为 JSON
+        """
+        # 尝试提取 JSON（可能在 markdown 代码块中）
+        json_str = raw_result.strip()
+        
+        # 如果响应包含 markdown 代码块，提取其中的 JSON
+        if "```json" in json_str:
+            start = json_str.find("```json") + 7
+            end = json_str.find("```", start)
+            if end == -1:
+                # 没有找到结束标记，取到字符串末尾
+                json_str = json_str[start:].strip()
+            else:
+                json_str = json_str[start:end].strip()
+        elif "```" in json_str:
+            start = json_str.find("```") + 3
+            end = json_str.find("```", start)
+            if end == -1:
+                json_str = json_str[start:].strip()
+            else:
+                json_str = json_str[start:end].strip()
+        
+        # 尝试修复常见的 JSON 问题
+        # 1. 移除可能的 BOM 和控制字符
+        json_str = json_str.replace('\ufeff', '').replace('\x00', '')
         
-        except json.JSONDecodeError as e:
+        # 2. 如果 JSON 不完整（缺少结束括号），尝试修复
+        if json_str.count('[') > json_str.count(']'):
+            json_str += ']' * (json_str.count('[') - json_str.count(']'))
+        if json_str.count('{') > json_str.count('}'):
+            json_str += '}' * (json_str.count('{') - json_str.count('}'))
+        
+        # 解析 JSON
+        try:
+            return loads(json_str)
+        except JSONDecodeError as e:
             self.logger.error(f"JSON 解析失败: {e}")
             self.logger.debug(f"原始响应: {raw_result[:500]}...")
+            self.logger.debug(f"提取的 JSON: {json_str[:500]}...")
             raise ValueError(f"无法解析 LLM 响应为 JSON: {e}")
+    
+    def _designs_from_items(self, data: List[Any]) -> List[TestCaseDesign]:
+        """
+        将解析出的 JSON 数组转换为测试用例设计列表（跳过无效项）
+        
+        Args:
+            data: 测试用例字典数组
+            
+        Returns:
+            测试用例设计列表
+            
+        Raises:
+            ValueError: 如果没有有效的测试用例
+        """
+        test_designs = [
+            design for design in (
+                self._design_from_item(i, item) for i, item in enumerate(data)
+            )
+            if design is not None
+        ]
+        
+        if not test_designs:
+            raise ValueError("没有有效的测试用例")
+        
+        return test_designs
+    
+    def _design_from_item(self, index: int, item: Any) -> Optional[TestCaseDesign]:
+        """
+        将单个测试用例字典转换为 TestCaseDesign
+        
+        Args:
+            index: 用例在 LLM 输出中的位置（用于日志）
+            item: 测试用例字典
+            
+        Returns:
+            测试用例设计，无效时返回 None
+        """
+        try:
+            # 验证必需字段
+            required_fields = [
+                'title', 'preconditions', 'steps',
+                'expected_result', 'priority', 'type'
+            ]
+            
+            for field in required_fields:
+                if field not in item:
+                    self.logger.warning(
+                        f"测试用例 {index} 缺少字段 '{field}'，跳过"
+                    )
+                    continue
+            
+            # 添加默认 rationale（如果缺失）
+            if 'rationale' not in item:
+                item['rationale'] = ""
+            
+            # 标准化优先级和类型（转换为共享的枚举成员或驻留字符串）
+            item['priority'] = intern_label(Priority, item['priority'])
+            item['type'] = intern_label(CaseType, item['type'])
+            
+            # 确保 steps 是列表
+            if not isinstance(item['steps'], list):
+                item['steps'] = [str(item['steps'])]
+            
+            return TestCaseDesign.from_dict(item)
+        
         except Exception as e:
-            self.logger.error(f"解析测试设计失败: {e}")
-            raise ValueError(f"解析测试设计失败: {e}")
+            self.logger.warning(f"跳过无效的测试用例 {index}: {e}")
+            return None
@@ -10,12 +10,12 @@ import asyncio
 from typing import Any, Dict, List, Optional, Type
 from enum import Enum
 
+from ..deadline import DeadlineExceeded, deadline_scope
+from ..metrics import AGENT_REQUEST_DURATION, AGENT_STEP_DURATION
+from ..progress import report_progress
+from ..tracing import tracer
 from ..integration.brconnector_client import BRConnectorClient
 from ..workflow.base import BaseWorkflow, WorkflowResult
-from ..workflow.test_case_generation_workflow import TestCaseGenerationWorkflow
-from ..workflow.impact_analysis_workflow import ImpactAnalysisWorkflow
-from ..workflow.regression_recommendation_workflow import RegressionRecommendationWorkflow
-from ..workflow.test_case_optimization_workflow import TestCaseOptimizationWorkflow
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +78,43 @@ class TestEngineerAgent:
     - 对最终结果进行质量保证
     """
     
+    CLASSIFICATION_SYSTEM_PROMPT = """你是一个测试工程师助手。请分析用户的请求，判断任务类型。
+
+任务类型说明：
+1. generate_test_cases - 生成测试用例
+   - 用户想要创建新的测试用例
+   - 关键词：生成、创建、编写、设计测试用例
+   - 示例："帮我生成用户登录的测试用例"
+
+2. impact_analysis - 影响分析
+   - 用户想要分析需求变更对现有系统的影响
+   - 关键词：影响、变更、修改、分析
+   - 示例："分析这个需求变更的影响"
+
+3. regression_recommendation - 回归测试推荐
+   - 用户想要推荐需要执行的回归测试用例
+   - 关键词：回归、推荐、建议
+   - 示例："推荐这个版本的回归测试用例"
+
+4. test_case_optimization - 测试用例优化
+   - 用户想要优化、补全或改进现有测试用例
+   - 关键词：优化、补全、完善、改进
+   - 示例："优化现有的登录测试用例"
+
+5. unknown - 未知任务
+   - 无法确定任务类型
+   - 用于不明确的请求
+
+分析规则：
+- 如果用户提到"生成"或"创建"测试用例，选择 generate_test_cases
+- 如果用户提到"影响"或"变更分析"，选择 impact_analysis
+- 如果用户提到"回归"或"推荐"，选择 regression_recommendation
+- 如果用户提到"优化"或"改进"现有用例，选择 test_case_optimization
+- 如果无法确定，选择 unknown
+
+请只返回任务类型的英文标识符（如：generate_test_cases），不要返回其他内容。
+"""
+    
     def __init__(
         self,
         llm_client: BRConnectorClient,
@@ -152,6 +189,18 @@ class TestEngineerAgent:
             for name, workflow in self.workflows.items()
         ]
     
+    def predict_task_type(self, message: str) -> Optional[TaskType]:
+        """
+        不调用 LLM 预判任务类型（用于请求准入时选择队列）
+        
+        Args:
+            message: 用户消息
+            
+        Returns:
+            任务类型，如果只能通过 LLM 确定则返回 None
+        """
+        return self._quick_classify_by_keywords(message)
+    
     def _quick_classify_by_keywords(self, message: str) -> Optional[TaskType]:
         """
         通过关键词快速分类任务（避免不必要的 LLM 调用）
@@ -239,50 +288,11 @@ class TestEngineerAgent:
         if 'last_task_type' in context and context['last_task_type']:
             context_info += f"\n上一次任务类型：{context['last_task_type']}"
         
-        # 构建分类 prompt
-        classification_prompt = f"""你是一个测试工程师助手。请分析用户的请求，判断任务类型。
-
-用户请求：{message}
-{context_info}
-
-任务类型说明：
-1. generate_test_cases - 生成测试用例
-   - 用户想要创建新的测试用例
-   - 关键词：生成、创建、编写、设计测试用例
-   - 示例："帮我生成用户登录的测试用例"
-
-2. impact_analysis - 影响分析
-   - 用户想要分析需求变更对现有系统的影响
-   - 关键词：影响、变更、修改、分析
-   - 示例："分析这个需求变更的影响"
-
-3. regression_recommendation - 回归测试推荐
-   - 用户想要推荐需要执行的回归测试用例
-   - 关键词：回归、推荐、建议
-   - 示例："推荐这个版本的回归测试用例"
-
-4. test_case_optimization - 测试用例优化
-   - 用户想要优化、补全或改进现有测试用例
-   - 关键词：优化、补全、完善、改进
-   - 示例："优化现有的登录测试用例"
-
-5. unknown - 未知任务
-   - 无法确定任务类型
-   - 用于不明确的请求
-
-分析规则：
-- 如果用户提到"生成"或"创建"测试用例，选择 generate_test_cases
-- 如果用户提到"影响"或"变更分析"，选择 impact_analysis
-- 如果用户提到"回归"或"推荐"，选择 regression_recommendation
-- 如果用户提到"优化"或"改进"现有用例，选择 test_case_optimization
-- 如果无法确定，选择 unknown
-
-请只返回任务类型的英文标识符（如：generate_test_cases），不要返回其他内容。
-"""
-        
         try:
+            # 分类说明固定不变，作为 system 前缀发送以命中提示词缓存
             response = await self.llm_client.chat(
-                messages=[{"role": "user", "content": classification_prompt}],
+                messages=[{"role": "user", "content": f"用户请求：{message}\n{context_info}"}],
+                system=self.CLASSIFICATION_SYSTEM_PROMPT,
                 max_tokens=50,
                 temperature=0.0
             )
@@ -320,6 +330,8 @@ class TestEngineerAgent:
             
             return task_type
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"任务分类失败: {e}")
             # 默认返回生成测试用例任务
@@ -365,6 +377,9 @@ class TestEngineerAgent:
         """
         处理用户请求
         
+        超时时间同时作为请求截止时间在上下文中传播，工具、Agent 和客户端
+        会将各自的超时和重试预算收紧到剩余时间以内；超时后未完成的调用会被取消。
+        
         Args:
             message: 用户消息
             context: 上下文信息，包含：
@@ -377,6 +392,25 @@ class TestEngineerAgent:
         Returns:
             Agent 响应
         """
+        with tracer.start_span("agent.process_request") as span:
+            response = await self._process_request_with_timeout(message, context, timeout)
+            span.set_attribute("project_id", context.get('project_id'))
+            span.set_attribute("task_type", response.task_type.value)
+            span.set_attribute("success", response.success)
+            response.metadata['trace_id'] = span.context.trace_id
+            if not response.success:
+                span.set_status("ERROR", response.error or "")
+            return response
+    
+    async def _process_request_with_timeout(
+        self,
+        message: str,
+        context: Dict[str, Any],
+        timeout: Optional[float]
+    ) -> AgentResponse:
+        """
+        带超时控制的请求处理（参数同 process_request）
+        """
         # 性能监控：记录开始时间
         start_time = time.time()
         
@@ -399,15 +433,21 @@ class TestEngineerAgent:
             )
         
         try:
-            # 使用 asyncio.wait_for 实现超时控制
-            response = await asyncio.wait_for(
-                self._process_request_internal(message, context, start_time),
-                timeout=timeout
-            )
+            # 设置请求截止时间，并使用 asyncio.wait_for 在超时后取消仍在执行的调用
+            with deadline_scope(timeout):
+                response = await asyncio.wait_for(
+                    self._process_request_internal(message, context, start_time),
+                    timeout=timeout
+                )
             
             # 添加总执行时间到元数据
             total_duration = time.time() - start_time
             response.metadata['total_duration_seconds'] = total_duration
+            AGENT_REQUEST_DURATION.observe(
+                total_duration,
+                task_type=response.task_type.value,
+                status="ok" if response.success else "error"
+            )
             
             logger.info(f"请求处理完成，总耗时: {total_duration:.2f}秒")
             
@@ -416,6 +456,7 @@ class TestEngineerAgent:
         except asyncio.TimeoutError:
             duration = time.time() - start_time
             logger.error(f"请求处理超时: {duration:.2f}秒 (限制: {timeout}秒)")
+            AGENT_REQUEST_DURATION.observe(duration, task_type=TaskType.UNKNOWN.value, status="timeout")
             return AgentResponse(
                 success=False,
                 task_type=TaskType.UNKNOWN,
@@ -429,6 +470,7 @@ class TestEngineerAgent:
         except Exception as e:
             duration = time.time() - start_time
             logger.exception(f"处理请求时发生异常: {e}")
+            AGENT_REQUEST_DURATION.observe(duration, task_type=TaskType.UNKNOWN.value, status="error")
             return AgentResponse(
                 success=False,
                 task_type=TaskType.UNKNOWN,
@@ -462,6 +504,8 @@ class TestEngineerAgent:
         task_type = await self.classify_task(message, context)
         step_duration = time.time() - step_start
         logger.info(f"步骤 1 完成，耗时: {step_duration:.2f}秒")
+        AGENT_STEP_DURATION.observe(step_duration, step="classify")
+        report_progress("task_classified", task_type=task_type.value)
         
         if task_type == TaskType.UNKNOWN:
             logger.warning("无法确定任务类型")
@@ -481,6 +525,7 @@ class TestEngineerAgent:
         workflow = self.select_workflow(task_type)
         step_duration = time.time() - step_start
         logger.info(f"步骤 2 完成，耗时: {step_duration:.2f}秒")
+        AGENT_STEP_DURATION.observe(step_duration, step="select_workflow")
         
         if not workflow:
             logger.error(f"未找到适合任务类型 {task_type} 的工作流")
@@ -497,9 +542,11 @@ class TestEngineerAgent:
         # 步骤 3: 执行工作流
         step_start = time.time()
         logger.info(f"步骤 3: 执行工作流 {workflow.name}")
+        report_progress("workflow_started", workflow=workflow.name)
         workflow_result = await workflow.execute(message, context)
         step_duration = time.time() - step_start
         logger.info(f"步骤 3 完成，耗时: {step_duration:.2f}秒")
+        AGENT_STEP_DURATION.observe(step_duration, step="execute_workflow")
         
         # 步骤 4: 转换结果
         step_start = time.time()
@@ -521,6 +568,7 @@ class TestEngineerAgent:
         # 成功响应
         step_duration = time.time() - step_start
         logger.info(f"步骤 4 完成，耗时: {step_duration:.2f}秒")
+        AGENT_STEP_DURATION.observe(step_duration, step="format_response")
         logger.info("请求处理成功")
         
         return AgentResponse(
@@ -0,0 +1,338 @@
+"""
+请求准入控制
+
+限制同时执行的请求数，超出的请求进入有界等待队列，队列已满或等待超时时以 429 拒绝。
+过载时不再让所有请求一起变慢直到超时，而是让已准入的请求按正常速度完成，保持有效吞吐。
+
+请求按车道排队，空位按车道优先级分配：
+- fast: 不调用 LLM 的短任务（如回归推荐）
+- interactive: 流式对话
+- standard: 调用 LLM 的长工作流（测试用例生成、影响分析、用例优化）
+
+standard 车道最多占用 max_concurrent - reserved_slots 个名额，
+预留的名额保证短任务和对话不会排在长任务后面。
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from app.agent.test_engineer_agent import TaskType
+from app.metrics import ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED
+
+logger = logging.getLogger(__name__)
+
+LANE_FAST = "fast"
+LANE_INTERACTIVE = "interactive"
+LANE_STANDARD = "standard"
+
+# 按优先级从高到低排列
+LANES = (LANE_FAST, LANE_INTERACTIVE, LANE_STANDARD)
+
+# 不调用 LLM 的任务类型
+FAST_TASK_TYPES = frozenset([TaskType.REGRESSION_RECOMMENDATION])
+
+# 各车道服务时间的初始估计（秒），用于在没有历史数据时计算 Retry-After
+DEFAULT_SERVICE_TIME = {
+    LANE_FAST: 2.0,
+    LANE_INTERACTIVE: 20.0,
+    LANE_STANDARD: 60.0,
+}
+
+# Retry-After 的范围（秒）
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 300
+
+# 服务时间指数移动平均的权重
+_EWMA_ALPHA = 0.2
+
+
+def lane_for_task(task_type: Optional[TaskType]) -> str:
+    """
+    根据预判的任务类型选择车道
+
+    Args:
+        task_type: 任务类型（无法预判时为 None，需要 LLM 分类，按长任务处理）
+
+    Returns:
+        车道名称
+    """
+    return LANE_FAST if task_type in FAST_TASK_TYPES else LANE_STANDARD
+
+
+class AdmissionRejected(Exception):
+    """请求未被准入（队列已满或等待超时）"""
+
+    def __init__(self, lane: str, reason: str, retry_after: int):
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+        message = "服务繁忙，等待队列已满" if reason == "queue_full" else "服务繁忙，排队等待超时"
+        super().__init__(f"{message}，请在 {retry_after} 秒后重试")
+
+
+class Ticket:
+    """
+    一次准入申请
+
+    Attributes:
+        lane: 车道
+        enqueued_at: 申请时间（time.monotonic()）
+        granted_at: 准入时间，尚未准入时为 None
+    """
+
+    def __init__(self, lane: str):
+        self.lane = lane
+        self.enqueued_at = time.monotonic()
+        self.granted_at: Optional[float] = None
+        self.released = False
+        # 准入或排队位置变化时被设置
+        self._changed = asyncio.Event()
+
+    @property
+    def granted(self) -> bool:
+        return self.granted_at is not None
+
+    @property
+    def queue_wait(self) -> float:
+        """排队等待的时间（秒）"""
+        end = self.granted_at if self.granted_at is not None else time.monotonic()
+        return end - self.enqueued_at
+
+
+class AdmissionController:
+    """
+    准入控制器
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_queue: int = 32,
+        max_wait: float = 30.0,
+        reserved_slots: int = 2
+    ):
+        """
+        Args:
+            max_concurrent: 同时执行的请求数上限
+            max_queue: 所有车道合计的等待队列长度上限
+            max_wait: 单个请求排队等待的最长时间（秒）
+            reserved_slots: 为 fast / interactive 车道预留的名额（standard 车道不可占用）
+        """
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent 必须大于 0")
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.reserved_slots = min(max(reserved_slots, 0), max_concurrent - 1)
+        self._active: Dict[str, int] = {lane: 0 for lane in LANES}
+        self._waiting: Dict[str, Deque[Ticket]] = {lane: deque() for lane in LANES}
+        self._service_time: Dict[str, float] = dict(DEFAULT_SERVICE_TIME)
+
+    # ------------------------------------------------------------------
+    # 状态
+    # ------------------------------------------------------------------
+
+    @property
+    def active(self) -> int:
+        """正在执行的请求数"""
+        return sum(self._active.values())
+
+    @property
+    def queued(self) -> int:
+        """排队中的请求数"""
+        return sum(len(waiters) for waiters in self._waiters_by_priority())
+
+    def _waiters_by_priority(self):
+        return [self._waiting[lane] for lane in LANES]
+
+    def _lane_capacity(self, lane: str) -> int:
+        if lane == LANE_STANDARD:
+            return self.max_concurrent - self.reserved_slots
+        return self.max_concurrent
+
+    def _can_grant(self, lane: str) -> bool:
+        if self.active >= self.max_concurrent:
+            return False
+        return lane != LANE_STANDARD or self._active[LANE_STANDARD] < self._lane_capacity(LANE_STANDARD)
+
+    def position(self, ticket: Ticket) -> int:
+        """
+        排队位置（1 表示下一个获得名额），已准入时返回 0
+
+        优先级更高的车道中的请求都排在前面。
+        """
+        if ticket.granted or ticket.released:
+            return 0
+        ahead = 0
+        for lane in LANES:
+            waiters = self._waiting[lane]
+            if lane == ticket.lane:
+                return ahead + waiters.index(ticket) + 1
+            ahead += len(waiters)
+        return 0
+
+    def retry_after(self, lane: str) -> int:
+        """根据排队长度和平均服务时间估计可以重试的时间（秒）"""
+        ahead = sum(len(self._waiting[other]) for other in LANES[:LANES.index(lane) + 1])
+        estimate = self._service_time[lane] * (ahead + 1) / self._lane_capacity(lane)
+        return int(min(max(math.ceil(estimate), MIN_RETRY_AFTER), MAX_RETRY_AFTER))
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """各车道的执行数、排队数和平均服务时间"""
+        return {
+            lane: {
+                "active": self._active[lane],
+                "queued": len(self._waiting[lane]),
+                "service_time_seconds": round(self._service_time[lane], 3),
+            }
+            for lane in LANES
+        }
+
+    # ------------------------------------------------------------------
+    # 准入
+    # ------------------------------------------------------------------
+
+    def enqueue(self, lane: str) -> Ticket:
+        """
+        申请准入，有空位时立即准入，否则进入等待队列
+
+        Args:
+            lane: 车道
+
+        Returns:
+            准入申请
+
+        Raises:
+            AdmissionRejected: 等待队列已满
+        """
+        if lane not in LANES:
+            raise ValueError(f"未知车道: {lane}，可选: {LANES}")
+
+        ticket = Ticket(lane)
+        if not self._waiting[lane] and self._can_grant(lane):
+            self._grant(ticket)
+            return ticket
+
+        if self.queued >= self.max_queue:
+            ADMISSION_REJECTED.inc(lane=lane, reason="queue_full")
+            raise AdmissionRejected(lane, "queue_full", self.retry_after(lane))
+
+        self._waiting[lane].append(ticket)
+        logger.info(f"请求进入 {lane} 队列，位置 {self.position(ticket)}，执行中 {self.active}")
+        return ticket
+
+    async def positions(self, ticket: Ticket) -> AsyncIterator[int]:
+        """
+        等待准入，排队位置变化时产生新位置
+
+        Args:
+            ticket: 准入申请
+
+        Yields:
+            排队位置（1 表示下一个获得名额）
+
+        Raises:
+            AdmissionRejected: 等待超过 max_wait
+        """
+        last_position = None
+        while not ticket.granted:
+            position = self.position(ticket)
+            if position != last_position:
+                last_position = position
+                yield position
+                continue
+
+            remaining = ticket.enqueued_at + self.max_wait - time.monotonic()
+            if remaining <= 0:
+                self._abandon(ticket)
+                ADMISSION_REJECTED.inc(lane=ticket.lane, reason="timeout")
+                raise AdmissionRejected(ticket.lane, "timeout", self.retry_after(ticket.lane))
+
+            ticket._changed.clear()
+            try:
+                await asyncio.wait_for(ticket._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait(self, ticket: Ticket) -> None:
+        """等待准入（见 positions）"""
+        async for _ in self.positions(ticket):
+            pass
+
+    def release(self, ticket: Ticket) -> None:
+        """
+        释放准入申请（执行完成或放弃排队），可以重复调用
+
+        Args:
+            ticket: 准入申请
+        """
+        if ticket.released:
+            return
+        if not ticket.granted:
+            self._abandon(ticket)
+            return
+
+        ticket.released = True
+        self._active[ticket.lane] -= 1
+        service_time = time.monotonic() - ticket.granted_at
+        self._service_time[ticket.lane] += _EWMA_ALPHA * (service_time - self._service_time[ticket.lane])
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, lane: str) -> AsyncIterator[Ticket]:
+        """
+        在准入后执行一段代码
+
+        Args:
+            lane: 车道
+
+        Yields:
+            已准入的申请
+
+        Raises:
+            AdmissionRejected: 队列已满或等待超时
+        """
+        ticket = self.enqueue(lane)
+        try:
+            await self.wait(ticket)
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def _grant(self, ticket: Ticket) -> None:
+        ticket.granted_at = time.monotonic()
+        self._active[ticket.lane] += 1
+        ADMISSION_QUEUE_WAIT.observe(ticket.queue_wait, lane=ticket.lane)
+        ticket._changed.set()
+
+    def _abandon(self, ticket: Ticket) -> None:
+        """将未准入的申请移出队列"""
+        ticket.released = True
+        try:
+            self._waiting[ticket.lane].remove(ticket)
+        except ValueError:
+            return
+        # 后面的请求位置前移
+        self._notify_waiters()
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """按车道优先级把空位分配给等待中的请求"""
+        granted = False
+        for lane in LANES:
+            waiters = self._waiting[lane]
+            while waiters and self._can_grant(lane):
+                self._grant(waiters.popleft())
+                granted = True
+        if granted:
+            self._notify_waiters()
+
+    def _notify_waiters(self) -> None:
+        for waiters in self._waiters_by_priority():
+            for ticket in waiters:
+                ticket._changed.set()
@@ -5,28 +5,32 @@ API Endpoints - AI Test Assistant
 """
 
 import logging
-from typing import Optional, Dict, Any
+import os
+from typing import TYPE_CHECKING, Optional, Dict, Any, AsyncIterator, Callable, List, Literal
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-import json
 import asyncio
+import time
 
 from app.agent.test_engineer_agent import TestEngineerAgent, TaskType
 from app.agent.conversation_manager import ConversationManager
 from app.integration.brconnector_client import BRConnectorClient
-from app.workflow.test_case_generation_workflow import TestCaseGenerationWorkflow
-from app.workflow.impact_analysis_workflow import ImpactAnalysisWorkflow
-from app.workflow.regression_recommendation_workflow import RegressionRecommendationWorkflow
-from app.workflow.test_case_optimization_workflow import TestCaseOptimizationWorkflow
-from app.agent.requirement_analysis_agent import RequirementAnalysisAgent
-from app.agent.test_design_agent import TestDesignAgent
-from app.agent.quality_review_agent import QualityReviewAgent
-from app.agent.impact_analysis_agent import ImpactAnalysisAgent
-from app.tool.retrieval_tools import SearchPRDTool, SearchTestCaseTool, GetRelatedCasesTool
-from app.tool.generation_tools import FormatTestCaseTool
-from app.tool.validation_tools import CheckQualityTool, ValidateCoverageTool
+from app.api.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    LANE_INTERACTIVE,
+    LANE_STANDARD,
+    Ticket,
+    lane_for_task,
+)
+from app.api.jobs import JOB_SUCCEEDED, Job, JobManager, JobQueueFull, JobStore
 from app.config import settings
+from app.executor import ExecutorSaturated, get_pool
+from app.serialization import SSE_HEARTBEAT, dumps, dumps_bytes, sse_content_frame, sse_frame
+
+if TYPE_CHECKING:
+    from app.workflow.batch_generation_workflow import BatchItemResult, BatchTestCaseGenerationWorkflow
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +47,9 @@ class GenerateRequest(BaseModel):
     project_id: str = Field(..., description="项目 ID")
     conversation_id: Optional[str] = Field(None, description="对话 ID（可选）")
     context: Optional[Dict[str, Any]] = Field(default_factory=dict, description="额外上下文")
+    mode: Optional[Literal["thorough", "fast", "pipelined"]] = Field(
+        None, description="测试用例生成模式（默认 GENERATION_DEFAULT_MODE）"
+    )
     
     class Config:
         json_schema_extra = {
@@ -94,6 +101,43 @@ class GenerateResponse(BaseModel):
         }
 
 
+class BatchGenerateRequest(BaseModel):
+    """批量测试用例生成请求"""
+    project_id: str = Field(..., description="项目 ID")
+    requirements: List[str] = Field(..., min_length=1, description="需求描述列表")
+    context: Optional[Dict[str, Any]] = Field(default_factory=dict, description="额外上下文（对所有需求生效）")
+    timeout: Optional[float] = Field(None, gt=0, description="整批的超时时间（秒，默认 BATCH_TIMEOUT_SECONDS）")
+    mode: Optional[Literal["thorough", "fast", "pipelined"]] = Field(
+        None, description="测试用例生成模式（默认 GENERATION_DEFAULT_MODE）"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "project_id": "1",
+                "requirements": [
+                    "用户登录功能需求：支持用户名密码登录，需要验证码",
+                    "找回密码功能需求：通过绑定手机号接收验证码重置密码"
+                ],
+                "context": {}
+            }
+        }
+
+
+class AuditRequest(BaseModel):
+    """项目审计请求"""
+    project_id: str = Field(..., description="项目 ID")
+    chunk_size: int = Field(1000, ge=1, le=10000, description="每批处理的用例数量")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "project_id": "1",
+                "chunk_size": 1000
+            }
+        }
+
+
 class ChatStreamRequest(BaseModel):
     """流式对话请求"""
     message: str = Field(..., description="用户消息")
@@ -120,21 +164,42 @@ class ChatStreamRequest(BaseModel):
 _agent: Optional[TestEngineerAgent] = None
 _conversation_manager: Optional[ConversationManager] = None
 _br_client: Optional[BRConnectorClient] = None
+_admission: Optional[AdmissionController] = None
+_job_manager: Optional[JobManager] = None
+_batch_workflow: Optional["BatchTestCaseGenerationWorkflow"] = None
 
 
 def get_agent() -> TestEngineerAgent:
-    """获取 TestEngineerAgent 实例（单例）"""
+    """
+    获取 TestEngineerAgent 实例（单例）
+    
+    Subagent、Tool 和 Workflow 模块在首次调用时才导入，导入本模块不会加载整条生成链路。
+    """
     global _agent
     
     if _agent is None:
+        from app.agent.requirement_analysis_agent import RequirementAnalysisAgent
+        from app.agent.test_design_agent import TestDesignAgent
+        from app.agent.quality_review_agent import QualityReviewAgent
+        from app.agent.impact_analysis_agent import ImpactAnalysisAgent
+        from app.tool.retrieval_tools import (
+            SearchPRDTool,
+            SearchTestCaseTool,
+            GetRelatedCasesTool,
+            ListTestCasesTool,
+            ListPRDsTool,
+        )
+        from app.tool.generation_tools import FormatTestCaseTool
+        from app.tool.validation_tools import CheckQualityTool, ValidateCoverageTool
+        from app.workflow.test_case_generation_workflow import TestCaseGenerationWorkflow
+        from app.workflow.impact_analysis_workflow import ImpactAnalysisWorkflow
+        from app.workflow.regression_recommendation_workflow import RegressionRecommendationWorkflow
+        from app.workflow.test_case_optimization_workflow import TestCaseOptimizationWorkflow
+        
         logger.info("初始化 TestEngineerAgent...")
         
-        # 初始化 BRConnector 客户端
-        br_client = BRConnectorClient(
-            api_key=settings.BRCONNECTOR_API_KEY,
-            base_url=settings.BRCONNECTOR_BASE_URL,
-            model=settings.BRCONNECTOR_MODEL
-        )
+        # 与对话接口共用同一个 BRConnector 客户端（同一个连接池）
+        br_client = get_br_client()
         
         # 初始化 Subagents
         requirement_agent = RequirementAnalysisAgent(br_client)
@@ -146,6 +211,8 @@ def get_agent() -> TestEngineerAgent:
         search_prd_tool = SearchPRDTool(backend_url=settings.GO_BACKEND_URL)
         search_testcase_tool = SearchTestCaseTool(backend_url=settings.GO_BACKEND_URL)
         get_related_cases_tool = GetRelatedCasesTool(backend_url=settings.GO_BACKEND_URL)
+        list_testcases_tool = ListTestCasesTool(backend_url=settings.GO_BACKEND_URL)
+        list_prds_tool = ListPRDsTool(backend_url=settings.GO_BACKEND_URL)
         format_testcase_tool = FormatTestCaseTool()
         check_quality_tool = CheckQualityTool()
         validate_coverage_tool = ValidateCoverageTool()
@@ -157,7 +224,13 @@ def get_agent() -> TestEngineerAgent:
             quality_review_agent=quality_review_agent,
             search_prd_tool=search_prd_tool,
             search_testcase_tool=search_testcase_tool,
-            format_tool=format_testcase_tool
+            format_tool=format_testcase_tool,
+            check_quality_tool=check_quality_tool,
+            validate_coverage_tool=validate_coverage_tool,
+            default_mode=settings.GENERATION_DEFAULT_MODE,
+            review_threshold=settings.FAST_REVIEW_THRESHOLD,
+            review_batch_size=settings.REVIEW_BATCH_SIZE,
+            review_concurrency=settings.REVIEW_CONCURRENCY
         )
         
         impact_analysis_workflow = ImpactAnalysisWorkflow(
@@ -178,7 +251,10 @@ def get_agent() -> TestEngineerAgent:
             check_quality_tool=check_quality_tool,
             requirement_analysis_agent=requirement_agent,
             test_design_agent=test_design_agent,
-            format_testcase_tool=format_testcase_tool
+            format_testcase_tool=format_testcase_tool,
+            list_testcases_tool=list_testcases_tool,
+            list_prds_tool=list_prds_tool,
+            report_dir=audit_report_dir()
         )
         
         # 创建 TestEngineerAgent
@@ -216,19 +292,283 @@ def get_br_client() -> BRConnectorClient:
         _br_client = BRConnectorClient(
             api_key=settings.BRCONNECTOR_API_KEY,
             base_url=settings.BRCONNECTOR_BASE_URL,
-            model=settings.BRCONNECTOR_MODEL
+            model=settings.BRCONNECTOR_MODEL,
+            prompt_caching=settings.LLM_PROMPT_CACHING
         )
         logger.info("BRConnectorClient 初始化完成")
     
     return _br_client
 
 
+def get_admission_controller() -> AdmissionController:
+    """获取 AdmissionController 实例（单例）"""
+    global _admission
+    
+    if _admission is None:
+        _admission = AdmissionController(
+            max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            max_wait=settings.ADMISSION_MAX_WAIT,
+            reserved_slots=settings.ADMISSION_RESERVED_SLOTS
+        )
+    
+    return _admission
+
+
+def get_batch_workflow() -> "BatchTestCaseGenerationWorkflow":
+    """获取 BatchTestCaseGenerationWorkflow 实例（单例，复用 Agent 注册的生成工作流）"""
+    global _batch_workflow
+    
+    if _batch_workflow is None:
+        from app.workflow.batch_generation_workflow import BatchTestCaseGenerationWorkflow
+        
+        generation_workflow = get_agent().workflows["test_case_generation"]
+        _batch_workflow = BatchTestCaseGenerationWorkflow(
+            generation_workflow,
+            max_concurrency=settings.BATCH_LLM_CONCURRENCY
+        )
+    
+    return _batch_workflow
+
+
+def audit_report_dir() -> str:
+    """审计报告目录（AUDIT_REPORT_DIR，未配置时使用临时目录下的默认目录）"""
+    from app.workflow.test_case_optimization_workflow import DEFAULT_AUDIT_REPORT_DIR
+    
+    return settings.AUDIT_REPORT_DIR or DEFAULT_AUDIT_REPORT_DIR
+
+
+def get_job_manager() -> JobManager:
+    """获取 JobManager 实例（单例）"""
+    global _job_manager
+    
+    if _job_manager is None:
+        logger.info("初始化 JobManager...")
+        _job_manager = JobManager(
+            runner=_run_job,
+            store=JobStore(settings.JOB_STORE_PATH, ttl=settings.JOB_TTL_SECONDS),
+            workers=settings.JOB_WORKERS,
+            max_queue=settings.JOB_MAX_QUEUE,
+            admission=get_admission_controller(),
+            lane_for_job=_job_lane,
+            purge_interval=settings.JOB_PURGE_INTERVAL_SECONDS
+        )
+        logger.info("JobManager 初始化完成")
+    
+    return _job_manager
+
+
+def start_job_manager() -> None:
+    """启动后台任务 worker 和过期任务清理（服务启动时调用）"""
+    get_job_manager().start()
+
+
+async def shutdown_job_manager() -> None:
+    """停止后台任务 worker 并关闭任务存储"""
+    global _job_manager
+    
+    if _job_manager is not None:
+        await _job_manager.shutdown()
+        _job_manager.store.close()
+        _job_manager = None
+
+
+def admission_rejected_error(error: AdmissionRejected) -> HTTPException:
+    """将未准入转换为 429 响应（带 Retry-After）"""
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+# ============================================================================
+# Response Helpers
+# ============================================================================
+
+class FastJSONResponse(JSONResponse):
+    """使用 app.serialization 编码的 JSON 响应（安装了 orjson 时直接输出 UTF-8 字节）"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
+
+# 检测客户端断开的轮询间隔（秒）
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    结束时关闭内容生成器的流式响应
+    
+    客户端断开时响应任务会被取消，而生成器可能正挂起在 yield 处；
+    显式关闭生成器可以让其 finally 立即执行并释放上游连接。
+    on_close 在响应结束后调用，生成器还没有开始执行时（其 finally 不会运行）也能释放资源。
+    """
+    
+    def __init__(self, content, *args, on_close: Optional[Callable[[], None]] = None, **kwargs):
+        super().__init__(content, *args, **kwargs)
+        self.on_close = on_close
+    
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                aclose = getattr(self.body_iterator, 'aclose', None)
+                if aclose is not None:
+                    await aclose()
+            finally:
+                if self.on_close is not None:
+                    self.on_close()
+
+
+async def iterate_until_disconnected(
+    http_request: Request,
+    source: AsyncIterator[Any],
+    poll_interval: float = DISCONNECT_POLL_INTERVAL
+) -> AsyncIterator[Any]:
+    """
+    迭代异步生成器，客户端断开时立即取消
+    
+    等待上游数据的同时轮询连接状态，客户端断开后取消正在等待的读取并关闭上游生成器，
+    避免继续消耗 token 和连接。
+    
+    Args:
+        http_request: 当前 HTTP 请求
+        source: 上游异步生成器
+        poll_interval: 断开检测的轮询间隔（秒）
+        
+    Yields:
+        上游生成器产生的数据
+    """
+    async def wait_for_disconnect():
+        while not await http_request.is_disconnected():
+            await asyncio.sleep(poll_interval)
+    
+    watcher = asyncio.create_task(wait_for_disconnect())
+    next_item = None
+    try:
+        while True:
+            next_item = asyncio.ensure_future(source.__anext__())
+            await asyncio.wait({next_item, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            
+            if not next_item.done():
+                logger.info("客户端已断开连接，取消流式请求")
+                next_item.cancel()
+                await asyncio.gather(next_item, return_exceptions=True)
+                return
+            
+            try:
+                item = next_item.result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        # 本生成器在等待时被取消（如下游合并器关闭）时，先结束正在进行的读取再关闭上游
+        if next_item is not None and not next_item.done():
+            next_item.cancel()
+            await asyncio.gather(next_item, return_exceptions=True)
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+        await source.aclose()
+
+
+# 合并器在空闲时产生的心跳标记
+HEARTBEAT = object()
+
+
+async def coalesce_chunks(
+    source: AsyncIterator[str],
+    max_delay: float = 0.03,
+    max_chars: int = 1024,
+    heartbeat_interval: Optional[float] = 15.0
+) -> AsyncIterator[Any]:
+    """
+    把上游的小文本块合并为较大的块
+    
+    LLM 流每个 token 产生一个增量，逐个编码发送会产生成千上万次很小的写入。
+    第一个增量到达后最多等待 max_delay 秒，或累计达到 max_chars 个字符时，把这段时间内的增量合并为一块产生。
+    
+    任何时刻最多只有一次上游读取在进行：下游（客户端连接）写得慢时本生成器停在 yield 处，
+    不会继续预读上游，背压会一直传到 LLM 连接。
+    超过 heartbeat_interval 秒没有产生数据时产生 HEARTBEAT，调用方据此发送 SSE 注释帧保持连接。
+    
+    Args:
+        source: 上游文本块
+        max_delay: 合并窗口（秒），从窗口内第一个增量到达时开始计时
+        max_chars: 单块的最大字符数，达到后立即产生
+        heartbeat_interval: 心跳间隔（秒），None 表示不发送心跳
+        
+    Yields:
+        合并后的文本块，或 HEARTBEAT
+    """
+    loop = asyncio.get_running_loop()
+    parts: List[str] = []
+    size = 0
+    flush_at = 0.0
+    last_emit = loop.time()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(source.__anext__())
+            
+            if parts:
+                timeout = flush_at - loop.time()
+            elif heartbeat_interval is not None:
+                timeout = last_emit + heartbeat_interval - loop.time()
+            else:
+                timeout = None
+            if timeout is None or timeout > 0:
+                await asyncio.wait({pending}, timeout=timeout)
+            
+            if not pending.done():
+                # 合并窗口到期或空闲超过心跳间隔
+                if parts:
+                    yield "".join(parts)
+                    parts.clear()
+                    size = 0
+                else:
+                    yield HEARTBEAT
+                last_emit = loop.time()
+                continue
+            
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                if parts:
+                    yield "".join(parts)
+                return
+            finally:
+                pending = None
+            
+            if not chunk:
+                continue
+            if not parts:
+                flush_at = loop.time() + max_delay
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= max_chars:
+                yield "".join(parts)
+                parts.clear()
+                size = 0
+                last_emit = loop.time()
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        aclose = getattr(source, 'aclose', None)
+        if aclose is not None:
+            await aclose()
+
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
 
 @router.post("/generate", response_model=GenerateResponse)
-async def generate_test_cases(request: GenerateRequest) -> GenerateResponse:
+async def generate_test_cases(request: GenerateRequest) -> FastJSONResponse:
     """
     生成测试用例端点
     
@@ -239,10 +579,11 @@ async def generate_test_cases(request: GenerateRequest) -> GenerateResponse:
         request: 生成请求，包含需求描述、项目 ID 等
         
     Returns:
-        GenerateResponse: 生成结果，包含测试用例、分析结果等
+        GenerateResponse 结构的 JSON 响应：生成结果，包含测试用例、分析结果等
+        （直接编码模型字段，不再经过 response_model 的二次校验和转换）
         
     Raises:
-        HTTPException: 当请求参数无效或处理失败时
+        HTTPException: 当请求参数无效、服务繁忙（429）或处理失败时
     """
     try:
         logger.info(f"收到测试用例生成请求: project_id={request.project_id}, message={request.message[:50]}...")
@@ -251,85 +592,452 @@ async def generate_test_cases(request: GenerateRequest) -> GenerateResponse:
         agent = get_agent()
         conversation_manager = get_conversation_manager()
         
-        # 创建或获取对话
-        conversation_id = request.conversation_id or f"conv-{request.project_id}-{asyncio.get_event_loop().time()}"
-        conversation = conversation_manager.get_or_create_conversation(
+        # 准入控制：不需要 LLM 的短任务走快速车道，其余请求排在长任务队列
+        lane = lane_for_task(agent.predict_task_type(request.message))
+        try:
+            async with get_admission_controller().admit(lane) as ticket:
+                response = await _process_generate_request(request, agent, conversation_manager, ticket)
+            return FastJSONResponse(response.model_dump())
+        except AdmissionRejected as e:
+            logger.warning(f"请求未被准入: lane={e.lane}, reason={e.reason}")
+            raise admission_rejected_error(e)
+            
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.error(f"参数验证失败: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"处理请求时发生错误: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"内部服务器错误: {str(e)}")
+
+
+async def _process_generate_request(
+    request: GenerateRequest,
+    agent: TestEngineerAgent,
+    conversation_manager: ConversationManager,
+    ticket: Optional[Ticket] = None
+) -> GenerateResponse:
+    """处理测试用例生成请求（ticket 为准入申请，后台任务没有）"""
+    # 创建或获取对话
+    conversation_id = request.conversation_id or f"conv-{request.project_id}-{asyncio.get_event_loop().time()}"
+    conversation = conversation_manager.get_or_create_conversation(
+        conversation_id=conversation_id,
+        project_id=str(request.project_id)
+    )
+    
+    # 添加用户消息到对话历史
+    conversation_manager.add_message(
+        conversation_id=conversation_id,
+        role='user',
+        content=request.message
+    )
+    
+    # 准备上下文
+    context = request.context or {}
+    context['project_id'] = request.project_id
+    context['conversation_history'] = conversation_manager.get_context(conversation_id)
+    if request.mode:
+        context['generation_mode'] = request.mode
+    
+    # 调用 Agent 处理请求
+    logger.info(f"调用 TestEngineerAgent 处理请求...")
+    agent_response = await agent.process_request(
+        message=request.message,
+        context=context
+    )
+    
+    # 添加 AI 响应到对话历史
+    response_content = dumps(agent_response.to_dict())
+    conversation_manager.add_message(
+        conversation_id=conversation_id,
+        role='assistant',
+        content=response_content
+    )
+    
+    # 构建响应
+    metadata = dict(agent_response.metadata or {})
+    if ticket is not None:
+        metadata['admission'] = {
+            'lane': ticket.lane,
+            'queue_wait_seconds': round(ticket.queue_wait, 3)
+        }
+    if agent_response.success:
+        logger.info(f"请求处理成功: task_type={agent_response.task_type}")
+        return GenerateResponse(
+            success=True,
+            task_type=agent_response.task_type.value,
             conversation_id=conversation_id,
-            project_id=str(request.project_id)
+            test_cases=agent_response.data.get('test_cases') if agent_response.data else None,
+            analysis=agent_response.data.get('analysis') if agent_response.data else None,
+            metadata=metadata
         )
-        
-        # 添加用户消息到对话历史
-        conversation_manager.add_message(
+    else:
+        logger.error(f"请求处理失败: {agent_response.error}")
+        return GenerateResponse(
+            success=False,
+            task_type=agent_response.task_type.value if agent_response.task_type else "UNKNOWN",
             conversation_id=conversation_id,
-            role='user',
-            content=request.message
+            error=agent_response.error,
+            metadata=metadata
         )
+
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    """编码为 SSE 数据帧"""
+    return sse_frame(event)
+
+
+def _batch_item_event(item: "BatchItemResult") -> Dict[str, Any]:
+    """单条需求的结果事件（字段与 GenerateResponse 一致）"""
+    data = item.result.data or {}
+    return {
+        'type': 'result',
+        'index': item.index,
+        'requirement': item.requirement,
+        'success': item.result.success,
+        'test_cases': data.get('test_cases'),
+        'analysis': data.get('analysis'),
+        'metadata': item.result.metadata,
+        'error': item.result.error
+    }
+
+
+@router.post("/generate/batch")
+async def generate_batch(request: BatchGenerateRequest, http_request: Request):
+    """
+    批量生成测试用例端点（SSE）
+    
+    为同一项目的多条需求生成测试用例：跳过任务分类，统一检索历史 PRD 和用例并去重，
+    各需求的 LLM 调用共享全局并发限制和限流退避。每条需求完成后立即发送 result 事件。
+    
+    事件顺序：queued（排队时）→ start → retrieved → result（按完成顺序）→ done。
+    
+    Args:
+        request: 批量生成请求
+        http_request: 原始 HTTP 请求（用于检测客户端断开）
         
-        # 准备上下文
-        context = request.context or {}
-        context['project_id'] = request.project_id
-        context['conversation_history'] = conversation_manager.get_context(conversation_id)
+    Returns:
+        StreamingResponse: SSE 流式响应
         
-        # 调用 Agent 处理请求
-        logger.info(f"调用 TestEngineerAgent 处理请求...")
-        agent_response = await agent.process_request(
-            message=request.message,
-            context=context
+    Raises:
+        HTTPException: 当需求数量超过上限（400）或服务繁忙（429）时
+    """
+    if len(request.requirements) > settings.BATCH_MAX_REQUIREMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多提交 {settings.BATCH_MAX_REQUIREMENTS} 条需求，实际 {len(request.requirements)} 条"
         )
+    
+    logger.info(f"收到批量生成请求: project_id={request.project_id}, 需求数={len(request.requirements)}")
+    workflow = get_batch_workflow()
+    
+    # 截止时间从收到请求时计算，排队、检索和生成共用
+    timeout = request.timeout or settings.BATCH_TIMEOUT_SECONDS
+    deadline = time.monotonic() + timeout
+    
+    # 整批占用一个 standard 名额，批内并发由限流器控制
+    admission = get_admission_controller()
+    try:
+        ticket = admission.enqueue(lane_for_task(TaskType.GENERATE_TEST_CASES))
+    except AdmissionRejected as e:
+        logger.warning(f"批量请求未被准入: reason={e.reason}")
+        raise admission_rejected_error(e)
+    
+    context = dict(request.context or {})
+    context['project_id'] = request.project_id
+    if request.mode:
+        context['generation_mode'] = request.mode
+    context['timeout'] = timeout
+    
+    async def event_generator():
+        """SSE 事件生成器"""
+        start = time.perf_counter()
+        try:
+            try:
+                async for position in admission.positions(ticket):
+                    yield _sse({'type': 'queued', 'position': position})
+            except AdmissionRejected as e:
+                yield _sse({'type': 'error', 'error': str(e), 'retry_after': e.retry_after})
+                return
+            
+            yield _sse({'type': 'start', 'total': len(request.requirements)})
+            
+            plan = await workflow.prepare(request.requirements, context, deadline=deadline)
+            yield _sse({'type': 'retrieved', **plan.retrieval})
+            
+            succeeded = failed = 0
+            items = iterate_until_disconnected(http_request, workflow.stream(plan))
+            try:
+                async for item in items:
+                    if item.result.success:
+                        succeeded += 1
+                    else:
+                        failed += 1
+                    yield _sse(_batch_item_event(item))
+            finally:
+                await items.aclose()
+            
+            if await http_request.is_disconnected():
+                logger.info("客户端已断开，批量生成已取消")
+                return
+            
+            yield _sse({
+                'type': 'done',
+                'total': len(request.requirements),
+                'succeeded': succeeded,
+                'failed': failed,
+                'duration_seconds': round(time.perf_counter() - start, 3)
+            })
         
-        # 添加 AI 响应到对话历史
-        response_content = json.dumps(agent_response.to_dict(), ensure_ascii=False)
-        conversation_manager.add_message(
-            conversation_id=conversation_id,
-            role='assistant',
-            content=response_content
-        )
+        except Exception as e:
+            logger.error(f"批量生成时发生错误: {str(e)}", exc_info=True)
+            yield _sse({'type': 'error', 'error': str(e)})
+        finally:
+            admission.release(ticket)
+    
+    return ClosingStreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        },
+        on_close=lambda: admission.release(ticket)
+    )
+
+
+# 后台任务类型（保存在任务请求的 kind 字段中，没有时为测试用例生成）
+JOB_KIND_GENERATE = "generate"
+JOB_KIND_AUDIT = "audit"
+
+
+def _job_lane(job: Job) -> str:
+    """后台任务的准入车道：生成任务与 /generate 相同按预测的任务类型选择，审计任务使用 standard"""
+    if job.request.get('kind') == JOB_KIND_AUDIT:
+        return LANE_STANDARD
+    return lane_for_task(get_agent().predict_task_type(job.request.get('message', '')))
+
+
+async def _run_job(job: Job) -> Dict[str, Any]:
+    """按任务类型执行后台任务"""
+    if job.request.get('kind') == JOB_KIND_AUDIT:
+        return await _run_audit_job(job)
+    return await _run_generate_job(job)
+
+
+async def _run_generate_job(job: Job) -> Dict[str, Any]:
+    """执行测试用例生成后台任务"""
+    request = GenerateRequest(**job.request)
+    response = await _process_generate_request(request, get_agent(), get_conversation_manager())
+    return response.model_dump()
+
+
+async def _run_audit_job(job: Job) -> Dict[str, Any]:
+    """执行项目审计后台任务（报告文件以任务 ID 命名）"""
+    workflow = get_agent().get_workflow("test_case_optimization")
+    if workflow is None:
+        raise RuntimeError("未注册测试用例优化工作流")
+    result = await workflow.run_audit(
+        job.request['project_id'],
+        chunk_size=job.request.get('chunk_size', 1000),
+        report_id=job.job_id
+    )
+    return result.to_dict()
+
+
+async def _submit_job(request: Dict[str, Any], http_request: Request) -> Dict[str, Any]:
+    """提交后台任务并返回任务 ID 和查询地址"""
+    try:
+        job = await get_job_manager().submit(request)
+    except JobQueueFull as e:
+        logger.warning("后台任务队列已满")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    return {
+        "success": True,
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": str(http_request.url_for("get_job", job_id=job.job_id)),
+        "events_url": str(http_request.url_for("stream_job_events", job_id=job.job_id))
+    }
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(request: GenerateRequest, http_request: Request) -> Dict[str, Any]:
+    """
+    提交后台生成任务
+    
+    请求内容与 /generate 相同。任务进入内部队列后立即返回任务 ID，
+    客户端轮询 /jobs/{job_id} 获取状态和结果，或订阅 /jobs/{job_id}/events 获取进度。
+    
+    Args:
+        request: 生成请求
+        http_request: 原始 HTTP 请求（用于生成状态查询地址）
         
-        # 构建响应
-        if agent_response.success:
-            logger.info(f"请求处理成功: task_type={agent_response.task_type}")
-            return GenerateResponse(
-                success=True,
-                task_type=agent_response.task_type.value,
-                conversation_id=conversation_id,
-                test_cases=agent_response.result.get('test_cases') if agent_response.result else None,
-                analysis=agent_response.result.get('analysis') if agent_response.result else None,
-                metadata=agent_response.metadata
-            )
-        else:
-            logger.error(f"请求处理失败: {agent_response.error}")
-            return GenerateResponse(
-                success=False,
-                task_type=agent_response.task_type.value if agent_response.task_type else "UNKNOWN",
-                conversation_id=conversation_id,
-                error=agent_response.error,
-                metadata=agent_response.metadata
-            )
-            
-    except ValueError as e:
-        logger.error(f"参数验证失败: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"处理请求时发生错误: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"内部服务器错误: {str(e)}")
+    Returns:
+        任务 ID 和状态
+        
+    Raises:
+        HTTPException: 任务队列已满（429）
+    """
+    return await _submit_job(request.model_dump(), http_request)
+
+
+@router.post("/audits", status_code=202)
+async def submit_audit(request: AuditRequest, http_request: Request) -> Dict[str, Any]:
+    """
+    提交项目审计后台任务
+    
+    审计分页遍历项目内全部测试用例，结果通过 /jobs/{job_id} 查询，
+    任务成功后从 /jobs/{job_id}/report 下载 JSON Lines 格式的审计报告。
+    
+    Args:
+        request: 审计请求
+        http_request: 原始 HTTP 请求（用于生成查询地址）
+        
+    Returns:
+        任务 ID、状态和报告下载地址
+        
+    Raises:
+        HTTPException: 任务队列已满（429）
+    """
+    response = await _submit_job({'kind': JOB_KIND_AUDIT, **request.model_dump()}, http_request)
+    response["report_url"] = str(http_request.url_for("download_job_report", job_id=response["job_id"]))
+    return response
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """
+    查询后台任务状态和结果
+    
+    Args:
+        job_id: 任务 ID
+        
+    Returns:
+        任务状态；任务结束后 result 为与 /generate 相同结构的响应
+        
+    Raises:
+        HTTPException: 任务不存在或已过期（404）
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务 {job_id} 不存在或已过期")
+    return {"success": True, "job": job.to_dict()}
+
+
+@router.get("/jobs/{job_id}/report")
+async def download_job_report(job_id: str) -> FileResponse:
+    """
+    下载审计任务的报告（JSON Lines）
+    
+    Args:
+        job_id: 任务 ID
+        
+    Returns:
+        报告文件
+        
+    Raises:
+        HTTPException: 任务不存在或已过期（404）、不是审计任务或尚未成功完成（409）、报告文件已被清理（410）
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务 {job_id} 不存在或已过期")
+    if job.request.get('kind') != JOB_KIND_AUDIT:
+        raise HTTPException(status_code=409, detail=f"任务 {job_id} 不是审计任务")
+    if job.status != JOB_SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"任务 {job_id} 尚未成功完成（当前状态: {job.status}）")
+    
+    report_path = ((job.result or {}).get('data') or {}).get('report_path')
+    directory = os.path.realpath(audit_report_dir())
+    if not report_path or os.path.dirname(os.path.realpath(report_path)) != directory:
+        raise HTTPException(status_code=410, detail=f"任务 {job_id} 的审计报告不可用")
+    if not os.path.exists(report_path):
+        raise HTTPException(status_code=410, detail=f"任务 {job_id} 的审计报告已被清理")
+    return FileResponse(report_path, media_type="application/x-ndjson", filename=os.path.basename(report_path))
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, http_request: Request):
+    """
+    订阅后台任务进度（SSE）
+    
+    先重放已发生的事件，再实时推送新事件，任务结束时发送 finished 事件后关闭。
+    
+    Args:
+        job_id: 任务 ID
+        http_request: 原始 HTTP 请求（用于检测客户端断开）
+        
+    Returns:
+        StreamingResponse: SSE 流式响应
+        
+    Raises:
+        HTTPException: 任务不存在或已过期（404）
+    """
+    manager = get_job_manager()
+    if manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"任务 {job_id} 不存在或已过期")
+    
+    async def event_generator():
+        events = iterate_until_disconnected(http_request, manager.events(job_id))
+        try:
+            async for event in events:
+                yield _sse(event)
+        finally:
+            await events.aclose()
+    
+    return ClosingStreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    """
+    取消后台任务（已结束的任务不受影响）
+    
+    Args:
+        job_id: 任务 ID
+        
+    Returns:
+        任务状态
+        
+    Raises:
+        HTTPException: 任务不存在或已过期（404）
+    """
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务 {job_id} 不存在或已过期")
+    return {"success": True, "job": job.to_dict()}
 
 
 @router.post("/chat/stream")
-async def chat_stream(request: ChatStreamRequest):
+async def chat_stream(request: ChatStreamRequest, http_request: Request):
     """
     流式对话端点（SSE）
     
     使用 Server-Sent Events (SSE) 流式传输 AI 响应。
     适用于需要实时显示 AI 生成过程的场景。
+    客户端断开连接时会取消上游 LLM 流，停止消耗 token 和连接。
+    服务繁忙时请求先在 interactive 车道排队，排队期间发送 queued 事件报告排队位置。
     
     Args:
         request: 对话请求，包含消息、项目 ID 等
+        http_request: 原始 HTTP 请求（用于检测客户端断开）
         
     Returns:
         StreamingResponse: SSE 流式响应
         
     Raises:
-        HTTPException: 当请求参数无效或处理失败时
+        HTTPException: 当请求参数无效、等待队列已满（429）或处理失败时
     """
     try:
         logger.info(f"收到流式对话请求: project_id={request.project_id}, message={request.message[:50]}...")
@@ -338,41 +1046,78 @@ async def chat_stream(request: ChatStreamRequest):
         br_client = get_br_client()
         conversation_manager = get_conversation_manager()
         
-        # 创建或获取对话
-        conversation_id = request.conversation_id or f"conv-{request.project_id}-{asyncio.get_event_loop().time()}"
-        conversation = conversation_manager.get_or_create_conversation(
-            conversation_id=conversation_id,
-            project_id=str(request.project_id)
-        )
+        # 申请准入（队列已满时在建立流之前返回 429）
+        admission = get_admission_controller()
+        try:
+            ticket = admission.enqueue(LANE_INTERACTIVE)
+        except AdmissionRejected as e:
+            logger.warning(f"流式请求未被准入: reason={e.reason}")
+            raise admission_rejected_error(e)
         
-        # 添加用户消息到对话历史
-        conversation_manager.add_message(
-            conversation_id=conversation_id,
-            role='user',
-            content=request.message
-        )
-        
-        # 获取对话上下文
-        conversation_history = conversation_manager.get_context(conversation_id)
+        try:
+            # 创建或获取对话
+            conversation_id = request.conversation_id or f"conv-{request.project_id}-{asyncio.get_event_loop().time()}"
+            conversation = conversation_manager.get_or_create_conversation(
+                conversation_id=conversation_id,
+                project_id=str(request.project_id)
+            )
+            
+            # 添加用户消息到对话历史
+            conversation_manager.add_message(
+                conversation_id=conversation_id,
+                role='user',
+                content=request.message
+            )
+            
+            # 获取对话上下文
+            conversation_history = conversation_manager.get_context(conversation_id)
+        except BaseException:
+            admission.release(ticket)
+            raise
         
         async def event_generator():
             """SSE 事件生成器"""
             try:
+                # 排队期间报告排队位置
+                try:
+                    async for position in admission.positions(ticket):
+                        yield _sse({'type': 'queued', 'position': position})
+                except AdmissionRejected as e:
+                    logger.warning(f"流式请求排队超时: conversation_id={conversation_id}")
+                    yield _sse({'type': 'error', 'error': str(e), 'retry_after': e.retry_after})
+                    return
+                
                 # 发送开始事件
-                yield f"data: {json.dumps({'type': 'start', 'conversation_id': conversation_id}, ensure_ascii=False)}\n\n"
+                yield _sse({'type': 'start', 'conversation_id': conversation_id})
                 
                 # 准备消息（包含对话历史）
                 messages = conversation_history + [
                     {'role': 'user', 'content': request.message}
                 ]
                 
-                # 流式调用 BRConnector
-                full_response = ""
-                async for chunk in br_client.chat_stream(messages=messages):
-                    if chunk:
-                        full_response += chunk
+                # 流式调用 BRConnector（客户端断开时取消），增量按时间窗口合并后再发送
+                parts: List[str] = []
+                stream = coalesce_chunks(
+                    iterate_until_disconnected(http_request, br_client.chat_stream(messages=messages)),
+                    max_delay=settings.SSE_COALESCE_INTERVAL,
+                    max_chars=settings.SSE_COALESCE_MAX_CHARS,
+                    heartbeat_interval=settings.SSE_HEARTBEAT_INTERVAL or None
+                )
+                try:
+                    async for chunk in stream:
+                        if chunk is HEARTBEAT:
+                            yield SSE_HEARTBEAT
+                            continue
+                        parts.append(chunk)
                         # 发送内容块
-                        yield f"data: {json.dumps({'type': 'content', 'content': chunk}, ensure_ascii=False)}\n\n"
+                        yield sse_content_frame(chunk)
+                finally:
+                    await stream.aclose()
+                full_response = "".join(parts)
+                
+                if await http_request.is_disconnected():
+                    logger.info(f"客户端已断开，放弃保存不完整的响应: conversation_id={conversation_id}")
+                    return
                 
                 # 添加完整响应到对话历史
                 conversation_manager.add_message(
@@ -382,23 +1127,28 @@ async def chat_stream(request: ChatStreamRequest):
                 )
                 
                 # 发送完成事件
-                yield f"data: {json.dumps({'type': 'done', 'conversation_id': conversation_id}, ensure_ascii=False)}\n\n"
+                yield _sse({'type': 'done', 'conversation_id': conversation_id})
                 
             except Exception as e:
                 logger.error(f"流式传输时发生错误: {str(e)}", exc_info=True)
                 # 发送错误事件
-                yield f"data: {json.dumps({'type': 'error', 'error': str(e)}, ensure_ascii=False)}\n\n"
+                yield _sse({'type': 'error', 'error': str(e)})
+            finally:
+                admission.release(ticket)
         
-        return StreamingResponse(
+        return ClosingStreamingResponse(
             event_generator(),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
                 "X-Accel-Buffering": "no"  # 禁用 nginx 缓冲
-            }
+            },
+            on_close=lambda: admission.release(ticket)
         )
         
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"参数验证失败: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -478,3 +1228,79 @@ async def delete_conversation(conversation_id: str):
     except Exception as e:
         logger.error(f"删除对话时发生错误: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"内部服务器错误: {str(e)}")
+
+
+async def _read_limited_body(http_request: Request, max_bytes: int, label: str) -> bytes:
+    """
+    分块读取请求体，超过大小限制时立即拒绝，不把超限的请求体读入内存
+    
+    Args:
+        http_request: HTTP 请求
+        max_bytes: 请求体大小上限（字节）
+        label: 错误信息中的请求体名称
+        
+    Returns:
+        请求体
+        
+    Raises:
+        HTTPException: Content-Length 无效（400）或请求体超过大小限制（413）
+    """
+    too_large = HTTPException(status_code=413, detail=f"{label}超过大小限制 ({max_bytes} 字节)")
+    content_length = http_request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="无效的 Content-Length")
+        if declared > max_bytes:
+            raise too_large
+    
+    chunks = []
+    received = 0
+    async for chunk in http_request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@router.post("/projects/{project_id}/executions")
+async def ingest_executions(
+    project_id: str,
+    http_request: Request,
+    format: Optional[Literal["csv", "json", "junit"]] = None
+) -> Dict[str, Any]:
+    """
+    导入测试执行结果
+    
+    请求体为 CSV、JSON 或 JUnit XML 格式的执行结果（默认按内容判断格式），
+    导入后用于回归推荐的时长估计、APFD 优先级排序和模块共同失败分析。
+    
+    Args:
+        project_id: 项目 ID
+        http_request: HTTP 请求（读取原始请求体）
+        format: 执行结果格式（可选）
+        
+    Returns:
+        导入结果：有效记录数、跳过的记录数、涉及的用例数、含失败的执行次数
+        
+    Raises:
+        HTTPException: 请求体超过 EXECUTION_UPLOAD_MAX_BYTES（413）、无法解析（400）或线程池已满（503）
+    """
+    body = await _read_limited_body(http_request, settings.EXECUTION_UPLOAD_MAX_BYTES, "执行结果")
+    try:
+        content = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="执行结果必须是 UTF-8 编码")
+    
+    from app.execution_history import ingest_results
+    try:
+        # 解析和统计是同步计算，放到共享线程池中执行
+        summary = await get_pool("thread").run(ingest_results, project_id, content, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"无法解析执行结果: {e}")
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {"success": True, "project_id": project_id, **summary.to_dict()}
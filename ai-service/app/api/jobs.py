@@ -0,0 +1,462 @@
+"""
+后台任务
+
+耗时较长的请求（测试用例生成等）可以提交为后台任务：提交后立即返回任务 ID，
+由固定数量的 worker 从内部队列中取出执行，客户端轮询任务状态或通过 SSE 订阅进度事件，
+不再需要在整个生成过程中保持 HTTP 连接。
+
+任务执行期间的进度事件来自 app.progress（任务分类、阶段开始/结束等）。
+任务和结果保存在本地 SQLite 文件中，结束后保留 ttl 秒，过期后被定期清理。
+服务重启时，上次没有执行完的任务被标记为失败。
+
+worker 执行任务前先取得准入控制器（app.api.admission）的车道名额，
+后台任务与同步请求共享同一个并发上限；取得名额之前任务保持排队状态。
+"""
+
+import asyncio
+import logging
+import math
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.api.admission import LANE_STANDARD, AdmissionController, AdmissionRejected, Ticket
+from app.metrics import JOB_DURATION, JOB_QUEUE_WAIT, JOBS
+from app.progress import progress_scope
+from app.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATUSES = frozenset([JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED])
+
+# 单个任务保留的进度事件数上限
+MAX_EVENTS_PER_JOB = 500
+
+# 任务耗时的初始估计（秒），用于在没有历史数据时计算 Retry-After
+DEFAULT_JOB_DURATION = 60.0
+
+# 任务耗时指数移动平均的权重
+_EWMA_ALPHA = 0.2
+
+
+class JobQueueFull(Exception):
+    """任务队列已满"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"任务队列已满，请在 {retry_after} 秒后重试")
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+@dataclass
+class Job:
+    """
+    后台任务
+
+    Attributes:
+        job_id: 任务 ID
+        request: 提交的请求内容
+        status: queued / running / succeeded / failed / cancelled
+        events: 进度事件（按发生顺序）
+        result: 执行结果（执行完成后）
+        error: 失败原因
+    """
+    job_id: str
+    request: Dict[str, Any]
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为 API 响应字典"""
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'created_at': _isoformat(self.created_at),
+            'started_at': _isoformat(self.started_at),
+            'finished_at': _isoformat(self.finished_at),
+            'progress': self.events[-1] if self.events else None,
+            'result': self.result,
+            'error': self.error
+        }
+
+    def to_record(self) -> str:
+        """序列化为存储记录"""
+        return dumps({
+            'job_id': self.job_id,
+            'request': self.request,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'events': self.events,
+            'result': self.result,
+            'error': self.error
+        }, default=str)
+
+    @classmethod
+    def from_record(cls, record: str) -> 'Job':
+        """从存储记录恢复"""
+        return cls(**loads(record))
+
+
+class JobStore:
+    """
+    基于 SQLite 的任务存储
+
+    结束的任务在 ttl 秒后过期：读取时不再返回，并在 purge_expired 时删除。
+    """
+
+    def __init__(self, path: str = ":memory:", ttl: float = 3600.0):
+        """
+        Args:
+            path: 数据库文件路径（:memory: 表示只保存在内存中）
+            ttl: 结束的任务保留时间（秒）
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, expires_at REAL, record TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at)")
+
+    def save(self, job: Job) -> None:
+        """保存（插入或更新）任务"""
+        expires_at = job.finished_at + self.ttl if job.finished and job.finished_at is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, expires_at, record) VALUES (?, ?, ?, ?)",
+                (job.job_id, job.status, expires_at, job.to_record())
+            )
+
+    def load(self, job_id: str) -> Optional[Job]:
+        """读取任务，不存在或已过期时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM jobs WHERE job_id = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, time.time())
+            ).fetchone()
+        return Job.from_record(row[0]) if row else None
+
+    def purge_expired(self) -> int:
+        """删除过期任务，返回删除数量"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def fail_unfinished(self, error: str) -> int:
+        """
+        将没有执行完的任务标记为失败（用于服务重启后）
+
+        Args:
+            error: 失败原因
+
+        Returns:
+            被标记的任务数
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM jobs WHERE status IN (?, ?)", (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        now = time.time()
+        for (record,) in rows:
+            job = Job.from_record(record)
+            job.status = JOB_FAILED
+            job.error = error
+            job.finished_at = now
+            self.save(job)
+        return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+JobRunner = Callable[[Job], Awaitable[Dict[str, Any]]]
+
+
+class JobManager:
+    """
+    后台任务管理器
+
+    worker 和过期任务清理在 start 或第一次提交任务时于当前事件循环中启动。
+    """
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        store: Optional[JobStore] = None,
+        workers: int = 2,
+        max_queue: int = 100,
+        admission: Optional[AdmissionController] = None,
+        lane_for_job: Optional[Callable[[Job], str]] = None,
+        purge_interval: float = 60.0
+    ):
+        """
+        Args:
+            runner: 执行任务的协程函数，返回结果字典（其中 success 为 False 时任务标记为失败）
+            store: 任务存储（默认只保存在内存中）
+            workers: 并发执行的任务数
+            max_queue: 排队任务数上限
+            admission: 准入控制器（可选），worker 取得车道名额后才执行任务
+            lane_for_job: 任务使用的车道（默认 standard）
+            purge_interval: 清理过期任务的间隔（秒）
+        """
+        if workers < 1:
+            raise ValueError("workers 必须大于 0")
+        self.runner = runner
+        self.store = store or JobStore()
+        self.workers = workers
+        self.max_queue = max_queue
+        self.admission = admission
+        self.lane_for_job = lane_for_job or (lambda job: LANE_STANDARD)
+        self.purge_interval = purge_interval
+        # 排队中和执行中的任务（结束的任务只保存在 store 中）
+        self._active: Dict[str, Job] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._purger: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._job_duration = DEFAULT_JOB_DURATION
+
+        interrupted = self.store.fail_unfinished("服务重启，任务被中断")
+        if interrupted:
+            logger.warning(f"{interrupted} 个未完成的任务因服务重启被标记为失败")
+
+    @property
+    def queued(self) -> int:
+        """排队中的任务数"""
+        return sum(1 for job in self._active.values() if job.status == JOB_QUEUED)
+
+    def retry_after(self) -> int:
+        """根据排队长度和平均耗时估计可以重试的时间（秒）"""
+        return max(1, math.ceil(self._job_duration * (self.queued + 1) / self.workers))
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        for job in self._active.values():
+            if job.status == JOB_QUEUED:
+                self._queue.put_nowait(job.job_id)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._purger = asyncio.create_task(self._purge_periodically())
+
+    def start(self) -> None:
+        """在当前事件循环中启动 worker 和过期任务清理（服务启动时调用）"""
+        self._ensure_workers()
+
+    async def submit(self, request: Dict[str, Any]) -> Job:
+        """
+        提交任务
+
+        Args:
+            request: 请求内容（传给 runner）
+
+        Returns:
+            已入队的任务
+
+        Raises:
+            JobQueueFull: 排队任务数已达上限
+        """
+        self._ensure_workers()
+        if self.queued >= self.max_queue:
+            JOBS.inc(status="rejected")
+            raise JobQueueFull(self.retry_after())
+
+        self.store.purge_expired()
+        job = Job(job_id=uuid.uuid4().hex, request=request)
+        self._active[job.job_id] = job
+        self._add_event(job, "queued", position=self.queued)
+        self.store.save(job)
+        self._queue.put_nowait(job.job_id)
+        logger.info(f"后台任务已提交: job_id={job.job_id}，排队 {self.queued}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """获取任务，不存在或已过期时返回 None"""
+        return self._active.get(job_id) or self.store.load(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        取消任务（已结束的任务不受影响）
+
+        Args:
+            job_id: 任务 ID
+
+        Returns:
+            任务，不存在时返回 None
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        task = self._running.get(job_id)
+        if task is not None:
+            # worker 在任务真正停止后记录结果
+            task.cancel()
+        else:
+            self._finish(job, JOB_CANCELLED)
+        return job
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        订阅任务的进度事件
+
+        先重放已有事件，再等待新事件，任务结束后停止。
+
+        Args:
+            job_id: 任务 ID
+
+        Yields:
+            进度事件
+        """
+        index = 0
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            while index < len(job.events):
+                yield job.events[index]
+                index += 1
+            if job.finished:
+                return
+            await self._changed.setdefault(job_id, asyncio.Event()).wait()
+
+    async def shutdown(self) -> None:
+        """停止 worker，执行中和排队中的任务被标记为失败"""
+        tasks = self._workers + ([self._purger] if self._purger is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._purger = None
+        for job in list(self._active.values()):
+            self._finish(job, JOB_FAILED, error="服务关闭，任务被中断")
+
+    def _add_event(self, job: Job, event: str, **fields: Any) -> None:
+        if len(job.events) < MAX_EVENTS_PER_JOB or event == "finished":
+            job.events.append({'type': event, 'at': _isoformat(time.time()), **fields})
+        changed = self._changed.pop(job.job_id, None)
+        if changed is not None:
+            changed.set()
+
+    def _finish(self, job: Job, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        self._add_event(job, "finished", status=status, error=error)
+        self.store.save(job)
+        self._active.pop(job.job_id, None)
+        JOBS.inc(status=status)
+        if job.started_at is not None:
+            duration = job.finished_at - job.started_at
+            JOB_DURATION.observe(duration, status=status)
+            self._job_duration += _EWMA_ALPHA * (duration - self._job_duration)
+        logger.info(f"后台任务结束: job_id={job.job_id}, status={status}")
+
+    async def _purge_periodically(self) -> None:
+        while True:
+            try:
+                purged = self.store.purge_expired()
+            except sqlite3.Error as e:
+                logger.warning(f"清理过期任务失败: {e}")
+            else:
+                if purged:
+                    logger.info(f"已清理 {purged} 个过期任务")
+            await asyncio.sleep(self.purge_interval)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._active.get(job_id)
+            if job is None or job.status != JOB_QUEUED:
+                continue
+
+            # 等待准入期间任务仍可被取消
+            task = asyncio.create_task(self._run(job))
+            self._running[job_id] = task
+            try:
+                # gather 不会因为任务被取消而抛出异常；worker 自身被取消时会一并取消任务
+                outcome = (await asyncio.gather(task, return_exceptions=True))[0]
+            finally:
+                self._running.pop(job_id, None)
+
+            if isinstance(outcome, asyncio.CancelledError):
+                self._finish(job, JOB_CANCELLED)
+            elif isinstance(outcome, BaseException):
+                logger.error(f"后台任务执行失败: job_id={job_id}, error={outcome}")
+                self._finish(job, JOB_FAILED, error=str(outcome) or type(outcome).__name__)
+            elif outcome.get('success', True):
+                self._finish(job, JOB_SUCCEEDED, result=outcome)
+            else:
+                self._finish(job, JOB_FAILED, result=outcome, error=outcome.get('error'))
+
+    async def _run(self, job: Job) -> Dict[str, Any]:
+        ticket = await self._acquire_lane(job)
+        try:
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            JOB_QUEUE_WAIT.observe(job.started_at - job.created_at)
+            self._add_event(job, "started")
+            self.store.save(job)
+            return await self._execute(job)
+        finally:
+            if ticket is not None:
+                self.admission.release(ticket)
+
+    async def _acquire_lane(self, job: Job) -> Optional[Ticket]:
+        """取得准入名额；后台任务不被拒绝，准入队列已满或等待超时时稍后重新申请"""
+        if self.admission is None:
+            return None
+        lane = self.lane_for_job(job)
+        while True:
+            try:
+                ticket = self.admission.enqueue(lane)
+            except AdmissionRejected as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            try:
+                await self.admission.wait(ticket)
+                return ticket
+            except AdmissionRejected as e:
+                await asyncio.sleep(e.retry_after)
+            except BaseException:
+                self.admission.release(ticket)
+                raise
+
+    async def _execute(self, job: Job) -> Dict[str, Any]:
+        with progress_scope(lambda event, fields: self._add_event(job, event, **fields)):
+            return await self.runner(job)
@@ -0,0 +1,201 @@
+"""
+启动预热与就绪状态
+
+Agent 图默认在第一个请求到来时才构建，第一个用户要额外承担客户端构建以及到 LLM 服务和
+Go 后端的首次 TCP/TLS 握手。服务启动时由 lifespan 在后台执行预热：
+
+1. agent: 构建 TestEngineerAgent 及其 Subagent、Tool、Workflow
+2. prompts: 渲染所有 Agent 的提示词模板，模板格式错误在启动时暴露，而不是在第一个请求中
+3. connections: 并发向 LLM 服务和 Go 后端发送一次轻量请求，在各个 httpx 连接池中留下已建立的连接
+
+三步都执行完后服务才算就绪（/ready 返回 200），前两步失败则保持未就绪。预热连接失败只记录警告：
+依赖暂时不可用不应让实例一直不接流量，真正的请求仍会按各自的重试策略处理。
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+WARMUP_PENDING = "pending"
+WARMUP_RUNNING = "running"
+WARMUP_READY = "ready"
+WARMUP_FAILED = "failed"
+
+
+class _BlankFields(dict):
+    """渲染模板时把所有占位符替换为空字符串"""
+
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+@dataclass
+class WarmupState:
+    """预热进度，/ready 端点据此返回就绪状态"""
+    status: str = WARMUP_PENDING
+    started_at: Optional[float] = None
+    duration: Optional[float] = None
+    steps: Dict[str, float] = field(default_factory=dict)
+    connections: Dict[str, str] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == WARMUP_READY
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为 /ready 响应体"""
+        return {
+            "status": self.status,
+            "duration_seconds": round(self.duration, 3) if self.duration is not None else None,
+            "steps": {name: round(seconds, 3) for name, seconds in self.steps.items()},
+            "connections": dict(self.connections),
+            "warnings": list(self.warnings),
+            "error": self.error,
+        }
+
+
+_state = WarmupState()
+
+
+def get_warmup_state() -> WarmupState:
+    """获取当前进程的预热状态"""
+    return _state
+
+
+def reset_warmup_state() -> WarmupState:
+    """重置预热状态（新一轮 lifespan 启动或测试使用）"""
+    global _state
+    _state = WarmupState()
+    return _state
+
+
+def _graph_components(agent) -> List[Any]:
+    """收集 Agent 图中的组件（Workflow 以及 Workflow 持有的 Subagent 和 Tool），按对象去重"""
+    components: Dict[int, Any] = {}
+    for workflow in agent.workflows.values():
+        components.setdefault(id(workflow), workflow)
+        for value in vars(workflow).values():
+            components.setdefault(id(value), value)
+    return list(components.values())
+
+
+def render_prompt_templates(components: List[Any]) -> int:
+    """
+    渲染组件类上定义的所有提示词模板（名称以 _TEMPLATE 结尾的字符串常量）
+
+    Args:
+        components: Agent 图中的组件
+
+    Returns:
+        渲染的模板数
+
+    Raises:
+        ValueError: 如果模板格式错误（如未转义的花括号）
+    """
+    rendered = 0
+    seen = set()
+    for component in components:
+        cls = type(component)
+        if cls in seen:
+            continue
+        seen.add(cls)
+        for name in dir(cls):
+            template = getattr(cls, name, None)
+            if not name.endswith("_TEMPLATE") or not isinstance(template, str):
+                continue
+            try:
+                template.format_map(_BlankFields())
+            except (ValueError, IndexError) as e:
+                raise ValueError(f"{cls.__name__}.{name} 格式错误: {e}") from e
+            rendered += 1
+    return rendered
+
+
+def _connection_targets(br_client, components: List[Any]) -> Dict[str, tuple]:
+    """需要预先建立连接的 (httpx 客户端, URL)，每个连接池一项"""
+    targets = {"llm": (br_client.client, br_client.default_base_url)}
+    clients = {id(br_client.client)}
+    for component in components:
+        http_client = getattr(component, "http_client", None)
+        backend_url = getattr(component, "backend_url", None)
+        if not isinstance(http_client, httpx.AsyncClient) or not backend_url or id(http_client) in clients:
+            continue
+        clients.add(id(http_client))
+        targets[f"backend:{getattr(component, 'name', type(component).__name__)}"] = (
+            http_client, f"{backend_url}/health"
+        )
+    return targets
+
+
+async def _open_connection(client: httpx.AsyncClient, url: str, timeout: float) -> str:
+    """发送一次轻量请求建立连接，任何 HTTP 响应都说明连接已经建立并留在连接池中"""
+    response = await client.get(url, timeout=timeout)
+    return f"ok ({response.status_code})"
+
+
+async def warm_up(timeout: float = 10.0, state: Optional[WarmupState] = None) -> WarmupState:
+    """
+    构建 Agent 图、渲染提示词模板并预先建立连接
+
+    Args:
+        timeout: 预热连接的超时时间（秒）
+        state: 记录进度的状态对象，默认使用进程级状态
+
+    Returns:
+        预热状态
+    """
+    from app.api import endpoints
+
+    state = state or _state
+    state.status = WARMUP_RUNNING
+    state.started_at = time.monotonic()
+    logger.info("开始预热...")
+
+    try:
+        step_start = time.monotonic()
+        agent = endpoints.get_agent()
+        endpoints.get_conversation_manager()
+        endpoints.get_admission_controller()
+        state.steps["agent"] = time.monotonic() - step_start
+
+        step_start = time.monotonic()
+        components = _graph_components(agent)
+        templates = render_prompt_templates(components)
+        state.steps["prompts"] = time.monotonic() - step_start
+        logger.debug(f"已渲染 {templates} 个提示词模板")
+
+        step_start = time.monotonic()
+        targets = _connection_targets(endpoints.get_br_client(), components)
+        results = await asyncio.gather(
+            *(_open_connection(client, url, timeout) for client, url in targets.values()),
+            return_exceptions=True
+        )
+        for name, result in zip(targets, results):
+            if isinstance(result, BaseException):
+                state.connections[name] = f"error: {type(result).__name__}"
+                state.warnings.append(f"预热连接 {name} 失败: {result}")
+            else:
+                state.connections[name] = result
+        state.steps["connections"] = time.monotonic() - step_start
+
+    except Exception as e:
+        state.status = WARMUP_FAILED
+        state.error = str(e)
+        state.duration = time.monotonic() - state.started_at
+        logger.error(f"预热失败: {e}", exc_info=True)
+        return state
+
+    state.status = WARMUP_READY
+    state.duration = time.monotonic() - state.started_at
+    for warning in state.warnings:
+        logger.warning(warning)
+    logger.info(f"预热完成，耗时 {state.duration:.2f}s")
+    return state
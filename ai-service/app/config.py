@@ -36,6 +36,8 @@ class Settings(BaseSettings):
     BRCONNECTOR_API_KEY: str = ""
     BRCONNECTOR_BASE_URL: str = "https://d106f995v5mndm.cloudfront.net"
     BRCONNECTOR_MODEL: str = "claude-4-5-sonnet"
+    # Mark system prompts and stable context as cacheable prompt prefixes (Claude cache_control)
+    LLM_PROMPT_CACHING: bool = True
     
     # Volcano Engine Embedding API
     VOLCANO_EMBEDDING_API_KEY: str = ""
@@ -47,6 +49,60 @@ class Settings(BaseSettings):
     # Go Backend
     GO_BACKEND_URL: str = "http://localhost:8080"
     
+    # Tracing (none / memory / file)
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+
+    # CPU worker pools for CPU-bound tools (0 = based on CPU count)
+    EXECUTOR_THREAD_WORKERS: int = 0
+    EXECUTOR_PROCESS_WORKERS: int = 0
+    EXECUTOR_MAX_QUEUE: int = 64
+    EXECUTOR_QUEUE_TIMEOUT: float = 10.0
+
+    # API admission control (concurrent requests, wait queue, reserved slots for short tasks)
+    ADMISSION_MAX_CONCURRENT: int = 8
+    ADMISSION_MAX_QUEUE: int = 32
+    ADMISSION_MAX_WAIT: float = 30.0
+    ADMISSION_RESERVED_SLOTS: int = 2
+
+    # Background jobs (workers, queue size, SQLite store, retention of finished jobs, purge interval)
+    JOB_WORKERS: int = 2
+    JOB_MAX_QUEUE: int = 100
+    JOB_STORE_PATH: str = "jobs.db"
+    JOB_TTL_SECONDS: float = 3600.0
+    JOB_PURGE_INTERVAL_SECONDS: float = 60.0
+
+    # Project audit reports (JSON Lines, downloaded through /jobs/{job_id}/report; empty = <tmp>/testcase_audits)
+    AUDIT_REPORT_DIR: str = ""
+
+    # Batch generation (requirements per request, global LLM concurrency, timeout per batch)
+    BATCH_MAX_REQUIREMENTS: int = 100
+    BATCH_LLM_CONCURRENCY: int = 4
+    BATCH_TIMEOUT_SECONDS: float = 1800.0
+
+    # Test case generation mode ("thorough", "fast" or "pipelined") and the local review score below which fast mode asks the LLM
+    GENERATION_DEFAULT_MODE: str = "thorough"
+    FAST_REVIEW_THRESHOLD: float = 60.0
+    # Pipelined mode: test cases per review batch, review batches in flight
+    REVIEW_BATCH_SIZE: int = 5
+    REVIEW_CONCURRENCY: int = 3
+
+    # Chat streaming: coalescing window (seconds) and max characters per SSE content frame, heartbeat interval (0 = off)
+    SSE_COALESCE_INTERVAL: float = 0.03
+    SSE_COALESCE_MAX_CHARS: int = 1024
+    SSE_HEARTBEAT_INTERVAL: float = 15.0
+
+    # Keyword index snapshots: directory for per-project snapshots, loaded on first use and written on shutdown (empty = in-memory only)
+    SEARCH_INDEX_DIR: str = ""
+
+    # Test execution history: directory for per-project statistics snapshots (empty = in-memory only) and upload size limit
+    EXECUTION_STATS_DIR: str = ""
+    EXECUTION_UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024
+
+    # Startup warm-up (build the agent graph and open LLM / backend connections before /ready turns green)
+    WARMUP_ENABLED: bool = True
+    WARMUP_TIMEOUT: float = 10.0
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,292 @@
+"""
+检索上下文打包
+
+把检索到的 PRD / 测试用例整理成提示词中的参考资料：
+- 按检索得分从高到低挑选文档，直到用完 token 预算，而不是按位置截取前几个
+- 标题和正文几乎相同的文档（同一份 PRD 的多个版本、复制出来的用例）只保留得分最高的一个
+- 正文过长时抽取与查询最相关的句子（保持原文顺序），而不是截取开头的固定字符数
+
+token 数按字符估算：CJK 字符约 1 个 token，其他字符约 4 个字符 1 个 token，只用于预算控制。
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+from .models import SlottedModel
+
+# 默认预算：整段参考资料的 token 数、文档数和单个文档摘录的 token 数
+DEFAULT_BUDGET_TOKENS = 600
+DEFAULT_MAX_PASSAGES = 5
+DEFAULT_EXCERPT_TOKENS = 120
+
+# 字符二元组 Jaccard 相似度达到该值即视为重复文档
+DEFAULT_DEDUP_THRESHOLD = 0.85
+
+# 剩余预算放不下标题加上这么多 token 的摘录时停止挑选
+_MIN_EXCERPT_TOKENS = 16
+
+_CJK = re.compile(r"[　-ヿ㐀-䶿一-鿿가-힯＀-￯]")
+# 参与词项计算的 CJK 文字（不含全角标点）
+_CJK_WORD = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+_SENTENCE_END = re.compile(r"(?<=[。！？；!?;])|\n+|(?<=[.])\s+")
+_ASCII_WORD = re.compile(r"[a-z0-9_]{2,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    按中英文句末标点和换行切分句子
+
+    Args:
+        text: 文本
+
+    Returns:
+        去掉首尾空白后的非空句子
+    """
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence and sentence.strip()]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    切分检索词项：英文单词和数字（至少 2 个字符）以及 CJK 字符二元组
+
+    Args:
+        text: 文本
+
+    Returns:
+        词项列表（保留重复，用于统计词频）
+    """
+    lowered = text.lower()
+    terms = _ASCII_WORD.findall(lowered)
+    compact = "".join(_CJK_WORD.findall(lowered))
+    if len(compact) == 1:
+        terms.append(compact)
+    terms.extend(compact[i:i + 2] for i in range(len(compact) - 1))
+    return terms
+
+
+def _terms(text: str) -> FrozenSet[str]:
+    """提取用于相关度和相似度计算的词项集合"""
+    return frozenset(tokenize(text))
+
+
+def _jaccard(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    if not left or not right:
+        return 1.0 if left == right else 0.0
+    return len(left & right) / len(left | right)
+
+
+def document_text(document: Dict[str, Any]) -> str:
+    """
+    提取文档正文：PRD 和检索结果使用 content，结构化用例使用步骤和预期结果
+
+    Args:
+        document: 检索结果或测试用例
+
+    Returns:
+        正文文本
+    """
+    content = document.get("content")
+    if content:
+        return str(content)
+    parts = []
+    steps = document.get("steps")
+    if isinstance(steps, list):
+        for step in steps:
+            if isinstance(step, dict):
+                parts.append(str(step.get("action") or step.get("description") or ""))
+            else:
+                parts.append(str(step))
+    if document.get("expected_result"):
+        parts.append(str(document["expected_result"]))
+    return "\n".join(part for part in parts if part)
+
+
+def extract_excerpt(text: str, query_terms: FrozenSet[str], max_tokens: int) -> str:
+    """
+    抽取与查询最相关的句子，按原文顺序拼接
+
+    命中查询词项的句子按命中数（对句子长度做开方归一化）排序，依次放入摘录直到用完 token 上限，
+    不相关的句子不占用预算；没有句子命中查询时使用开头的句子。
+
+    Args:
+        text: 正文
+        query_terms: 查询词项
+        max_tokens: 摘录的 token 上限
+
+    Returns:
+        摘录文本（正文本身不超过上限时原样返回）
+    """
+    text = text.strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    sentences = split_sentences(text)
+    costs = [estimate_tokens(sentence) for sentence in sentences]
+    relevance = [
+        len(query_terms & _terms(sentence)) / math.sqrt(cost or 1)
+        for sentence, cost in zip(sentences, costs)
+    ]
+    order = [i for i in sorted(range(len(sentences)), key=lambda i: (-relevance[i], i)) if relevance[i] > 0]
+    if not order:
+        order = list(range(len(sentences)))
+
+    # 每个句子多计 1 个 token，留给拼接用的空格和省略号
+    chosen, used, seen = [], 0, set()
+    for index in order:
+        if sentences[index] in seen:
+            continue
+        if used + costs[index] + 1 <= max_tokens:
+            chosen.append(index)
+            seen.add(sentences[index])
+            used += costs[index] + 1
+    if not chosen:
+        # 单个句子就超过上限：截取最相关的句子
+        best = sentences[order[0]]
+        return _truncate(best, max_tokens)
+
+    chosen.sort()
+    pieces = []
+    for position, index in enumerate(chosen):
+        if position and chosen[position - 1] != index - 1:
+            pieces.append("…")
+        pieces.append(sentences[index])
+    if chosen[-1] != len(sentences) - 1:
+        pieces.append("…")
+    return " ".join(pieces)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """按估算的 token 数截断文本"""
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + ("…" if low < len(text) else "")
+
+
+@dataclass(slots=True)
+class Passage(SlottedModel):
+    """打包后的一条参考资料"""
+    document: Dict[str, Any]
+    title: str
+    excerpt: str
+    score: float
+    tokens: int
+
+
+def pack_passages(
+    query: str,
+    documents: Optional[Sequence[Dict[str, Any]]],
+    budget_tokens: int = DEFAULT_BUDGET_TOKENS,
+    max_passages: int = DEFAULT_MAX_PASSAGES,
+    excerpt_tokens: int = DEFAULT_EXCERPT_TOKENS,
+    dedup_threshold: float = DEFAULT_DEDUP_THRESHOLD,
+    text_of: Callable[[Dict[str, Any]], str] = document_text
+) -> List[Passage]:
+    """
+    在 token 预算内挑选参考资料
+
+    Args:
+        query: 查询文本（需求描述、变更描述等），用于抽取相关句子
+        documents: 检索结果，带 score 的按得分从高到低挑选，没有 score 的保持原有顺序排在后面
+        budget_tokens: 全部参考资料的 token 预算
+        max_passages: 最多挑选的文档数
+        excerpt_tokens: 单个文档摘录的 token 上限
+        dedup_threshold: 判定为重复文档的相似度阈值
+        text_of: 提取文档正文的函数
+
+    Returns:
+        挑选出的参考资料，按得分从高到低
+    """
+    if not documents:
+        return []
+
+    ranked = sorted(
+        enumerate(documents),
+        key=lambda pair: (pair[1].get("score") is None, -(pair[1].get("score") or 0.0), pair[0])
+    )
+    query_terms = _terms(query or "")
+
+    passages: List[Passage] = []
+    fingerprints: List[FrozenSet[str]] = []
+    seen_ids = set()
+    remaining = budget_tokens
+    for _, document in ranked:
+        if len(passages) >= max_passages:
+            break
+        document_id = document.get("id")
+        if document_id is not None and document_id in seen_ids:
+            continue
+
+        title = str(document.get("title") or "N/A")
+        text = text_of(document)
+        fingerprint = _terms(f"{title}\n{text}")
+        if any(_jaccard(fingerprint, other) >= dedup_threshold for other in fingerprints):
+            continue
+
+        title_tokens = estimate_tokens(title)
+        available = min(excerpt_tokens, remaining - title_tokens)
+        if text and available < _MIN_EXCERPT_TOKENS:
+            if remaining - title_tokens < _MIN_EXCERPT_TOKENS:
+                break
+            continue
+        excerpt = extract_excerpt(text, query_terms, available) if text else ""
+        tokens = title_tokens + estimate_tokens(excerpt)
+        if tokens > remaining:
+            break
+
+        passages.append(Passage(document, title, excerpt, float(document.get("score") or 0.0), tokens))
+        fingerprints.append(fingerprint)
+        if document_id is not None:
+            seen_ids.add(document_id)
+        remaining -= tokens
+    return passages
+
+
+def format_passages(
+    header: str,
+    passages: Iterable[Passage],
+    details: Optional[Callable[[Passage], List[str]]] = None
+) -> str:
+    """
+    渲染参考资料段落
+
+    Args:
+        header: 段落标题（如"参考历史 PRD："）
+        passages: pack_passages 挑选出的参考资料
+        details: 返回每条资料附加行（如模块、优先级）的函数
+
+    Returns:
+        段落文本，没有资料时返回空字符串
+    """
+    lines = []
+    for i, passage in enumerate(passages, 1):
+        lines.append(f"\n{i}. {passage.title}")
+        if details is not None:
+            lines.extend(f"   {line}" for line in details(passage))
+        if passage.excerpt:
+            lines.append(f"   {passage.excerpt}")
+    if not lines:
+        return ""
+    return header + "\n" + "\n".join(lines) + "\n"
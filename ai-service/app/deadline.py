@@ -0,0 +1,102 @@
+"""
+请求截止时间
+
+通过 contextvar 在一次请求内传播截止时间。TestEngineerAgent 在处理请求时设置截止时间，
+工具、Agent 和客户端读取剩余时间来收紧自身的超时和重试预算，
+避免单个重试循环耗尽整个请求的时间预算。
+
+contextvar 会随 asyncio.create_task 复制到子任务中，因此并发执行的阶段同样可见。
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# 截止时间（time.monotonic() 时间戳），None 表示没有截止时间
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """请求截止时间已到"""
+    pass
+
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    在当前上下文中设置截止时间。
+
+    嵌套使用时取更早的截止时间，内层作用域不能放宽外层的限制。
+
+    Args:
+        timeout: 从现在起的超时时间（秒），None 表示不额外限制
+
+    Yields:
+        生效的截止时间（time.monotonic() 时间戳）
+    """
+    current = _deadline.get()
+    deadline = current
+    if timeout is not None:
+        candidate = time.monotonic() + timeout
+        deadline = candidate if current is None else min(current, candidate)
+
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    """获取当前截止时间（time.monotonic() 时间戳）"""
+    return _deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """
+    获取剩余时间。
+
+    Returns:
+        剩余秒数（可能为负数），没有截止时间时返回 None
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline() -> None:
+    """
+    检查截止时间，作为协作式取消点在开始耗时操作前调用。
+
+    Raises:
+        DeadlineExceeded: 截止时间已到
+    """
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("请求截止时间已到")
+
+
+def clamp_timeout(timeout: Optional[float]) -> Optional[float]:
+    """
+    将超时时间收紧到剩余时间以内。
+
+    Args:
+        timeout: 组件自身的超时时间（秒），None 表示不限制
+
+    Returns:
+        收紧后的超时时间；没有截止时间时原样返回
+
+    Raises:
+        DeadlineExceeded: 截止时间已到
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("请求截止时间已到")
+    if timeout is None:
+        return remaining
+    return min(timeout, remaining)
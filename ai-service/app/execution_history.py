@@ -0,0 +1,734 @@
+"""
+测试执行历史与回归用例优先级
+
+导入测试执行结果（CSV / JSON / JUnit XML），按项目维护紧凑的用例统计：执行次数、失败次数、
+平均时长、最近一次失败时间。每个用例的统计只占几个定长数组中的一行，十万条用例只需几 MB。
+
+回归推荐用这些统计做 APFD 风格的优先级排序：
+
+    失败概率 p = 1 - (1 - 平滑失败率) · (1 - RECENT_FAILURE_WEIGHT · 2^(-距上次失败天数 / 半衰期))
+    排序键   = p / 平均执行时长（分钟）
+
+即按"单位执行时间的期望发现故障数"降序执行（对相互独立的失败，这是使期望 APFDc 最大的顺序）。
+平滑失败率 = (失败次数 + PRIOR_FAILURES) / (执行次数 + PRIOR_RUNS)，没有历史的用例使用先验失败率。
+
+导入时，同一次执行（run_id 相同；没有 run_id 时整批视为一次执行）中失败用例所属的模块
+会写入模块依赖图的共同失败数据（见 app/impact_graph.py）。
+"""
+
+import csv
+import io
+import logging
+import math
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Set
+from urllib.parse import quote
+
+import numpy as np
+
+from .config import settings
+from .impact_graph import case_minutes, record_failure_run
+from .keyword_index import case_module, get_project_index, parse_timestamp
+from .models import SlottedModel
+from .serialization import dumps_bytes, loads
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SUFFIX = ".stats.npz"
+
+# 先验：相当于每个用例事先执行过 PRIOR_RUNS 次、失败 PRIOR_FAILURES 次（先验失败率 5%）
+PRIOR_RUNS = 2.0
+PRIOR_FAILURES = 0.1
+# 最近失败过的用例额外的失败概率（按距上次失败的天数指数衰减）
+RECENT_FAILURE_WEIGHT = 0.5
+RECENT_FAILURE_HALF_LIFE_DAYS = 14.0
+# 保留的最近若干次执行的失败模块（用于重建共同失败数据）
+MAX_FAILURE_RUNS = 200
+
+_SECONDS_PER_DAY = 86400.0
+
+PASS_STATUSES = {"pass", "passed", "success", "succeeded", "ok", "通过", "成功"}
+FAIL_STATUSES = {"fail", "failed", "failure", "error", "errored", "broken", "失败", "错误"}
+
+# CSV / JSON 记录中各字段可用的列名
+_CASE_ID_KEYS = ("case_id", "test_case_id", "id", "case", "code")
+_STATUS_KEYS = ("status", "result", "outcome")
+_DURATION_KEYS = ("duration", "duration_seconds", "time", "elapsed")
+_DURATION_MS_KEYS = ("duration_ms", "elapsed_ms")
+_TIMESTAMP_KEYS = ("timestamp", "executed_at", "started_at", "finished_at")
+_RUN_ID_KEYS = ("run_id", "execution_id", "build", "build_id")
+
+
+@dataclass(slots=True)
+class ExecutionRecord(SlottedModel):
+    """一条用例执行结果"""
+    case_id: str
+    failed: bool
+    duration: Optional[float] = None  # 秒
+    timestamp: Optional[float] = None  # Unix 时间戳
+    module: Optional[str] = None
+    run_id: Optional[str] = None
+
+
+@dataclass(slots=True)
+class CaseStats(SlottedModel):
+    """单个用例的执行统计"""
+    case_id: str
+    runs: int
+    failures: int
+    mean_duration: Optional[float]  # 秒，没有时长记录时为 None
+    last_failure: Optional[float]
+    last_run: Optional[float]
+
+    @property
+    def failure_rate(self) -> float:
+        """失败率（未平滑）"""
+        return self.failures / self.runs if self.runs else 0.0
+
+
+@dataclass(slots=True)
+class IngestSummary(SlottedModel):
+    """一次导入的结果"""
+    records: int
+    skipped: int
+    cases: int
+    failure_runs: int
+
+
+def _float(value: Any) -> Optional[float]:
+    """转换为有限浮点数，无法转换时返回 None"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _first(row: Mapping[str, Any], keys: Sequence[str]) -> Any:
+    """读取第一个非空的字段"""
+    for key in keys:
+        value = row.get(key)
+        if value is not None and value != "":
+            return value
+    return None
+
+
+def parse_status(value: Any) -> Optional[bool]:
+    """
+    解析执行状态
+
+    Args:
+        value: 状态文本或布尔值（True 表示通过）
+
+    Returns:
+        失败为 True，通过为 False，跳过、阻塞等无法判定的状态为 None
+    """
+    if isinstance(value, bool):
+        return not value
+    status = str(value or "").strip().lower()
+    if status in FAIL_STATUSES:
+        return True
+    if status in PASS_STATUSES:
+        return False
+    return None
+
+
+def record_from_mapping(row: Mapping[str, Any]) -> Optional[ExecutionRecord]:
+    """
+    把 CSV 行或 JSON 对象转换为执行记录
+
+    Args:
+        row: 字段名不区分大小写；状态可用 status / result / outcome，也可以给出布尔值 failed / passed
+
+    Returns:
+        执行记录，缺少用例 ID 或状态无法判定时返回 None
+    """
+    row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+    case_id = _first(row, _CASE_ID_KEYS)
+    if case_id is None:
+        return None
+    if isinstance(row.get("failed"), bool):
+        failed: Optional[bool] = row["failed"]
+    elif isinstance(row.get("passed"), bool):
+        failed = not row["passed"]
+    else:
+        failed = parse_status(_first(row, _STATUS_KEYS))
+    if failed is None:
+        return None
+
+    duration = _float(_first(row, _DURATION_KEYS))
+    if duration is None:
+        milliseconds = _float(_first(row, _DURATION_MS_KEYS))
+        duration = milliseconds / 1000 if milliseconds is not None else None
+    module = row.get("module") or row.get("module_name")
+    run_id = _first(row, _RUN_ID_KEYS)
+    return ExecutionRecord(
+        case_id=str(case_id).strip(),
+        failed=failed,
+        duration=duration if duration is not None and duration >= 0 else None,
+        timestamp=parse_timestamp(_first(row, _TIMESTAMP_KEYS)),
+        module=str(module) if module else None,
+        run_id=str(run_id) if run_id is not None else None
+    )
+
+
+def parse_csv(content: str) -> List[Optional[ExecutionRecord]]:
+    """解析 CSV 执行结果（第一行为表头），无法识别的行为 None"""
+    return [record_from_mapping(row) for row in csv.DictReader(io.StringIO(content))]
+
+
+def parse_json(content: str) -> List[Optional[ExecutionRecord]]:
+    """
+    解析 JSON 执行结果
+
+    Args:
+        content: 记录数组，或把记录数组放在 results / executions / records 中的对象
+
+    Raises:
+        ValueError: 如果 JSON 无法解析或结构不符合要求
+    """
+    data = loads(content)
+    if isinstance(data, dict):
+        data = _first(data, ("results", "executions", "records"))
+    if not isinstance(data, list):
+        raise ValueError("JSON 执行结果必须是记录数组")
+    return [record_from_mapping(item) if isinstance(item, dict) else None for item in data]
+
+
+def parse_junit(content: str) -> List[Optional[ExecutionRecord]]:
+    """
+    解析 JUnit XML 执行结果
+
+    用例 ID 取 testcase 的 id 属性（或 case_id 属性），没有时使用 name；
+    含 failure / error 子元素为失败，含 skipped 子元素为跳过。
+    执行时间取所在 testsuite 的 timestamp；一个文件中的所有 testsuite 视为同一次执行。
+
+    Raises:
+        ValueError: 如果 XML 无法解析
+    """
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError as e:
+        raise ValueError(f"JUnit XML 解析失败: {e}") from e
+
+    records: List[Optional[ExecutionRecord]] = []
+    suites = [root] if root.tag == "testsuite" else list(root.iter("testsuite"))
+    for suite in suites:
+        timestamp = parse_timestamp(suite.get("timestamp"))
+        for testcase in suite.findall("testcase"):
+            case_id = testcase.get("id") or testcase.get("case_id") or testcase.get("name")
+            if not case_id or testcase.find("skipped") is not None:
+                records.append(None)
+                continue
+            failed = testcase.find("failure") is not None or testcase.find("error") is not None
+            duration = _float(testcase.get("time"))
+            records.append(ExecutionRecord(
+                case_id=case_id.strip(),
+                failed=failed,
+                duration=duration if duration is not None and duration >= 0 else None,
+                timestamp=timestamp,
+                module=testcase.get("module")
+            ))
+    return records
+
+
+def detect_format(content: str) -> str:
+    """按内容判断执行结果格式：csv、json 或 junit"""
+    head = content.lstrip("\ufeff \t\r\n")[:1]
+    if head == "<":
+        return "junit"
+    if head in ("[", "{"):
+        return "json"
+    return "csv"
+
+
+_PARSERS = {"csv": parse_csv, "json": parse_json, "junit": parse_junit}
+
+
+def parse_results(content: str, format: Optional[str] = None) -> List[Optional[ExecutionRecord]]:
+    """
+    解析执行结果
+
+    Args:
+        content: 文件内容
+        format: csv / json / junit（默认按内容判断）
+
+    Returns:
+        执行记录列表，跳过或无法识别的记录为 None
+
+    Raises:
+        ValueError: 如果格式不支持或内容无法解析
+    """
+    format = (format or detect_format(content)).lower()
+    parser = _PARSERS.get(format)
+    if parser is None:
+        raise ValueError(f"不支持的执行结果格式: {format}")
+    return parser(content)
+
+
+class ExecutionStats:
+    """
+    按用例汇总的执行统计
+
+    每个用例占各列中的一行（执行次数、失败次数、时长总和、有时长的执行次数、最近失败 / 执行时间）。
+    """
+
+    def __init__(self):
+        """初始化空的统计"""
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._runs = array("i")
+        self._failures = array("i")
+        self._duration_sum = array("d")
+        self._timed_runs = array("i")
+        self._last_failure = array("d")
+        self._last_run = array("d")
+        self.failure_runs: Deque[List[str]] = deque(maxlen=MAX_FAILURE_RUNS)
+        self.version = 0
+        self.saved_version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, case_id: Any) -> bool:
+        return str(case_id) in self._rows
+
+    def _row(self, case_id: str) -> int:
+        """用例所在的行，不存在时追加一行（调用方持有锁）"""
+        row = self._rows.get(case_id)
+        if row is None:
+            row = self._rows[case_id] = len(self._ids)
+            self._ids.append(case_id)
+            self._runs.append(0)
+            self._failures.append(0)
+            self._duration_sum.append(0.0)
+            self._timed_runs.append(0)
+            self._last_failure.append(math.nan)
+            self._last_run.append(math.nan)
+        return row
+
+    def add_records(self, records: Iterable[ExecutionRecord], now: Optional[float] = None) -> int:
+        """
+        累加执行记录
+
+        Args:
+            records: 执行记录
+            now: 记录没有时间戳时使用的时间（默认当前时间）
+
+        Returns:
+            累加的记录数
+        """
+        now = time.time() if now is None else now
+        count = 0
+        with self._lock:
+            for record in records:
+                row = self._row(record.case_id)
+                moment = record.timestamp if record.timestamp is not None else now
+                self._runs[row] += 1
+                if record.failed:
+                    self._failures[row] += 1
+                    if not moment <= self._last_failure[row]:
+                        self._last_failure[row] = moment
+                if record.duration is not None:
+                    self._duration_sum[row] += record.duration
+                    self._timed_runs[row] += 1
+                if not moment <= self._last_run[row]:
+                    self._last_run[row] = moment
+                count += 1
+            if count:
+                self.version += 1
+        return count
+
+    def add_failure_run(self, failed_modules: Iterable[str]) -> None:
+        """保存一次执行中失败的模块（只保留最近 MAX_FAILURE_RUNS 次）"""
+        modules = sorted({str(module) for module in failed_modules if module})
+        if modules:
+            with self._lock:
+                self.failure_runs.append(modules)
+                self.version += 1
+
+    def get(self, case_id: Any) -> Optional[CaseStats]:
+        """
+        读取用例的统计
+
+        Args:
+            case_id: 用例 ID
+
+        Returns:
+            统计，没有执行记录时返回 None
+        """
+        with self._lock:
+            row = self._rows.get(str(case_id))
+            if row is None:
+                return None
+            timed = self._timed_runs[row]
+            last_failure, last_run = self._last_failure[row], self._last_run[row]
+            return CaseStats(
+                case_id=self._ids[row],
+                runs=self._runs[row],
+                failures=self._failures[row],
+                mean_duration=self._duration_sum[row] / timed if timed else None,
+                last_failure=None if math.isnan(last_failure) else last_failure,
+                last_run=None if math.isnan(last_run) else last_run
+            )
+
+    def features(self, case_ids: Sequence[Any], now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        计算一组用例的失败概率和平均时长
+
+        Args:
+            case_ids: 用例 ID
+            now: 当前 Unix 时间戳（默认当前时间）
+
+        Returns:
+            failure_probability：失败概率；minutes：平均执行时长（分钟，没有时长记录时为 NaN）；
+            known：是否有执行记录
+        """
+        count = len(case_ids)
+        with self._lock:
+            rows = np.fromiter((self._rows.get(str(case_id), -1) for case_id in case_ids), dtype=np.intp, count=count)
+            known = rows >= 0
+            safe = np.where(known, rows, 0)
+            size = len(self._ids)
+
+            def column(values: array, dtype: Any, missing: float) -> np.ndarray:
+                if not size:
+                    return np.full(count, missing, dtype=dtype)
+                return np.where(known, np.frombuffer(values, dtype=dtype)[safe], missing)
+
+            runs = column(self._runs, np.intc, 0).astype(np.float64)
+            failures = column(self._failures, np.intc, 0).astype(np.float64)
+            duration_sum = column(self._duration_sum, np.float64, 0.0)
+            timed_runs = column(self._timed_runs, np.intc, 0).astype(np.float64)
+            last_failure = column(self._last_failure, np.float64, math.nan)
+
+        rate = (failures + PRIOR_FAILURES) / (runs + PRIOR_RUNS)
+        age_days = np.maximum((time.time() if now is None else now) - last_failure, 0.0) / _SECONDS_PER_DAY
+        recency = np.nan_to_num(np.exp2(-age_days / RECENT_FAILURE_HALF_LIFE_DAYS), nan=0.0)
+        probability = 1.0 - (1.0 - rate) * (1.0 - RECENT_FAILURE_WEIGHT * recency)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            minutes = np.where(timed_runs > 0, duration_sum / timed_runs / 60.0, math.nan)
+        return {"failure_probability": probability, "minutes": minutes, "known": known}
+
+    def save(self, path: str) -> None:
+        """
+        把统计快照写入磁盘（先写临时文件再替换）
+
+        Args:
+            path: 快照文件路径（.npz）
+        """
+        with self._lock:
+            meta = {"format": SNAPSHOT_FORMAT, "ids": self._ids, "failure_runs": list(self.failure_runs)}
+            arrays = {
+                "meta": np.frombuffer(dumps_bytes(meta), dtype=np.uint8),
+                "runs": np.array(self._runs, dtype=np.intc),
+                "failures": np.array(self._failures, dtype=np.intc),
+                "duration_sum": np.array(self._duration_sum, dtype=np.float64),
+                "timed_runs": np.array(self._timed_runs, dtype=np.intc),
+                "last_failure": np.array(self._last_failure, dtype=np.float64),
+                "last_run": np.array(self._last_run, dtype=np.float64),
+            }
+            version = self.version
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(temporary, path)
+        self.saved_version = version
+
+    @classmethod
+    def load(cls, path: str) -> "ExecutionStats":
+        """
+        从快照加载统计
+
+        Args:
+            path: 快照文件路径
+
+        Returns:
+            统计
+
+        Raises:
+            OSError: 如果文件无法读取
+            ValueError: 如果文件不是合法的快照或格式版本不匹配
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = loads(data["meta"].tobytes())
+                if meta.get("format") != SNAPSHOT_FORMAT:
+                    raise ValueError(f"不支持的快照格式: {meta.get('format')}")
+                columns = {
+                    name: data[name]
+                    for name in ("runs", "failures", "duration_sum", "timed_runs", "last_failure", "last_run")
+                }
+        except KeyError as e:
+            raise ValueError(f"快照缺少字段: {e}") from e
+
+        stats = cls()
+        stats._ids = [str(case_id) for case_id in meta["ids"]]
+        stats._rows = {case_id: row for row, case_id in enumerate(stats._ids)}
+        for name, typecode, dtype in (
+            ("runs", "i", np.intc),
+            ("failures", "i", np.intc),
+            ("duration_sum", "d", np.float64),
+            ("timed_runs", "i", np.intc),
+            ("last_failure", "d", np.float64),
+            ("last_run", "d", np.float64),
+        ):
+            setattr(stats, f"_{name}", array(typecode, columns[name].astype(dtype, copy=False).tobytes()))
+        stats.failure_runs.extend(meta.get("failure_runs") or [])
+        stats.saved_version = stats.version
+        return stats
+
+
+def prioritize(
+    cases: Sequence[Dict[str, Any]],
+    stats: ExecutionStats,
+    now: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    按单位执行时间的期望发现故障数排序（APFD 风格的优先级）
+
+    Args:
+        cases: 测试用例（通常已按相关度排序，排序键相同时保持原有顺序）
+        stats: 项目执行统计
+        now: 当前 Unix 时间戳（默认当前时间）
+
+    Returns:
+        排序后的用例副本，带 failure_probability、estimated_minutes 和 faults_per_minute 字段
+    """
+    annotated = annotate_history(cases, stats, now=now)
+    return sorted(annotated, key=lambda case: -case["faults_per_minute"])
+
+
+def annotate_history(
+    cases: Sequence[Dict[str, Any]],
+    stats: ExecutionStats,
+    now: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    给用例标注执行历史推算的失败概率和执行时长（不改变顺序）
+
+    有执行时长记录的用例使用历史平均时长作为 estimated_minutes，其余保留用例自带的估计。
+
+    Args:
+        cases: 测试用例
+        stats: 项目执行统计
+        now: 当前 Unix 时间戳（默认当前时间）
+
+    Returns:
+        用例副本
+    """
+    if not cases:
+        return []
+    features = stats.features([case.get("id") for case in cases], now=now)
+    annotated = []
+    for case, probability, measured in zip(
+        cases, features["failure_probability"].tolist(), features["minutes"].tolist()
+    ):
+        minutes = measured if not math.isnan(measured) and measured > 0 else case_minutes(case)
+        annotated.append({
+            **case,
+            "failure_probability": round(probability, 4),
+            "estimated_minutes": round(minutes, 4),
+            "faults_per_minute": round(probability / minutes, 6),
+        })
+    return annotated
+
+
+def apfd(
+    order: Sequence[Hashable],
+    faults: Mapping[Hashable, Iterable[Hashable]],
+    minutes: Optional[Mapping[Hashable, float]] = None
+) -> float:
+    """
+    计算执行顺序的 APFD（给出时长时为考虑成本的 APFDc）
+
+        APFDc = Σ_故障 (Σ_{j ≥ TF_i} t_j - t_{TF_i} / 2) / (Σ t · 故障数)
+
+    时长全部为 1 时等于经典的 APFD = 1 - Σ TF_i / (n · m) + 1 / (2n)。
+
+    Args:
+        order: 用例执行顺序
+        faults: 用例 -> 它能发现的故障
+        minutes: 用例 -> 执行时长（默认每个用例 1）
+
+    Returns:
+        0-1 之间的分数，越大表示故障发现得越早；没有故障时返回 0
+    """
+    costs = [float(minutes.get(case_id, 1.0)) if minutes else 1.0 for case_id in order]
+    total = sum(costs)
+    detected: Dict[Hashable, int] = {}
+    for position, case_id in enumerate(order):
+        for fault in faults.get(case_id, ()):
+            detected.setdefault(fault, position)
+    all_faults: Set[Hashable] = {fault for found in faults.values() for fault in found}
+    if not all_faults or total <= 0:
+        return 0.0
+    remaining = np.cumsum(costs[::-1])[::-1]  # remaining[j] = Σ_{k ≥ j} t_k
+    score = sum(remaining[position] - costs[position] / 2 for position in detected.values())
+    return float(score / (total * len(all_faults)))
+
+
+# 按项目缓存的执行统计
+_project_stats: Dict[Hashable, ExecutionStats] = {}
+_project_stats_lock = threading.Lock()
+
+
+def snapshot_path(directory: str, project_id: Hashable) -> str:
+    """项目执行统计快照的文件路径"""
+    return os.path.join(directory, quote(str(project_id), safe="") + SNAPSHOT_SUFFIX)
+
+
+def _load_snapshot(project_id: Hashable) -> Optional[ExecutionStats]:
+    """加载项目的统计快照，未配置快照目录、快照不存在或已损坏时返回 None"""
+    if not settings.EXECUTION_STATS_DIR:
+        return None
+    path = snapshot_path(settings.EXECUTION_STATS_DIR, project_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        stats = ExecutionStats.load(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"加载执行统计快照失败，重新统计: {path}: {e}")
+        return None
+    logger.info(f"已加载执行统计快照: {path}（{len(stats)} 个用例）")
+    return stats
+
+
+def get_project_stats(project_id: Hashable) -> ExecutionStats:
+    """
+    获取项目的执行统计（不存在时从快照加载或新建）
+
+    从快照加载时，快照中保存的失败模块会写回项目依赖图。
+
+    Args:
+        project_id: 项目 ID
+
+    Returns:
+        项目执行统计
+    """
+    with _project_stats_lock:
+        stats = _project_stats.get(project_id)
+        if stats is not None:
+            return stats
+        stats = _project_stats[project_id] = _load_snapshot(project_id) or ExecutionStats()
+    for failed_modules in stats.failure_runs:
+        record_failure_run(project_id, failed_modules)
+    return stats
+
+
+def ingest_records(
+    project_id: Hashable,
+    records: Iterable[Optional[ExecutionRecord]],
+    now: Optional[float] = None
+) -> IngestSummary:
+    """
+    导入执行记录
+
+    Args:
+        project_id: 项目 ID
+        records: 执行记录（None 表示跳过的记录）
+        now: 记录没有时间戳时使用的时间（默认当前时间）
+
+    Returns:
+        导入结果
+    """
+    stats = get_project_stats(project_id)
+    index = get_project_index(project_id)
+    valid = []
+    skipped = 0
+    runs: Dict[Optional[str], Set[str]] = {}
+    for record in records:
+        if record is None:
+            skipped += 1
+            continue
+        valid.append(record)
+        failed_modules = runs.setdefault(record.run_id, set())
+        if record.failed:
+            module = record.module
+            if module is None:
+                document = index.document(record.case_id)
+                module = case_module(document) if document else None
+            if module:
+                failed_modules.add(str(module))
+
+    stats.add_records(valid, now=now)
+    failure_runs = 0
+    for failed_modules in runs.values():
+        if failed_modules:
+            stats.add_failure_run(failed_modules)
+            record_failure_run(project_id, failed_modules)
+            failure_runs += 1
+    summary = IngestSummary(
+        records=len(valid),
+        skipped=skipped,
+        cases=len({record.case_id for record in valid}),
+        failure_runs=failure_runs
+    )
+    logger.info(f"导入执行结果 (project_id={project_id}): {summary.to_dict()}")
+    return summary
+
+
+def ingest_results(
+    project_id: Hashable,
+    content: str,
+    format: Optional[str] = None,
+    now: Optional[float] = None
+) -> IngestSummary:
+    """
+    解析并导入执行结果文件
+
+    Args:
+        project_id: 项目 ID
+        content: 文件内容
+        format: csv / json / junit（默认按内容判断）
+        now: 记录没有时间戳时使用的时间（默认当前时间）
+
+    Returns:
+        导入结果
+
+    Raises:
+        ValueError: 如果格式不支持或内容无法解析
+    """
+    return ingest_records(project_id, parse_results(content, format), now=now)
+
+
+def save_project_stats(directory: Optional[str] = None) -> int:
+    """
+    把自上次保存以来有变化的项目统计写入快照
+
+    Args:
+        directory: 快照目录（默认 EXECUTION_STATS_DIR，未配置时不保存）
+
+    Returns:
+        写入的快照数
+    """
+    directory = directory or settings.EXECUTION_STATS_DIR
+    if not directory:
+        return 0
+    with _project_stats_lock:
+        items = list(_project_stats.items())
+    saved = 0
+    for project_id, stats in items:
+        if stats.saved_version == stats.version:
+            continue
+        stats.save(snapshot_path(directory, project_id))
+        saved += 1
+    return saved
+
+
+def reset_project_stats() -> None:
+    """清空所有项目执行统计（用于测试）"""
+    with _project_stats_lock:
+        _project_stats.clear()
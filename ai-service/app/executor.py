@@ -0,0 +1,256 @@
+"""
+CPU 密集型任务的共享工作池
+
+同步计算在事件循环线程上执行时会阻塞所有并发请求（包括正在输出的 SSE 流）。
+本模块提供两个进程内共享的工作池：
+- thread: 线程池。适合释放 GIL 的操作（hashlib、zlib、numpy 等），以及输入很大、
+  不值得序列化到子进程的纯 Python 循环（事件循环仍能按 GIL 切换间隔获得执行机会）
+- process: 进程池。适合计算量远大于参数序列化开销的纯 Python 计算，函数和参数必须可以 pickle
+
+每个池限制已提交任务的数量（工作线程/进程数 + 排队上限）。池饱和时调用方在事件循环上等待空位，
+等待超过 queue_timeout（或请求剩余时间）时抛出 ExecutorSaturated，形成背压而不是无限排队。
+任务占用的名额在工作线程/进程真正执行完后才释放，调用方被取消不会让池超额。
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, Optional
+
+from .deadline import clamp_timeout
+from .metrics import EXECUTOR_QUEUE_WAIT, EXECUTOR_REJECTED, EXECUTOR_TASKS
+
+logger = logging.getLogger(__name__)
+
+POOL_KINDS = ("thread", "process")
+
+
+class ExecutorSaturated(RuntimeError):
+    """工作池饱和，等待空位超时"""
+
+    def __init__(self, kind: str, limit: int, waited: float):
+        self.kind = kind
+        self.limit = limit
+        self.waited = waited
+        super().__init__(f"{kind} 工作池已饱和（上限 {limit} 个任务），等待 {waited:.2f} 秒后放弃")
+
+
+class _Slots:
+    """
+    计数信号量
+
+    与 asyncio.Semaphore 不同，不绑定到某个事件循环；名额可以从工作线程的完成回调中释放。
+    等待者按先来先服务的顺序获得名额。
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self, timeout: Optional[float]) -> None:
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # 名额由 release 直接转交给等待者，in_use 不变
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已经转交但调用方放弃了，归还给下一个等待者
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if waiter.done() or waiter.get_loop().is_closed():
+                continue
+            waiter.set_result(None)
+            return
+        self.in_use -= 1
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+
+class WorkerPool:
+    """
+    带背压的工作池
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        max_workers: Optional[int] = None,
+        max_queue: int = 64,
+        queue_timeout: Optional[float] = 10.0
+    ):
+        """
+        Args:
+            kind: thread 或 process
+            max_workers: 工作线程/进程数（默认按 CPU 数量）
+            max_queue: 工作线程/进程全忙时允许排队的任务数
+            queue_timeout: 等待空位的最长时间（秒），None 表示一直等待
+        """
+        if kind not in POOL_KINDS:
+            raise ValueError(f"不支持的工作池类型: {kind}，可选: {POOL_KINDS}")
+        cpus = os.cpu_count() or 1
+        if max_workers is None:
+            max_workers = min(32, cpus + 4) if kind == "thread" else cpus
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = _Slots(max_workers + max_queue)
+        self._executor: Optional[concurrent.futures.Executor] = None
+
+    @property
+    def in_flight(self) -> int:
+        """已提交（执行中或排队中）的任务数"""
+        return self._slots.in_use
+
+    @property
+    def waiting(self) -> int:
+        """在事件循环上等待空位的调用方数量"""
+        return self._slots.waiting
+
+    def _get_executor(self) -> concurrent.futures.Executor:
+        if self._executor is None:
+            if self.kind == "thread":
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="cpu-worker"
+                )
+            else:
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _on_done(self, loop: asyncio.AbstractEventLoop, future: concurrent.futures.Future) -> None:
+        """工作线程/进程执行完毕后在事件循环上释放名额"""
+        try:
+            loop.call_soon_threadsafe(self._slots.release)
+        except RuntimeError:
+            # 事件循环已关闭（例如测试结束），直接释放
+            self._slots.release()
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在工作池中执行同步函数
+
+        线程池中的函数在调用方上下文的副本中执行（截止时间、追踪 span 等 contextvar 可见）。
+
+        Args:
+            func: 同步函数（进程池要求可以 pickle）
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数返回值
+
+        Raises:
+            ExecutorSaturated: 等待空位超时
+            DeadlineExceeded: 请求截止时间已到
+        """
+        timeout = clamp_timeout(self.queue_timeout)
+        start = time.perf_counter()
+        try:
+            await self._slots.acquire(timeout)
+        except asyncio.TimeoutError:
+            EXECUTOR_REJECTED.inc(pool=self.kind)
+            raise ExecutorSaturated(self.kind, self._slots.limit, time.perf_counter() - start) from None
+        EXECUTOR_QUEUE_WAIT.observe(time.perf_counter() - start, pool=self.kind)
+
+        loop = asyncio.get_running_loop()
+        if self.kind == "thread":
+            call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        else:
+            call = functools.partial(func, *args, **kwargs)
+
+        try:
+            future = self._get_executor().submit(call)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(functools.partial(self._on_done, loop))
+
+        status = "error"
+        try:
+            result = await asyncio.wrap_future(future)
+            status = "ok"
+            return result
+        except BrokenProcessPool:
+            # 子进程异常退出，下次调用时重建进程池
+            logger.error(f"{self.kind} 工作池已损坏，将重建")
+            self._executor = None
+            raise
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            EXECUTOR_TASKS.inc(pool=self.kind, status=status)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭工作池（之后再次使用会重新创建）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+_pools: Dict[str, WorkerPool] = {}
+
+
+def get_pool(kind: str) -> WorkerPool:
+    """
+    获取（并按需创建）共享工作池
+
+    Args:
+        kind: thread 或 process
+
+    Returns:
+        WorkerPool
+    """
+    pool = _pools.get(kind)
+    if pool is None:
+        from .config import settings
+
+        workers = settings.EXECUTOR_THREAD_WORKERS if kind == "thread" else settings.EXECUTOR_PROCESS_WORKERS
+        pool = WorkerPool(
+            kind,
+            max_workers=workers or None,
+            max_queue=settings.EXECUTOR_MAX_QUEUE,
+            queue_timeout=settings.EXECUTOR_QUEUE_TIMEOUT,
+        )
+        _pools[kind] = pool
+    return pool
+
+
+async def run_in_thread(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """在共享线程池中执行同步函数（见 WorkerPool.run）"""
+    return await get_pool("thread").run(func, *args, **kwargs)
+
+
+async def run_in_process(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """在共享进程池中执行同步函数（见 WorkerPool.run）"""
+    return await get_pool("process").run(func, *args, **kwargs)
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    """关闭所有共享工作池"""
+    for pool in list(_pools.values()):
+        pool.shutdown(wait=wait)
+    _pools.clear()
@@ -0,0 +1,421 @@
+"""
+模块依赖图与基于风险的回归用例选择
+
+回归推荐不再孤立地处理每个变更模块：
+
+- 依赖图的边来自三类数据，同一对模块的多个来源按 noisy-or 合并（1 - Π(1 - w)）：
+  - 测试用例元数据：两个模块的用例关联同一份 PRD，说明功能耦合。A → B 的权重为
+    A 关联的 PRD 中 B 也关联的比例 × ``PRD_LINK_WEIGHT``
+  - 历史共同失败：A 失败的执行中 B 也失败的比例（A 至少失败 ``MIN_FAILURE_RUNS`` 次才计入）
+  - 调用方显式给出的依赖（上游 → 下游）
+- 影响范围：从变更模块（影响分 1.0）出发按 BFS 逐层传播，下游模块的影响分 = 上游影响分 × 边权重，
+  取所有路径中的最大值；低于 ``min_score`` 或超过 ``max_depth`` 层时停止
+- 用例选择：待覆盖项是"影响模块 × 用例类型"、用例关联的 PRD 和影响模块中的 P0 用例，
+  权重为所在模块的影响分。贪心加权集合覆盖在数量 / 时间预算内每次选出单位成本新增覆盖权重最大的用例，
+  全部覆盖后停止，因此大版本推荐的用例更少、与变更的关系更明确
+
+项目依赖图按项目缓存（``get_project_graph``）：用例元数据取自项目关键词索引，索引变化后重新同步；
+共同失败数据通过 ``record_failure_run`` 累积（导入执行结果时写入，见 app/execution_history.py）。
+"""
+
+import heapq
+import math
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Set
+
+from .keyword_index import (
+    PRIORITY_WEIGHTS,
+    case_module,
+    case_prd,
+    case_priority,
+    document_key,
+    get_project_index,
+    priority_weight,
+)
+from .models import SlottedModel
+
+# 共享 PRD 的边权重上限
+PRD_LINK_WEIGHT = 0.6
+# 模块至少失败这么多次，才用它的共同失败比例作为边权重
+MIN_FAILURE_RUNS = 2
+
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MIN_IMPACT = 0.1
+
+# 没有时长信息的用例按 1 分钟计
+DEFAULT_CASE_MINUTES = 1.0
+
+
+@dataclass(slots=True)
+class ModuleImpact(SlottedModel):
+    """模块受变更影响的程度"""
+    module: str
+    score: float
+    depth: int
+    via: Optional[str] = None
+
+
+class ModuleGraph:
+    """
+    模块依赖图（有向加权图，边从上游指向受其影响的下游）
+    """
+
+    def __init__(self):
+        """初始化空图"""
+        self._dependencies: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._module_prds: Dict[str, Set[str]] = defaultdict(set)
+        self._prd_modules: Dict[str, Set[str]] = defaultdict(set)
+        self._failure_runs: Counter = Counter()
+        self._co_failures: Dict[str, Counter] = defaultdict(Counter)
+        self._edges: Optional[Dict[str, Dict[str, float]]] = None
+        self.case_version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def modules(self) -> Set[str]:
+        """图中出现过的所有模块"""
+        modules = set(self._module_prds) | set(self._failure_runs) | set(self._dependencies)
+        for targets in self._dependencies.values():
+            modules.update(targets)
+        return modules
+
+    def add_dependency(self, upstream: str, downstream: str, weight: float = 1.0) -> None:
+        """
+        添加显式依赖
+
+        Args:
+            upstream: 上游模块（被依赖方）
+            downstream: 下游模块（上游变更时受影响）
+            weight: 边权重（0-1）
+        """
+        if not upstream or not downstream or upstream == downstream:
+            return
+        with self._lock:
+            self._dependencies[upstream][downstream] = max(0.0, min(float(weight), 1.0))
+            self._edges = None
+
+    def add_cases(self, cases: Iterable[Dict[str, Any]]) -> None:
+        """
+        从测试用例元数据中收集模块与 PRD 的关联
+
+        Args:
+            cases: 测试用例、检索结果或索引中保存的原始字段
+        """
+        with self._lock:
+            for case in cases:
+                module, prd = case_module(case), case_prd(case)
+                if module and prd:
+                    self._module_prds[str(module)].add(str(prd))
+                    self._prd_modules[str(prd)].add(str(module))
+            self._edges = None
+
+    def clear_cases(self) -> None:
+        """清空用例元数据（共同失败数据和显式依赖保留）"""
+        with self._lock:
+            self._module_prds.clear()
+            self._prd_modules.clear()
+            self._edges = None
+
+    def add_failure_run(self, failed_modules: Iterable[str]) -> None:
+        """
+        记录一次执行中失败的模块
+
+        Args:
+            failed_modules: 该次执行中有用例失败的模块
+        """
+        failed = {str(module) for module in failed_modules if module}
+        if not failed:
+            return
+        with self._lock:
+            for module in failed:
+                self._failure_runs[module] += 1
+                self._co_failures[module].update(failed - {module})
+            self._edges = None
+
+    def copy(self) -> "ModuleGraph":
+        """复制一份（用于叠加单次请求的额外数据，不影响缓存的项目图）"""
+        graph = ModuleGraph()
+        with self._lock:
+            for upstream, targets in self._dependencies.items():
+                graph._dependencies[upstream] = dict(targets)
+            for module, prds in self._module_prds.items():
+                graph._module_prds[module] = set(prds)
+            for prd, modules in self._prd_modules.items():
+                graph._prd_modules[prd] = set(modules)
+            graph._failure_runs = Counter(self._failure_runs)
+            for module, counter in self._co_failures.items():
+                graph._co_failures[module] = Counter(counter)
+            graph.case_version = self.case_version
+        return graph
+
+    def edges(self) -> Dict[str, Dict[str, float]]:
+        """
+        合并各来源后的边权重
+
+        Returns:
+            上游模块 -> {下游模块: 权重}
+        """
+        with self._lock:
+            if self._edges is None:
+                self._edges = self._build_edges()
+            return self._edges
+
+    def _build_edges(self) -> Dict[str, Dict[str, float]]:
+        """按 noisy-or 合并三类来源的边（调用方持有锁）"""
+        misses: Dict[str, Dict[str, float]] = defaultdict(dict)
+
+        def combine(upstream: str, downstream: str, weight: float) -> None:
+            if weight <= 0:
+                return
+            targets = misses[upstream]
+            targets[downstream] = targets.get(downstream, 1.0) * (1.0 - min(weight, 1.0))
+
+        for upstream, targets in self._dependencies.items():
+            for downstream, weight in targets.items():
+                combine(upstream, downstream, weight)
+
+        for module, prds in self._module_prds.items():
+            shared: Counter = Counter()
+            for prd in prds:
+                shared.update(self._prd_modules[prd] - {module})
+            for other, count in shared.items():
+                combine(module, other, PRD_LINK_WEIGHT * count / len(prds))
+
+        for module, runs in self._failure_runs.items():
+            if runs < MIN_FAILURE_RUNS:
+                continue
+            for other, count in self._co_failures[module].items():
+                combine(module, other, count / runs)
+
+        return {
+            upstream: {downstream: 1.0 - miss for downstream, miss in targets.items()}
+            for upstream, targets in misses.items()
+        }
+
+    def impact(
+        self,
+        changed_modules: Iterable[str],
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        min_score: float = DEFAULT_MIN_IMPACT
+    ) -> Dict[str, ModuleImpact]:
+        """
+        从变更模块出发计算传递影响（BFS）
+
+        Args:
+            changed_modules: 变更模块
+            max_depth: 最多传播的层数（0 表示只包含变更模块）
+            min_score: 影响分低于该值的模块不再传播，也不计入结果
+
+        Returns:
+            模块 -> 影响，变更模块的影响分为 1.0、深度为 0
+        """
+        edges = self.edges()
+        impacts: Dict[str, ModuleImpact] = {}
+        frontier = []
+        for module in changed_modules:
+            module = str(module)
+            if module and module not in impacts:
+                impacts[module] = ModuleImpact(module, 1.0, 0)
+                frontier.append(module)
+
+        for depth in range(1, max_depth + 1):
+            next_frontier = []
+            # 同一层内更新的分数留到下一层再传播，保证路径长度不超过 max_depth
+            sources = [(upstream, impacts[upstream].score) for upstream in frontier]
+            for upstream, source in sources:
+                for downstream, weight in edges.get(upstream, {}).items():
+                    score = source * weight
+                    if score < min_score:
+                        continue
+                    current = impacts.get(downstream)
+                    if current is None or score > current.score + 1e-12:
+                        impacts[downstream] = ModuleImpact(downstream, score, depth, upstream)
+                        next_frontier.append(downstream)
+            frontier = list(dict.fromkeys(next_frontier))
+            if not frontier:
+                break
+        return impacts
+
+
+def case_minutes(case: Dict[str, Any], default: float = DEFAULT_CASE_MINUTES) -> float:
+    """
+    用例的预计执行时长（分钟）
+
+    Args:
+        case: 测试用例或检索结果（读取 estimated_minutes / duration_minutes，检索结果放在 metadata 中）
+        default: 没有时长信息时的默认值
+
+    Returns:
+        时长（分钟），始终为正数
+    """
+    metadata = case.get("metadata") or {}
+    for key in ("estimated_minutes", "duration_minutes"):
+        value = case.get(key)
+        if value is None:
+            value = metadata.get(key)
+        try:
+            minutes = float(value)
+        except (TypeError, ValueError):
+            continue
+        if minutes > 0 and math.isfinite(minutes):
+            return minutes
+    return default
+
+
+def impact_module(case: Dict[str, Any]) -> Optional[str]:
+    """用例计入的影响模块：检索阶段标注的 impact_module，没有时使用用例自己的模块"""
+    module = case.get("impact_module") or case_module(case)
+    return str(module) if module else None
+
+
+def coverage_items(case: Dict[str, Any], module: str) -> Set[Hashable]:
+    """
+    用例覆盖的待覆盖项
+
+    Args:
+        case: 测试用例
+        module: 用例计入的影响模块
+
+    Returns:
+        待覆盖项集合：模块、模块 × 用例类型、关联 PRD，P0 用例还覆盖它自己
+    """
+    case_type = case.get("type") or (case.get("metadata") or {}).get("type") or ""
+    items: Set[Hashable] = {("module", module), ("type", module, str(case_type).lower())}
+    prd = case_prd(case)
+    if prd:
+        items.add(("prd", str(prd)))
+    if priority_weight(case_priority(case)) >= PRIORITY_WEIGHTS["p0"]:
+        items.add(("case", document_key(case)))
+    return items
+
+
+@dataclass(slots=True)
+class CoverSelection(SlottedModel):
+    """集合覆盖选出的回归用例"""
+    cases: List[Dict[str, Any]]
+    covered_weight: float
+    total_weight: float
+    minutes: float
+
+
+def select_cover(
+    cases: Sequence[Dict[str, Any]],
+    impacts: Mapping[str, ModuleImpact],
+    max_cases: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    minutes_of: Callable[[Dict[str, Any]], float] = case_minutes
+) -> CoverSelection:
+    """
+    贪心加权集合覆盖：在预算内用尽量少的用例覆盖影响范围
+
+    每次选出"新增覆盖权重 / 执行时长"最大的用例（没有时间预算时成本按每个用例 1 计），
+    新增覆盖权重只会随已选用例增多而减小，用惰性求值的堆避免每轮重新计算所有用例。
+
+    Args:
+        cases: 候选用例，按相关度排好序（收益相同时优先选排在前面的）
+        impacts: 影响范围（见 ModuleGraph.impact），不在其中的用例不参与覆盖
+        max_cases: 最多选出的用例数
+        time_budget: 执行时长预算（分钟）
+        minutes_of: 读取用例执行时长的函数
+
+    Returns:
+        选出的用例（保持输入顺序）和覆盖统计
+    """
+    item_weights: Dict[Hashable, float] = {}
+    case_items: List[Set[Hashable]] = []
+    costs: List[float] = []
+    for case in cases:
+        module = impact_module(case)
+        impact = impacts.get(module) if module else None
+        if impact is None:
+            case_items.append(set())
+            costs.append(1.0)
+            continue
+        items = coverage_items(case, module)
+        for item in items:
+            # PRD 可能被多个模块的用例关联，取其中最大的影响分
+            item_weights[item] = max(item_weights.get(item, 0.0), impact.score)
+        case_items.append(items)
+        costs.append(minutes_of(case) if time_budget is not None else 1.0)
+
+    total_weight = sum(item_weights.values())
+    covered: Set[Hashable] = set()
+    selected: List[int] = []
+    spent = 0.0
+
+    def gain(index: int) -> float:
+        return sum(item_weights[item] for item in case_items[index] if item not in covered)
+
+    heap = [(-gain(i) / costs[i], i) for i in range(len(cases)) if case_items[i]]
+    heapq.heapify(heap)
+    while heap and len(covered) < len(item_weights):
+        if max_cases is not None and len(selected) >= max_cases:
+            break
+        negative_ratio, index = heapq.heappop(heap)
+        ratio = gain(index) / costs[index]
+        if ratio <= 0:
+            continue
+        if heap and ratio < -heap[0][0] - 1e-12:
+            # 收益已经下降，放回堆中重新比较
+            heapq.heappush(heap, (-ratio, index))
+            continue
+        if time_budget is not None and spent + costs[index] > time_budget + 1e-9:
+            continue
+        selected.append(index)
+        covered.update(case_items[index])
+        spent += costs[index]
+
+    selected.sort()
+    return CoverSelection(
+        cases=[cases[i] for i in selected],
+        covered_weight=round(sum(item_weights[item] for item in covered), 4),
+        total_weight=round(total_weight, 4),
+        minutes=round(sum(minutes_of(cases[i]) for i in selected), 2)
+    )
+
+
+# 按项目缓存的依赖图
+_project_graphs: Dict[Hashable, ModuleGraph] = {}
+_project_graphs_lock = threading.Lock()
+
+
+def get_project_graph(project_id: Hashable) -> ModuleGraph:
+    """
+    获取项目的模块依赖图，用例元数据与项目关键词索引保持同步
+
+    Args:
+        project_id: 项目 ID
+
+    Returns:
+        项目依赖图
+    """
+    with _project_graphs_lock:
+        graph = _project_graphs.get(project_id)
+        if graph is None:
+            graph = _project_graphs[project_id] = ModuleGraph()
+    index = get_project_index(project_id)
+    version = index.version
+    if graph.case_version != version:
+        graph.clear_cases()
+        graph.add_cases(index.stored_documents())
+        graph.case_version = version
+    return graph
+
+
+def record_failure_run(project_id: Hashable, failed_modules: Iterable[str]) -> None:
+    """
+    记录项目一次执行中失败的模块（累积共同失败数据）
+
+    Args:
+        project_id: 项目 ID
+        failed_modules: 该次执行中有用例失败的模块
+    """
+    get_project_graph(project_id).add_failure_run(failed_modules)
+
+
+def reset_project_graphs() -> None:
+    """清空所有项目依赖图（用于测试）"""
+    with _project_graphs_lock:
+        _project_graphs.clear()
@@ -5,11 +5,19 @@ This module provides clients for external services:
 - BRConnectorClient: Claude API through BRConnector
 - VolcanoEmbeddingService: Volcano Engine Embedding API
 - WeaviateClient: Weaviate vector database
+
+Clients are imported lazily on first attribute access, so importing one client
+does not load the others (``weaviate`` in particular is slow to import).
 """
 
-from .brconnector_client import BRConnectorClient, BRConnectorError, RateLimitError, APIError
-from .volcano_embedding import VolcanoEmbeddingService, VolcanoEmbeddingError
-from .weaviate_client import WeaviateClient, WeaviateClientError
+from typing import TYPE_CHECKING
+
+from app.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .brconnector_client import BRConnectorClient, BRConnectorError, RateLimitError, APIError
+    from .volcano_embedding import VolcanoEmbeddingService, VolcanoEmbeddingError
+    from .weaviate_client import WeaviateClient, WeaviateClientError
 
 __all__ = [
     "BRConnectorClient",
@@ -21,3 +29,14 @@ __all__ = [
     "WeaviateClient",
     "WeaviateClientError",
 ]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "BRConnectorClient": ".brconnector_client",
+    "BRConnectorError": ".brconnector_client",
+    "RateLimitError": ".brconnector_client",
+    "APIError": ".brconnector_client",
+    "VolcanoEmbeddingService": ".volcano_embedding",
+    "VolcanoEmbeddingError": ".volcano_embedding",
+    "WeaviateClient": ".weaviate_client",
+    "WeaviateClientError": ".weaviate_client",
+})
@@ -3,11 +3,17 @@ BRConnector Client for Claude API
 
 Provides async client for interacting with Claude API through BRConnector.
 Supports streaming responses, retry logic, and dynamic configuration.
+
+Prompt caching: system prompts and content blocks marked with ``cache_control``
+are sent as cacheable prefix blocks to the Claude Messages API. For
+OpenAI-compatible APIs the blocks are flattened to plain text; those providers
+cache stable prefixes automatically.
 """
 
 import asyncio
 import logging
-from typing import Optional, Dict, Any, List, AsyncIterator
+import time
+from typing import Optional, Dict, Any, List, AsyncIterator, Union
 import httpx
 from tenacity import (
     retry,
@@ -16,8 +22,167 @@ from tenacity import (
     retry_if_exception_type,
 )
 
+from ..deadline import check_deadline, clamp_timeout, remaining_time
+from ..metrics import LLM_REQUEST_DURATION, LLM_RETRIES, LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS
+from ..serialization import JSONDecodeError, loads
+from ..tracing import tracer
+from .rate_limiter import AdaptiveRateLimiter, get_limiter, run_limited
+
 logger = logging.getLogger(__name__)
 
+# 重试等待策略；实际等待时间会收紧到请求剩余时间以内
+_retry_wait = wait_exponential(multiplier=1, min=2, max=10)
+
+
+def _stop_at_deadline(retry_state) -> bool:
+    """请求剩余时间不足以等待并再次尝试时停止重试"""
+    remaining = remaining_time()
+    return remaining is not None and remaining <= _retry_wait(retry_state)
+
+
+def _wait_within_deadline(retry_state) -> float:
+    """重试等待时间不超过请求剩余时间"""
+    wait = _retry_wait(retry_state)
+    remaining = remaining_time()
+    if remaining is None:
+        return wait
+    return max(min(wait, remaining), 0.0)
+
+
+def _record_retry(retry_state) -> None:
+    """记录一次重试"""
+    client = retry_state.args[0] if retry_state.args else None
+    model = retry_state.kwargs.get("model") or getattr(client, "default_model", "unknown")
+    LLM_RETRIES.inc(model=model)
+
+
+# Prompt caching breakpoint (Claude Messages API)
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _cache_usage(usage: Dict[str, Any]) -> Dict[str, Optional[int]]:
+    """
+    提取 prompt 缓存的读取和写入 token 数。
+    
+    Claude: cache_read_input_tokens / cache_creation_input_tokens；
+    OpenAI: prompt_tokens_details.cached_tokens；DeepSeek: prompt_cache_hit_tokens。
+    """
+    details = usage.get("prompt_tokens_details") or {}
+    cache_read = usage.get(
+        "cache_read_input_tokens",
+        details.get("cached_tokens", usage.get("prompt_cache_hit_tokens"))
+    )
+    return {"cache_read": cache_read, "cache_write": usage.get("cache_creation_input_tokens")}
+
+
+def _record_usage(model: str, usage: Optional[Dict[str, Any]], span=None) -> None:
+    """
+    记录 token 用量（指标，以及可选的追踪 span 属性）。
+    
+    兼容 Claude（input_tokens/output_tokens）和 OpenAI（prompt_tokens/completion_tokens）格式，
+    以及各自的 prompt 缓存读取 / 写入用量。
+    """
+    if not usage:
+        return
+    counts = {
+        "input": usage.get("input_tokens", usage.get("prompt_tokens")),
+        "output": usage.get("output_tokens", usage.get("completion_tokens")),
+        **_cache_usage(usage),
+    }
+    for token_type, count in counts.items():
+        if count:
+            LLM_TOKENS.inc(count, model=model, type=token_type)
+            if span is not None:
+                span.set_attribute(f"llm.usage.{token_type}_tokens", count)
+
+
+def _has_content(event: Dict[str, Any]) -> bool:
+    """流式事件是否包含生成内容"""
+    if event.get("type") == "content_block_delta":
+        return True
+    choices = event.get("choices")
+    return bool(choices) and bool(choices[0].get("delta", {}).get("content"))
+
+
+def _stream_usage(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    提取流式事件中的 token 用量。
+    
+    Claude 的 message_start 携带输入用量，message_delta 携带累计输出用量
+    （message_start 中的输出用量只是占位，忽略）；OpenAI 的最后一个数据块可能携带 usage。
+    """
+    if event.get("type") == "message_start":
+        usage = (event.get("message") or {}).get("usage") or {}
+        return {
+            key: usage.get(key)
+            for key in ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+        }
+    return event.get("usage")
+
+
+def _text_blocks(content: Union[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """将消息内容转换为内容块列表"""
+    if isinstance(content, list):
+        return [dict(block) for block in content]
+    return [{"type": "text", "text": content}]
+
+
+def _flatten_content(content: Union[str, List[Dict[str, Any]]]) -> str:
+    """将内容块列表拼接为纯文本（OpenAI 兼容接口）"""
+    if isinstance(content, list):
+        return "\n\n".join(block.get("text", "") for block in content if block.get("type") == "text")
+    return content
+
+
+def _claude_messages(
+    messages: List[Dict[str, Any]],
+    system: Optional[Union[str, List[Dict[str, Any]]]],
+    prompt_caching: bool
+) -> Dict[str, Any]:
+    """
+    构建 Claude Messages API 的 system 和 messages 字段。
+    
+    system 参数与 messages 中 role 为 system 的消息合并为顶层 system 内容块，
+    开启 prompt 缓存时最后一个 system 块标记为缓存断点；关闭时移除所有 cache_control。
+    """
+    system_blocks = _text_blocks(system) if system else []
+    chat_messages = []
+    for message in messages:
+        if message.get("role") == "system":
+            system_blocks.extend(_text_blocks(message.get("content", "")))
+        elif isinstance(message.get("content"), list):
+            # 复制内容块，移除 cache_control 时不修改调用方的消息
+            chat_messages.append({**message, "content": _text_blocks(message["content"])})
+        else:
+            chat_messages.append(dict(message))
+    
+    if not prompt_caching:
+        for blocks in [system_blocks] + [
+            message["content"] for message in chat_messages if isinstance(message.get("content"), list)
+        ]:
+            for block in blocks:
+                block.pop("cache_control", None)
+    elif system_blocks:
+        system_blocks[-1]["cache_control"] = CACHE_CONTROL
+    
+    fields: Dict[str, Any] = {"messages": chat_messages}
+    if system_blocks:
+        fields["system"] = system_blocks
+    return fields
+
+
+def _openai_messages(
+    messages: List[Dict[str, Any]],
+    system: Optional[Union[str, List[Dict[str, Any]]]]
+) -> Dict[str, Any]:
+    """构建 OpenAI 兼容接口的 messages 字段（system 作为首条消息，内容块拼接为纯文本）"""
+    chat_messages = [{"role": "system", "content": _flatten_content(system)}] if system else []
+    chat_messages.extend(
+        {**message, "content": _flatten_content(message.get("content", ""))}
+        for message in messages
+    )
+    return {"messages": chat_messages}
+
 
 class BRConnectorError(Exception):
     """Base exception for BRConnector errors"""
@@ -26,7 +191,22 @@ class BRConnectorError(Exception):
 
 class RateLimitError(BRConnectorError):
     """Raised when rate limit is exceeded"""
-    pass
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse the Retry-After header (seconds form only)."""
+    headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
 
 
 class APIError(BRConnectorError):
@@ -43,6 +223,11 @@ class BRConnectorClient:
     - Streaming and non-streaming responses
     - Automatic retry with exponential backoff
     - Rate limit handling
+    - Request deadline propagation (timeouts and retries are clamped to
+      the remaining time of the current request, see app.deadline)
+    - Latency, time-to-first-token, token and retry metrics (see app.metrics)
+    - Tracing spans for every request (see app.tracing)
+    - Prompt caching of system prompts and stable context blocks
     """
     
     def __init__(
@@ -52,6 +237,7 @@ class BRConnectorClient:
         model: Optional[str] = None,
         timeout: float = 60.0,
         max_retries: int = 3,
+        prompt_caching: bool = True,
     ):
         """
         Initialize BRConnector client.
@@ -62,12 +248,14 @@ class BRConnectorClient:
             model: Default model name (can be overridden per request)
             timeout: Request timeout in seconds
             max_retries: Maximum number of retry attempts
+            prompt_caching: Mark system prompts and context blocks as cacheable (Claude)
         """
         self.default_api_key = api_key
         self.default_base_url = base_url or "https://d106f995v5mndm.cloudfront.net"
         self.default_model = model or "claude-4-5-sonnet"
         self.timeout = timeout
         self.max_retries = max_retries
+        self.prompt_caching = prompt_caching
         
         # Create async HTTP client
         # DeepSeek Reasoner 需要更长的超时时间
@@ -107,28 +295,49 @@ class BRConnectorClient:
             "Content-Type": "application/json",
         }
     
+    def _request_timeout(self) -> Any:
+        """
+        Get the timeout for a single request, clamped to the request deadline.
+        
+        Returns:
+            httpx timeout (client default when no deadline is set)
+            
+        Raises:
+            DeadlineExceeded: When the request deadline has passed
+        """
+        if remaining_time() is None:
+            return httpx.USE_CLIENT_DEFAULT
+        return httpx.Timeout(clamp_timeout(self.timeout), read=clamp_timeout(120.0))
+    
     @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
+        stop=stop_after_attempt(3) | _stop_at_deadline,
+        wait=_wait_within_deadline,
         retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError)),
+        before_sleep=_record_retry,
         reraise=True,
     )
     async def chat(
         self,
-        messages: List[Dict[str, str]],
+        messages: List[Dict[str, Any]],
         model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 4000,
         stream: bool = False,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
+        system: Optional[Union[str, List[Dict[str, Any]]]] = None,
         **kwargs,
     ) -> Any:
         """
         Send chat completion request to Claude API.
         
         Args:
-            messages: List of message dictionaries with 'role' and 'content'
+            messages: List of message dictionaries with 'role' and 'content'.
+                Content may be a string or a list of text blocks; blocks may carry
+                ``cache_control`` to mark the end of a cacheable prefix.
+            system: System prompt (string or text blocks). For Claude it is sent,
+                together with any 'system' role messages, as the top-level
+                ``system`` field and marked as cacheable.
             model: Model name (uses default if not provided)
             temperature: Sampling temperature (0-1)
             max_tokens: Maximum tokens to generate
@@ -144,24 +353,30 @@ class BRConnectorClient:
             RateLimitError: When rate limit is exceeded
             APIError: When API returns an error
             ValueError: When required parameters are missing
+            DeadlineExceeded: When the request deadline has passed
         """
+        check_deadline()
+        
         # 检测 API 类型（Claude 或 OpenAI 兼容）
         effective_base_url = base_url or self.default_base_url
         if "deepseek" in effective_base_url.lower():
             # DeepSeek API (不需要 /v1 前缀)
             url = f"{effective_base_url}/chat/completions"
+            message_fields = _openai_messages(messages, system)
         elif "openai" in effective_base_url.lower():
             # OpenAI API
             url = f"{effective_base_url}/v1/chat/completions"
+            message_fields = _openai_messages(messages, system)
         else:
             # Claude API
             url = f"{effective_base_url}/v1/messages"
+            message_fields = _claude_messages(messages, system, self.prompt_caching)
         
         headers = self._get_headers(api_key)
         
         payload = {
             "model": model or self.default_model,
-            "messages": messages,
+            **message_fields,
             "temperature": temperature,
             "max_tokens": max_tokens,
             "stream": stream,
@@ -170,12 +385,30 @@ class BRConnectorClient:
         
         logger.info(f"Sending chat request to {url} with model {payload['model']}")
         
+        if stream:
+            # 限流器在调用时取得：流的迭代可能运行在其他上下文中
+            return self._stream_response(url, headers, payload, get_limiter())
+        
+        start = time.perf_counter()
+        status = "error"
+        span_attributes = {"llm.model": payload["model"], "llm.stream": False, "http.url": url}
+        
+        async def send() -> Any:
+            with tracer.start_span("llm.chat", kind="CLIENT", attributes=span_attributes) as span:
+                response = await self.client.post(
+                    url, json=payload, headers=headers, timeout=self._request_timeout()
+                )
+                span.set_attribute("http.status_code", response.status_code)
+                result = self._handle_response(response)
+                if isinstance(result, dict):
+                    _record_usage(payload["model"], result.get("usage"), span)
+                return result
+        
         try:
-            if stream:
-                return self._stream_response(url, headers, payload)
-            else:
-                response = await self.client.post(url, json=payload, headers=headers)
-                return self._handle_response(response)
+            # 当前上下文设置了限流器时（如批量生成）经由限流器发送，被限流时暂停后重试
+            result = await run_limited(send)
+            status = "ok"
+            return result
         
         except httpx.TimeoutException as e:
             logger.error(f"Request timeout: {e}")
@@ -184,47 +417,115 @@ class BRConnectorClient:
         except httpx.NetworkError as e:
             logger.error(f"Network error: {e}")
             raise APIError(f"Network error: {e}")
+        
+        finally:
+            LLM_REQUEST_DURATION.observe(
+                time.perf_counter() - start, model=payload["model"], stream="false", status=status
+            )
     
     async def _stream_response(
         self,
         url: str,
         headers: Dict[str, str],
         payload: Dict[str, Any],
+        limiter: Optional[AdaptiveRateLimiter] = None,
     ) -> AsyncIterator[Dict[str, Any]]:
         """
-        Stream response from API.
+        Stream response from API, through the rate limiter when one is set.
+        
+        The limiter slot is held until the stream finishes or is closed, and
+        a 429 received before the first event is retried by the limiter.
         
         Args:
             url: API endpoint URL
             headers: Request headers
             payload: Request payload
+            limiter: Rate limiter of the calling context (see app.integration.rate_limiter)
             
         Yields:
             Parsed SSE events as dictionaries
-        """
-        async with self.client.stream("POST", url, json=payload, headers=headers) as response:
-            if response.status_code == 429:
-                raise RateLimitError("Rate limit exceeded")
-            
-            if response.status_code >= 400:
-                error_text = await response.aread()
-                logger.error(f"API error {response.status_code}: {error_text}")
-                raise APIError(f"API error {response.status_code}: {error_text.decode()}")
             
-            async for line in response.aiter_lines():
-                if line.startswith("data: "):
-                    data = line[6:]  # Remove "data: " prefix
+        Raises:
+            RateLimitError: When rate limit is exceeded
+            DeadlineExceeded: When the request deadline passes mid-stream
+        """
+        if limiter is None:
+            events = self._stream_events(url, headers, payload)
+        else:
+            events = limiter.stream(lambda: self._stream_events(url, headers, payload))
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+    
+    async def _stream_events(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Open one streaming request and yield its parsed SSE events."""
+        model = payload["model"]
+        start = time.perf_counter()
+        first_token_seen = False
+        status = "error"
+        span_attributes = {"llm.model": model, "llm.stream": True, "http.url": url}
+        
+        # 异步生成器的每次迭代可能运行在不同的上下文中，span 不设为当前 span
+        with tracer.start_span(
+            "llm.chat", kind="CLIENT", attributes=span_attributes, set_current=False
+        ) as span:
+            try:
+                async with self.client.stream(
+                    "POST", url, json=payload, headers=headers, timeout=self._request_timeout()
+                ) as response:
+                    span.set_attribute("http.status_code", response.status_code)
                     
-                    if data == "[DONE]":
-                        break
+                    if response.status_code == 429:
+                        raise RateLimitError("Rate limit exceeded", _retry_after_seconds(response))
                     
-                    try:
-                        import json
-                        event = json.loads(data)
-                        yield event
-                    except json.JSONDecodeError:
-                        logger.warning(f"Failed to parse SSE data: {data}")
-                        continue
+                    if response.status_code >= 400:
+                        error_text = await response.aread()
+                        logger.error(f"API error {response.status_code}: {error_text}")
+                        raise APIError(f"API error {response.status_code}: {error_text.decode()}")
+                    
+                    async for line in response.aiter_lines():
+                        # 截止时间已到时退出 async with，关闭上游连接以停止生成
+                        check_deadline()
+                        
+                        if line.startswith("data: "):
+                            data = line[6:]  # Remove "data: " prefix
+                            
+                            if data == "[DONE]":
+                                break
+                            
+                            try:
+                                event = loads(data)
+                            except JSONDecodeError:
+                                logger.warning(f"Failed to parse SSE data: {data}")
+                                continue
+                            
+                            if not first_token_seen and _has_content(event):
+                                first_token_seen = True
+                                LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start, model=model)
+                                span.add_event("first_token")
+                            
+                            _record_usage(model, _stream_usage(event), span)
+                            
+                            yield event
+                
+                status = "ok"
+            
+            except (GeneratorExit, asyncio.CancelledError):
+                # 调用方提前关闭流（如客户端断开）
+                status = "cancelled"
+                raise
+            
+            finally:
+                LLM_REQUEST_DURATION.observe(
+                    time.perf_counter() - start, model=model, stream="true", status=status
+                )
     
     def _handle_response(self, response: httpx.Response) -> Dict[str, Any]:
         """
@@ -242,7 +543,7 @@ class BRConnectorClient:
         """
         if response.status_code == 429:
             logger.warning("Rate limit exceeded")
-            raise RateLimitError("Rate limit exceeded")
+            raise RateLimitError("Rate limit exceeded", _retry_after_seconds(response))
         
         if response.status_code >= 400:
             error_text = response.text
@@ -272,25 +573,30 @@ class BRConnectorClient:
         """
         stream = await self.chat(messages, stream=True, **kwargs)
         
-        async for event in stream:
-            # OpenAI 格式: {"choices": [{"delta": {"content": "..."}}]}
-            if "choices" in event and len(event["choices"]) > 0:
-                delta = event["choices"][0].get("delta", {})
-                content = delta.get("content")
-                if content:
-                    yield content
-            # Claude 格式: {"type": "content_block_delta", "delta": {"text": "..."}}
-            elif event.get("type") == "content_block_delta":
-                delta = event.get("delta", {})
-                if delta.get("type") == "text_delta":
-                    text = delta.get("text", "")
-                    if text:
-                        yield text
+        try:
+            async for event in stream:
+                # OpenAI 格式: {"choices": [{"delta": {"content": "..."}}]}
+                if "choices" in event and len(event["choices"]) > 0:
+                    delta = event["choices"][0].get("delta", {})
+                    content = delta.get("content")
+                    if content:
+                        yield content
+                # Claude 格式: {"type": "content_block_delta", "delta": {"text": "..."}}
+                elif event.get("type") == "content_block_delta":
+                    delta = event.get("delta", {})
+                    if delta.get("type") == "text_delta":
+                        text = delta.get("text", "")
+                        if text:
+                            yield text
+        finally:
+            # 调用方提前停止迭代（如客户端断开）时立即关闭上游流
+            await stream.aclose()
     
     async def chat_simple(
         self,
         prompt: str,
         system: Optional[str] = None,
+        cached_context: Optional[str] = None,
         **kwargs,
     ) -> str:
         """
@@ -298,20 +604,24 @@ class BRConnectorClient:
         
         Args:
             prompt: User prompt
-            system: Optional system message
+            system: Optional system message (sent as a cacheable prefix)
+            cached_context: Optional stable context (e.g. historical documents) sent
+                before the prompt as a cacheable block
             **kwargs: Additional parameters (model, temperature, etc.)
             
         Returns:
             Assistant's response text
         """
-        messages = []
-        
-        if system:
-            messages.append({"role": "system", "content": system})
-        
-        messages.append({"role": "user", "content": prompt})
+        if cached_context:
+            content: Any = [
+                {"type": "text", "text": cached_context, "cache_control": CACHE_CONTROL},
+                {"type": "text", "text": prompt},
+            ]
+        else:
+            content = prompt
+        messages = [{"role": "user", "content": content}]
         
-        response = await self.chat(messages, stream=False, **kwargs)
+        response = await self.chat(messages, stream=False, system=system, **kwargs)
         
         # 兼容 Claude 和 OpenAI 格式的响应
         # OpenAI 格式: {"choices": [{"message": {"content": "..."}}]}
@@ -0,0 +1,222 @@
+"""
+LLM 调用的自适应限流
+
+批量任务会在短时间内发出大量 LLM 调用。AdaptiveRateLimiter 限制同时进行的调用数，
+遇到 429（RateLimitError）时按 AIMD 策略收缩并发数、暂停所有调用直到 Retry-After 到期，
+再重试被限流的调用；连续成功后逐步恢复并发数。
+
+限流器通过 contextvar 在一次批量任务内共享：BRConnectorClient.chat 在当前上下文设置了
+限流器时经由限流器发送请求，调用方（Agent、工作流）无需修改。没有限流器时行为不变。
+流式调用在整个流的生命周期内占用一个并发名额，开始产出事件前被限流时同样暂停后重试。
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from ..deadline import remaining_time
+from ..metrics import LLM_RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_limiter: ContextVar[Optional["AdaptiveRateLimiter"]] = ContextVar("llm_rate_limiter", default=None)
+
+
+class AdaptiveRateLimiter:
+    """
+    自适应并发限制器
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_retries: int = 3,
+        base_backoff: float = 2.0,
+        max_backoff: float = 60.0,
+        increase_every: int = 5
+    ):
+        """
+        Args:
+            max_concurrency: 最大并发调用数（初始值）
+            min_concurrency: 收缩后的最小并发调用数
+            max_retries: 单个调用被限流后的最大重试次数
+            base_backoff: 没有 Retry-After 时的初始暂停时间（秒，按重试次数指数递增）
+            max_backoff: 暂停时间上限（秒）
+            increase_every: 连续成功多少次后并发数加一
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency 必须大于 0")
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = max(1, min(min_concurrency, max_concurrency))
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.increase_every = increase_every
+        self.concurrency = max_concurrency
+        self.in_flight = 0
+        self.rate_limited = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # 在第一次使用时创建，绑定到调用方所在的事件循环
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def run(self, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        在并发限制内执行调用，被限流时暂停后重试
+
+        Args:
+            func: 发送请求的协程函数（每次重试重新调用）
+
+        Returns:
+            调用结果
+
+        Raises:
+            RateLimitError: 超过最大重试次数，或剩余时间不足以等待
+        """
+        from .brconnector_client import RateLimitError
+
+        attempt = 0
+        while True:
+            await self._acquire()
+            try:
+                result = await func()
+            except RateLimitError as e:
+                if not self._retry_after_rate_limit(e, attempt):
+                    raise
+                attempt += 1
+                continue
+            finally:
+                await self._release()
+            self._on_success()
+            return result
+
+    async def stream(self, func: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        在并发限制内执行流式调用
+
+        从打开流到流结束（或调用方关闭流）一直占用一个并发名额。
+        产出第一个事件前被限流时暂停后重新打开流，之后被限流只记录并向上抛出。
+
+        Args:
+            func: 打开流的函数（每次重试重新调用）
+
+        Yields:
+            流中的事件
+
+        Raises:
+            RateLimitError: 超过最大重试次数、剩余时间不足以等待，或流已开始产出后被限流
+        """
+        from .brconnector_client import RateLimitError
+
+        attempt = 0
+        while True:
+            await self._acquire()
+            started = False
+            events = func()
+            try:
+                async for event in events:
+                    started = True
+                    yield event
+            except RateLimitError as e:
+                if started:
+                    self._on_rate_limited(e.retry_after, attempt)
+                    raise
+                if not self._retry_after_rate_limit(e, attempt):
+                    raise
+                attempt += 1
+                continue
+            finally:
+                await events.aclose()
+                await self._release()
+            self._on_success()
+            return
+
+    def _retry_after_rate_limit(self, error, attempt: int) -> bool:
+        """记录一次限流，返回是否还可以重试"""
+        delay = self._on_rate_limited(error.retry_after, attempt)
+        remaining = remaining_time()
+        if attempt >= self.max_retries or (remaining is not None and remaining <= delay):
+            return False
+        logger.warning(f"LLM 调用被限流，{delay:.1f} 秒后第 {attempt + 1} 次重试（并发数 {self.concurrency}）")
+        return True
+
+    async def _acquire(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(condition.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < self.concurrency:
+                    self.in_flight += 1
+                    return
+                await condition.wait()
+
+    async def _release(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    def _on_rate_limited(self, retry_after: Optional[float], attempt: int) -> float:
+        """收缩并发数并暂停所有调用，返回暂停时间"""
+        self.rate_limited += 1
+        LLM_RATE_LIMITED.inc()
+        delay = retry_after if retry_after is not None else self.base_backoff * (2 ** attempt)
+        delay = min(max(delay, 0.0), self.max_backoff)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+        self._successes = 0
+        return delay
+
+    def _on_success(self) -> None:
+        self._successes += 1
+        if self._successes >= self.increase_every and self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+            self._successes = 0
+
+
+@contextmanager
+def limiter_scope(limiter: AdaptiveRateLimiter) -> Iterator[AdaptiveRateLimiter]:
+    """
+    在当前上下文中设置 LLM 限流器
+
+    Args:
+        limiter: 限流器
+
+    Yields:
+        限流器
+    """
+    token = _limiter.set(limiter)
+    try:
+        yield limiter
+    finally:
+        _limiter.reset(token)
+
+
+def get_limiter() -> Optional[AdaptiveRateLimiter]:
+    """获取当前上下文的 LLM 限流器"""
+    return _limiter.get()
+
+
+async def run_limited(func: Callable[[], Awaitable[T]]) -> T:
+    """经由当前上下文的限流器执行调用，没有限流器时直接执行"""
+    limiter = _limiter.get()
+    if limiter is None:
+        return await func()
+    return await limiter.run(func)
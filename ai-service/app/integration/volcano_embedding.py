@@ -13,6 +13,9 @@ import logging
 from typing import List, Optional, Dict, Any
 import httpx
 
+from ..deadline import clamp_timeout
+from ..tracing import tracer
+
 logger = logging.getLogger(__name__)
 
 
@@ -202,15 +205,23 @@ class VolcanoEmbeddingService:
             
         Raises:
             VolcanoEmbeddingError: If request fails
+            DeadlineExceeded: If the request deadline has passed
         """
         payload = {
             "input": texts,
         }
+        timeout = clamp_timeout(self.timeout)
         
         try:
             logger.info(f"Sending embedding request for {len(texts)} texts to {url}")
             
-            response = await self.client.post(url, json=payload, headers=headers)
+            with tracer.start_span(
+                "embedding.request",
+                kind="CLIENT",
+                attributes={"embedding.batch_size": len(texts), "http.url": url}
+            ) as span:
+                response = await self.client.post(url, json=payload, headers=headers, timeout=timeout)
+                span.set_attribute("http.status_code", response.status_code)
             
             if response.status_code != 200:
                 error_text = response.text
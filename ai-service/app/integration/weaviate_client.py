@@ -13,6 +13,8 @@ from typing import List, Dict, Any, Optional
 import weaviate
 from weaviate.exceptions import WeaviateBaseError
 
+from ..tracing import tracer
+
 logger = logging.getLogger(__name__)
 
 
@@ -166,7 +168,12 @@ class WeaviateClient:
                 query = query.with_where(where_filter)
             
             # Execute query
-            result = query.do()
+            with tracer.start_span(
+                "weaviate.search",
+                kind="CLIENT",
+                attributes={"db.collection": class_name, "search.limit": limit, "search.mode": "near_vector"}
+            ):
+                result = query.do()
             
             # Extract results
             if "data" not in result or "Get" not in result["data"]:
@@ -256,7 +263,12 @@ class WeaviateClient:
                 query = query.with_where(where_filter)
             
             # Execute query
-            result = query.do()
+            with tracer.start_span(
+                "weaviate.search",
+                kind="CLIENT",
+                attributes={"db.collection": class_name, "search.limit": limit, "search.mode": "hybrid"}
+            ):
+                result = query.do()
             
             # Extract results
             if "data" not in result or "Get" not in result["data"]:
@@ -0,0 +1,944 @@
+"""
+按项目增量维护的关键词倒排索引
+
+测试用例（以及检索结果）写入进程内的倒排索引，关键词查找不必扫描全文或请求 Go 后端：
+
+- 词项切分兼顾中文：英文单词和数字、每段连续 CJK 文字的字符二元组，再加上词典分词
+  （全切分）切出的三字及以上的词（"验证码"、"优惠券"、"忘记密码"）。二元组保证任意
+  中文片段都能查到，词典词让领域术语成为独立的高区分度词项；``Segmenter.add_words`` 可追加词典
+- 倒排表是紧凑数组：每个词项两个 ``array('i')``（行号、词频），查询时转成 NumPy 向量。
+  文档只追加不修改：更新文档时写入新行、旧行标记为失效，失效行超过有效行时整体压缩重新编号
+- 支持布尔查询（``match``：全部词项 / 任一词项 / 排除词项）和 BM25 打分（``scores`` / ``search``），
+  同一查询的 BM25 分数向量按索引版本缓存
+- 每行记录文档的优先级权重、时间戳和签名（重排使用的静态特征），以及少量原始字段
+  （ID、标题、模块、关联 PRD、类型、优先级、时间），布尔查询命中后可以直接还原成候选用例，
+  也用于构建模块依赖图（见 app/impact_graph.py）
+- ``save`` / ``load`` 把索引快照写入磁盘（单个 .npz 文件）。配置了 ``SEARCH_INDEX_DIR`` 时，
+  ``get_project_index`` 首次访问项目时加载快照，服务关闭时写回有变化的索引
+
+SaveTestCaseTool / UpdateTestCaseTool 写入成功后更新项目索引，回归推荐的候选重排也会把检索到的候选写入索引。
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+from .config import settings
+from .context_packing import document_text
+from .serialization import dumps_bytes, loads
+
+logger = logging.getLogger(__name__)
+
+# 本地召回的文档的 source 字段
+INDEX_SOURCE = "keyword_index"
+
+# 快照格式版本，格式变化时旧快照被忽略
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SUFFIX = ".npz"
+
+# 失效行数超过该值且多于有效行时压缩
+_COMPACT_MIN_DEAD = 1024
+
+_ASCII_WORD = re.compile(r"[a-z0-9_]{2,}")
+# 连续的 CJK 文字（假名、汉字、谚文，不含全角标点）
+_CJK_RUN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]+")
+
+# 内置词典：测试和常见业务领域中二元组切分不出的三字及以上的词
+DEFAULT_WORDS = (
+    "验证码", "手机号", "用户名", "身份证", "银行卡", "二维码", "购物车", "优惠券", "收货地址",
+    "订单号", "退款单", "发票抬头", "支付宝", "微信支付", "第三方", "第三方登录", "单点登录",
+    "忘记密码", "找回密码", "修改密码", "重置密码", "密码强度", "短信验证", "邮箱验证", "实名认证",
+    "登录态", "会话超时", "自动登录", "记住密码", "多设备", "管理员", "黑名单", "白名单",
+    "权限管理", "角色权限", "数据权限", "操作日志", "审计日志", "会员等级", "自动续费", "积分兑换",
+    "排行榜", "消息推送", "站内信", "通知中心", "个人中心", "首页推荐", "搜索框", "输入框",
+    "下拉框", "复选框", "单选框", "弹出框", "二次确认", "文件上传", "批量导入", "批量导出",
+    "导入导出", "断点续传", "数据库", "缓存失效", "接口超时", "超时重试", "网络异常", "弱网环境",
+    "并发请求", "幂等性", "兼容性", "稳定性", "安全性", "可用性", "性能测试", "压力测试",
+    "回归测试", "冒烟测试", "集成测试", "单元测试", "接口测试", "边界值", "等价类", "异常处理",
+    "错误提示", "空数据", "特殊字符", "最大长度", "最小长度", "必填项", "灰度发布", "国际化",
+    "多语言", "时区转换", "限流熔断", "库存扣减", "秒杀活动", "拼团活动", "满减活动",
+)
+
+
+class Segmenter:
+    """
+    词典分词器（全切分）
+
+    切出文本中出现的所有词典词（含相互重叠的词），保证查询中的词典词在包含该查询的文档中同样被切出；
+    正向最大匹配在"短信验证码"里切出"短信验证"后就会漏掉"验证码"。
+    只切出三字及以上的词：两字词已经被字符二元组覆盖，重复计入会抬高词频。
+    """
+
+    def __init__(self, words: Iterable[str] = DEFAULT_WORDS):
+        """
+        初始化分词器
+
+        Args:
+            words: 词典
+        """
+        self._words: Set[str] = set()
+        self._prefixes: Set[str] = set()
+        self._max_length = 0
+        self.add_words(words)
+
+    def add_words(self, words: Iterable[str]) -> None:
+        """
+        追加词典词（已写入索引的文档不会重新切分）
+
+        Args:
+            words: 新词，少于三个字的词被忽略
+        """
+        for word in words:
+            word = word.strip().lower()
+            if len(word) < 3:
+                continue
+            self._words.add(word)
+            self._prefixes.add(word[:2])
+            self._max_length = max(self._max_length, len(word))
+
+    def cut(self, run: str) -> List[str]:
+        """
+        切出一段连续 CJK 文字中的词典词
+
+        Args:
+            run: 连续的 CJK 文字（小写）
+
+        Returns:
+            出现的词典词，按起始位置和长度排序
+        """
+        words = []
+        end = len(run)
+        for position in range(end - 2):
+            # 先用两字前缀过滤，绝大多数位置只做一次集合查找
+            if run[position:position + 2] not in self._prefixes:
+                continue
+            for length in range(3, min(self._max_length, end - position) + 1):
+                word = run[position:position + length]
+                if word in self._words:
+                    words.append(word)
+        return words
+
+
+default_segmenter = Segmenter()
+
+
+def tokenize(text: str, segmenter: Optional[Segmenter] = None) -> List[str]:
+    """
+    切分索引词项：英文单词和数字（至少 2 个字符）、CJK 字符二元组和词典词
+
+    Args:
+        text: 文本
+        segmenter: 词典分词器（默认使用内置词典）
+
+    Returns:
+        词项列表（保留重复，用于统计词频）
+    """
+    segmenter = segmenter or default_segmenter
+    lowered = text.lower()
+    terms = _ASCII_WORD.findall(lowered)
+    for run in _CJK_RUN.findall(lowered):
+        if len(run) == 1:
+            terms.append(run)
+            continue
+        terms += [run[i:i + 2] for i in range(len(run) - 1)]
+        terms += segmenter.cut(run)
+    return terms
+
+
+def _int_array(typecode: str, values: np.ndarray) -> array:
+    """把 NumPy 向量转换为紧凑数组"""
+    return array(typecode, values.tobytes())
+
+
+def _restore_id(value: Any) -> Hashable:
+    """快照中的文档 ID：JSON 数组还原为元组"""
+    return tuple(value) if isinstance(value, list) else value
+
+
+class KeywordIndex:
+    """
+    关键词倒排索引
+
+    每个文档占一行，行号只增不减；更新文档时写入新行并把旧行标记为失效，文档频率和
+    平均长度只统计有效行。每次修改递增 version，查询缓存随之失效。
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        cache_size: int = 128,
+        segmenter: Optional[Segmenter] = None
+    ):
+        """
+        初始化索引
+
+        Args:
+            k1: BM25 词频饱和参数
+            b: BM25 文档长度归一化参数
+            cache_size: 缓存的查询数
+            segmenter: 词典分词器（默认使用内置词典）
+        """
+        self.k1 = k1
+        self.b = b
+        self.segmenter = segmenter or default_segmenter
+        self.version = 0
+        self.saved_version: Optional[int] = None
+        self._rows: Dict[Hashable, int] = {}
+        self._ids: List[Optional[Hashable]] = []
+        self._stored: List[Optional[Dict[str, Any]]] = []
+        self._live = bytearray()
+        self._lengths = array("i")
+        self._priorities = array("d")
+        self._timestamps = array("d")
+        self._signatures = array("q")
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._posting_arrays: Dict[str, Tuple[int, np.ndarray, np.ndarray]] = {}
+        self._row_arrays: Optional[Dict[str, np.ndarray]] = None
+        self._total_length = 0
+        self._dead = 0
+        self._cache: "OrderedDict[str, Tuple[int, np.ndarray]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._rows
+
+    def tokenize(self, text: str) -> List[str]:
+        """按索引的分词器切分词项"""
+        return tokenize(text or "", self.segmenter)
+
+    def add(
+        self,
+        doc_id: Hashable,
+        text: str,
+        priority: float = 0.0,
+        timestamp: Optional[float] = None,
+        signature: int = 0,
+        stored: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        添加或替换文档
+
+        Args:
+            doc_id: 文档 ID
+            text: 文档文本
+            priority: 优先级权重（见 priority_weight）
+            timestamp: 更新时间的 Unix 时间戳
+            signature: 文档签名（见 document_signature），用于判断候选是否已变化
+            stored: 随索引保存的原始字段（需要能编码为 JSON）
+        """
+        terms = Counter(self.tokenize(text))
+        length = sum(terms.values())
+        with self._lock:
+            old = self._rows.get(doc_id)
+            if old is not None:
+                self._kill(old)
+            row = len(self._ids)
+            self._rows[doc_id] = row
+            self._ids.append(doc_id)
+            self._stored.append(dict(stored) if stored else None)
+            self._live.append(1)
+            self._lengths.append(length)
+            self._priorities.append(float(priority))
+            self._timestamps.append(math.nan if timestamp is None else float(timestamp))
+            self._signatures.append(signature)
+            self._total_length += length
+            all_postings = self._postings
+            for term, tf in terms.items():
+                postings = all_postings.get(term)
+                if postings is None:
+                    postings = all_postings[term] = (array("i"), array("i"))
+                postings[0].append(row)
+                postings[1].append(tf)
+            if self._posting_arrays:
+                for term in terms:
+                    self._posting_arrays.pop(term, None)
+            self._touch()
+            if self._dead > _COMPACT_MIN_DEAD and self._dead > len(self._rows):
+                self._compact()
+
+    def remove(self, doc_id: Hashable) -> bool:
+        """
+        删除文档
+
+        Args:
+            doc_id: 文档 ID
+
+        Returns:
+            文档是否存在
+        """
+        with self._lock:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                return False
+            self._kill(row)
+            self._touch()
+            return True
+
+    def document(self, doc_id: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        文档随索引保存的原始字段
+
+        Args:
+            doc_id: 文档 ID
+
+        Returns:
+            原始字段的副本，文档不存在时返回 None
+        """
+        row = self._rows.get(doc_id)
+        if row is None:
+            return None
+        return dict(self._stored[row] or {})
+
+    def stored_documents(self) -> List[Dict[str, Any]]:
+        """
+        所有有效文档随索引保存的原始字段（只读，不要修改返回的字典）
+
+        Returns:
+            原始字段列表，按写入顺序
+        """
+        with self._lock:
+            return [
+                stored for stored, live in zip(self._stored, self._live)
+                if live and stored is not None
+            ]
+
+    def _kill(self, row: int) -> None:
+        """把一行标记为失效（调用方持有锁，并负责从 _rows 中移除）"""
+        self._live[row] = 0
+        self._total_length -= self._lengths[row]
+        self._ids[row] = None
+        self._stored[row] = None
+        self._dead += 1
+
+    def _touch(self) -> None:
+        self.version += 1
+        self._row_arrays = None
+
+    def _compact(self) -> None:
+        """丢弃失效行并重新编号（调用方持有锁）"""
+        live = np.frombuffer(bytes(self._live), dtype=np.bool_)
+        mapping = np.cumsum(live, dtype=np.int64) - 1
+        postings = {}
+        for term, (rows, tfs) in self._postings.items():
+            rows = np.frombuffer(rows, dtype=np.intc)
+            keep = live[rows]
+            if keep.any():
+                postings[term] = (
+                    _int_array("i", mapping[rows[keep]].astype(np.intc)),
+                    _int_array("i", np.frombuffer(tfs, dtype=np.intc)[keep]),
+                )
+        self._postings = postings
+        self._posting_arrays.clear()
+        kept = np.flatnonzero(live)
+        self._ids = [self._ids[row] for row in kept.tolist()]
+        self._stored = [self._stored[row] for row in kept.tolist()]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._live = bytearray(b"\x01" * len(self._ids))
+        self._lengths = _int_array("i", np.frombuffer(self._lengths, dtype=np.intc)[kept])
+        self._priorities = _int_array("d", np.frombuffer(self._priorities, dtype=np.float64)[kept])
+        self._timestamps = _int_array("d", np.frombuffer(self._timestamps, dtype=np.float64)[kept])
+        self._signatures = _int_array("q", np.frombuffer(self._signatures, dtype=np.int64)[kept])
+        self._dead = 0
+        self._touch()
+
+    def compact(self) -> None:
+        """丢弃失效行并重新编号"""
+        with self._lock:
+            if self._dead:
+                self._compact()
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        """按行的向量（调用方持有锁）"""
+        if self._row_arrays is None:
+            # 复制一份：数组在导出缓冲区期间不能追加
+            self._row_arrays = {
+                "live": np.frombuffer(bytes(self._live), dtype=np.bool_),
+                "lengths": np.array(self._lengths, dtype=np.float64),
+                "priorities": np.array(self._priorities, dtype=np.float64),
+                "timestamps": np.array(self._timestamps, dtype=np.float64),
+                "signatures": np.array(self._signatures, dtype=np.int64),
+            }
+        return self._row_arrays
+
+    def _term_postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """词项的有效行号（升序）和词频（调用方持有锁）"""
+        cached = self._posting_arrays.get(term)
+        # 失效行数只增不减（压缩时清空缓存），失效行数不变说明缓存的有效行仍然准确
+        if cached is None or cached[0] != self._dead:
+            raw = self._postings.get(term)
+            if raw is None:
+                return None
+            rows = np.array(raw[0], dtype=np.int64)
+            tfs = np.array(raw[1], dtype=np.float64)
+            if self._dead:
+                keep = self._arrays()["live"][rows]
+                rows, tfs = rows[keep], tfs[keep]
+            cached = self._posting_arrays[term] = (self._dead, rows, tfs)
+        return cached[1:] if len(cached[1]) else None
+
+    def rows(self, doc_ids: Sequence[Hashable]) -> np.ndarray:
+        """
+        文档 ID 对应的行号
+
+        Args:
+            doc_ids: 文档 ID
+
+        Returns:
+            行号向量，不在索引中的文档为 -1
+        """
+        get = self._rows.get
+        return np.fromiter((get(doc_id, -1) for doc_id in doc_ids), dtype=np.int64, count=len(doc_ids))
+
+    def static_features(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        指定行的优先级权重、时间戳和签名
+
+        Args:
+            rows: 行号向量（必须都在索引中）
+
+        Returns:
+            (优先级权重, 时间戳, 签名)，缺失的时间戳为 NaN
+        """
+        with self._lock:
+            arrays = self._arrays()
+        return arrays["priorities"][rows], arrays["timestamps"][rows], arrays["signatures"][rows]
+
+    def _match_rows(self, terms: Sequence[str], mode: str) -> np.ndarray:
+        """布尔查询命中的行号（调用方持有锁）"""
+        postings = [self._term_postings(term) for term in terms]
+        if mode == "and":
+            if not postings or any(posting is None for posting in postings):
+                return np.empty(0, dtype=np.int64)
+            # 从最短的倒排表开始求交集
+            postings.sort(key=lambda posting: len(posting[0]))
+            rows = postings[0][0]
+            for other, _ in postings[1:]:
+                if not len(rows):
+                    break
+                rows = np.intersect1d(rows, other, assume_unique=True)
+            return rows
+        if mode == "or":
+            present = [posting[0] for posting in postings if posting is not None]
+            if not present:
+                return np.empty(0, dtype=np.int64)
+            return present[0] if len(present) == 1 else np.unique(np.concatenate(present))
+        raise ValueError(f"不支持的布尔查询模式: {mode}")
+
+    def match(self, query: str, mode: str = "and", exclude: Optional[str] = None) -> List[Hashable]:
+        """
+        布尔查询
+
+        Args:
+            query: 查询文本，切分后的每个词项是一个条件
+            mode: "and" 要求包含全部词项，"or" 包含任一词项即可
+            exclude: 排除包含其中任一词项的文档
+
+        Returns:
+            命中的文档 ID（按写入顺序）；查询切分不出词项时返回空列表
+
+        Raises:
+            ValueError: 如果 mode 不是 "and" 或 "or"
+        """
+        with self._lock:
+            ids = self._ids
+            return [ids[row] for row in self._boolean_rows(query, mode, exclude).tolist()]
+
+    def _boolean_rows(self, query: str, mode: str, exclude: Optional[str]) -> np.ndarray:
+        """布尔查询（含排除词项）命中的行号（调用方持有锁）"""
+        rows = self._match_rows(sorted(set(self.tokenize(query))), mode)
+        if exclude and len(rows):
+            excluded = self._match_rows(sorted(set(self.tokenize(exclude))), "or")
+            rows = np.setdiff1d(rows, excluded, assume_unique=True)
+        return rows
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        计算查询对索引中每一行的 BM25 分数
+
+        Args:
+            query: 查询文本
+
+        Returns:
+            长度为行数的分数向量（失效的行为 0）
+        """
+        with self._lock:
+            return self._scores(query)
+
+    def _scores(self, query: str) -> np.ndarray:
+        """计算或从缓存读取 BM25 分数向量（调用方持有锁）"""
+        cached = self._cache.get(query)
+        if cached is not None and cached[0] == self.version:
+            self._cache.move_to_end(query)
+            return cached[1]
+
+        scores = np.zeros(len(self._ids), dtype=np.float64)
+        documents = len(self._rows)
+        if documents and self._total_length:
+            lengths = self._arrays()["lengths"]
+            norm = self.k1 * (1 - self.b + self.b * lengths / (self._total_length / documents))
+            for term in set(self.tokenize(query)):
+                postings = self._term_postings(term)
+                if postings is None:
+                    continue
+                term_rows, tfs = postings
+                df = len(term_rows)
+                idf = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+                scores[term_rows] += idf * tfs * (self.k1 + 1) / (tfs + norm[term_rows])
+
+        self._cache[query] = (self.version, scores)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return scores
+
+    def score_documents(self, query: str, doc_ids: Sequence[Hashable]) -> np.ndarray:
+        """
+        计算查询对指定文档的 BM25 分数
+
+        Args:
+            query: 查询文本
+            doc_ids: 文档 ID（不在索引中的文档得 0 分）
+
+        Returns:
+            与 doc_ids 对齐的分数向量
+        """
+        scores = self.scores(query)
+        rows = self.rows(doc_ids)
+        result = np.zeros(len(doc_ids), dtype=np.float64)
+        known = rows >= 0
+        result[known] = scores[rows[known]]
+        return result
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        mode: str = "or",
+        exclude: Optional[str] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        布尔查询过滤后按 BM25 分数排序
+
+        Args:
+            query: 查询文本
+            limit: 最多返回的文档数
+            mode: 布尔查询模式（见 match）
+            exclude: 排除包含其中任一词项的文档
+
+        Returns:
+            (文档 ID, BM25 分数)，按分数降序，分数相同的按写入顺序
+        """
+        if limit <= 0:
+            return []
+        with self._lock:
+            rows = self._boolean_rows(query, mode, exclude)
+            if not len(rows):
+                return []
+            scores = self._scores(query)[rows]
+            order = np.argsort(-scores, kind="stable")[:limit]
+            ids = self._ids
+            return [(ids[row], score) for row, score in zip(rows[order].tolist(), scores[order].tolist())]
+
+    def save(self, path: str) -> None:
+        """
+        把索引快照写入磁盘（先写临时文件再替换，写入过程中崩溃不会留下损坏的快照）
+
+        Args:
+            path: 快照文件路径（.npz）
+        """
+        with self._lock:
+            if self._dead:
+                self._compact()
+            terms = sorted(self._postings)
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            for i, term in enumerate(terms):
+                offsets[i + 1] = offsets[i] + len(self._postings[term][0])
+            rows = np.empty(int(offsets[-1]), dtype=np.intc)
+            tfs = np.empty(int(offsets[-1]), dtype=np.intc)
+            for i, term in enumerate(terms):
+                term_rows, term_tfs = self._postings[term]
+                rows[offsets[i]:offsets[i + 1]] = np.frombuffer(term_rows, dtype=np.intc)
+                tfs[offsets[i]:offsets[i + 1]] = np.frombuffer(term_tfs, dtype=np.intc)
+            meta = {
+                "format": SNAPSHOT_FORMAT,
+                "k1": self.k1,
+                "b": self.b,
+                "ids": self._ids,
+                "stored": self._stored,
+                "terms": terms,
+            }
+            arrays = {
+                "meta": np.frombuffer(dumps_bytes(meta), dtype=np.uint8),
+                "offsets": offsets,
+                "rows": rows,
+                "tfs": tfs,
+                "lengths": np.array(self._lengths, dtype=np.intc),
+                "priorities": np.array(self._priorities, dtype=np.float64),
+                "timestamps": np.array(self._timestamps, dtype=np.float64),
+                "signatures": np.array(self._signatures, dtype=np.int64),
+            }
+            version = self.version
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(temporary, path)
+        self.saved_version = version
+
+    @classmethod
+    def load(cls, path: str, cache_size: int = 128, segmenter: Optional[Segmenter] = None) -> "KeywordIndex":
+        """
+        从快照加载索引
+
+        Args:
+            path: 快照文件路径
+            cache_size: 缓存的查询数
+            segmenter: 词典分词器（应与写入快照时一致）
+
+        Returns:
+            索引
+
+        Raises:
+            OSError: 如果文件无法读取
+            ValueError: 如果文件不是合法的快照或格式版本不匹配
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = loads(data["meta"].tobytes())
+                if meta.get("format") != SNAPSHOT_FORMAT:
+                    raise ValueError(f"不支持的快照格式: {meta.get('format')}")
+                offsets = data["offsets"]
+                rows = data["rows"].astype(np.intc, copy=False)
+                tfs = data["tfs"].astype(np.intc, copy=False)
+                lengths = data["lengths"].astype(np.intc, copy=False)
+                priorities = data["priorities"]
+                timestamps = data["timestamps"]
+                signatures = data["signatures"]
+        except KeyError as e:
+            raise ValueError(f"快照缺少字段: {e}") from e
+
+        index = cls(k1=meta["k1"], b=meta["b"], cache_size=cache_size, segmenter=segmenter)
+        index._ids = [_restore_id(doc_id) for doc_id in meta["ids"]]
+        index._stored = meta["stored"]
+        index._rows = {doc_id: row for row, doc_id in enumerate(index._ids)}
+        index._live = bytearray(b"\x01" * len(index._ids))
+        index._lengths = _int_array("i", lengths)
+        index._priorities = _int_array("d", priorities.astype(np.float64, copy=False))
+        index._timestamps = _int_array("d", timestamps.astype(np.float64, copy=False))
+        index._signatures = _int_array("q", signatures.astype(np.int64, copy=False))
+        index._total_length = int(lengths.sum())
+        bounds = offsets.tolist()
+        index._postings = {
+            term: (_int_array("i", rows[start:end]), _int_array("i", tfs[start:end]))
+            for term, start, end in zip(meta["terms"], bounds, bounds[1:])
+        }
+        index.saved_version = index.version
+        return index
+
+
+# 优先级权重（0-4），未知优先级为 0
+PRIORITY_WEIGHTS = {
+    "p0": 4,
+    "p1": 3,
+    "high": 3,
+    "高": 3,
+    "p2": 2,
+    "medium": 2,
+    "中": 2,
+    "p3": 1,
+    "low": 1,
+    "低": 1,
+    "p4": 0,
+}
+
+
+def priority_weight(value: Any) -> int:
+    """
+    优先级权重（P0=4 ... P3=1，兼容 high/medium/low 和中文写法）
+
+    Args:
+        value: 原始优先级
+
+    Returns:
+        权重，无法识别时为 0
+    """
+    if value is None:
+        return 0
+    return PRIORITY_WEIGHTS.get(str(value).lower().strip(), 0)
+
+
+def _field(document: Dict[str, Any], key: str) -> Any:
+    """读取检索结果或测试用例的字段（检索结果的部分字段放在 metadata 中）"""
+    value = document.get(key)
+    if value is None:
+        value = (document.get("metadata") or {}).get(key)
+    return value
+
+
+def case_priority(case: Dict[str, Any]) -> Any:
+    """读取检索结果或测试用例的优先级"""
+    return _field(case, "priority")
+
+
+def case_module(case: Dict[str, Any]) -> Any:
+    """读取检索结果或测试用例的模块名称"""
+    module = _field(case, "module")
+    return module if module is not None else _field(case, "module_name")
+
+
+def case_prd(case: Dict[str, Any]) -> Any:
+    """读取检索结果或测试用例关联的 PRD ID"""
+    return _field(case, "prd_id")
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """把 ISO 8601 字符串、datetime 或 Unix 时间戳转换为 Unix 时间戳"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        try:
+            moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def case_timestamp(case: Dict[str, Any]) -> Optional[float]:
+    """读取检索结果或测试用例的更新时间（没有时使用创建时间）"""
+    for key in ("updated_at", "created_at"):
+        moment = parse_timestamp(_field(case, key))
+        if moment is not None:
+            return moment
+    return None
+
+
+def document_key(document: Dict[str, Any]) -> Hashable:
+    """索引中的文档 ID：有 id 时使用 id，否则使用标题"""
+    document_id = document.get("id")
+    return document_id if document_id is not None else ("title", document.get("title"))
+
+
+def document_signature(document: Dict[str, Any]) -> int:
+    """
+    文档签名：标题、前置条件、正文、模块、优先级和时间任一变化时签名随之变化
+
+    结构化用例的步骤只计入步骤数，逐个序列化步骤的开销比重排本身还大；
+    步骤内容的修改会更新 updated_at。签名保存在快照中，因此使用跨进程稳定的 blake2b，
+    而不是按进程随机化的内置 hash()。
+    """
+    # 重排时每个候选都要计算签名，这里直接读字段，不经过 _field
+    metadata = document.get("metadata") or {}
+    get, meta = document.get, metadata.get
+    steps = get("steps")
+    fields = (
+        get("title"),
+        get("preconditions"),
+        get("content"),
+        len(steps) if isinstance(steps, list) else None,
+        get("expected_result"),
+        get("module") or meta("module") or get("module_name") or meta("module_name"),
+        get("priority") or meta("priority"),
+        get("updated_at") or meta("updated_at") or get("created_at") or meta("created_at"),
+    )
+    digest = hashlib.blake2b(repr(fields).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def index_text(document: Dict[str, Any]) -> str:
+    """写入索引的文本：标题、模块名称、前置条件和正文（覆盖率检查扫描同样的文本）"""
+    return (
+        f"{document.get('title') or ''}\n{case_module(document) or ''}\n"
+        f"{document.get('preconditions') or ''}\n{document_text(document)}"
+    )
+
+
+def stored_fields(document: Dict[str, Any]) -> Dict[str, Any]:
+    """随索引保存的原始字段：足以在本地召回后还原成候选用例"""
+    fields = {"id": document.get("id"), "title": document.get("title")}
+    for key, value in (
+        ("module", case_module(document)),
+        ("prd_id", case_prd(document)),
+        ("type", _field(document, "type")),
+        ("priority", case_priority(document)),
+        ("created_at", _field(document, "created_at")),
+        ("updated_at", _field(document, "updated_at")),
+    ):
+        if value is not None:
+            fields[key] = value if isinstance(value, (str, int, float)) else str(value)
+    return fields
+
+
+def index_documents(index: KeywordIndex, documents: Iterable[Dict[str, Any]]) -> int:
+    """
+    把文档批量写入索引（已存在的文档会被替换）
+
+    Args:
+        index: 目标索引
+        documents: 文档列表
+
+    Returns:
+        写入的文档数
+    """
+    count = 0
+    for document in documents:
+        index.add(
+            document_key(document),
+            index_text(document),
+            priority=priority_weight(case_priority(document)),
+            timestamp=case_timestamp(document),
+            signature=document_signature(document),
+            stored=stored_fields(document)
+        )
+        count += 1
+    return count
+
+
+def ensure_indexed(index: KeywordIndex, documents: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    把不在索引中或已变化（签名不同）的文档写入索引，未变化的文档不重复切分
+
+    Args:
+        index: 目标索引
+        documents: 文档列表
+
+    Returns:
+        与 documents 对齐的行号向量
+    """
+    keys = [document_key(document) for document in documents]
+    signatures = np.fromiter(map(document_signature, documents), dtype=np.int64, count=len(documents))
+    rows = index.rows(keys)
+    known = rows >= 0
+    stale = ~known
+    stale[known] = index.static_features(rows[known])[2] != signatures[known]
+    # 从索引召回的文档只带原始字段，不能回写覆盖索引中的全文
+    stale &= ~(known & np.fromiter(
+        (document.get("source") == INDEX_SOURCE for document in documents), dtype=np.bool_, count=len(documents)
+    ))
+    if stale.any():
+        index_documents(index, (documents[i] for i in np.flatnonzero(stale).tolist()))
+        rows = index.rows(keys)
+    return rows
+
+
+def recall_documents(
+    index: KeywordIndex,
+    query: str,
+    limit: int = 20,
+    mode: str = "and"
+) -> List[Dict[str, Any]]:
+    """
+    本地召回：布尔查询过滤、BM25 排序，返回随索引保存的原始字段
+
+    Args:
+        index: 关键词索引
+        query: 查询文本
+        limit: 最多召回的文档数
+        mode: 布尔查询模式（见 KeywordIndex.match）
+
+    Returns:
+        召回的文档（带 source=keyword_index 和 keyword_score），没有 ID 的文档不参与召回
+    """
+    documents = []
+    for doc_id, score in index.search(query, limit=limit, mode=mode):
+        if isinstance(doc_id, tuple):
+            continue
+        document = index.document(doc_id)
+        if document is not None:
+            documents.append({**document, "source": INDEX_SOURCE, "keyword_score": round(score, 4)})
+    return documents
+
+
+# 按项目缓存的索引
+_project_indexes: Dict[Hashable, KeywordIndex] = {}
+_project_indexes_lock = threading.Lock()
+
+
+def snapshot_path(directory: str, project_id: Hashable) -> str:
+    """项目索引快照的文件路径"""
+    return os.path.join(directory, quote(str(project_id), safe="") + SNAPSHOT_SUFFIX)
+
+
+def _load_snapshot(project_id: Hashable) -> Optional[KeywordIndex]:
+    """加载项目的索引快照，未配置快照目录、快照不存在或已损坏时返回 None"""
+    if not settings.SEARCH_INDEX_DIR:
+        return None
+    path = snapshot_path(settings.SEARCH_INDEX_DIR, project_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        index = KeywordIndex.load(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"加载索引快照失败，重新建立索引: {path}: {e}")
+        return None
+    logger.info(f"已加载索引快照: {path}（{len(index)} 个文档）")
+    return index
+
+
+def get_project_index(project_id: Hashable) -> KeywordIndex:
+    """
+    获取项目的关键词索引（不存在时从快照加载或新建）
+
+    Args:
+        project_id: 项目 ID
+
+    Returns:
+        项目索引
+    """
+    with _project_indexes_lock:
+        index = _project_indexes.get(project_id)
+        if index is None:
+            index = _project_indexes[project_id] = _load_snapshot(project_id) or KeywordIndex()
+        return index
+
+
+def save_project_indexes(directory: Optional[str] = None) -> int:
+    """
+    把自上次保存以来有变化的项目索引写入快照
+
+    Args:
+        directory: 快照目录（默认 SEARCH_INDEX_DIR，未配置时不保存）
+
+    Returns:
+        写入的快照数
+    """
+    directory = directory or settings.SEARCH_INDEX_DIR
+    if not directory:
+        return 0
+    with _project_indexes_lock:
+        indexes = list(_project_indexes.items())
+    saved = 0
+    for project_id, index in indexes:
+        if index.saved_version == index.version:
+            continue
+        index.save(snapshot_path(directory, project_id))
+        saved += 1
+    return saved
+
+
+def reset_project_indexes() -> None:
+    """清空所有项目索引（用于测试）"""
+    with _project_indexes_lock:
+        _project_indexes.clear()
@@ -0,0 +1,51 @@
+"""
+包属性的延迟导入
+
+包的 __init__ 直接导入所有子模块时，导入任意一个子模块都会连带加载整个包
+（以及 weaviate 等重量级依赖），拖慢 worker 冷启动和测试收集，还容易形成循环导入。
+本模块基于 PEP 562 的模块级 __getattr__ / __dir__，让包在首次访问某个导出名时
+才导入对应的子模块，`from app.tool import SearchPRDTool` 这类写法保持不变。
+
+用法（在包的 __init__.py 中）::
+
+    __getattr__, __dir__ = lazy_exports(__name__, {
+        "SearchPRDTool": ".retrieval_tools",
+    })
+"""
+
+import importlib
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_exports(
+    package: str,
+    exports: Dict[str, str],
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    为包生成延迟导入的 __getattr__ 和 __dir__。
+
+    首次访问导出名时导入子模块，并把值缓存到包的全局命名空间，
+    之后的访问不再经过 __getattr__。
+
+    Args:
+        package: 包名（传入 __name__）
+        exports: 导出名 -> 所在子模块（相对路径如 ".base"，或绝对模块名）
+
+    Returns:
+        (__getattr__, __dir__)
+    """
+    module = importlib.import_module(package)
+    namespace = vars(module)
+
+    def __getattr__(name: str) -> Any:
+        target = exports.get(name)
+        if target is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(target, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,374 @@
+"""
+运行指标
+
+轻量级的计数器和直方图，以 Prometheus 文本格式导出（见 main.py 中的 /metrics）。
+
+不依赖第三方库：每次记录只做一次字典查找、一次二分查找和几次整数加法，
+可以在生产环境中常开。指标在进程内聚合，多进程部署时由采集端按实例汇总。
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 默认耗时分桶（秒），覆盖从本地解析到 LLM 长生成的范围
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+
+def _format_value(value: float) -> str:
+    """格式化样本值"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    """转义标签值"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """格式化标签集合"""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """指标基类"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        初始化指标
+
+        Args:
+            name: 指标名称
+            documentation: 指标说明
+            labelnames: 标签名称
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """
+        将标签转换为序列键
+
+        Raises:
+            ValueError: 标签与声明不一致
+        """
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError as e:
+            raise ValueError(f"指标 {self.name} 缺少标签 {e}")
+
+    def render(self) -> List[str]:
+        """以 Prometheus 文本格式输出"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """
+        增加计数
+
+        Args:
+            amount: 增量（不能为负数）
+            **labels: 标签值
+        """
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """获取当前计数"""
+        return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class _HistogramSeries:
+    """直方图的单个标签序列（分桶计数不累计，输出时再累加）"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * bucket_count
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        bounds = sorted(float(b) for b in buckets if b != float("inf"))
+        self.buckets: Tuple[float, ...] = tuple(bounds) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        记录一次观测值
+
+        Args:
+            value: 观测值
+            **labels: 标签值
+        """
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets))
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """记录代码块的耗时（秒），异常同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels: str) -> Optional[Dict[str, float]]:
+        """
+        获取某个标签序列的汇总
+
+        Returns:
+            包含 count 和 sum 的字典，序列不存在时返回 None
+        """
+        series = self._series.get(self._key(labels))
+        if series is None:
+            return None
+        with self._lock:
+            return {"count": series.count, "sum": series.sum}
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, list(series.counts), series.sum, series.count)
+                for key, series in self._series.items()
+            )
+
+        lines = []
+        bucket_labels = self.labelnames + ("le",)
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(bucket_labels, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"指标重复注册: {metric.name}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """注册（或获取已注册的）计数器"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """注册（或获取已注册的）直方图"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式导出所有指标"""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        """清空所有指标的数据（保留注册）"""
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+# 全局注册表
+REGISTRY = MetricsRegistry()
+
+# 工具
+TOOL_DURATION = REGISTRY.histogram(
+    "ai_tool_execute_duration_seconds",
+    "工具 execute 调用耗时",
+    ["tool", "status"]
+)
+PARSE_DURATION = REGISTRY.histogram(
+    "ai_llm_parse_duration_seconds",
+    "解析 LLM 响应的耗时",
+    ["tool"]
+)
+
+# CPU 工作池（见 app.executor）
+EXECUTOR_QUEUE_WAIT = REGISTRY.histogram(
+    "ai_executor_queue_wait_seconds",
+    "提交到工作池前等待空位的耗时",
+    ["pool"]
+)
+EXECUTOR_TASKS = REGISTRY.counter(
+    "ai_executor_tasks",
+    "工作池执行的任务数",
+    ["pool", "status"]
+)
+EXECUTOR_REJECTED = REGISTRY.counter(
+    "ai_executor_rejected",
+    "因工作池饱和被拒绝的任务数",
+    ["pool"]
+)
+
+# API 准入控制（见 app.api.admission）
+ADMISSION_QUEUE_WAIT = REGISTRY.histogram(
+    "ai_admission_queue_wait_seconds",
+    "请求在准入队列中等待的耗时",
+    ["lane"]
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "ai_admission_rejected",
+    "未被准入的请求数",
+    ["lane", "reason"]
+)
+
+# 后台任务（见 app.api.jobs）
+JOBS = REGISTRY.counter(
+    "ai_jobs",
+    "后台任务数（按结束状态，rejected 为队列已满被拒绝）",
+    ["status"]
+)
+JOB_QUEUE_WAIT = REGISTRY.histogram(
+    "ai_job_queue_wait_seconds",
+    "后台任务从提交到开始执行的耗时"
+)
+JOB_DURATION = REGISTRY.histogram(
+    "ai_job_duration_seconds",
+    "后台任务的执行耗时",
+    ["status"]
+)
+
+# LLM 调用
+LLM_REQUEST_DURATION = REGISTRY.histogram(
+    "ai_llm_request_duration_seconds",
+    "单次 LLM 请求的总耗时（流式请求为整个流的耗时）",
+    ["model", "stream", "status"]
+)
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "ai_llm_time_to_first_token_seconds",
+    "流式 LLM 请求从发送到收到首个内容块的耗时",
+    ["model"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "ai_llm_tokens",
+    "LLM 消耗的 token 数（type: input / output / cache_read / cache_write）",
+    ["model", "type"]
+)
+LLM_RETRIES = REGISTRY.counter(
+    "ai_llm_retries",
+    "LLM 请求的重试次数",
+    ["model"]
+)
+LLM_RATE_LIMITED = REGISTRY.counter(
+    "ai_llm_rate_limited",
+    "经由限流器发送的 LLM 请求被限流（429）的次数"
+)
+
+# 工作流和 Agent
+STAGE_DURATION = REGISTRY.histogram(
+    "ai_workflow_stage_duration_seconds",
+    "工作流阶段耗时（含重试）",
+    ["workflow", "stage", "status"]
+)
+AGENT_STEP_DURATION = REGISTRY.histogram(
+    "ai_agent_step_duration_seconds",
+    "TestEngineerAgent 各处理步骤的耗时",
+    ["step"]
+)
+AGENT_REQUEST_DURATION = REGISTRY.histogram(
+    "ai_agent_request_duration_seconds",
+    "TestEngineerAgent 处理请求的总耗时",
+    ["task_type", "status"]
+)
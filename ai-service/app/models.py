@@ -0,0 +1,112 @@
+"""
+核心数据模型的公共部分
+
+测试用例、分析结果、审查结果和对话消息在一次生成中会有成千上万个实例，并在各阶段之间反复转换为字典：
+- 模型使用 ``@dataclass(slots=True)``，实例不带 ``__dict__``，单个实例的内存占用更小、属性访问更快
+- ``SlottedModel.to_dict`` 返回字段的浅层视图：列表、字典等容器与实例共享，不像 ``asdict`` 那样递归深拷贝。
+  返回的字典只用于序列化和只读访问，需要修改时由调用方自行复制
+- 优先级和用例类型使用 ``StrEnum``。枚举成员是单例，大量用例共享同一个对象，
+  并且与对应的字符串相等、哈希相同，JSON 序列化结果也是字符串本身
+"""
+
+import sys
+from enum import StrEnum
+from typing import Any, Dict, Optional, Union
+
+
+class SlottedModel:
+    """slots 数据类的基类，提供不复制容器的 to_dict"""
+
+    __slots__ = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（字段的浅层视图，容器与实例共享）"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Priority(StrEnum):
+    """测试用例优先级"""
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+    @classmethod
+    def parse(cls, value: Any) -> Optional["Priority"]:
+        """
+        解析优先级（兼容中文和 P0-P4 写法）
+
+        Args:
+            value: 原始优先级
+
+        Returns:
+            对应的枚举成员，无法识别时返回 None
+        """
+        return _PRIORITY_ALIASES.get(str(value).lower().strip())
+
+
+class CaseType(StrEnum):
+    """测试用例类型"""
+    FUNCTIONAL = "functional"
+    BOUNDARY = "boundary"
+    EXCEPTION = "exception"
+
+    @classmethod
+    def parse(cls, value: Any) -> Optional["CaseType"]:
+        """
+        解析用例类型（兼容中文写法）
+
+        Args:
+            value: 原始类型
+
+        Returns:
+            对应的枚举成员，无法识别时返回 None
+        """
+        return _CASE_TYPE_ALIASES.get(str(value).lower().strip())
+
+
+_PRIORITY_ALIASES = {
+    "high": Priority.HIGH,
+    "高": Priority.HIGH,
+    "p0": Priority.HIGH,
+    "p1": Priority.HIGH,
+    "medium": Priority.MEDIUM,
+    "中": Priority.MEDIUM,
+    "p2": Priority.MEDIUM,
+    "low": Priority.LOW,
+    "低": Priority.LOW,
+    "p3": Priority.LOW,
+    "p4": Priority.LOW,
+}
+
+_CASE_TYPE_ALIASES = {
+    "functional": CaseType.FUNCTIONAL,
+    "功能": CaseType.FUNCTIONAL,
+    "功能测试": CaseType.FUNCTIONAL,
+    "boundary": CaseType.BOUNDARY,
+    "边界": CaseType.BOUNDARY,
+    "边界值": CaseType.BOUNDARY,
+    "exception": CaseType.EXCEPTION,
+    "异常": CaseType.EXCEPTION,
+    "异常测试": CaseType.EXCEPTION,
+    "错误": CaseType.EXCEPTION,
+}
+
+
+def intern_label(enum_cls, value: Any) -> Union[StrEnum, str]:
+    """
+    把 LLM 输出的优先级或类型转换为共享对象
+
+    能识别的值转换为枚举成员；其他值（如 security、performance）保留为驻留的小写字符串，
+    交给质量检查规则判断是否有效。
+
+    Args:
+        enum_cls: Priority 或 CaseType
+        value: 原始值
+
+    Returns:
+        枚举成员或驻留字符串
+    """
+    member = enum_cls.parse(value)
+    if member is not None:
+        return member
+    return sys.intern(str(value).lower().strip())
@@ -0,0 +1,54 @@
+"""
+执行进度通知
+
+通过 contextvar 在一次请求内传播进度监听器。后台任务（见 app.api.jobs）在执行请求时设置监听器，
+Agent 和阶段图在关键节点调用 report_progress，调用方无需逐层传递回调。
+没有监听器时 report_progress 不做任何事情。
+
+contextvar 会随 asyncio.create_task 复制到子任务中，因此并发执行的阶段同样可见。
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+ProgressListener = Callable[[str, Dict[str, Any]], None]
+
+_listener: ContextVar[Optional[ProgressListener]] = ContextVar("progress_listener", default=None)
+
+
+@contextmanager
+def progress_scope(listener: ProgressListener) -> Iterator[None]:
+    """
+    在当前上下文中设置进度监听器
+
+    Args:
+        listener: 监听器，以事件名称和事件字段调用，必须是同步且快速的函数
+    """
+    token = _listener.set(listener)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def report_progress(event: str, **fields: Any) -> None:
+    """
+    通知当前上下文的进度监听器
+
+    监听器抛出的异常会被记录并忽略，进度通知不影响业务流程。
+
+    Args:
+        event: 事件名称（如 stage_started、stage_finished）
+        **fields: 事件字段（必须可以 JSON 序列化）
+    """
+    listener = _listener.get()
+    if listener is None:
+        return
+    try:
+        listener(event, fields)
+    except Exception as e:
+        logger.warning(f"进度监听器执行失败: {e}")
@@ -0,0 +1,138 @@
+"""
+检索结果本地重排
+
+Go 后端按向量相似度返回候选，工作流在本地对候选集合重新打分：
+
+    fused = w_bm25 · BM25(query, 标题 + 正文) / max + w_vector · score + w_priority · 优先级 + w_recency · 新鲜度
+
+- BM25 使用按项目维护的关键词倒排索引（app/keyword_index.py 的 ``get_project_index``）。候选第一次出现时写入索引，
+  同时记录优先级和时间戳这些静态特征，之后的查询只做词项查找和向量运算；
+  同一查询的全量 BM25 分数向量按索引版本缓存。候选的标题、正文、优先级或时间与索引中的
+  记录不一致（签名不同）时重新写入
+- 优先级映射到 0-1（P0=1.0, P1/high=0.75, P2/medium=0.5, P3/low=0.25）
+- 新鲜度按更新时间（没有时使用创建时间）指数衰减，半衰期默认 180 天
+
+打分全部用 NumPy 向量运算完成，10,000 个候选的重排在毫秒级。
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .keyword_index import KeywordIndex, ensure_indexed
+
+_MAX_PRIORITY_WEIGHT = 4
+
+_SECONDS_PER_DAY = 86400.0
+
+
+@dataclass(frozen=True)
+class RerankWeights:
+    """融合分数中各项特征的权重"""
+    bm25: float = 0.35
+    vector: float = 0.35
+    priority: float = 0.2
+    recency: float = 0.1
+
+
+class Reranker:
+    """
+    候选集合的本地重排器
+    """
+
+    def __init__(self, weights: RerankWeights = RerankWeights(), recency_half_life_days: float = 180.0):
+        """
+        初始化重排器
+
+        Args:
+            weights: 特征权重
+            recency_half_life_days: 新鲜度半衰期（天）
+        """
+        self.weights = weights
+        self.recency_half_life_days = recency_half_life_days
+
+    def features(
+        self,
+        query: str,
+        candidates: Sequence[Dict[str, Any]],
+        index: Optional[KeywordIndex] = None,
+        now: Optional[float] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        计算候选的各项特征（均在 0-1 之间）
+
+        Args:
+            query: 查询文本
+            candidates: 候选列表
+            index: 关键词索引，不在索引中或已变化的候选会先写入索引；为 None 时使用只包含候选的临时索引
+            now: 当前 Unix 时间戳（默认当前时间）
+
+        Returns:
+            特征名到与候选对齐的向量
+        """
+        count = len(candidates)
+        if index is None:
+            index = KeywordIndex(cache_size=1)
+        # 新出现或已变化的候选写入索引
+        rows = ensure_indexed(index, candidates)
+
+        bm25 = index.scores(query)[rows]
+        top = bm25.max() if count else 0.0
+        if top > 0:
+            bm25 = bm25 / top
+
+        vector = np.fromiter((candidate.get("score") or 0.0 for candidate in candidates), dtype=np.float64, count=count)
+        np.clip(vector, 0.0, 1.0, out=vector)
+
+        priorities, timestamps, _ = index.static_features(rows)
+        priority = priorities / _MAX_PRIORITY_WEIGHT
+        age_days = np.maximum((time.time() if now is None else now) - timestamps, 0.0) / _SECONDS_PER_DAY
+        recency = np.nan_to_num(np.exp2(-age_days / self.recency_half_life_days), nan=0.0)
+
+        return {"bm25": bm25, "vector": vector, "priority": priority, "recency": recency}
+
+    def rerank(
+        self,
+        query: str,
+        candidates: Sequence[Dict[str, Any]],
+        index: Optional[KeywordIndex] = None,
+        limit: Optional[int] = None,
+        now: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        按融合分数重排候选
+
+        Args:
+            query: 查询文本
+            candidates: 候选列表
+            index: 关键词索引（通常是 get_project_index 返回的项目索引）
+            limit: 只返回前 limit 个（默认全部）
+            now: 当前 Unix 时间戳（默认当前时间）
+
+        Returns:
+            按融合分数降序排列的候选副本，每个候选增加 rerank_score 字段；分数相同的保持原有顺序
+        """
+        if not candidates:
+            return []
+        features = self.features(query, candidates, index=index, now=now)
+        fused = (
+            self.weights.bm25 * features["bm25"]
+            + self.weights.vector * features["vector"]
+            + self.weights.priority * features["priority"]
+            + self.weights.recency * features["recency"]
+        )
+        fused = np.round(fused, 4)
+        if limit is not None and limit < len(candidates):
+            if limit <= 0:
+                return []
+            # 先取出前 limit 个（含并列），再稳定排序
+            threshold = np.partition(fused, len(fused) - limit)[len(fused) - limit]
+            selected = np.flatnonzero(fused >= threshold)
+            order = selected[np.argsort(-fused[selected], kind="stable")][:limit]
+        else:
+            order = np.argsort(-fused, kind="stable")
+        scores = fused[order].tolist()
+        return [{**candidates[i], "rerank_score": score} for i, score in zip(order.tolist(), scores)]
+
@@ -0,0 +1,152 @@
+"""
+JSON 序列化
+
+服务中所有 JSON 编解码都经过本模块：安装了 orjson 时使用 orjson（编码和解码都快数倍，
+直接输出 UTF-8 字节），否则回退到标准库 json，两种后端的输出内容一致（紧凑分隔符、不转义非 ASCII 字符）。
+
+- dumps / dumps_bytes / loads: 通用编解码，orjson 原生支持 dataclass、datetime 和枚举，标准库后端用 default 兜底
+- dumps_prompt: 嵌入提示词的 JSON。不缩进、不加空格，同样的内容占用更少的 token
+- sse_frame / sse_content_frame / SSE_HEARTBEAT: 编码 SSE 数据帧和心跳注释帧，常量部分预先编码为字节
+
+解码错误统一抛出 json.JSONDecodeError（orjson.JSONDecodeError 是它的子类），调用方无需关心后端。
+"""
+
+import dataclasses
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于运行环境
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+JSONDecodeError = json.JSONDecodeError
+
+_COMPACT = (",", ":")
+
+# SSE 数据帧的常量部分
+SSE_DATA_PREFIX = b"data: "
+SSE_FRAME_END = b"\n\n"
+# SSE 注释帧，客户端会忽略，用于在没有数据时保持连接
+SSE_HEARTBEAT = b": heartbeat\n\n"
+# 流式对话中最频繁的内容事件：{"type":"content","content":<chunk>}
+_CONTENT_FRAME_PREFIX = SSE_DATA_PREFIX + b'{"type":"content","content":'
+_CONTENT_FRAME_END = b"}" + SSE_FRAME_END
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """标准库后端无法直接编码的类型（与 orjson 的原生行为保持一致）"""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)}
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    编码为紧凑的 UTF-8 JSON 字节
+
+    Args:
+        obj: 要编码的对象
+        default: 无法编码的对象的转换函数
+
+    Returns:
+        JSON 字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+    return dumps(obj, default=default).encode("utf-8")
+
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    编码为紧凑的 JSON 字符串（不转义非 ASCII 字符）
+
+    Args:
+        obj: 要编码的对象
+        default: 无法编码的对象的转换函数
+
+    Returns:
+        JSON 字符串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS).decode("utf-8")
+
+    def fallback(value: Any) -> Any:
+        if default is not None:
+            try:
+                return default(value)
+            except TypeError:
+                pass
+        return _default(value)
+
+    return json.dumps(obj, ensure_ascii=False, separators=_COMPACT, default=fallback)
+
+
+def dumps_prompt(obj: Any) -> str:
+    """
+    编码嵌入提示词的 JSON
+
+    不缩进、不加多余空格：模型读取紧凑 JSON 的效果与缩进格式相同，但 token 数明显更少。
+
+    Args:
+        obj: 要编码的对象
+
+    Returns:
+        JSON 字符串
+    """
+    return dumps(obj)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    解码 JSON
+
+    Args:
+        data: JSON 字符串或字节
+
+    Returns:
+        解码后的对象
+
+    Raises:
+        json.JSONDecodeError: 如果不是合法的 JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def sse_frame(event: Any) -> bytes:
+    """
+    编码 SSE 数据帧（data: <json>\\n\\n）
+
+    Args:
+        event: 事件内容
+
+    Returns:
+        帧字节
+    """
+    return SSE_DATA_PREFIX + dumps_bytes(event) + SSE_FRAME_END
+
+
+def sse_content_frame(content: str) -> bytes:
+    """
+    编码流式对话的内容事件帧，与 sse_frame({'type': 'content', 'content': content}) 等价
+
+    Args:
+        content: 内容块
+
+    Returns:
+        帧字节
+    """
+    return _CONTENT_FRAME_PREFIX + dumps_bytes(content) + _CONTENT_FRAME_END
@@ -7,14 +7,27 @@
 - 生成工具：生成和格式化测试用例
 - 验证工具：验证覆盖率和质量
 - 存储工具：保存和更新测试用例
+
+工具类在首次访问时才导入所在子模块（见 app.lazy）。
 """
 
-from .base import BaseTool, ToolError
-from .retrieval_tools import SearchPRDTool, SearchTestCaseTool, GetRelatedCasesTool
-from .understanding_tools import ParseRequirementTool, ExtractTestPointsTool
-from .generation_tools import GenerateTestCaseTool, FormatTestCaseTool
-from .validation_tools import ValidateCoverageTool, CheckDuplicationTool, CheckQualityTool
-from .storage_tools import SaveTestCaseTool, UpdateTestCaseTool
+from typing import TYPE_CHECKING
+
+from app.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .base import BaseTool, ToolError
+    from .retrieval_tools import (
+        SearchPRDTool,
+        SearchTestCaseTool,
+        GetRelatedCasesTool,
+        ListTestCasesTool,
+        ListPRDsTool,
+    )
+    from .understanding_tools import ParseRequirementTool, ExtractTestPointsTool
+    from .generation_tools import GenerateTestCaseTool, FormatTestCaseTool
+    from .validation_tools import ValidateCoverageTool, CheckDuplicationTool, CheckQualityTool
+    from .storage_tools import SaveTestCaseTool, UpdateTestCaseTool
 
 __all__ = [
     "BaseTool",
@@ -22,6 +35,8 @@ __all__ = [
     "SearchPRDTool",
     "SearchTestCaseTool",
     "GetRelatedCasesTool",
+    "ListTestCasesTool",
+    "ListPRDsTool",
     "ParseRequirementTool",
     "ExtractTestPointsTool",
     "GenerateTestCaseTool",
@@ -32,3 +47,22 @@ __all__ = [
     "SaveTestCaseTool",
     "UpdateTestCaseTool",
 ]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    "BaseTool": ".base",
+    "ToolError": ".base",
+    "SearchPRDTool": ".retrieval_tools",
+    "SearchTestCaseTool": ".retrieval_tools",
+    "GetRelatedCasesTool": ".retrieval_tools",
+    "ListTestCasesTool": ".retrieval_tools",
+    "ListPRDsTool": ".retrieval_tools",
+    "ParseRequirementTool": ".understanding_tools",
+    "ExtractTestPointsTool": ".understanding_tools",
+    "GenerateTestCaseTool": ".generation_tools",
+    "FormatTestCaseTool": ".generation_tools",
+    "ValidateCoverageTool": ".validation_tools",
+    "CheckDuplicationTool": ".validation_tools",
+    "CheckQualityTool": ".validation_tools",
+    "SaveTestCaseTool": ".storage_tools",
+    "UpdateTestCaseTool": ".storage_tools",
+})
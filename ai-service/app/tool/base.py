@@ -5,20 +5,68 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
+import functools
+import inspect
 import logging
+import time
+
+from ..executor import POOL_KINDS, get_pool
+from ..metrics import TOOL_DURATION
+from ..tracing import tracer
 
 logger = logging.getLogger(__name__)
 
 
+def _instrument_execute(execute):
+    """包装 execute，记录每次调用的耗时、结果状态和追踪 span"""
+    @functools.wraps(execute)
+    async def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        status = "error"
+        try:
+            with tracer.start_span(f"tool.{self.name}", attributes={"tool.name": self.name}):
+                result = await execute(self, *args, **kwargs)
+            status = "ok"
+            return result
+        finally:
+            TOOL_DURATION.observe(time.perf_counter() - start, tool=self.name, status=status)
+
+    wrapper._instrumented = True
+    return wrapper
+
+
 class BaseTool(ABC):
     """
     所有工具的抽象基类。
     
     工具是可以组合成技能的原子能力。
     每个工具应该专注做好一件事。
+    
+    子类实现的 execute 会被自动包装，记录调用耗时指标（见 app.metrics）
+    和追踪 span（见 app.tracing）。
+    
+    CPU 密集型工具通过 cpu_bound 声明同步计算的执行位置，并用 run_cpu_bound 执行计算，
+    超过 offload_threshold 的输入会被派发到共享工作池（见 app.executor），不阻塞事件循环。
     """
     
+    # 同步计算的执行位置：None（事件循环）、"thread"（线程池）或 "process"（进程池）
+    cpu_bound: Optional[str] = None
+    # 输入规模小于该值时仍在事件循环上执行（派发开销大于计算本身）
+    offload_threshold: int = 0
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.cpu_bound is not None and cls.cpu_bound not in POOL_KINDS:
+            raise TypeError(f"{cls.__name__}.cpu_bound 无效: {cls.cpu_bound}，可选: None, {POOL_KINDS}")
+        execute = cls.__dict__.get("execute")
+        if (
+            execute is not None
+            and inspect.iscoroutinefunction(execute)
+            and not getattr(execute, "_instrumented", False)
+        ):
+            cls.execute = _instrument_execute(execute)
+    
     def __init__(self, name: str, description: str):
         """
         初始化工具。
@@ -47,6 +95,35 @@ class BaseTool(ABC):
         """
         pass
     
+    async def run_cpu_bound(
+        self,
+        func: Callable[..., Any],
+        *args,
+        size: Optional[int] = None,
+        **kwargs
+    ) -> Any:
+        """
+        执行同步计算。
+        
+        按类的 cpu_bound 声明派发到共享工作池；未声明或输入规模低于 offload_threshold 时
+        直接在当前线程执行。派发到进程池时 func 和参数必须可以 pickle（模块级函数）。
+        
+        Args:
+            func: 同步函数
+            *args: 位置参数
+            size: 输入规模（如用例数），用于与 offload_threshold 比较
+            **kwargs: 关键字参数
+            
+        Returns:
+            函数返回值
+            
+        Raises:
+            ExecutorSaturated: 工作池饱和，等待空位超时
+        """
+        if self.cpu_bound is None or (size is not None and size < self.offload_threshold):
+            return func(*args, **kwargs)
+        return await get_pool(self.cpu_bound).run(func, *args, **kwargs)
+    
     def __str__(self) -> str:
         return f"{self.name}: {self.description}"
     
@@ -4,10 +4,14 @@
 提供测试用例生成和格式化能力，使用 LLM 生成详细的测试用例。
 """
 
-import json
 from typing import List, Dict, Any, Optional
 from .base import BaseTool, ToolError
 from app.integration import BRConnectorClient
+from app.context_packing import pack_passages
+from app.deadline import DeadlineExceeded
+from app.metrics import PARSE_DURATION
+from app.models import CaseType, Priority
+from app.serialization import JSONDecodeError, dumps_prompt, loads
 
 
 class GenerateTestCaseTool(BaseTool):
@@ -23,6 +27,9 @@ class GenerateTestCaseTool(BaseTool):
     - 测试类型
     """
     
+    # 历史用例示例的 token 预算
+    EXAMPLE_BUDGET_TOKENS = 300
+    
     def __init__(self, llm_client: BRConnectorClient):
         """
         初始化测试用例生成工具。
@@ -84,7 +91,8 @@ class GenerateTestCaseTool(BaseTool):
             )
             
             # 解析 LLM 响应
-            test_case = self._parse_response(response)
+            with PARSE_DURATION.time(tool=self.name):
+                test_case = self._parse_response(response)
             
             # 确保优先级和类型与测试点一致
             test_case["priority"] = test_point.get("priority", "medium")
@@ -93,6 +101,8 @@ class GenerateTestCaseTool(BaseTool):
             self.logger.info(f"测试用例生成完成: {test_case.get('title', 'Unknown')}")
             return test_case
         
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self.logger.error(f"测试用例生成失败: {e}")
             raise ToolError(
@@ -118,13 +128,19 @@ class GenerateTestCaseTool(BaseTool):
         
         # 构建历史用例参考
         historical_ref = ""
-        if historical_cases:
+        passages = pack_passages(
+            test_point.get('description', ''),
+            historical_cases,
+            budget_tokens=self.EXAMPLE_BUDGET_TOKENS,
+            max_passages=2
+        )
+        if passages:
             historical_ref = "\n\n参考历史测试用例（学习格式和风格）：\n"
-            for i, case in enumerate(historical_cases[:2], 1):  # 只取前2个
+            for i, passage in enumerate(passages, 1):
                 historical_ref += f"\n示例 {i}:\n"
-                historical_ref += f"标题: {case.get('title', 'N/A')}\n"
-                if case.get('content'):
-                    historical_ref += f"内容: {case.get('content', '')[:200]}...\n"
+                historical_ref += f"标题: {passage.title}\n"
+                if passage.excerpt:
+                    historical_ref += f"内容: {passage.excerpt}\n"
         
         return f"""你是一个测试用例设计专家。请基于以下测试点生成一个详细的、可执行的测试用例。
 
@@ -135,7 +151,7 @@ class GenerateTestCaseTool(BaseTool):
 - 原因: {test_point.get('rationale', '')}
 
 需求上下文：
-{json.dumps(requirement_analysis, ensure_ascii=False, indent=2) if requirement_analysis else '无'}
+{dumps_prompt(requirement_analysis) if requirement_analysis else '无'}
 {historical_ref}
 
 请生成一个详细的测试用例，包含：
@@ -186,7 +202,7 @@ class GenerateTestCaseTool(BaseTool):
         """
         try:
             # 尝试直接解析 JSON
-            test_case = json.loads(response.strip())
+            test_case = loads(response.strip())
             
             # 验证必需字段
             required_fields = ["title", "preconditions", "steps", "expected_result"]
@@ -209,7 +225,7 @@ class GenerateTestCaseTool(BaseTool):
             
             return test_case
         
-        except json.JSONDecodeError as e:
+        except JSONDecodeError as e:
             # 如果直接解析失败，尝试提取 JSON 部分
             self.logger.warning(f"JSON 解析失败，尝试提取 JSON 部分: {e}")
             
@@ -218,18 +234,18 @@ class GenerateTestCaseTool(BaseTool):
             json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
             if json_match:
                 try:
-                    test_case = json.loads(json_match.group(1))
+                    test_case = loads(json_match.group(1))
                     return test_case
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     pass
             
             # 查找花括号包围的内容
             json_match = re.search(r'\{.*\}', response, re.DOTALL)
             if json_match:
                 try:
-                    test_case = json.loads(json_match.group(0))
+                    test_case = loads(json_match.group(0))
                     return test_case
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     pass
             
             raise ToolError(
@@ -248,8 +264,13 @@ class FormatTestCaseTool(BaseTool):
     - 数据类型正确
     - 格式统一
     - 符合系统要求
+    
+    大批量用例（如项目级审计）在线程池中格式化。
     """
     
+    cpu_bound = "thread"
+    offload_threshold = 1000
+    
     def __init__(self):
         """初始化测试用例格式化工具。"""
         super().__init__(
@@ -278,15 +299,9 @@ class FormatTestCaseTool(BaseTool):
         try:
             self.logger.info(f"格式化 {len(test_cases)} 个测试用例")
             
-            formatted_cases = []
-            for i, test_case in enumerate(test_cases):
-                try:
-                    formatted_case = self._format_single_case(test_case, i + 1)
-                    formatted_cases.append(formatted_case)
-                except Exception as e:
-                    self.logger.warning(f"格式化测试用例 {i+1} 失败: {e}")
-                    # 继续处理其他用例
-                    continue
+            formatted_cases = await self.run_cpu_bound(
+                self._format_cases, test_cases, size=len(test_cases)
+            )
             
             self.logger.info(f"成功格式化 {len(formatted_cases)} 个测试用例")
             return formatted_cases
@@ -299,6 +314,27 @@ class FormatTestCaseTool(BaseTool):
                 details={"count": len(test_cases), "error": str(e)}
             )
     
+    def _format_cases(self, test_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        逐个格式化测试用例，跳过格式化失败的用例。
+        
+        Args:
+            test_cases: 原始测试用例列表
+            
+        Returns:
+            格式化后的测试用例列表
+        """
+        formatted_cases = []
+        for i, test_case in enumerate(test_cases):
+            try:
+                formatted_case = self._format_single_case(test_case, i + 1)
+                formatted_cases.append(formatted_case)
+            except Exception as e:
+                self.logger.warning(f"格式化测试用例 {i+1} 失败: {e}")
+                # 继续处理其他用例
+                continue
+        return formatted_cases
+    
     def _format_single_case(self, test_case: Dict[str, Any], index: int) -> Dict[str, Any]:
         """
         格式化单个测试用例。
@@ -338,24 +374,7 @@ class FormatTestCaseTool(BaseTool):
         Returns:
             标准化的优先级（high/medium/low）
         """
-        priority_str = str(priority).lower().strip()
-        
-        # 映射表
-        priority_map = {
-            "high": "high",
-            "高": "high",
-            "p0": "high",
-            "p1": "high",
-            "medium": "medium",
-            "中": "medium",
-            "p2": "medium",
-            "low": "low",
-            "低": "low",
-            "p3": "low",
-            "p4": "low",
-        }
-        
-        return priority_map.get(priority_str, "medium")
+        return Priority.parse(priority) or Priority.MEDIUM
     
     def _normalize_type(self, test_type: Any) -> str:
         """
@@ -367,23 +386,7 @@ class FormatTestCaseTool(BaseTool):
         Returns:
             标准化的测试类型（functional/boundary/exception）
         """
-        type_str = str(test_type).lower().strip()
-        
-        # 映射表
-        type_map = {
-            "functional": "functional",
-            "功能": "functional",
-            "功能测试": "functional",
-            "boundary": "boundary",
-            "边界": "boundary",
-            "边界值": "boundary",
-            "exception": "exception",
-            "异常": "exception",
-            "异常测试": "exception",
-            "错误": "exception",
-        }
-        
-        return type_map.get(type_str, "functional")
+        return CaseType.parse(test_type) or CaseType.FUNCTIONAL
     
     def _format_steps(self, steps: Any) -> List[Dict[str, Any]]:
         """
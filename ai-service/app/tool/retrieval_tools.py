@@ -5,9 +5,12 @@
 通过调用 Go 后端的搜索 API 实现，复用现有的智能搜索和重排功能。
 """
 
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator
 import httpx
 from .base import BaseTool, ToolError
+from ..deadline import DeadlineExceeded, clamp_timeout
+from ..tracing import httpx_event_hooks
 
 
 class SearchPRDTool(BaseTool):
@@ -30,7 +33,7 @@ class SearchPRDTool(BaseTool):
             description="在 PRD 文档库中搜索相关文档"
         )
         self.backend_url = backend_url.rstrip("/")  # 移除末尾的斜杠
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        self.http_client = httpx.AsyncClient(timeout=30.0, event_hooks=httpx_event_hooks())
     
     async def execute(
         self,
@@ -70,14 +73,16 @@ class SearchPRDTool(BaseTool):
             search_request = {
                 "query": query,
                 "type": "prd",  # 搜索 PRD
-                "limit": 20,  # 增加返回数量
-                "score_threshold": 0.7,
+                "limit": limit,
+                "score_threshold": threshold,
                 "alpha": 0.9,  # 混合搜索权重
             }
             
             # 调用 Go 后端搜索 API
             url = f"{self.backend_url}/api/v1/projects/{project_id}/search"
-            response = await self.http_client.post(url, json=search_request)
+            response = await self.http_client.post(
+                url, json=search_request, timeout=clamp_timeout(30.0)
+            )
             
             # 检查响应状态
             if response.status_code != 200:
@@ -109,9 +114,9 @@ class SearchPRDTool(BaseTool):
             if results is None:
                 results = []
             
-            # 转换为工具期望的格式
+            # 转换为工具期望的格式（后端未遵守 limit 时在本地截断）
             formatted_results = []
-            for item in results:
+            for item in results[:limit]:
                 formatted_results.append({
                     "id": item.get("id"),
                     "title": item.get("title"),
@@ -123,7 +128,7 @@ class SearchPRDTool(BaseTool):
             self.logger.info(f"找到 {len(formatted_results)} 个相关 PRD 文档")
             return formatted_results
         
-        except ToolError:
+        except (ToolError, DeadlineExceeded):
             raise
         except Exception as e:
             self.logger.error(f"PRD 搜索失败: {e}")
@@ -158,7 +163,7 @@ class SearchTestCaseTool(BaseTool):
             description="在测试用例库中搜索相关测试用例"
         )
         self.backend_url = backend_url.rstrip("/")
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        self.http_client = httpx.AsyncClient(timeout=30.0, event_hooks=httpx_event_hooks())
     
     async def execute(
         self,
@@ -167,6 +172,7 @@ class SearchTestCaseTool(BaseTool):
         threshold: float = 0.7,
         project_id: Optional[str] = None,
         priority: Optional[str] = None,
+        module: Optional[str] = None,
         **kwargs
     ) -> List[Dict[str, Any]]:
         """
@@ -178,6 +184,7 @@ class SearchTestCaseTool(BaseTool):
             threshold: 相似度阈值（0-1）
             project_id: 项目 ID（必需）
             priority: 可选的优先级过滤（P0, P1, P2, P3）
+            module: 可选的模块名称过滤
             **kwargs: 其他参数
             
         Returns:
@@ -196,18 +203,24 @@ class SearchTestCaseTool(BaseTool):
             
             self.logger.info(f"搜索测试用例: query='{query}', limit={limit}, project_id={project_id}")
             
-            # 构建搜索请求
+            # 构建搜索请求（优先级和模块过滤由后端在截断之前完成）
             search_request = {
                 "query": query,
                 "type": "testcase",  # 搜索测试用例
-                "limit": 20,  # 增加返回数量
-                "score_threshold": 0.7,
+                "limit": limit,
+                "score_threshold": threshold,
                 "alpha": 0.9,  # 混合搜索权重
             }
+            if priority:
+                search_request["priority"] = priority
+            if module:
+                search_request["module"] = module
             
             # 调用 Go 后端搜索 API
             url = f"{self.backend_url}/api/v1/projects/{project_id}/search"
-            response = await self.http_client.post(url, json=search_request)
+            response = await self.http_client.post(
+                url, json=search_request, timeout=clamp_timeout(30.0)
+            )
             
             # 检查响应状态
             if response.status_code != 200:
@@ -239,14 +252,16 @@ class SearchTestCaseTool(BaseTool):
             if results is None:
                 results = []
             
-            # 转换为工具期望的格式，并应用优先级过滤
+            # 转换为工具期望的格式（兼容不支持优先级和模块过滤的后端：本地再校验一次）
             formatted_results = []
             for item in results:
-                # 如果指定了优先级过滤，则只返回匹配的结果
+                metadata = item.get("metadata") or {}
                 if priority:
-                    item_priority = item.get("metadata", {}).get("priority")
-                    if item_priority != priority:
+                    item_priority = metadata.get("priority")
+                    if str(item_priority).lower() != priority.lower():
                         continue
+                if module and metadata.get("module") not in (None, module):
+                    continue
                 
                 formatted_results.append({
                     "id": item.get("id"),
@@ -255,11 +270,13 @@ class SearchTestCaseTool(BaseTool):
                     "score": item.get("score"),
                     "metadata": item.get("metadata", {}),
                 })
+                if len(formatted_results) >= limit:
+                    break
             
             self.logger.info(f"找到 {len(formatted_results)} 个相关测试用例")
             return formatted_results
         
-        except ToolError:
+        except (ToolError, DeadlineExceeded):
             raise
         except Exception as e:
             self.logger.error(f"测试用例搜索失败: {e}")
@@ -293,7 +310,7 @@ class GetRelatedCasesTool(BaseTool):
             description="获取与指定测试用例相关的其他测试用例"
         )
         self.backend_url = backend_url.rstrip("/")
-        self.http_client = httpx.AsyncClient(timeout=30.0)
+        self.http_client = httpx.AsyncClient(timeout=30.0, event_hooks=httpx_event_hooks())
     
     async def execute(
         self,
@@ -330,7 +347,7 @@ class GetRelatedCasesTool(BaseTool):
             # 调用 Go 后端推荐 API
             url = f"{self.backend_url}/api/v1/projects/{project_id}/testcases/{test_case_id}/recommendations"
             params = {"limit": limit}
-            response = await self.http_client.get(url, params=params)
+            response = await self.http_client.get(url, params=params, timeout=clamp_timeout(30.0))
             
             # 检查响应状态
             if response.status_code != 200:
@@ -376,7 +393,7 @@ class GetRelatedCasesTool(BaseTool):
             self.logger.info(f"找到 {len(formatted_results)} 个相关测试用例")
             return formatted_results
         
-        except ToolError:
+        except (ToolError, DeadlineExceeded):
             raise
         except Exception as e:
             self.logger.error(f"查找相关测试用例失败: {e}")
@@ -389,3 +406,247 @@ class GetRelatedCasesTool(BaseTool):
     async def close(self):
         """关闭 HTTP 客户端连接"""
         await self.http_client.aclose()
+
+
+class _PagedListTool(BaseTool):
+    """
+    分页列表工具基类。
+    
+    调用 Go 后端的列表 API 逐页拉取项目内的全部数据，
+    用于项目级审计等需要遍历整个数据集的场景。
+    """
+    
+    # Go 后端列表 API 的资源路径（如 testcases、prds）
+    resource: str = ""
+    
+    # Go 后端限制 page_size 最大为 100
+    MAX_PAGE_SIZE = 100
+    
+    def __init__(self, backend_url: str, name: str, description: str):
+        """
+        初始化分页列表工具。
+        
+        Args:
+            backend_url: Go 后端的基础 URL（例如：http://localhost:8080）
+            name: 工具名称
+            description: 工具描述
+        """
+        super().__init__(name=name, description=description)
+        self.backend_url = backend_url.rstrip("/")
+        self.http_client = httpx.AsyncClient(timeout=30.0, event_hooks=httpx_event_hooks())
+    
+    async def execute(
+        self,
+        project_id: str,
+        page: int = 1,
+        page_size: int = MAX_PAGE_SIZE,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        拉取一页数据。
+        
+        Args:
+            project_id: 项目 ID（必需）
+            page: 页码（从 1 开始）
+            page_size: 每页数量（最大 100）
+            **kwargs: 透传给列表 API 的过滤参数（如 status、module_id）
+            
+        Returns:
+            分页结果，包含：
+            - items: 当前页数据（已转换为工具期望的格式）
+            - total: 总数量
+            - page: 当前页码
+            - total_pages: 总页数
+            
+        Raises:
+            ToolError: 如果拉取失败
+        """
+        try:
+            if not project_id:
+                raise ToolError(
+                    tool_name=self.name,
+                    message="project_id 是必需参数",
+                    details={"page": page}
+                )
+            
+            params = {k: v for k, v in kwargs.items() if v is not None}
+            params["page"] = page
+            params["page_size"] = min(max(page_size, 1), self.MAX_PAGE_SIZE)
+            
+            url = f"{self.backend_url}/api/v1/projects/{project_id}/{self.resource}"
+            response = await self.http_client.get(url, params=params, timeout=clamp_timeout(30.0))
+            
+            if response.status_code != 200:
+                raise ToolError(
+                    tool_name=self.name,
+                    message=f"Go 后端列表 API 返回错误: {response.status_code}",
+                    details={
+                        "page": page,
+                        "status_code": response.status_code,
+                        "response": response.text
+                    }
+                )
+            
+            result = response.json()
+            if result.get("code") != 200:
+                raise ToolError(
+                    tool_name=self.name,
+                    message=f"拉取列表失败: {result.get('message', 'Unknown error')}",
+                    details={"page": page, "result": result}
+                )
+            
+            data = result.get("data") or {}
+            items = data.get("items") or []
+            
+            return {
+                "items": [self._format_item(item) for item in items],
+                "total": data.get("total", 0),
+                "page": data.get("page", page),
+                "total_pages": data.get("total_pages", 0),
+            }
+        
+        except (ToolError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            self.logger.error(f"拉取列表失败: {e}")
+            raise ToolError(
+                tool_name=self.name,
+                message=f"拉取列表失败: {str(e)}",
+                details={"page": page, "error": str(e)}
+            )
+    
+    async def iter_pages(
+        self,
+        project_id: str,
+        page_size: int = MAX_PAGE_SIZE,
+        **kwargs
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        逐页遍历项目内的全部数据。
+        
+        处理当前页的同时预取下一页，内存中最多保留两页数据。
+        
+        Args:
+            project_id: 项目 ID（必需）
+            page_size: 每页数量（最大 100）
+            **kwargs: 透传给列表 API 的过滤参数
+            
+        Yields:
+            每一页的数据列表
+            
+        Raises:
+            ToolError: 如果任意一页拉取失败
+        """
+        next_page = asyncio.create_task(
+            self.execute(project_id=project_id, page=1, page_size=page_size, **kwargs)
+        )
+        try:
+            while next_page is not None:
+                result = await next_page
+                next_page = None
+                
+                page = result["page"]
+                if result["items"] and page < result["total_pages"]:
+                    next_page = asyncio.create_task(
+                        self.execute(
+                            project_id=project_id,
+                            page=page + 1,
+                            page_size=page_size,
+                            **kwargs
+                        )
+                    )
+                
+                if result["items"]:
+                    yield result["items"]
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+                await asyncio.gather(next_page, return_exceptions=True)
+    
+    def _format_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """将 Go 后端返回的数据转换为工具期望的格式"""
+        return item
+    
+    async def close(self):
+        """关闭 HTTP 客户端连接"""
+        await self.http_client.aclose()
+
+
+class ListTestCasesTool(_PagedListTool):
+    """
+    列出测试用例工具。
+    
+    分页拉取项目内的全部测试用例，字段转换为与生成/验证工具一致的格式。
+    """
+    
+    resource = "testcases"
+    
+    def __init__(self, backend_url: str):
+        """
+        初始化测试用例列表工具。
+        
+        Args:
+            backend_url: Go 后端的基础 URL（例如：http://localhost:8080）
+        """
+        super().__init__(
+            backend_url=backend_url,
+            name="list_test_cases",
+            description="分页列出项目内的全部测试用例"
+        )
+    
+    def _format_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """将 Go 后端的测试用例转换为工具期望的格式"""
+        steps = sorted(item.get("steps") or [], key=lambda step: step.get("step_order", 0))
+        return {
+            "id": item.get("id"),
+            "code": item.get("code"),
+            "title": item.get("title"),
+            "preconditions": item.get("precondition"),
+            "steps": [
+                {
+                    "step_number": step.get("step_order"),
+                    "action": step.get("description"),
+                    "expected": step.get("expected"),
+                }
+                for step in steps
+            ],
+            "expected_result": item.get("expected_result"),
+            "priority": item.get("priority"),
+            "type": item.get("type"),
+            "status": item.get("status"),
+            "prd_id": item.get("prd_id"),
+            "module_id": item.get("module_id"),
+        }
+
+
+class ListPRDsTool(_PagedListTool):
+    """
+    列出 PRD 文档工具。
+    
+    分页拉取项目内的全部 PRD 文档（不包含正文，避免占用内存）。
+    """
+    
+    resource = "prds"
+    
+    def __init__(self, backend_url: str):
+        """
+        初始化 PRD 列表工具。
+        
+        Args:
+            backend_url: Go 后端的基础 URL（例如：http://localhost:8080）
+        """
+        super().__init__(
+            backend_url=backend_url,
+            name="list_prds",
+            description="分页列出项目内的全部 PRD 文档"
+        )
+    
+    def _format_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """只保留 PRD 的元数据"""
+        return {
+            "id": item.get("id"),
+            "code": item.get("code"),
+            "title": item.get("title"),
+            "status": item.get("status"),
+            "module_id": item.get("module_id"),
+        }
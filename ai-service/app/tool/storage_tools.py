@@ -4,9 +4,31 @@
 提供测试用例存储能力，通过 Go 后端 API 保存和更新测试用例。
 """
 
+import logging
 import httpx
 from typing import List, Dict, Any, Optional
 from .base import BaseTool, ToolError
+from ..deadline import DeadlineExceeded, clamp_timeout
+from ..keyword_index import get_project_index, index_documents
+from ..tracing import httpx_event_hooks
+
+logger = logging.getLogger(__name__)
+
+
+def _index_test_case(project_id: str, test_case: Dict[str, Any]) -> None:
+    """
+    把写入成功的测试用例更新到项目关键词索引。
+    
+    索引只是本地加速结构，更新失败不影响保存结果，下次检索到该用例时会重新写入。
+    
+    Args:
+        project_id: 项目 ID
+        test_case: 请求中的用例数据与后端返回字段合并后的用例
+    """
+    try:
+        index_documents(get_project_index(project_id), [test_case])
+    except Exception as e:
+        logger.warning(f"更新关键词索引失败: {e}")
 
 
 class SaveTestCaseTool(BaseTool):
@@ -18,6 +40,7 @@ class SaveTestCaseTool(BaseTool):
     - 保存测试步骤
     - 自动生成向量并存储
     - 关联 PRD 和模块
+    - 保存成功后更新项目关键词索引
     """
     
     def __init__(self, go_backend_url: str):
@@ -67,7 +90,9 @@ class SaveTestCaseTool(BaseTool):
             # 调用 Go 后端 API
             url = f"{self.go_backend_url}/api/v1/projects/{project_id}/testcases"
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with httpx.AsyncClient(
+                timeout=clamp_timeout(30.0), event_hooks=httpx_event_hooks()
+            ) as client:
                 response = await client.post(
                     url,
                     json=request_data,
@@ -88,6 +113,7 @@ class SaveTestCaseTool(BaseTool):
                 if result.get("code") == 0 and "data" in result:
                     saved_case = result["data"]
                     self.logger.info(f"测试用例保存成功: ID={saved_case.get('id')}")
+                    _index_test_case(project_id, {**test_case, **saved_case})
                     return saved_case
                 else:
                     raise ToolError(
@@ -96,6 +122,8 @@ class SaveTestCaseTool(BaseTool):
                         details={"response": result}
                     )
         
+        except DeadlineExceeded:
+            raise
         except httpx.HTTPError as e:
             self.logger.error(f"HTTP 请求失败: {e}")
             raise ToolError(
@@ -178,6 +206,7 @@ class UpdateTestCaseTool(BaseTool):
     - 更新测试步骤
     - 重新生成向量
     - 创建新版本
+    - 更新项目关键词索引
     """
     
     def __init__(self, go_backend_url: str):
@@ -228,7 +257,9 @@ class UpdateTestCaseTool(BaseTool):
             # 调用 Go 后端 API
             url = f"{self.go_backend_url}/api/v1/projects/{project_id}/testcases/{test_case_id}"
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with httpx.AsyncClient(
+                timeout=clamp_timeout(30.0), event_hooks=httpx_event_hooks()
+            ) as client:
                 response = await client.put(
                     url,
                     json=request_data,
@@ -252,6 +283,7 @@ class UpdateTestCaseTool(BaseTool):
                         f"测试用例更新成功: ID={test_case_id}, "
                         f"Version={updated_case.get('version')}"
                     )
+                    _index_test_case(project_id, {**test_case, **updated_case, "id": test_case_id})
                     return updated_case
                 else:
                     raise ToolError(
@@ -260,6 +292,8 @@ class UpdateTestCaseTool(BaseTool):
                         details={"response": result}
                     )
         
+        except DeadlineExceeded:
+            raise
         except httpx.HTTPError as e:
             self.logger.error(f"HTTP 请求失败: {e}")
             raise ToolError(
@@ -4,10 +4,12 @@
 提供需求解析和测试点提取能力，使用 LLM 理解自然语言需求。
 """
 
-import json
 from typing import List, Dict, Any, Optional
 from .base import BaseTool, ToolError
 from app.integration import BRConnectorClient
+from app.deadline import DeadlineExceeded
+from app.metrics import PARSE_DURATION
+from app.serialization import JSONDecodeError, dumps_prompt, loads
 
 
 class ParseRequirementTool(BaseTool):
@@ -80,11 +82,14 @@ class ParseRequirementTool(BaseTool):
             )
             
             # 解析 LLM 响应
-            result = self._parse_response(response)
+            with PARSE_DURATION.time(tool=self.name):
+                result = self._parse_response(response)
             
             self.logger.info(f"需求解析完成: {result.get('feature_name', 'Unknown')}")
             return result
         
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self.logger.error(f"需求解析失败: {e}")
             raise ToolError(
@@ -145,7 +150,7 @@ class ParseRequirementTool(BaseTool):
         """
         try:
             # 尝试直接解析 JSON
-            result = json.loads(response.strip())
+            result = loads(response.strip())
             
             # 验证必需字段
             required_fields = [
@@ -162,7 +167,7 @@ class ParseRequirementTool(BaseTool):
             
             return result
         
-        except json.JSONDecodeError as e:
+        except JSONDecodeError as e:
             # 如果直接解析失败，尝试提取 JSON 部分
             self.logger.warning(f"JSON 解析失败，尝试提取 JSON 部分: {e}")
             
@@ -171,18 +176,18 @@ class ParseRequirementTool(BaseTool):
             json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
             if json_match:
                 try:
-                    result = json.loads(json_match.group(1))
+                    result = loads(json_match.group(1))
                     return result
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     pass
             
             # 查找花括号包围的内容
             json_match = re.search(r'\{.*\}', response, re.DOTALL)
             if json_match:
                 try:
-                    result = json.loads(json_match.group(0))
+                    result = loads(json_match.group(0))
                     return result
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     pass
             
             raise ToolError(
@@ -259,11 +264,14 @@ class ExtractTestPointsTool(BaseTool):
             )
             
             # 解析 LLM 响应
-            test_points = self._parse_response(response)
+            with PARSE_DURATION.time(tool=self.name):
+                test_points = self._parse_response(response)
             
             self.logger.info(f"提取了 {len(test_points)} 个测试点")
             return test_points
         
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             self.logger.error(f"测试点提取失败: {e}")
             raise ToolError(
@@ -285,7 +293,7 @@ class ExtractTestPointsTool(BaseTool):
         return f"""你是一个测试设计专家。基于以下需求分析，提取所有需要测试的测试点。
 
 需求分析：
-{json.dumps(requirement_analysis, ensure_ascii=False, indent=2)}
+{dumps_prompt(requirement_analysis)}
 
 请提取以下类型的测试点：
 
@@ -339,7 +347,7 @@ class ExtractTestPointsTool(BaseTool):
         """
         try:
             # 尝试直接解析 JSON
-            test_points = json.loads(response.strip())
+            test_points = loads(response.strip())
             
             # 验证是否为列表
             if not isinstance(test_points, list):
@@ -362,7 +370,7 @@ class ExtractTestPointsTool(BaseTool):
             
             return test_points
         
-        except json.JSONDecodeError as e:
+        except JSONDecodeError as e:
             # 如果直接解析失败，尝试提取 JSON 部分
             self.logger.warning(f"JSON 解析失败，尝试提取 JSON 部分: {e}")
             
@@ -371,18 +379,18 @@ class ExtractTestPointsTool(BaseTool):
             json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
             if json_match:
                 try:
-                    test_points = json.loads(json_match.group(1))
+                    test_points = loads(json_match.group(1))
                     return test_points
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     pass
             
             # 查找方括号包围的内容
             json_match = re.search(r'\[.*\]', response, re.DOTALL)
             if json_match:
                 try:
-                    test_points = json.loads(json_match.group(0))
+                    test_points = loads(json_match.group(0))
                     return test_points
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     pass
             
             raise ToolError(
@@ -4,9 +4,164 @@
 提供测试用例验证能力，包括覆盖率检查、重复检测和质量验证。
 """
 
-from typing import List, Dict, Any, Tuple
+import asyncio
+import hashlib
+import struct
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Set, Tuple, Hashable
 from difflib import SequenceMatcher
 from .base import BaseTool, ToolError
+from ..executor import get_pool
+from ..keyword_index import KeywordIndex, document_key, ensure_indexed, get_project_index, index_text, tokenize
+
+
+def _point_keywords(point: str) -> List[str]:
+    """提取功能点的关键词（按空白分词，忽略不超过两个字符的词）"""
+    return [w for w in point.lower().split() if len(w) > 2]
+
+
+def _case_terms(test_case: Dict[str, Any]) -> Set[str]:
+    """测试用例的词项集合：与写入项目关键词索引的文本（index_text）和切分方式相同"""
+    return set(tokenize(index_text(test_case)))
+
+
+def _point_covered(point: str, test_case_terms: List[Set[str]]) -> bool:
+    """
+    检查某个功能点是否被测试用例覆盖。
+    
+    某个关键词切分出的词项全部出现在同一个用例中即视为覆盖，
+    与 _point_covered_indexed 在索引上的布尔查询结果一致。
+    
+    Args:
+        point: 功能点描述
+        test_case_terms: 每个测试用例的词项集合（见 _case_terms）
+        
+    Returns:
+        是否被覆盖
+    """
+    for keyword in _point_keywords(point):
+        terms = set(tokenize(keyword))
+        if terms and any(terms <= case for case in test_case_terms):
+            return True
+    return False
+
+
+def _point_covered_indexed(point: str, index: KeywordIndex, case_keys: set) -> bool:
+    """
+    通过关键词索引检查功能点是否被测试用例覆盖。
+    
+    关键词和覆盖条件与 _point_covered 相同，每个关键词只做一次倒排表求交集，不扫描用例文本。
+    
+    Args:
+        point: 功能点描述
+        index: 已写入这些测试用例的关键词索引
+        case_keys: 参与统计的测试用例在索引中的 ID
+        
+    Returns:
+        是否被覆盖
+    """
+    for keyword in _point_keywords(point):
+        if any(key in case_keys for key in index.match(keyword, mode="and")):
+            return True
+    return False
+
+
+def compute_coverage(
+    test_cases: List[Dict[str, Any]],
+    requirement_analysis: Dict[str, Any],
+    index: Optional[KeywordIndex] = None
+) -> Dict[str, Any]:
+    """
+    计算测试用例对需求分析的覆盖率（ValidateCoverageTool 的同步计算部分）。
+    
+    Args:
+        test_cases: 测试用例列表
+        requirement_analysis: 需求分析结果
+        index: 项目关键词索引。传入时有 id 的（已保存的）测试用例先写入索引（未变化的用例不重复写入），
+            通过索引查找判断覆盖；没有 id 的草稿用例不写入项目索引，与 index 为 None 时一样扫描用例文本。
+            两种方式的判断结果相同
+        
+    Returns:
+        覆盖率报告（结构见 ValidateCoverageTool.execute）
+    """
+    # 提取需求分析中的关键点
+    functional_points = requirement_analysis.get("functional_points", [])
+    exception_conditions = requirement_analysis.get("exception_conditions", [])
+    constraints = requirement_analysis.get("constraints", [])
+    
+    # 检查功能点覆盖
+    covered_functional = set()
+    uncovered_functional = set()
+    
+    indexed, scanned = [], test_cases
+    if index is not None:
+        indexed = [tc for tc in test_cases if tc.get("id") is not None]
+        scanned = [tc for tc in test_cases if tc.get("id") is None]
+    case_keys = set()
+    if indexed:
+        ensure_indexed(index, indexed)
+        case_keys = {document_key(tc) for tc in indexed}
+    scanned_terms = [_case_terms(tc) for tc in scanned]
+    
+    for fp in functional_points:
+        is_covered = (
+            bool(case_keys) and _point_covered_indexed(fp, index, case_keys)
+        ) or _point_covered(fp, scanned_terms)
+        if is_covered:
+            covered_functional.add(fp)
+        else:
+            uncovered_functional.add(fp)
+    
+    # 计算功能点覆盖率
+    functional_coverage = (
+        len(covered_functional) / max(len(functional_points), 1) * 100
+    )
+    
+    # 检查异常条件覆盖
+    exception_test_count = sum(
+        1 for tc in test_cases 
+        if tc.get("type") == "exception"
+    )
+    exception_coverage = min(
+        exception_test_count / max(len(exception_conditions), 1) * 100,
+        100
+    )
+    
+    # 检查边界值覆盖
+    boundary_test_count = sum(
+        1 for tc in test_cases 
+        if tc.get("type") == "boundary"
+    )
+    # 假设每个约束至少需要一个边界值测试
+    boundary_coverage = min(
+        boundary_test_count / max(len(constraints), 1) * 100,
+        100
+    )
+    
+    # 计算整体覆盖率（加权平均）
+    overall_score = (
+        functional_coverage * 0.5 +  # 功能点权重 50%
+        exception_coverage * 0.3 +   # 异常条件权重 30%
+        boundary_coverage * 0.2      # 边界值权重 20%
+    )
+    
+    coverage_report = {
+        "overall_score": round(overall_score, 2),
+        "functional_coverage": round(functional_coverage, 2),
+        "exception_coverage": round(exception_coverage, 2),
+        "boundary_coverage": round(boundary_coverage, 2),
+        "covered_points": list(covered_functional),
+        "uncovered_points": list(uncovered_functional),
+        "coverage_details": {
+            "total_functional_points": len(functional_points),
+            "covered_functional_points": len(covered_functional),
+            "total_exception_conditions": len(exception_conditions),
+            "exception_test_cases": exception_test_count,
+            "total_constraints": len(constraints),
+            "boundary_test_cases": boundary_test_count,
+        }
+    }
+    return coverage_report
 
 
 class ValidateCoverageTool(BaseTool):
@@ -18,8 +173,14 @@ class ValidateCoverageTool(BaseTool):
     - 异常条件覆盖率
     - 边界值覆盖率
     - 整体覆盖评分
+    
+    计算量主要是对用例文本分词，与用例数成正比，超过阈值时在线程池中执行。
     """
     
+    cpu_bound = "thread"
+    # 按用例数计（1000 个用例分词约 50 ms，200 个约 10 ms）
+    offload_threshold = 200
+    
     def __init__(self):
         """初始化覆盖率验证工具。"""
         super().__init__(
@@ -39,7 +200,7 @@ class ValidateCoverageTool(BaseTool):
         Args:
             test_cases: 测试用例列表
             requirement_analysis: 需求分析结果（来自 ParseRequirementTool）
-            **kwargs: 其他参数
+            **kwargs: 其他参数（如 project_id：已保存到该项目的用例通过项目关键词索引判断覆盖）
             
         Returns:
             覆盖率报告，包含：
@@ -57,71 +218,16 @@ class ValidateCoverageTool(BaseTool):
         try:
             self.logger.info(f"验证 {len(test_cases)} 个测试用例的覆盖率")
             
-            # 提取需求分析中的关键点
-            functional_points = requirement_analysis.get("functional_points", [])
-            exception_conditions = requirement_analysis.get("exception_conditions", [])
-            constraints = requirement_analysis.get("constraints", [])
-            
-            # 检查功能点覆盖
-            covered_functional = set()
-            uncovered_functional = set()
-            
-            for fp in functional_points:
-                is_covered = self._check_point_coverage(fp, test_cases)
-                if is_covered:
-                    covered_functional.add(fp)
-                else:
-                    uncovered_functional.add(fp)
-            
-            # 计算功能点覆盖率
-            functional_coverage = (
-                len(covered_functional) / max(len(functional_points), 1) * 100
-            )
-            
-            # 检查异常条件覆盖
-            exception_test_count = sum(
-                1 for tc in test_cases 
-                if tc.get("type") == "exception"
-            )
-            exception_coverage = min(
-                exception_test_count / max(len(exception_conditions), 1) * 100,
-                100
+            project_id = kwargs.get("project_id")
+            index = get_project_index(project_id) if project_id is not None else None
+            coverage_report = await self.run_cpu_bound(
+                compute_coverage,
+                test_cases,
+                requirement_analysis,
+                index,
+                size=len(test_cases)
             )
-            
-            # 检查边界值覆盖
-            boundary_test_count = sum(
-                1 for tc in test_cases 
-                if tc.get("type") == "boundary"
-            )
-            # 假设每个约束至少需要一个边界值测试
-            boundary_coverage = min(
-                boundary_test_count / max(len(constraints), 1) * 100,
-                100
-            )
-            
-            # 计算整体覆盖率（加权平均）
-            overall_score = (
-                functional_coverage * 0.5 +  # 功能点权重 50%
-                exception_coverage * 0.3 +   # 异常条件权重 30%
-                boundary_coverage * 0.2      # 边界值权重 20%
-            )
-            
-            coverage_report = {
-                "overall_score": round(overall_score, 2),
-                "functional_coverage": round(functional_coverage, 2),
-                "exception_coverage": round(exception_coverage, 2),
-                "boundary_coverage": round(boundary_coverage, 2),
-                "covered_points": list(covered_functional),
-                "uncovered_points": list(uncovered_functional),
-                "coverage_details": {
-                    "total_functional_points": len(functional_points),
-                    "covered_functional_points": len(covered_functional),
-                    "total_exception_conditions": len(exception_conditions),
-                    "exception_test_cases": exception_test_count,
-                    "total_constraints": len(constraints),
-                    "boundary_test_cases": boundary_test_count,
-                }
-            }
+            overall_score = coverage_report["overall_score"]
             
             self.logger.info(f"覆盖率验证完成，整体评分: {overall_score:.2f}%")
             return coverage_report
@@ -133,41 +239,86 @@ class ValidateCoverageTool(BaseTool):
                 message=f"验证覆盖率失败: {str(e)}",
                 details={"test_case_count": len(test_cases), "error": str(e)}
             )
+
+
+def _steps_text(steps: List[Dict[str, Any]]) -> str:
+    """
+    从步骤列表中提取文本。
     
-    def _check_point_coverage(
-        self, 
-        point: str, 
-        test_cases: List[Dict[str, Any]]
-    ) -> bool:
-        """
-        检查某个功能点是否被测试用例覆盖。
+    Args:
+        steps: 步骤列表
         
-        Args:
-            point: 功能点描述
-            test_cases: 测试用例列表
-            
-        Returns:
-            是否被覆盖
-        """
-        point_lower = point.lower()
+    Returns:
+        合并的步骤文本
+    """
+    if not isinstance(steps, list):
+        return ""
+    
+    text_parts = []
+    for step in steps:
+        if isinstance(step, dict):
+            action = step.get("action", "")
+            expected = step.get("expected", "")
+            text_parts.append(f"{action} {expected}")
+    
+    return " ".join(text_parts)
+
+
+def _case_similarity(tc1: Dict[str, Any], tc2: Dict[str, Any]) -> float:
+    """
+    计算两个测试用例的相似度。
+    
+    Args:
+        tc1: 测试用例 1
+        tc2: 测试用例 2
         
-        # 检查测试用例标题或前置条件中是否包含功能点关键词
-        for tc in test_cases:
-            title = tc.get("title", "").lower()
-            preconditions = tc.get("preconditions", "").lower()
-            expected_result = tc.get("expected_result", "").lower()
-            
-            # 提取功能点的关键词（简单分词）
-            keywords = [w for w in point_lower.split() if len(w) > 2]
-            
-            # 如果标题、前置条件或预期结果中包含关键词，认为已覆盖
-            for keyword in keywords:
-                if (keyword in title or 
-                    keyword in preconditions or 
-                    keyword in expected_result):
-                    return True
+    Returns:
+        相似度评分（0-1）
+    """
+    # 比较标题相似度
+    title1 = tc1.get("title", "")
+    title2 = tc2.get("title", "")
+    title_sim = SequenceMatcher(None, title1, title2).ratio()
+    
+    # 比较步骤相似度
+    steps1 = _steps_text(tc1.get("steps", []))
+    steps2 = _steps_text(tc2.get("steps", []))
+    steps_sim = SequenceMatcher(None, steps1, steps2).ratio()
+    
+    # 比较预期结果相似度
+    expected1 = tc1.get("expected_result", "")
+    expected2 = tc2.get("expected_result", "")
+    expected_sim = SequenceMatcher(None, expected1, expected2).ratio()
+    
+    # 加权平均（标题 40%，步骤 40%，预期结果 20%）
+    return (
+        title_sim * 0.4 +
+        steps_sim * 0.4 +
+        expected_sim * 0.2
+    )
+
+
+def find_duplicate_pairs(
+    test_cases: List[Dict[str, Any]],
+    threshold: float
+) -> List[Tuple[int, int, float]]:
+    """
+    两两比较测试用例，找出相似度不低于阈值的用例对（CheckDuplicationTool 的同步计算部分）。
+    
+    Args:
+        test_cases: 测试用例列表
+        threshold: 相似度阈值（0-1）
         
-        return False
+    Returns:
+        重复用例对列表 [(index1, index2, similarity), ...]
+    """
+    duplicate_pairs = []
+    for i in range(len(test_cases)):
+        for j in range(i + 1, len(test_cases)):
+            similarity = _case_similarity(test_cases[i], test_cases[j])
+            if similarity >= threshold:
+                duplicate_pairs.append((i, j, round(similarity, 3)))
+    return duplicate_pairs
 
 
 class CheckDuplicationTool(BaseTool):
@@ -178,8 +329,13 @@ class CheckDuplicationTool(BaseTool):
     - 识别冗余测试
     - 提高测试效率
     - 减少维护成本
+    
+    两两比较的计算量随用例数平方增长（10 个用例约 60 ms），在进程池中执行。
     """
     
+    cpu_bound = "process"
+    offload_threshold = 5
+    
     def __init__(self, similarity_threshold: float = 0.85):
         """
         初始化重复检测工具。
@@ -219,18 +375,9 @@ class CheckDuplicationTool(BaseTool):
             threshold = kwargs.get("similarity_threshold", self.similarity_threshold)
             self.logger.info(f"检测 {len(test_cases)} 个测试用例的重复情况（阈值: {threshold}）")
             
-            duplicate_pairs = []
-            
-            # 两两比较测试用例
-            for i in range(len(test_cases)):
-                for j in range(i + 1, len(test_cases)):
-                    similarity = self._calculate_similarity(
-                        test_cases[i],
-                        test_cases[j]
-                    )
-                    
-                    if similarity >= threshold:
-                        duplicate_pairs.append((i, j, round(similarity, 3)))
+            duplicate_pairs = await self.run_cpu_bound(
+                find_duplicate_pairs, test_cases, threshold, size=len(test_cases)
+            )
             
             # 计算统计信息
             duplicate_indices = set()
@@ -265,67 +412,306 @@ class CheckDuplicationTool(BaseTool):
                 message=f"检测重复失败: {str(e)}",
                 details={"test_case_count": len(test_cases), "error": str(e)}
             )
+
+
+# MinHash 签名：每个 token 的一次 blake2b 摘要切分为 32 个 16 位哈希值
+_SIGNATURE_SIZE = 32
+_SIGNATURE_FORMAT = f">{_SIGNATURE_SIZE}H"
+_LANE_LOW_BITS = sum(1 << (lane * 16) for lane in range(_SIGNATURE_SIZE))
+
+
+@lru_cache(maxsize=4096)
+def _token_hashes(token: str) -> Tuple[int, ...]:
+    """计算 token 在各个哈希函数下的取值"""
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=_SIGNATURE_SIZE * 2).digest()
+    return struct.unpack(_SIGNATURE_FORMAT, digest)
+
+
+def _case_text(test_case: Dict[str, Any]) -> str:
+    """提取用于相似度比较的用例文本（标题、步骤、预期结果），去除空白并转为小写"""
+    parts = [str(test_case.get("title") or "")]
+    steps = test_case.get("steps")
+    if isinstance(steps, list):
+        for step in steps:
+            if isinstance(step, dict):
+                parts.append(str(step.get("action") or ""))
+                parts.append(str(step.get("expected") or ""))
+    parts.append(str(test_case.get("expected_result") or ""))
+    return "".join("".join(parts).lower().split())
+
+
+def case_signature(test_case: Dict[str, Any]) -> bytes:
+    """
+    计算测试用例的 MinHash 签名。
+    
+    以字符二元组为 token，两个签名中相同位置取值相等的比例
+    近似于两个用例 token 集合的 Jaccard 相似度。
+    
+    Args:
+        test_case: 测试用例
+        
+    Returns:
+        64 字节的签名（32 个 16 位最小哈希值）
+    """
+    text = _case_text(test_case)
+    tokens = {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+    columns = zip(*(_token_hashes(token) for token in tokens))
+    return struct.pack(_SIGNATURE_FORMAT, *map(min, columns))
+
+
+def _lane_match_count(value1: int, value2: int) -> int:
+    """统计两个打包签名中取值相同的 16 位槽数量"""
+    diff = value1 ^ value2
+    # 将每个槽内的所有位折叠到该槽的最低位（位移不超过 15，不会跨槽）
+    diff |= diff >> 8
+    diff |= diff >> 4
+    diff |= diff >> 2
+    diff |= diff >> 1
+    return _SIGNATURE_SIZE - bin(diff & _LANE_LOW_BITS).count("1")
+
+
+def signature_similarity(signature1: bytes, signature2: bytes) -> float:
+    """
+    根据 MinHash 签名估算 Jaccard 相似度。
     
-    def _calculate_similarity(
+    Args:
+        signature1: 签名 1
+        signature2: 签名 2
+        
+    Returns:
+        相似度估计值（0-1）
+    """
+    return _lane_match_count(
+        int.from_bytes(signature1, "big"),
+        int.from_bytes(signature2, "big")
+    ) / _SIGNATURE_SIZE
+
+
+class NearDuplicateIndex:
+    """
+    近似重复用例索引。
+    
+    基于 MinHash 签名的局部敏感哈希（LSH）：签名被切分为若干段，
+    只有至少一段完全相同的用例才会被比较，无需两两比较整个测试套件。
+    每个分桶最多保留 bucket_capacity 个代表用例，大簇不会退化为平方复杂度。
+    每个用例只保留 ID 和打包后的签名（与用例文本长度无关），可以流式处理大规模用例。
+    """
+    
+    def __init__(
         self,
-        tc1: Dict[str, Any],
-        tc2: Dict[str, Any]
-    ) -> float:
+        similarity_threshold: float = 0.75,
+        bands: int = 8,
+        bucket_capacity: int = 8
+    ):
+        """
+        初始化索引。
+        
+        Args:
+            similarity_threshold: 判定为近似重复的最小相似度（0-1）
+            bands: 签名分段数（必须整除 32，越多召回越高）
+            bucket_capacity: 每个分桶保留的代表用例数量上限
+        """
+        if _SIGNATURE_SIZE % bands:
+            raise ValueError(f"bands 必须整除 {_SIGNATURE_SIZE}: {bands}")
+        self.similarity_threshold = similarity_threshold
+        self.bucket_capacity = bucket_capacity
+        self._band_bytes = _SIGNATURE_SIZE * 2 // bands
+        self._bands = bands
+        self._buckets: Dict[int, List[Hashable]] = {}
+        self._signatures: Dict[Hashable, int] = {}
+        self._parent: Dict[Hashable, Hashable] = {}
+    
+    def __len__(self) -> int:
+        return len(self._parent)
+    
+    def add(self, case_id: Hashable, signature: bytes) -> List[Hashable]:
         """
-        计算两个测试用例的相似度。
+        加入一个用例，并返回已有的近似重复用例 ID。
         
         Args:
-            tc1: 测试用例 1
-            tc2: 测试用例 2
+            case_id: 用例 ID
+            signature: 用例签名（case_signature 的结果）
             
         Returns:
-            相似度评分（0-1）
+            与该用例近似重复的已有用例 ID 列表
         """
-        # 比较标题相似度
-        title1 = tc1.get("title", "")
-        title2 = tc2.get("title", "")
-        title_sim = SequenceMatcher(None, title1, title2).ratio()
-        
-        # 比较步骤相似度
-        steps1 = self._extract_steps_text(tc1.get("steps", []))
-        steps2 = self._extract_steps_text(tc2.get("steps", []))
-        steps_sim = SequenceMatcher(None, steps1, steps2).ratio()
+        self._parent.setdefault(case_id, case_id)
+        packed = int.from_bytes(signature, "big")
+        min_matches = self.similarity_threshold * _SIGNATURE_SIZE
         
-        # 比较预期结果相似度
-        expected1 = tc1.get("expected_result", "")
-        expected2 = tc2.get("expected_result", "")
-        expected_sim = SequenceMatcher(None, expected1, expected2).ratio()
-        
-        # 加权平均（标题 40%，步骤 40%，预期结果 20%）
-        similarity = (
-            title_sim * 0.4 +
-            steps_sim * 0.4 +
-            expected_sim * 0.2
-        )
+        matches: List[Hashable] = []
+        seen = set()
+        for band, offset in enumerate(range(0, len(signature), self._band_bytes)):
+            # 分段取值与段序号合并为一个整数键，减少每个用例的索引开销
+            key = int.from_bytes(signature[offset:offset + self._band_bytes], "big") * self._bands + band
+            bucket = self._buckets.setdefault(key, [])
+            for other_id in bucket:
+                if other_id in seen or other_id == case_id:
+                    continue
+                seen.add(other_id)
+                if self._find(other_id) == self._find(case_id):
+                    # 已在同一个簇中，无需再比较
+                    continue
+                if _lane_match_count(packed, self._signatures[other_id]) >= min_matches:
+                    matches.append(other_id)
+                    self._union(case_id, other_id)
+            if len(bucket) < self.bucket_capacity:
+                bucket.append(case_id)
+                self._signatures[case_id] = packed
         
-        return similarity
+        return matches
     
-    def _extract_steps_text(self, steps: List[Dict[str, Any]]) -> str:
+    def clusters(self) -> List[List[Hashable]]:
         """
-        从步骤列表中提取文本。
+        返回所有近似重复簇（至少包含两个用例）。
         
-        Args:
-            steps: 步骤列表
-            
         Returns:
-            合并的步骤文本
+            用例 ID 簇列表，簇内顺序与加入顺序一致，按簇大小降序排列
         """
-        if not isinstance(steps, list):
-            return ""
-        
-        text_parts = []
-        for step in steps:
-            if isinstance(step, dict):
-                action = step.get("action", "")
-                expected = step.get("expected", "")
-                text_parts.append(f"{action} {expected}")
+        groups: Dict[Hashable, List[Hashable]] = {}
+        for case_id in self._parent:
+            groups.setdefault(self._find(case_id), []).append(case_id)
+        return sorted(
+            (group for group in groups.values() if len(group) > 1),
+            key=len,
+            reverse=True
+        )
+    
+    def _find(self, case_id: Hashable) -> Hashable:
+        """并查集查找（路径压缩）"""
+        root = case_id
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[case_id] != root:
+            self._parent[case_id], case_id = root, self._parent[case_id]
+        return root
+    
+    def _union(self, a: Hashable, b: Hashable) -> None:
+        """并查集合并"""
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            self._parent[root_a] = root_b
+
+
+# 质量规则表（预先构建，单条与批量检查共用）
+VALID_PRIORITIES = frozenset(["high", "medium", "low", "高", "中", "低"])
+VALID_TYPES = frozenset(["functional", "boundary", "exception", "功能", "边界", "异常"])
+
+_TITLE_LENGTH_ISSUE = {
+    "severity": "warning",
+    "rule": "title_length",
+    "message": "标题过短，应该更具描述性（至少 10 个字符）",
+    "field": "title"
+}
+_TITLE_FORMAT_ISSUE = {
+    "severity": "info",
+    "rule": "title_format",
+    "message": "建议标题以'测试'开头，更符合命名规范",
+    "field": "title"
+}
+_MISSING_PRECONDITIONS_ISSUE = {
+    "severity": "error",
+    "rule": "missing_preconditions",
+    "message": "前置条件缺失或不完整，应明确测试前的准备工作",
+    "field": "preconditions"
+}
+_INSUFFICIENT_STEPS_ISSUE = {
+    "severity": "warning",
+    "rule": "insufficient_steps",
+    "message": "测试步骤过少，建议至少包含 2 个步骤",
+    "field": "steps"
+}
+_VAGUE_EXPECTED_RESULT_ISSUE = {
+    "severity": "error",
+    "rule": "vague_expected_result",
+    "message": "预期结果应该明确且可验证（至少 10 个字符）",
+    "field": "expected_result"
+}
+
+
+def _field_column(test_cases: List[Dict[str, Any]], field: str) -> List[Any]:
+    """按字段提取一列值（缺失或 None 视为空字符串）"""
+    return [tc.get(field) or "" for tc in test_cases]
+
+
+def check_cases_quality(test_cases: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    批量执行质量规则。
+    
+    规则按字段逐列应用到所有用例上，每个用例的问题顺序与规则顺序一致。
+    该函数不依赖任何实例状态，可以在进程池中执行。
+    
+    Args:
+        test_cases: 测试用例列表
         
-        return " ".join(text_parts)
+    Returns:
+        与输入一一对应的质量问题列表
+    """
+    issues: List[List[Dict[str, Any]]] = [[] for _ in test_cases]
+    
+    # 规则 1 / 2: 标题长度和命名规范
+    for case_issues, title in zip(issues, _field_column(test_cases, "title")):
+        title = str(title)
+        if len(title) < 10:
+            case_issues.append(dict(_TITLE_LENGTH_ISSUE))
+        if not title.startswith("测试") and not title.lower().startswith("test"):
+            case_issues.append(dict(_TITLE_FORMAT_ISSUE))
+    
+    # 规则 3: 前置条件
+    for case_issues, preconditions in zip(issues, _field_column(test_cases, "preconditions")):
+        if len(preconditions) < 5:
+            case_issues.append(dict(_MISSING_PRECONDITIONS_ISSUE))
+    
+    # 规则 4 / 5: 步骤数量以及每个步骤的操作和预期
+    for case_issues, steps in zip(issues, _field_column(test_cases, "steps")):
+        if not isinstance(steps, list) or len(steps) < 2:
+            case_issues.append(dict(_INSUFFICIENT_STEPS_ISSUE))
+        if not isinstance(steps, list):
+            continue
+        for i, step in enumerate(steps):
+            if not isinstance(step, dict):
+                continue
+            if not step.get("action"):
+                case_issues.append({
+                    "severity": "error",
+                    "rule": "missing_step_action",
+                    "message": f"步骤 {i+1} 缺少操作描述",
+                    "field": f"steps[{i}].action"
+                })
+            if not step.get("expected"):
+                case_issues.append({
+                    "severity": "warning",
+                    "rule": "missing_step_expected",
+                    "message": f"步骤 {i+1} 缺少预期结果",
+                    "field": f"steps[{i}].expected"
+                })
+    
+    # 规则 6: 预期结果
+    for case_issues, expected_result in zip(issues, _field_column(test_cases, "expected_result")):
+        if len(expected_result) < 10:
+            case_issues.append(dict(_VAGUE_EXPECTED_RESULT_ISSUE))
+    
+    # 规则 7: 优先级
+    for case_issues, priority in zip(issues, _field_column(test_cases, "priority")):
+        if priority and priority not in VALID_PRIORITIES:
+            case_issues.append({
+                "severity": "warning",
+                "rule": "invalid_priority",
+                "message": f"优先级值无效: {priority}，应为 high/medium/low",
+                "field": "priority"
+            })
+    
+    # 规则 8: 测试类型
+    for case_issues, test_type in zip(issues, _field_column(test_cases, "type")):
+        if test_type and test_type not in VALID_TYPES:
+            case_issues.append({
+                "severity": "warning",
+                "rule": "invalid_type",
+                "message": f"测试类型无效: {test_type}，应为 functional/boundary/exception",
+                "field": "type"
+            })
+    
+    return issues
 
 
 class CheckQualityTool(BaseTool):
@@ -338,14 +724,29 @@ class CheckQualityTool(BaseTool):
     - 步骤可执行性
     - 预期结果明确性
     - 命名规范
+    
+    支持单个用例检查（execute）和批量检查（execute_batch）。
+    批量检查超过 offload_threshold 时在线程池中执行，
+    超过 process_pool_threshold 时拆分到共享进程池并行执行。
     """
     
-    def __init__(self):
-        """初始化质量检查工具。"""
+    cpu_bound = "thread"
+    offload_threshold = 1000
+    
+    def __init__(self, process_pool_threshold: int = 20000, chunk_size: int = 5000):
+        """
+        初始化质量检查工具。
+        
+        Args:
+            process_pool_threshold: 批量检查使用进程池的最小用例数
+            chunk_size: 进程池中每个任务处理的用例数
+        """
         super().__init__(
             name="check_quality",
             description="执行测试用例质量规则验证"
         )
+        self.process_pool_threshold = process_pool_threshold
+        self.chunk_size = chunk_size
     
     async def execute(
         self,
@@ -373,99 +774,7 @@ class CheckQualityTool(BaseTool):
             title = test_case.get("title", "")
             self.logger.info(f"检查测试用例质量: {title[:50]}...")
             
-            issues = []
-            
-            # 规则 1: 标题应该清晰且具体（至少 10 个字符）
-            if len(title) < 10:
-                issues.append({
-                    "severity": "warning",
-                    "rule": "title_length",
-                    "message": "标题过短，应该更具描述性（至少 10 个字符）",
-                    "field": "title"
-                })
-            
-            # 规则 2: 标题应该以"测试"开头
-            if not title.startswith("测试") and not title.lower().startswith("test"):
-                issues.append({
-                    "severity": "info",
-                    "rule": "title_format",
-                    "message": "建议标题以'测试'开头，更符合命名规范",
-                    "field": "title"
-                })
-            
-            # 规则 3: 应该有前置条件
-            preconditions = test_case.get("preconditions", "")
-            if not preconditions or len(preconditions) < 5:
-                issues.append({
-                    "severity": "error",
-                    "rule": "missing_preconditions",
-                    "message": "前置条件缺失或不完整，应明确测试前的准备工作",
-                    "field": "preconditions"
-                })
-            
-            # 规则 4: 应该至少有 2 个测试步骤
-            steps = test_case.get("steps", [])
-            if not isinstance(steps, list) or len(steps) < 2:
-                issues.append({
-                    "severity": "warning",
-                    "rule": "insufficient_steps",
-                    "message": "测试步骤过少，建议至少包含 2 个步骤",
-                    "field": "steps"
-                })
-            
-            # 规则 5: 每个步骤应该有操作和预期
-            for i, step in enumerate(steps):
-                if isinstance(step, dict):
-                    action = step.get("action", "")
-                    expected = step.get("expected", "")
-                    
-                    if not action:
-                        issues.append({
-                            "severity": "error",
-                            "rule": "missing_step_action",
-                            "message": f"步骤 {i+1} 缺少操作描述",
-                            "field": f"steps[{i}].action"
-                        })
-                    
-                    if not expected:
-                        issues.append({
-                            "severity": "warning",
-                            "rule": "missing_step_expected",
-                            "message": f"步骤 {i+1} 缺少预期结果",
-                            "field": f"steps[{i}].expected"
-                        })
-            
-            # 规则 6: 预期结果应该明确且可验证
-            expected_result = test_case.get("expected_result", "")
-            if not expected_result or len(expected_result) < 10:
-                issues.append({
-                    "severity": "error",
-                    "rule": "vague_expected_result",
-                    "message": "预期结果应该明确且可验证（至少 10 个字符）",
-                    "field": "expected_result"
-                })
-            
-            # 规则 7: 优先级应该是有效值
-            priority = test_case.get("priority", "")
-            valid_priorities = ["high", "medium", "low", "高", "中", "低"]
-            if priority and priority not in valid_priorities:
-                issues.append({
-                    "severity": "warning",
-                    "rule": "invalid_priority",
-                    "message": f"优先级值无效: {priority}，应为 high/medium/low",
-                    "field": "priority"
-                })
-            
-            # 规则 8: 测试类型应该是有效值
-            test_type = test_case.get("type", "")
-            valid_types = ["functional", "boundary", "exception", "功能", "边界", "异常"]
-            if test_type and test_type not in valid_types:
-                issues.append({
-                    "severity": "warning",
-                    "rule": "invalid_type",
-                    "message": f"测试类型无效: {test_type}，应为 functional/boundary/exception",
-                    "field": "type"
-                })
+            issues = check_cases_quality([test_case])[0]
             
             self.logger.info(f"质量检查完成，发现 {len(issues)} 个问题")
             return issues
@@ -477,3 +786,67 @@ class CheckQualityTool(BaseTool):
                 message=f"检查质量失败: {str(e)}",
                 details={"test_case_title": test_case.get("title", "Unknown"), "error": str(e)}
             )
+    
+    async def execute_batch(
+        self,
+        test_cases: List[Dict[str, Any]],
+        **kwargs
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量执行质量检查。
+        
+        Args:
+            test_cases: 测试用例列表
+            **kwargs: 其他参数
+            
+        Returns:
+            与输入一一对应的质量问题列表，问题结构与 execute 相同
+            
+        Raises:
+            ToolError: 如果检查失败
+        """
+        try:
+            if len(test_cases) >= self.process_pool_threshold:
+                results = await self._check_in_process_pool(test_cases)
+            else:
+                results = await self.run_cpu_bound(
+                    check_cases_quality, test_cases, size=len(test_cases)
+                )
+            
+            self.logger.info(
+                f"批量质量检查完成: {len(test_cases)} 个测试用例，"
+                f"{sum(1 for issues in results if issues)} 个存在问题"
+            )
+            return results
+        
+        except Exception as e:
+            self.logger.error(f"批量质量检查失败: {e}")
+            raise ToolError(
+                tool_name=self.name,
+                message=f"批量检查质量失败: {str(e)}",
+                details={"test_case_count": len(test_cases), "error": str(e)}
+            )
+    
+    async def _check_in_process_pool(
+        self,
+        test_cases: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        将用例分块后在共享进程池中并行检查。
+        
+        Args:
+            test_cases: 测试用例列表
+            
+        Returns:
+            与输入一一对应的质量问题列表
+        """
+        pool = get_pool("process")
+        chunks = [
+            test_cases[i:i + self.chunk_size]
+            for i in range(0, len(test_cases), self.chunk_size)
+        ]
+        chunk_results = await asyncio.gather(*[
+            pool.run(check_cases_quality, chunk)
+            for chunk in chunks
+        ])
+        return [issues for chunk in chunk_results for issues in chunk]
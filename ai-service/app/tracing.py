@@ -0,0 +1,399 @@
+"""
+链路追踪
+
+轻量级的 span 实现，数据模型与 OpenTelemetry 保持一致：
+- trace_id / span_id 使用 W3C Trace Context 格式，通过 traceparent 头向 Go 后端传播
+- 导出的 span 字段沿用 OTLP JSON 的命名（traceId、spanId、startTimeUnixNano 等），
+  可直接导入兼容 OTLP 的工具做离线分析
+
+当前 span 保存在 contextvar 中，随 asyncio.create_task 复制到子任务，
+因此并发执行的工作流阶段会挂在正确的父 span 下。
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# W3C traceparent: version-trace_id-span_id-flags
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """跨进程传播的 span 标识"""
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    def to_traceparent(self) -> str:
+        """转换为 W3C traceparent 头"""
+        flags = "01" if self.sampled else "00"
+        return f"00-{self.trace_id}-{self.span_id}-{flags}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    """
+    解析 W3C traceparent 头
+
+    Args:
+        header: traceparent 头的值
+
+    Returns:
+        SpanContext，头不存在或格式无效时返回 None
+    """
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id=trace_id, span_id=span_id, sampled=bool(int(flags, 16) & 0x01))
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128) or 1:032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64) or 1:016x}"
+
+
+@dataclass
+class Span:
+    """一次操作的耗时记录"""
+    name: str
+    context: SpanContext
+    parent_span_id: Optional[str] = None
+    kind: str = "INTERNAL"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    status_code: str = "UNSET"
+    status_message: str = ""
+    start_time_unix_nano: int = field(default_factory=time.time_ns)
+    end_time_unix_nano: Optional[int] = None
+
+    @property
+    def duration_seconds(self) -> Optional[float]:
+        """耗时（秒），未结束时返回 None"""
+        if self.end_time_unix_nano is None:
+            return None
+        return (self.end_time_unix_nano - self.start_time_unix_nano) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """设置属性"""
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        """记录事件（如流式响应的首个内容块）"""
+        self.events.append({
+            "name": name,
+            "timeUnixNano": time.time_ns(),
+            "attributes": dict(attributes or {}),
+        })
+
+    def record_exception(self, error: BaseException) -> None:
+        """记录异常并将状态设为 ERROR"""
+        self.add_event("exception", {
+            "exception.type": type(error).__name__,
+            "exception.message": str(error),
+        })
+        self.set_status("ERROR", str(error))
+
+    def set_status(self, code: str, message: str = "") -> None:
+        """设置状态（UNSET / OK / ERROR）"""
+        self.status_code = code
+        self.status_message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为 OTLP JSON 风格的字典"""
+        return {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind}",
+            "startTimeUnixNano": self.start_time_unix_nano,
+            "endTimeUnixNano": self.end_time_unix_nano,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": f"STATUS_CODE_{self.status_code}", "message": self.status_message},
+        }
+
+
+class SpanExporter:
+    """span 导出器基类"""
+
+    def export(self, span: Span) -> None:
+        """导出一个已结束的 span"""
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """释放资源"""
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """内存导出器（测试和进程内分析）"""
+
+    def __init__(self, max_spans: int = 10000):
+        """
+        Args:
+            max_spans: 最多保留的 span 数，超出后丢弃最早的
+        """
+        self.max_spans = max_spans
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+            if len(self._spans) > self.max_spans:
+                del self._spans[:len(self._spans) - self.max_spans]
+
+    def get_finished_spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        """获取已结束的 span（可按 trace_id 过滤）"""
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id is not None:
+            spans = [span for span in spans if span.context.trace_id == trace_id]
+        return spans
+
+    def clear(self) -> None:
+        """清空"""
+        with self._lock:
+            self._spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    """文件导出器，每行一个 OTLP JSON 风格的 span"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 输出文件路径（追加写入）
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span) -> None:
+        line = dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class Tracer:
+    """
+    追踪器
+
+    没有配置导出器时仍会创建 span（用于生成和传播 traceparent），但不会导出。
+    """
+
+    def __init__(self):
+        self._exporters: List[SpanExporter] = []
+
+    def add_exporter(self, exporter: SpanExporter) -> None:
+        """添加导出器"""
+        self._exporters.append(exporter)
+
+    def remove_exporter(self, exporter: SpanExporter) -> None:
+        """移除导出器"""
+        if exporter in self._exporters:
+            self._exporters.remove(exporter)
+
+    def shutdown(self) -> None:
+        """关闭并移除所有导出器"""
+        for exporter in self._exporters:
+            exporter.shutdown()
+        self._exporters.clear()
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        kind: str = "INTERNAL",
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[SpanContext] = None,
+        set_current: bool = True
+    ) -> Iterator[Span]:
+        """
+        创建 span 并设为当前 span
+
+        Args:
+            name: span 名称
+            kind: INTERNAL / SERVER / CLIENT
+            attributes: 初始属性
+            parent: 远程父 span（如来自请求头），默认使用当前 span
+            set_current: 是否设为当前 span；在异步生成器中跨 yield 使用时必须为 False，
+                因为每次迭代可能运行在不同的上下文中，无法还原 contextvar
+
+        Yields:
+            Span: 新建的 span；代码块抛出异常时记录为 ERROR 并继续抛出
+        """
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+
+        if parent is not None:
+            context = SpanContext(parent.trace_id, _new_span_id(), parent.sampled)
+            parent_span_id = parent.span_id
+        else:
+            context = SpanContext(_new_trace_id(), _new_span_id())
+            parent_span_id = None
+
+        span = Span(
+            name=name,
+            context=context,
+            parent_span_id=parent_span_id,
+            kind=kind,
+            attributes=dict(attributes or {}),
+        )
+        token = _current_span.set(span) if set_current else None
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            if token is not None:
+                _current_span.reset(token)
+            span.end_time_unix_nano = time.time_ns()
+            self._export(span)
+
+    def _export(self, span: Span) -> None:
+        if not span.context.sampled:
+            return
+        for exporter in self._exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.warning(f"导出 span 失败: {e}")
+
+
+# 全局追踪器
+tracer = Tracer()
+
+
+def current_span() -> Optional[Span]:
+    """获取当前 span"""
+    return _current_span.get()
+
+
+def trace_headers() -> Dict[str, str]:
+    """
+    生成向下游传播的追踪头
+
+    Returns:
+        包含 traceparent 的字典，没有当前 span 时返回空字典
+    """
+    span = _current_span.get()
+    if span is None:
+        return {}
+    return {"traceparent": span.context.to_traceparent()}
+
+
+async def _inject_trace_headers(request) -> None:
+    """httpx 请求钩子：注入当前 span 的 traceparent"""
+    request.headers.update(trace_headers())
+
+
+def httpx_event_hooks() -> Dict[str, List[Callable]]:
+    """
+    用于 httpx.AsyncClient(event_hooks=...) 的钩子，向 Go 后端传播追踪头
+
+    钩子在发起请求的任务中执行，能读取到调用方的当前 span。
+    """
+    return {"request": [_inject_trace_headers]}
+
+
+class TracingMiddleware:
+    """
+    ASGI 中间件：为每个 HTTP 请求创建 SERVER span
+
+    - 请求头中带有 traceparent 时延续调用方的 trace
+    - 响应头中返回 traceparent，便于调用方关联
+    - span 覆盖整个响应（包括流式响应）的发送过程
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        method = scope.get("method", "")
+        path = scope.get("path", "")
+
+        with tracer.start_span(
+            f"{method} {path}",
+            kind="SERVER",
+            attributes={"http.method": method, "http.target": path},
+            parent=parent
+        ) as span:
+            traceparent = span.context.to_traceparent().encode("latin-1")
+
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status("ERROR")
+                    message = {
+                        **message,
+                        "headers": list(message.get("headers") or []) + [(b"traceparent", traceparent)],
+                    }
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
+
+
+def configure_tracing(exporter: str = "none", file_path: str = "traces.jsonl") -> Optional[SpanExporter]:
+    """
+    根据配置安装导出器
+
+    Args:
+        exporter: none / memory / file
+        file_path: file 导出器的输出路径
+
+    Returns:
+        安装的导出器，none 时返回 None
+
+    Raises:
+        ValueError: 不支持的导出器类型
+    """
+    exporter = (exporter or "none").lower()
+    if exporter == "none":
+        return None
+    if exporter == "memory":
+        instance: SpanExporter = InMemorySpanExporter()
+    elif exporter == "file":
+        instance = FileSpanExporter(file_path)
+    else:
+        raise ValueError(f"不支持的追踪导出器: {exporter}")
+
+    tracer.add_exporter(instance)
+    logger.info(f"已启用链路追踪导出器: {exporter}")
+    return instance
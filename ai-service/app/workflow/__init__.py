@@ -2,20 +2,52 @@
 工作流模块
 
 Workflow 是工作流编排器，负责协调多个 Subagent 和 Tool 完成复杂业务流程。
+工作流类在首次访问时才导入所在子模块（见 app.lazy）。
 """
 
-from .base import BaseWorkflow, WorkflowError, WorkflowResult
-from .test_case_generation_workflow import TestCaseGenerationWorkflow
-from .impact_analysis_workflow import ImpactAnalysisWorkflow
-from .regression_recommendation_workflow import RegressionRecommendationWorkflow
-from .test_case_optimization_workflow import TestCaseOptimizationWorkflow
+from typing import TYPE_CHECKING
+
+from app.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .base import BaseWorkflow, WorkflowError, WorkflowResult
+    from .stage_graph import StageGraphExecutor, StageGraphResult, StageOutput, WorkflowStage
+    from .test_case_generation_workflow import TestCaseGenerationWorkflow
+    from .impact_analysis_workflow import ImpactAnalysisWorkflow
+    from .regression_recommendation_workflow import RegressionRecommendationWorkflow
+    from .test_case_optimization_workflow import TestCaseOptimizationWorkflow
+    from .batch_generation_workflow import BatchItemResult, BatchPlan, BatchTestCaseGenerationWorkflow
 
 __all__ = [
     'BaseWorkflow',
     'WorkflowError',
     'WorkflowResult',
+    'StageGraphExecutor',
+    'StageGraphResult',
+    'StageOutput',
+    'WorkflowStage',
     'TestCaseGenerationWorkflow',
     'ImpactAnalysisWorkflow',
     'RegressionRecommendationWorkflow',
     'TestCaseOptimizationWorkflow',
+    'BatchTestCaseGenerationWorkflow',
+    'BatchPlan',
+    'BatchItemResult',
 ]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'BaseWorkflow': '.base',
+    'WorkflowError': '.base',
+    'WorkflowResult': '.base',
+    'StageGraphExecutor': '.stage_graph',
+    'StageGraphResult': '.stage_graph',
+    'StageOutput': '.stage_graph',
+    'WorkflowStage': '.stage_graph',
+    'TestCaseGenerationWorkflow': '.test_case_generation_workflow',
+    'ImpactAnalysisWorkflow': '.impact_analysis_workflow',
+    'RegressionRecommendationWorkflow': '.regression_recommendation_workflow',
+    'TestCaseOptimizationWorkflow': '.test_case_optimization_workflow',
+    'BatchTestCaseGenerationWorkflow': '.batch_generation_workflow',
+    'BatchPlan': '.batch_generation_workflow',
+    'BatchItemResult': '.batch_generation_workflow',
+})
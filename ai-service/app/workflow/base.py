@@ -4,9 +4,16 @@
 定义所有 Workflow 的基础接口和数据结构。
 """
 
+import functools
+import inspect
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from ..tracing import tracer
+
+if TYPE_CHECKING:
+    from .stage_graph import StageGraphResult, WorkflowStage
 
 
 class WorkflowError(Exception):
@@ -32,8 +39,38 @@ class WorkflowResult:
         }
 
 
+def _trace_execute(execute):
+    """包装 execute，为每次执行创建追踪 span"""
+    @functools.wraps(execute)
+    async def wrapper(self, *args, **kwargs):
+        with tracer.start_span(f"workflow.{self.name}", attributes={"workflow.name": self.name}) as span:
+            result = await execute(self, *args, **kwargs)
+            if isinstance(result, WorkflowResult):
+                span.set_attribute("workflow.success", result.success)
+                if not result.success:
+                    span.set_status("ERROR", result.error or "")
+            return result
+
+    wrapper._traced = True
+    return wrapper
+
+
 class BaseWorkflow(ABC):
-    """工作流基类"""
+    """
+    工作流基类
+    
+    子类实现的 execute 会被自动包装，为每次执行创建追踪 span（见 app.tracing）。
+    """
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        execute = cls.__dict__.get('execute')
+        if (
+            execute is not None
+            and inspect.iscoroutinefunction(execute)
+            and not getattr(execute, '_traced', False)
+        ):
+            cls.execute = _trace_execute(execute)
     
     @abstractmethod
     async def execute(self, input_data: Any, context: Optional[Dict[str, Any]] = None) -> WorkflowResult:
@@ -63,3 +100,24 @@ class BaseWorkflow(ABC):
     def description(self) -> str:
         """工作流描述"""
         pass
+    
+    async def run_stages(
+        self,
+        stages: List['WorkflowStage'],
+        initial_state: Optional[Dict[str, Any]] = None
+    ) -> 'StageGraphResult':
+        """
+        以阶段图方式执行工作流步骤
+        
+        互不依赖的阶段会被并发执行，每个阶段的耗时记录在结果和运行指标中。
+        
+        Args:
+            stages: 阶段声明列表
+            initial_state: 初始状态
+            
+        Returns:
+            StageGraphResult: 阶段图执行结果
+        """
+        from .stage_graph import StageGraphExecutor
+        
+        return await StageGraphExecutor(stages, name=self.name).run(initial_state)
@@ -0,0 +1,294 @@
+"""
+批量测试用例生成工作流
+
+一次为同一项目的多条需求（如一个版本的 PRD 章节）生成测试用例：
+1. 跳过任务分类，所有需求直接走测试用例生成流程
+2. 统一检索：一次并发检索所有需求的历史 PRD 和用例，相同查询只检索一次，
+   多条需求命中的同一文档只保留一份，每条需求的上下文内不含重复文档
+3. 各需求的分析 / 设计 / 审查 LLM 调用共享一个自适应限流器（见 app.integration.rate_limiter），
+   限制全局并发，遇到 429 时收缩并发并暂停后重试
+4. 每条需求完成后立即产出结果，不等待整批结束
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple
+
+from .base import BaseWorkflow, WorkflowResult
+from .test_case_generation_workflow import TestCaseGenerationWorkflow
+from ..deadline import deadline_scope
+from ..integration.rate_limiter import AdaptiveRateLimiter, limiter_scope
+from ..progress import report_progress
+
+logger = logging.getLogger(__name__)
+
+
+def _document_key(document: Dict[str, Any]) -> Hashable:
+    """文档去重键：优先使用 id，没有 id 时使用标题和内容的摘要"""
+    if document.get('id') is not None:
+        return ('id', str(document['id']))
+    text = f"{document.get('title') or ''}\n{document.get('content') or ''}"
+    return ('content', hashlib.sha1(text.encode('utf-8')).hexdigest())
+
+
+def dedupe_documents(
+    results: List[Optional[List[Dict[str, Any]]]],
+    limit: int
+) -> Tuple[List[List[Dict[str, Any]]], int]:
+    """
+    对多个查询的检索结果去重
+
+    多个查询命中的同一文档共享同一个对象；每个查询的结果内去掉重复文档后保留前 limit 个。
+
+    Args:
+        results: 每个查询的检索结果（检索失败为 None）
+        limit: 每个查询保留的文档数
+
+    Returns:
+        (每个查询去重后的文档列表, 不同文档的总数)
+    """
+    pool: Dict[Hashable, Dict[str, Any]] = {}
+    deduped = []
+    for documents in results:
+        selected = []
+        seen = set()
+        for document in documents or []:
+            key = _document_key(document)
+            if key in seen:
+                continue
+            seen.add(key)
+            selected.append(pool.setdefault(key, document))
+            if len(selected) >= limit:
+                break
+        deduped.append(selected)
+    return deduped, len(pool)
+
+
+@dataclass
+class BatchItemResult:
+    """单条需求的生成结果"""
+    index: int
+    requirement: str
+    result: WorkflowResult
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'index': self.index, 'requirement': self.requirement, **self.result.to_dict()}
+
+
+@dataclass
+class BatchPlan:
+    """
+    批量生成计划（统一检索之后、LLM 调用之前）
+
+    Attributes:
+        requirements: 需求列表
+        contexts: 每条需求的工作流上下文（包含已检索的历史 PRD 和用例）
+        warnings: 每条需求的检索警告
+        retrieval: 检索统计
+        deadline: 整批的截止时间（time.monotonic() 时间戳），检索和生成共用，None 表示不限制
+    """
+    requirements: List[str]
+    contexts: List[Dict[str, Any]]
+    warnings: List[List[str]]
+    retrieval: Dict[str, Any] = field(default_factory=dict)
+    deadline: Optional[float] = None
+
+    def remaining_time(self) -> Optional[float]:
+        """距截止时间的剩余秒数（可能为负数），没有截止时间时返回 None"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+
+class BatchTestCaseGenerationWorkflow(BaseWorkflow):
+    """
+    批量测试用例生成工作流
+    """
+
+    def __init__(
+        self,
+        generation_workflow: TestCaseGenerationWorkflow,
+        max_concurrency: int = 4,
+        retrieval_concurrency: int = 8,
+        max_active_requirements: Optional[int] = None
+    ):
+        """
+        初始化工作流
+
+        Args:
+            generation_workflow: 单条需求的测试用例生成工作流
+            max_concurrency: LLM 调用的全局并发数
+            retrieval_concurrency: 统一检索的并发数
+            max_active_requirements: 同时处理的需求数（默认为 LLM 并发数的 2 倍）。
+                限制进行中的需求数可以让靠前的需求先完成，而不是所有需求一起推进、同时结束
+        """
+        self.generation_workflow = generation_workflow
+        self.max_concurrency = max_concurrency
+        self.retrieval_concurrency = retrieval_concurrency
+        self.max_active_requirements = max_active_requirements or max_concurrency * 2
+
+    @property
+    def name(self) -> str:
+        return "batch_test_case_generation"
+
+    @property
+    def description(self) -> str:
+        return "为多条需求批量生成测试用例"
+
+    async def prepare(
+        self,
+        requirements: List[str],
+        context: Dict[str, Any],
+        deadline: Optional[float] = None
+    ) -> BatchPlan:
+        """
+        统一检索所有需求的历史 PRD 和测试用例
+
+        Args:
+            requirements: 需求列表
+            context: 上下文信息，包含：
+                - project_id: 项目 ID（必需）
+                - historical_prd_limit: 每条需求的历史 PRD 数量（默认 5）
+                - historical_case_limit: 每条需求的历史用例数量（默认 5）
+                - timeout: 整批的超时时间（秒，可选，没有传入 deadline 时从现在起计算）
+            deadline: 整批的截止时间（time.monotonic() 时间戳，可选）。
+                调用方在收到请求时计算，排队、检索和生成共用同一个截止时间
+
+        Returns:
+            BatchPlan: 批量生成计划
+        """
+        if deadline is None and context.get('timeout') is not None:
+            deadline = time.monotonic() + context['timeout']
+
+        project_id = context['project_id']
+        prd_limit = context.get('historical_prd_limit', 5)
+        case_limit = context.get('historical_case_limit', 5)
+
+        # 相同的需求文本只检索一次
+        queries = list(dict.fromkeys(requirement.strip() for requirement in requirements))
+        semaphore = asyncio.Semaphore(self.retrieval_concurrency)
+        workflow = self.generation_workflow
+
+        async def search(tool, query: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+            async with semaphore:
+                try:
+                    return await tool.execute(query=query, project_id=project_id, limit=limit)
+                except Exception as e:
+                    logger.warning(f"批量检索失败 ({tool.name}): {e}")
+                    return None
+
+        start = time.perf_counter()
+        remaining = None if deadline is None else deadline - time.monotonic()
+        with deadline_scope(remaining):
+            prd_results, case_results = await asyncio.gather(
+                asyncio.gather(*(search(workflow.search_prd_tool, query, prd_limit) for query in queries)),
+                asyncio.gather(*(search(workflow.search_testcase_tool, query, case_limit) for query in queries)),
+            )
+        prds, unique_prds = dedupe_documents(list(prd_results), prd_limit)
+        cases, unique_cases = dedupe_documents(list(case_results), case_limit)
+        by_query = {query: index for index, query in enumerate(queries)}
+
+        contexts, warnings = [], []
+        for requirement in requirements:
+            index = by_query[requirement.strip()]
+            item_warnings = []
+            if prd_results[index] is None:
+                item_warnings.append("无法检索历史 PRD，将继续执行")
+            if case_results[index] is None:
+                item_warnings.append("无法检索历史测试用例，将继续执行")
+            contexts.append({
+                **context,
+                'historical_prds': prds[index],
+                'historical_cases': cases[index],
+            })
+            warnings.append(item_warnings)
+
+        retrieval = {
+            'queries': len(queries),
+            'prd_hits': sum(len(result or []) for result in prd_results),
+            'unique_prds': unique_prds,
+            'case_hits': sum(len(result or []) for result in case_results),
+            'unique_cases': unique_cases,
+            'duration_seconds': round(time.perf_counter() - start, 4),
+        }
+        logger.info(f"批量检索完成: {retrieval}")
+        report_progress("retrieval_finished", **retrieval)
+        return BatchPlan(list(requirements), contexts, warnings, retrieval, deadline)
+
+    async def stream(self, plan: BatchPlan) -> AsyncIterator[BatchItemResult]:
+        """
+        按完成顺序产出每条需求的生成结果
+
+        生成只能使用计划截止时间前的剩余时间，整批耗时不会超过一次超时时间。
+
+        Args:
+            plan: prepare 返回的批量生成计划
+
+        Yields:
+            BatchItemResult: 单条需求的生成结果
+        """
+        limiter = AdaptiveRateLimiter(max_concurrency=self.max_concurrency)
+        active = asyncio.Semaphore(self.max_active_requirements)
+
+        # 任务在创建时复制当前上下文，截止时间和限流器对所有需求生效；
+        # 作用域不跨越 yield，调用方在其他任务中迭代时也不受影响
+        with deadline_scope(plan.remaining_time()), limiter_scope(limiter):
+            tasks = [
+                asyncio.create_task(self._generate_one(index, plan, active))
+                for index in range(len(plan.requirements))
+            ]
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if limiter.rate_limited:
+                logger.warning(f"批量生成期间 LLM 调用被限流 {limiter.rate_limited} 次")
+
+    async def execute(self, requirements: List[str], context: Optional[Dict[str, Any]] = None) -> WorkflowResult:
+        """
+        执行批量生成并汇总结果
+
+        Args:
+            requirements: 需求列表
+            context: 上下文信息（见 prepare）
+
+        Returns:
+            WorkflowResult: data.results 为按需求顺序排列的结果
+        """
+        if not context or 'project_id' not in context:
+            return WorkflowResult(success=False, error="缺少必需的 project_id 参数")
+        if not requirements:
+            return WorkflowResult(success=False, error="需求列表为空")
+
+        plan = await self.prepare(requirements, context)
+        items = [item async for item in self.stream(plan)]
+        items.sort(key=lambda item: item.index)
+        succeeded = sum(1 for item in items if item.result.success)
+        return WorkflowResult(
+            success=succeeded > 0,
+            data={'results': [item.to_dict() for item in items]},
+            error=None if succeeded else "所有需求均生成失败",
+            metadata={
+                'total': len(items),
+                'succeeded': succeeded,
+                'failed': len(items) - succeeded,
+                'retrieval': plan.retrieval,
+            }
+        )
+
+    async def _generate_one(self, index: int, plan: BatchPlan, active: asyncio.Semaphore) -> BatchItemResult:
+        requirement = plan.requirements[index]
+        async with active:
+            report_progress("requirement_started", index=index)
+            result = await self.generation_workflow.execute(requirement, plan.contexts[index])
+        if plan.warnings[index]:
+            result.metadata['warnings'] = plan.warnings[index] + result.metadata.get('warnings', [])
+        report_progress("requirement_finished", index=index, success=result.success)
+        return BatchItemResult(index, requirement, result)
@@ -5,10 +5,11 @@
 """
 
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from .base import BaseWorkflow, WorkflowError, WorkflowResult
-from ..agent.impact_analysis_agent import ImpactAnalysisAgent
+from .stage_graph import WorkflowStage
+from ..agent.impact_analysis_agent import ImpactAnalysisAgent, ImpactReport
 from ..tool.retrieval_tools import SearchPRDTool, SearchTestCaseTool, GetRelatedCasesTool
 
 logger = logging.getLogger(__name__)
@@ -23,6 +24,8 @@ class ImpactAnalysisWorkflow(BaseWorkflow):
     2. 获取相关的测试用例
     3. 调用 ImpactAnalysisAgent 分析影响
     4. 返回影响报告
+    
+    步骤 1 和步骤 2 互不依赖，由阶段图并发执行。
     """
     
     def __init__(
@@ -81,66 +84,59 @@ class ImpactAnalysisWorkflow(BaseWorkflow):
         project_id = context['project_id']
         warnings = []
         
+        stages = [
+            WorkflowStage(
+                name='retrieve_prds',
+                func=self._retrieve_prds,
+                inputs=['change_description', 'project_id', 'prd_limit'],
+                output='related_prds',
+                required=False,
+                default_factory=lambda state: [],
+                warning="无法检索历史 PRD，将继续执行"
+            ),
+            WorkflowStage(
+                name='retrieve_cases',
+                func=self._retrieve_cases,
+                inputs=['change_description', 'project_id', 'case_limit'],
+                output='existing_test_cases',
+                required=False,
+                default_factory=lambda state: [],
+                warning="无法检索测试用例，将继续执行"
+            ),
+            WorkflowStage(
+                name='impact_analysis',
+                func=self._analyze_impact,
+                inputs=['change_description', 'related_prds', 'existing_test_cases'],
+                output='impact_report'
+            ),
+        ]
+        
         try:
-            # 步骤 1: 检索相关的历史 PRD
-            logger.info(f"步骤 1: 检索相关 PRD (project_id={project_id})")
-            related_prds = []
-            
-            try:
-                prd_limit = context.get('prd_limit', 5)
-                related_prds = await self.search_prd_tool.execute(
-                    query=change_description,
-                    project_id=project_id,
-                    limit=prd_limit
-                )
-                logger.info(f"检索到 {len(related_prds)} 个相关 PRD")
-            except Exception as e:
-                logger.warning(f"检索历史 PRD 失败: {e}")
-                warnings.append("无法检索历史 PRD，将继续执行")
+            graph = await self.run_stages(stages, {
+                'change_description': change_description,
+                'project_id': project_id,
+                'prd_limit': context.get('prd_limit', 5),
+                'case_limit': context.get('case_limit', 10),
+            })
+            warnings = graph.warnings
+            related_prds = graph.state.get('related_prds', [])
+            existing_test_cases = graph.state.get('existing_test_cases', [])
             
-            # 步骤 2: 获取相关的测试用例
-            logger.info("步骤 2: 获取相关测试用例")
-            existing_test_cases = []
-            
-            try:
-                case_limit = context.get('case_limit', 10)
-                # 基于变更描述搜索相关测试用例
-                existing_test_cases = await self.search_testcase_tool.execute(
-                    query=change_description,
-                    project_id=project_id,
-                    limit=case_limit
-                )
-                logger.info(f"检索到 {len(existing_test_cases)} 个相关测试用例")
-            except Exception as e:
-                logger.warning(f"检索测试用例失败: {e}")
-                warnings.append("无法检索测试用例，将继续执行")
-            
-            # 步骤 3: 调用 ImpactAnalysisAgent 分析影响
-            logger.info("步骤 3: 分析变更影响")
-            try:
-                impact_report = await self.impact_agent.analyze_impact(
-                    change_description=change_description,
-                    related_prds=related_prds,
-                    existing_test_cases=existing_test_cases
-                )
-                logger.info(
-                    f"影响分析完成: 风险等级={impact_report.risk_level}, "
-                    f"受影响模块数={len(impact_report.affected_modules)}, "
-                    f"受影响测试用例数={len(impact_report.affected_test_cases)}"
-                )
-            except Exception as e:
-                logger.error(f"影响分析失败: {e}")
+            if not graph.success:
                 return WorkflowResult(
                     success=False,
-                    error=f"影响分析失败: {str(e)}",
+                    error=f"影响分析失败: {str(graph.error)}",
                     metadata={
-                        'step': 'impact_analysis',
+                        'step': graph.failed_stage,
                         'warnings': warnings,
                         'related_prds_count': len(related_prds),
-                        'existing_cases_count': len(existing_test_cases)
+                        'existing_cases_count': len(existing_test_cases),
+                        **graph.metadata()
                     }
                 )
             
+            impact_report = graph.state['impact_report']
+            
             # 步骤 4: 返回影响报告
             return WorkflowResult(
                 success=True,
@@ -156,7 +152,8 @@ class ImpactAnalysisWorkflow(BaseWorkflow):
                     'affected_cases_count': len(impact_report.affected_test_cases),
                     'warnings': warnings,
                     'related_prds_count': len(related_prds),
-                    'existing_cases_count': len(existing_test_cases)
+                    'existing_cases_count': len(existing_test_cases),
+                    **graph.metadata()
                 }
             )
             
@@ -167,3 +164,55 @@ class ImpactAnalysisWorkflow(BaseWorkflow):
                 error=f"工作流执行失败: {str(e)}",
                 metadata={'warnings': warnings}
             )
+    
+    async def _retrieve_prds(
+        self,
+        change_description: str,
+        project_id: Any,
+        prd_limit: int
+    ) -> List[Dict[str, Any]]:
+        """步骤 1: 检索相关的历史 PRD"""
+        logger.info(f"步骤 1: 检索相关 PRD (project_id={project_id})")
+        related_prds = await self.search_prd_tool.execute(
+            query=change_description,
+            project_id=project_id,
+            limit=prd_limit
+        )
+        logger.info(f"检索到 {len(related_prds)} 个相关 PRD")
+        return related_prds
+    
+    async def _retrieve_cases(
+        self,
+        change_description: str,
+        project_id: Any,
+        case_limit: int
+    ) -> List[Dict[str, Any]]:
+        """步骤 2: 基于变更描述搜索相关测试用例"""
+        logger.info("步骤 2: 获取相关测试用例")
+        existing_test_cases = await self.search_testcase_tool.execute(
+            query=change_description,
+            project_id=project_id,
+            limit=case_limit
+        )
+        logger.info(f"检索到 {len(existing_test_cases)} 个相关测试用例")
+        return existing_test_cases
+    
+    async def _analyze_impact(
+        self,
+        change_description: str,
+        related_prds: List[Dict[str, Any]],
+        existing_test_cases: List[Dict[str, Any]]
+    ) -> ImpactReport:
+        """步骤 3: 调用 ImpactAnalysisAgent 分析影响"""
+        logger.info("步骤 3: 分析变更影响")
+        impact_report = await self.impact_agent.analyze_impact(
+            change_description=change_description,
+            related_prds=related_prds,
+            existing_test_cases=existing_test_cases
+        )
+        logger.info(
+            f"影响分析完成: 风险等级={impact_report.risk_level}, "
+            f"受影响模块数={len(impact_report.affected_modules)}, "
+            f"受影响测试用例数={len(impact_report.affected_test_cases)}"
+        )
+        return impact_report
@@ -5,36 +5,62 @@
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from .base import BaseWorkflow, WorkflowError, WorkflowResult
+from .stage_graph import WorkflowStage
+from ..execution_history import annotate_history, get_project_stats, prioritize
+from ..impact_graph import (
+    DEFAULT_MAX_DEPTH,
+    ModuleGraph,
+    ModuleImpact,
+    get_project_graph,
+    select_cover,
+)
+from ..keyword_index import case_module, get_project_index, recall_documents
+from ..rerank import Reranker
 from ..tool.retrieval_tools import SearchTestCaseTool
 
 logger = logging.getLogger(__name__)
 
+# 每个变更模块从项目关键词索引本地召回的用例数
+LOCAL_RECALL_LIMIT = 20
+# 除变更模块外，最多额外检索的受影响下游模块数（按影响分从高到低）
+MAX_DOWNSTREAM_MODULES = 8
+# 推荐结果的排序方式：relevance 按融合分数，apfd 按执行历史推算的单位时间期望发现故障数
+PRIORITIZATION_MODES = ('relevance', 'apfd')
+
 
 class RegressionRecommendationWorkflow(BaseWorkflow):
     """
     回归测试推荐工作流
     
     工作流程：
-    1. 获取变更的模块列表
-    2. 检索相关的测试用例
-    3. 根据优先级和风险排序
-    4. 返回推荐的测试用例列表
+    1. 获取变更的模块列表，在模块依赖图上计算影响范围（见 app/impact_graph.py）
+    2. 检索影响范围内各模块的测试用例（Go 后端向量检索 + 项目关键词索引本地召回），
+       丢弃所属模块不在影响范围内的结果
+    3. 本地重排（BM25 文本相关度、相似度分数、优先级、新鲜度的加权融合）
+    4. 候选超过推荐数量或指定了时间预算时，用贪心加权集合覆盖选出覆盖影响范围的最小用例集合
+       （有执行历史的用例按历史平均时长计算成本，见 app/execution_history.py）
+    5. 返回推荐的测试用例列表（可按 APFD 风格的优先级排序）
+    
+    各模块的检索阶段由阶段图并发执行。
     """
     
     def __init__(
         self,
-        search_testcase_tool: SearchTestCaseTool
+        search_testcase_tool: SearchTestCaseTool,
+        reranker: Optional[Reranker] = None
     ):
         """
         初始化工作流
         
         Args:
             search_testcase_tool: 测试用例搜索工具
+            reranker: 本地重排器（默认使用默认权重）
         """
         self.search_testcase_tool = search_testcase_tool
+        self.reranker = reranker or Reranker()
     
     @property
     def name(self) -> str:
@@ -61,6 +87,11 @@ class RegressionRecommendationWorkflow(BaseWorkflow):
                 - project_id: 项目 ID（必需）
                 - limit: 推荐数量限制（默认 50）
                 - priority_filter: 优先级过滤（可选，如 'P0', 'P1'）
+                - time_budget: 回归执行时长预算（分钟，可选）
+                - failure_history: 历史执行中每次失败的模块列表（可选，补充项目依赖图的共同失败数据）
+                - module_dependencies: 显式模块依赖（可选，元素为 {'upstream', 'downstream', 'weight'}）
+                - impact_depth: 影响传播的最大层数（默认 2）
+                - prioritization: 排序方式，relevance（默认，按融合分数）或 apfd（按单位时间期望发现故障数）
                 
         Returns:
             WorkflowResult: 包含推荐的测试用例列表和元数据
@@ -81,6 +112,13 @@ class RegressionRecommendationWorkflow(BaseWorkflow):
         changed_modules = version_info['changed_modules']
         limit = context.get('limit', 50)
         priority_filter = context.get('priority_filter')
+        time_budget = context.get('time_budget')
+        prioritization = context.get('prioritization') or 'relevance'
+        if prioritization not in PRIORITIZATION_MODES:
+            return WorkflowResult(
+                success=False,
+                error=f"不支持的排序方式: {prioritization}"
+            )
         
         warnings = []
         
@@ -104,40 +142,80 @@ class RegressionRecommendationWorkflow(BaseWorkflow):
                     }
                 )
             
-            # 步骤 2: 检索相关的测试用例
+            # 先加载执行统计：从快照加载时会把历史共同失败数据写回项目依赖图
+            stats = get_project_stats(project_id)
+            impacts = self._impact_scope(changed_modules, project_id, context)
+            search_modules = self._search_modules(impacts)
+            logger.info(f"影响范围: {len(impacts)} 个模块，检索 {len(search_modules)} 个模块")
+            
+            # 步骤 2: 检索相关的测试用例（各模块并发检索）
             logger.info("步骤 2: 检索相关测试用例")
-            candidate_cases = []
-            failed_modules = []
+            module_keys = [f'module_cases_{i}' for i in range(len(search_modules))]
+            stages = [
+                WorkflowStage(
+                    name=f'search_module_{i}',
+                    func=self._make_module_search(
+                        module, version_info.get('change_description'), project_id, priority_filter, impacts
+                    ),
+                    output=key,
+                    required=False,
+                    default_factory=lambda state: []
+                )
+                for i, (module, key) in enumerate(zip(search_modules, module_keys))
+            ]
+            stages.append(WorkflowStage(
+                name='local_recall',
+                func=self._make_local_recall(search_modules, project_id, priority_filter, impacts),
+                output='local_cases',
+                required=False,
+                default_factory=lambda state: []
+            ))
+            # 后端结果在前：同一用例优先保留带相似度分数和全文的检索结果
+            stages.append(WorkflowStage(
+                name='deduplicate',
+                func=self._deduplicate_stage,
+                inputs=module_keys + ['local_cases'],
+                output='unique_cases'
+            ))
+            stages.append(WorkflowStage(
+                name='rank',
+                func=self._make_rank_stage(self._ranking_query(version_info), project_id),
+                inputs=['unique_cases'],
+                output='ranked_cases'
+            ))
             
-            for module in changed_modules:
-                try:
-                    # 为每个模块搜索测试用例
-                    module_cases = await self.search_testcase_tool.execute(
-                        query=f"模块:{module}",
-                        project_id=project_id,
-                        limit=20,  # 每个模块最多 20 个
-                        priority=priority_filter
-                    )
-                    candidate_cases.extend(module_cases)
-                    logger.info(f"模块 '{module}' 找到 {len(module_cases)} 个测试用例")
-                except Exception as e:
-                    logger.warning(f"检索模块 '{module}' 的测试用例失败: {e}")
-                    failed_modules.append(module)
+            graph = await self.run_stages(stages)
+            if not graph.success:
+                raise graph.error
             
+            failed_modules = [
+                module for i, module in enumerate(search_modules)
+                if f'search_module_{i}' in graph.errors
+            ]
             if failed_modules:
                 warnings.append(f"部分模块检索失败: {', '.join(failed_modules)}")
             
-            # 步骤 3: 去重（基于测试用例 ID）
-            logger.info("步骤 3: 去重测试用例")
-            unique_cases = self._deduplicate_cases(candidate_cases)
-            logger.info(f"去重后剩余 {len(unique_cases)} 个测试用例")
-            
-            # 步骤 4: 根据优先级和风险排序
-            logger.info("步骤 4: 排序测试用例")
-            ranked_cases = self._rank_cases(unique_cases)
+            candidate_count = sum(len(graph.state[key]) for key in module_keys)
+            unique_cases = graph.state['unique_cases']
+            ranked_cases = graph.state['ranked_cases']
+            if len(stats) or prioritization == 'apfd':
+                ranked_cases = annotate_history(ranked_cases, stats)
             
-            # 步骤 5: 限制推荐数量
-            recommended_cases = ranked_cases[:limit]
+            # 步骤 5: 在数量 / 时间预算内选出覆盖影响范围的用例
+            selection_info = None
+            if len(ranked_cases) > limit or time_budget is not None:
+                selection = select_cover(ranked_cases, impacts, max_cases=limit, time_budget=time_budget)
+                recommended_cases = selection.cases
+                selection_info = {
+                    'covered_weight': selection.covered_weight,
+                    'total_weight': selection.total_weight,
+                    'estimated_minutes': selection.minutes,
+                    'time_budget': time_budget,
+                }
+            else:
+                recommended_cases = ranked_cases
+            if prioritization == 'apfd':
+                recommended_cases = prioritize(recommended_cases, stats)
             logger.info(f"推荐 {len(recommended_cases)} 个测试用例（限制: {limit}）")
             
             # 返回结果
@@ -149,12 +227,17 @@ class RegressionRecommendationWorkflow(BaseWorkflow):
                     'ranking_criteria': self._get_ranking_criteria()
                 },
                 metadata={
-                    'total_candidates': len(candidate_cases),
+                    'total_candidates': candidate_count,
+                    'local_candidates': len(graph.state['local_cases']),
                     'unique_candidates': len(unique_cases),
                     'recommended_count': len(recommended_cases),
                     'changed_modules_count': len(changed_modules),
                     'changed_modules': changed_modules,
-                    'warnings': warnings
+                    'impacted_modules': [impact.to_dict() for impact in impacts.values()],
+                    'selection': selection_info,
+                    'prioritization': prioritization,
+                    'warnings': warnings,
+                    **graph.metadata()
                 }
             )
             
@@ -166,6 +249,182 @@ class RegressionRecommendationWorkflow(BaseWorkflow):
                 metadata={'warnings': warnings}
             )
     
+    @staticmethod
+    def _impact_scope(
+        changed_modules: List[str],
+        project_id: Any,
+        context: Dict[str, Any]
+    ) -> Dict[str, ModuleImpact]:
+        """
+        计算变更的影响范围
+        
+        使用项目依赖图；上下文带有 failure_history 或 module_dependencies 时在副本上叠加，
+        不写回项目图。
+        
+        Args:
+            changed_modules: 变更模块
+            project_id: 项目 ID
+            context: 工作流上下文
+            
+        Returns:
+            模块 -> 影响（变更模块在前，其余按影响分降序）
+        """
+        graph: ModuleGraph = get_project_graph(project_id)
+        failure_history = context.get('failure_history') or []
+        dependencies = context.get('module_dependencies') or []
+        if failure_history or dependencies:
+            graph = graph.copy()
+            for failed in failure_history:
+                graph.add_failure_run(failed)
+            for dependency in dependencies:
+                graph.add_dependency(
+                    dependency.get('upstream'),
+                    dependency.get('downstream'),
+                    dependency.get('weight', 1.0)
+                )
+        impacts = graph.impact(
+            [str(module) for module in changed_modules],
+            max_depth=context.get('impact_depth', DEFAULT_MAX_DEPTH)
+        )
+        return dict(sorted(impacts.items(), key=lambda item: (item[1].depth > 0, -item[1].score)))
+    
+    @staticmethod
+    def _search_modules(impacts: Dict[str, ModuleImpact]) -> List[str]:
+        """需要检索的模块：全部变更模块和影响分最高的若干下游模块"""
+        changed = [module for module, impact in impacts.items() if impact.depth == 0]
+        downstream = [module for module, impact in impacts.items() if impact.depth > 0]
+        return changed + downstream[:MAX_DOWNSTREAM_MODULES]
+    
+    @staticmethod
+    def _scope_cases(
+        cases: List[Dict[str, Any]],
+        module: str,
+        impacts: Dict[str, ModuleImpact]
+    ) -> List[Dict[str, Any]]:
+        """
+        按影响范围过滤检索结果，并标注用例计入的影响模块和影响分
+        
+        Args:
+            cases: 检索到的用例
+            module: 检索时使用的模块（用例没有模块信息时计入该模块）
+            impacts: 影响范围
+            
+        Returns:
+            所属模块在影响范围内的用例副本
+        """
+        scoped = []
+        for case in cases:
+            owner = case_module(case)
+            owner = str(owner) if owner else module
+            impact = impacts.get(owner)
+            if impact is None:
+                continue
+            scoped.append({**case, 'impact_module': owner, 'impact_score': round(impact.score, 4)})
+        return scoped
+    
+    def _make_module_search(
+        self,
+        module: str,
+        change_description: Optional[str],
+        project_id: Any,
+        priority_filter: Optional[str],
+        impacts: Dict[str, ModuleImpact]
+    ) -> Callable[[], Awaitable[List[Dict[str, Any]]]]:
+        """
+        创建单个模块的检索阶段函数
+        
+        后端按模块名称过滤，在模块内用变更描述做语义检索（没有变更描述时用模块名称）。
+        
+        Args:
+            module: 模块名称
+            change_description: 版本的变更描述
+            project_id: 项目 ID
+            priority_filter: 优先级过滤
+            impacts: 影响范围
+            
+        Returns:
+            检索该模块测试用例的异步函数
+        """
+        async def search_module() -> List[Dict[str, Any]]:
+            try:
+                module_cases = await self.search_testcase_tool.execute(
+                    query=str(change_description or module),
+                    project_id=project_id,
+                    limit=20,  # 每个模块最多 20 个
+                    priority=priority_filter,
+                    module=module
+                )
+            except Exception as e:
+                logger.warning(f"检索模块 '{module}' 的测试用例失败: {e}")
+                raise
+            logger.info(f"模块 '{module}' 找到 {len(module_cases)} 个测试用例")
+            return self._scope_cases(module_cases, module, impacts)
+        
+        return search_module
+    
+    def _make_local_recall(
+        self,
+        modules: List[str],
+        project_id: Any,
+        priority_filter: Optional[str],
+        impacts: Dict[str, ModuleImpact]
+    ) -> Callable[[], Awaitable[List[Dict[str, Any]]]]:
+        """
+        创建本地召回阶段函数
+        
+        Args:
+            modules: 需要检索的模块列表
+            project_id: 项目 ID
+            priority_filter: 优先级过滤
+            impacts: 影响范围
+            
+        Returns:
+            从项目关键词索引召回各模块测试用例的异步函数
+        """
+        async def local_recall() -> List[Dict[str, Any]]:
+            index = get_project_index(project_id)
+            cases = []
+            for module in modules:
+                recalled = recall_documents(index, str(module), limit=LOCAL_RECALL_LIMIT)
+                for case in self._scope_cases(recalled, str(module), impacts):
+                    priority = case.get('priority')
+                    if priority_filter and str(priority or '').lower() != priority_filter.lower():
+                        continue
+                    cases.append(case)
+            logger.info(f"本地关键词索引召回 {len(cases)} 个测试用例")
+            return cases
+        
+        return local_recall
+    
+    async def _deduplicate_stage(self, **module_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """步骤 3: 合并各模块的检索结果并去重"""
+        logger.info("步骤 3: 去重测试用例")
+        candidate_cases = [case for cases in module_cases.values() for case in cases]
+        unique_cases = self._deduplicate_cases(candidate_cases)
+        logger.info(f"去重后剩余 {len(unique_cases)} 个测试用例")
+        return unique_cases
+    
+    def _make_rank_stage(
+        self,
+        query: str,
+        project_id: Any
+    ) -> Callable[..., Awaitable[List[Dict[str, Any]]]]:
+        """创建重排阶段函数（返回全部候选，数量限制由后续的集合覆盖处理）"""
+        async def rank_stage(unique_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            """步骤 4: 本地重排"""
+            logger.info("步骤 4: 排序测试用例")
+            return self._rank_cases(unique_cases, query=query, project_id=project_id)
+        
+        return rank_stage
+    
+    @staticmethod
+    def _ranking_query(version_info: Dict[str, Any]) -> str:
+        """重排使用的查询文本：变更模块和变更描述"""
+        parts = [str(module) for module in version_info.get('changed_modules') or []]
+        if version_info.get('change_description'):
+            parts.append(str(version_info['change_description']))
+        return "\n".join(parts)
+    
     def _deduplicate_cases(self, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         去重测试用例（基于 ID）
@@ -187,48 +446,30 @@ class RegressionRecommendationWorkflow(BaseWorkflow):
         
         return unique_cases
     
-    def _rank_cases(self, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _rank_cases(
+        self,
+        cases: List[Dict[str, Any]],
+        query: str = "",
+        project_id: Any = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
-        根据优先级和风险排序测试用例
+        按融合分数排序测试用例
         
-        排序规则：
-        1. 优先级：P0 > P1 > P2 > P3
-        2. 相同优先级按分数（score）降序
+        融合分数由 BM25 文本相关度（项目倒排索引）、相似度分数（score）、
+        优先级（P0 > P1 > P2 > P3）和新鲜度加权得到，见 app/rerank.py。
         
         Args:
             cases: 测试用例列表
+            query: 查询文本（变更模块和变更描述）
+            project_id: 项目 ID（使用该项目的缓存索引，None 时使用临时索引）
+            limit: 只返回前 limit 个
             
         Returns:
-            排序后的测试用例列表
-        """
-        # 定义优先级权重
-        priority_weights = {
-            'P0': 4,
-            'P1': 3,
-            'P2': 2,
-            'P3': 1,
-            'p0': 4,
-            'p1': 3,
-            'p2': 2,
-            'p3': 3,
-        }
-        
-        def get_sort_key(case: Dict[str, Any]) -> tuple:
-            """获取排序键"""
-            # 从 metadata 中获取优先级
-            priority = case.get('metadata', {}).get('priority', 'P3')
-            priority_weight = priority_weights.get(priority, 0)
-            
-            # 获取相似度分数
-            score = case.get('score', 0.0)
-            
-            # 返回排序键：优先级权重（降序），分数（降序）
-            return (-priority_weight, -score)
-        
-        # 排序
-        sorted_cases = sorted(cases, key=get_sort_key)
-        
-        return sorted_cases
+            排序后的测试用例列表（每个用例带 rerank_score）
+        """
+        index = get_project_index(project_id) if project_id is not None else None
+        return self.reranker.rerank(query, cases, index=index, limit=limit)
     
     def _get_ranking_criteria(self) -> Dict[str, Any]:
         """
@@ -237,8 +478,17 @@ class RegressionRecommendationWorkflow(BaseWorkflow):
         Returns:
             排名标准字典
         """
+        weights = self.reranker.weights
         return {
-            'primary': '优先级（P0 > P1 > P2 > P3）',
-            'secondary': '相似度分数（降序）',
+            'primary': '融合分数：BM25 文本相关度、相似度分数、优先级（P0 > P1 > P2 > P3）、新鲜度加权',
+            'secondary': '融合分数相同时保持相似度分数（检索结果）的顺序',
+            'weights': {
+                'bm25': weights.bm25,
+                'vector': weights.vector,
+                'priority': weights.priority,
+                'recency': weights.recency,
+            },
+            'selection': '候选超过推荐数量或指定时间预算时，按影响分加权的贪心集合覆盖选出覆盖影响模块、用例类型、关联 PRD 和 P0 用例的最小集合',
+            'prioritization': 'apfd 模式下按执行历史推算的失败概率 / 平均执行时长降序排列，尽早发现故障',
             'description': '优先推荐高优先级和高相关性的测试用例'
         }
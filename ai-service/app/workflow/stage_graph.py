@@ -0,0 +1,347 @@
+"""
+阶段图执行器
+
+以声明式的方式描述工作流步骤（阶段）及其输入/输出依赖，
+由执行器自动并发运行相互独立的阶段。
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .base import WorkflowError
+from ..deadline import DeadlineExceeded, check_deadline, clamp_timeout, remaining_time
+from ..metrics import STAGE_DURATION
+from ..progress import report_progress
+from ..tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StageOutput:
+    """阶段输出（带警告信息）"""
+    value: Any
+    warnings: List[str] = field(default_factory=list)
+
+
+@dataclass
+class WorkflowStage:
+    """
+    工作流阶段
+
+    Attributes:
+        name: 阶段名称（在同一个图内唯一）
+        func: 异步函数，以 inputs 中的键作为关键字参数调用
+        inputs: 依赖的状态键（来自初始状态或其他阶段的输出）
+        output: 输出写入的状态键（默认与阶段名称相同）
+        required: 是否必需；必需阶段失败会终止整个图
+        timeout: 单次执行的超时时间（秒）
+        retries: 失败后的重试次数
+        retry_delay: 重试前的等待时间（秒，按指数递增）
+        default: 可选阶段失败时写入的默认值
+        default_factory: 可选阶段失败时根据当前状态生成默认值
+        warning: 可选阶段失败时记录的警告（可包含 {error} 占位符）
+        condition: 执行条件，返回 False 时跳过阶段并写入默认值
+    """
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    inputs: List[str] = field(default_factory=list)
+    output: Optional[str] = None
+    required: bool = True
+    timeout: Optional[float] = None
+    retries: int = 0
+    retry_delay: float = 0.0
+    default: Any = None
+    default_factory: Optional[Callable[[Dict[str, Any]], Any]] = None
+    warning: Optional[str] = None
+    condition: Optional[Callable[[Dict[str, Any]], bool]] = None
+
+    @property
+    def output_key(self) -> str:
+        """输出状态键"""
+        return self.output or self.name
+
+    def default_value(self, state: Dict[str, Any]) -> Any:
+        """生成默认输出值"""
+        if self.default_factory is not None:
+            return self.default_factory(state)
+        return self.default
+
+
+@dataclass
+class StageGraphResult:
+    """阶段图执行结果"""
+    state: Dict[str, Any]
+    timings: Dict[str, float] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+    errors: Dict[str, Exception] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    failed_stage: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        """是否所有必需阶段均成功"""
+        return self.failed_stage is None
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """导致失败的异常"""
+        if self.failed_stage is None:
+            return None
+        return self.errors.get(self.failed_stage)
+
+    def metadata(self) -> Dict[str, Any]:
+        """转换为可写入 WorkflowResult.metadata 的字典"""
+        metadata: Dict[str, Any] = {
+            'stage_timings': {name: round(duration, 4) for name, duration in self.timings.items()}
+        }
+        if self.skipped:
+            metadata['skipped_stages'] = list(self.skipped)
+        return metadata
+
+
+@dataclass
+class _StageOutcome:
+    """单个阶段的执行情况"""
+    value: Any = None
+    warnings: List[str] = field(default_factory=list)
+    error: Optional[Exception] = None
+    duration: float = 0.0
+
+
+class StageGraphExecutor:
+    """
+    阶段图执行器
+
+    根据阶段声明的输入/输出构建依赖关系：
+    - 输入全部就绪的阶段立即并发执行
+    - 支持单阶段超时、重试和可选/必需语义
+    - 单阶段超时和重试等待会收紧到请求剩余时间以内，截止时间已到时不再重试
+    - 警告按阶段声明顺序汇总，保证结果确定
+    - 每个阶段的耗时记录到 ai_workflow_stage_duration_seconds 指标，并创建追踪 span
+    - 阶段开始和结束时发出进度通知（见 app.progress）
+    """
+
+    def __init__(self, stages: List[WorkflowStage], name: str = "default"):
+        """
+        初始化执行器
+
+        Args:
+            stages: 阶段列表（声明顺序决定警告的汇总顺序）
+            name: 阶段图名称（通常为工作流名称，用作指标标签）
+
+        Raises:
+            WorkflowError: 阶段名称或输出键重复
+        """
+        names = set()
+        outputs = set()
+        for stage in stages:
+            if stage.name in names:
+                raise WorkflowError(f"阶段名称重复: {stage.name}")
+            if stage.output_key in outputs:
+                raise WorkflowError(f"阶段输出重复: {stage.output_key}")
+            names.add(stage.name)
+            outputs.add(stage.output_key)
+
+        self.stages = list(stages)
+        self.name = name
+
+    async def run(self, initial_state: Optional[Dict[str, Any]] = None) -> StageGraphResult:
+        """
+        执行阶段图
+
+        Args:
+            initial_state: 初始状态（阶段可以直接依赖其中的键）
+
+        Returns:
+            StageGraphResult: 执行结果
+
+        Raises:
+            WorkflowError: 存在无法满足的依赖（缺失输入或循环依赖）
+        """
+        state: Dict[str, Any] = dict(initial_state or {})
+        result = StageGraphResult(state=state)
+        order = {stage.name: index for index, stage in enumerate(self.stages)}
+        stage_warnings: Dict[str, List[str]] = {}
+        pending = list(self.stages)
+        running: Dict[asyncio.Task, WorkflowStage] = {}
+
+        try:
+            while pending or running:
+                # 启动所有输入已就绪的阶段；跳过的阶段写入默认值后可能让之前声明的阶段就绪，
+                # 因此重复扫描，直到一轮中既没有启动也没有跳过任何阶段
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for stage in list(pending):
+                        if not all(key in state for key in stage.inputs):
+                            continue
+                        pending.remove(stage)
+                        progressed = True
+
+                        try:
+                            skip = stage.condition is not None and not stage.condition(state)
+                        except Exception as e:
+                            if self._record_failure(stage, e, result, state, stage_warnings):
+                                return result
+                            continue
+                        if skip:
+                            logger.info(f"跳过阶段: {stage.name}")
+                            state[stage.output_key] = stage.default_value(state)
+                            result.skipped.append(stage.name)
+                            continue
+
+                        report_progress("stage_started", workflow=self.name, stage=stage.name)
+                        task = asyncio.create_task(self._run_stage(stage, state))
+                        running[task] = stage
+
+                if not running:
+                    if pending:
+                        missing = {
+                            stage.name: [key for key in stage.inputs if key not in state]
+                            for stage in pending
+                        }
+                        raise WorkflowError(f"阶段依赖无法满足: {missing}")
+                    continue
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in sorted(done, key=lambda t: order[running[t].name]):
+                    stage = running.pop(task)
+                    outcome: _StageOutcome = task.result()
+                    result.timings[stage.name] = outcome.duration
+                    stage_warnings[stage.name] = list(outcome.warnings)
+                    status = "ok" if outcome.error is None else "error"
+                    STAGE_DURATION.observe(outcome.duration, workflow=self.name, stage=stage.name, status=status)
+                    report_progress(
+                        "stage_finished",
+                        workflow=self.name,
+                        stage=stage.name,
+                        status=status,
+                        duration_seconds=round(outcome.duration, 4)
+                    )
+
+                    if outcome.error is None:
+                        state[stage.output_key] = outcome.value
+                        continue
+
+                    if self._record_failure(stage, outcome.error, result, state, stage_warnings):
+                        return result
+
+            result.warnings = self._collect_warnings(stage_warnings)
+            return result
+
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    def _record_failure(
+        self,
+        stage: WorkflowStage,
+        error: Exception,
+        result: StageGraphResult,
+        state: Dict[str, Any],
+        stage_warnings: Dict[str, List[str]]
+    ) -> bool:
+        """
+        记录阶段失败（执行函数或执行条件抛出异常）
+
+        Returns:
+            是否需要终止整个阶段图（必需阶段失败或截止时间已到）
+        """
+        result.errors[stage.name] = error
+
+        if stage.required or isinstance(error, DeadlineExceeded):
+            # 截止时间已到时继续执行其他阶段没有意义，直接终止
+            logger.error(f"必需阶段 '{stage.name}' 失败: {error}")
+            result.failed_stage = stage.name
+            result.warnings = self._collect_warnings(stage_warnings)
+            return True
+
+        logger.warning(f"可选阶段 '{stage.name}' 失败: {error}")
+        if stage.warning:
+            stage_warnings.setdefault(stage.name, []).append(stage.warning.format(error=str(error)))
+        state[stage.output_key] = stage.default_value(state)
+        return False
+
+    def _collect_warnings(self, stage_warnings: Dict[str, List[str]]) -> List[str]:
+        """按阶段声明顺序汇总警告"""
+        warnings: List[str] = []
+        for stage in self.stages:
+            warnings.extend(stage_warnings.get(stage.name, []))
+        return warnings
+
+    async def _run_stage(self, stage: WorkflowStage, state: Dict[str, Any]) -> _StageOutcome:
+        """
+        执行单个阶段（含超时和重试）
+
+        Args:
+            stage: 阶段
+            state: 当前状态
+
+        Returns:
+            阶段执行情况（异常不会向外抛出，取消除外）
+        """
+        with tracer.start_span(
+            f"stage.{stage.name}",
+            attributes={"workflow.name": self.name, "stage.name": stage.name}
+        ) as span:
+            outcome = await self._run_attempts(stage, state)
+            span.set_attribute("stage.duration_seconds", round(outcome.duration, 4))
+            if outcome.error is not None:
+                span.record_exception(outcome.error)
+            return outcome
+
+    async def _run_attempts(self, stage: WorkflowStage, state: Dict[str, Any]) -> _StageOutcome:
+        """按重试策略执行阶段，返回执行情况"""
+        kwargs = {key: state[key] for key in stage.inputs}
+        attempts = max(stage.retries, 0) + 1
+        outcome = _StageOutcome()
+        start = time.perf_counter()
+
+        for attempt in range(1, attempts + 1):
+            try:
+                check_deadline()
+                timeout = clamp_timeout(stage.timeout)
+                if timeout is not None:
+                    try:
+                        value = await asyncio.wait_for(stage.func(**kwargs), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        # 超时时间被收紧到请求剩余时间时，超时由请求截止时间造成，不再重试
+                        if stage.timeout is None or timeout < stage.timeout:
+                            configured = "未设置阶段超时" if stage.timeout is None else f"阶段超时 {stage.timeout} 秒"
+                            raise DeadlineExceeded(
+                                f"阶段 '{stage.name}' 执行超时（{timeout:.3f}秒，受请求截止时间限制，{configured}）"
+                            )
+                        raise WorkflowError(f"阶段 '{stage.name}' 执行超时（{timeout}秒）")
+                else:
+                    value = await stage.func(**kwargs)
+
+                if isinstance(value, StageOutput):
+                    outcome.warnings = list(value.warnings)
+                    value = value.value
+                outcome.value = value
+                outcome.error = None
+                break
+
+            except Exception as e:
+                outcome.error = e
+                if isinstance(e, DeadlineExceeded):
+                    break
+                if attempt < attempts:
+                    delay = stage.retry_delay * (2 ** (attempt - 1))
+                    remaining = remaining_time()
+                    if remaining is not None and remaining <= delay:
+                        logger.warning(f"阶段 '{stage.name}' 执行失败，剩余时间不足以重试: {e}")
+                        break
+                    logger.warning(f"阶段 '{stage.name}' 第 {attempt} 次执行失败，准备重试: {e}")
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+        outcome.duration = time.perf_counter() - start
+        return outcome
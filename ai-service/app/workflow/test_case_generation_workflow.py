@@ -4,18 +4,53 @@
 完整的测试用例自动生成流程，编排所有 Subagent 和 Tool。
 """
 
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
 from .base import BaseWorkflow, WorkflowError, WorkflowResult
-from ..agent.requirement_analysis_agent import RequirementAnalysisAgent
-from ..agent.test_design_agent import TestDesignAgent
-from ..agent.quality_review_agent import QualityReviewAgent
+from .stage_graph import StageOutput, WorkflowStage
+from ..agent.requirement_analysis_agent import RequirementAnalysisAgent, AnalysisResult
+from ..agent.test_design_agent import TestDesignAgent, TestCaseDesign
+from ..agent.quality_review_agent import QualityReviewAgent, ReviewResult, merge_reviews
+from ..deadline import DeadlineExceeded
 from ..tool.retrieval_tools import SearchPRDTool, SearchTestCaseTool
 from ..tool.generation_tools import FormatTestCaseTool
+from ..tool.validation_tools import CheckQualityTool, ValidateCoverageTool
 
 logger = logging.getLogger(__name__)
 
+# 生成模式
+MODE_THOROUGH = "thorough"  # 需求分析、测试设计、LLM 质量审查三次调用
+MODE_FAST = "fast"  # 一次调用完成分析和设计，本地规则审查
+MODE_PIPELINED = "pipelined"  # 同 thorough，但质量审查与流式测试设计重叠进行
+GENERATION_MODES = (MODE_THOROUGH, MODE_FAST, MODE_PIPELINED)
+
+
+@dataclass(slots=True)
+class LocalReview:
+    """
+    快速模式的本地规则审查结果
+
+    Attributes:
+        review: 按本地规则得出的审查结果
+        quality_score: 通过质量规则（无 error 级问题）的用例占比（0-100）
+        coverage_score: ValidateCoverageTool 的整体覆盖率评分（0-100）
+        escalate: 是否需要升级为 LLM 审查
+    """
+    review: ReviewResult
+    quality_score: int
+    coverage_score: int
+    escalate: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'quality_score': self.quality_score,
+            'coverage_score': self.coverage_score,
+            'escalated': self.escalate,
+        }
+
 
 class TestCaseGenerationWorkflow(BaseWorkflow):
     """
@@ -27,8 +62,26 @@ class TestCaseGenerationWorkflow(BaseWorkflow):
     3. 设计测试用例（TestDesignAgent）
     4. 质量审查（QualityReviewAgent）
     5. 格式化输出
+    
+    步骤以阶段图声明，PRD 与历史用例检索并发执行。
+    
+    快速模式（context['generation_mode'] == "fast"）用一次 LLM 调用同时完成步骤 2 和 3
+    （TestDesignAgent.draft_tests），质量审查改为本地规则（CheckQualityTool、ValidateCoverageTool），
+    只有本地评分低于 review_threshold 时才升级为 LLM 审查。适合较短的需求。
+    
+    流水线模式（"pipelined"）流式接收 TestDesignAgent 设计的用例，每凑满 review_batch_size 个
+    就提交一批质量审查，各批审查并发执行并与后续用例的设计重叠，审查结果合并时换算为全局索引。
     """
     
+    # 必需阶段失败时的错误前缀
+    STAGE_ERRORS = {
+        'requirement_analysis': "需求分析失败",
+        'test_design': "测试设计失败",
+        'analysis_and_design': "测试用例生成失败",
+        'design_and_review': "测试设计失败",
+        'formatting': "格式化失败",
+    }
+    
     def __init__(
         self,
         requirement_agent: RequirementAnalysisAgent,
@@ -36,7 +89,13 @@ class TestCaseGenerationWorkflow(BaseWorkflow):
         quality_review_agent: QualityReviewAgent,
         search_prd_tool: SearchPRDTool,
         search_testcase_tool: SearchTestCaseTool,
-        format_tool: FormatTestCaseTool
+        format_tool: FormatTestCaseTool,
+        check_quality_tool: Optional[CheckQualityTool] = None,
+        validate_coverage_tool: Optional[ValidateCoverageTool] = None,
+        default_mode: str = MODE_THOROUGH,
+        review_threshold: float = 60.0,
+        review_batch_size: int = 5,
+        review_concurrency: int = 3
     ):
         """
         初始化工作流
@@ -48,13 +107,27 @@ class TestCaseGenerationWorkflow(BaseWorkflow):
             search_prd_tool: PRD 搜索工具
             search_testcase_tool: 测试用例搜索工具
             format_tool: 格式化工具
+            check_quality_tool: 快速模式的质量规则检查工具（默认新建）
+            validate_coverage_tool: 快速模式的覆盖率验证工具（默认新建）
+            default_mode: 请求未指定时的生成模式（"thorough"、"fast" 或 "pipelined"）
+            review_threshold: 快速模式升级为 LLM 审查的本地评分阈值（0-100）
+            review_batch_size: 流水线模式每批审查的用例数
+            review_concurrency: 流水线模式同时进行的审查批次数
         """
+        if default_mode not in GENERATION_MODES:
+            raise ValueError(f"未知的生成模式: {default_mode}")
         self.requirement_agent = requirement_agent
         self.test_design_agent = test_design_agent
         self.quality_review_agent = quality_review_agent
         self.search_prd_tool = search_prd_tool
         self.search_testcase_tool = search_testcase_tool
         self.format_tool = format_tool
+        self.check_quality_tool = check_quality_tool or CheckQualityTool()
+        self.validate_coverage_tool = validate_coverage_tool or ValidateCoverageTool()
+        self.default_mode = default_mode
+        self.review_threshold = review_threshold
+        self.review_batch_size = max(1, review_batch_size)
+        self.review_concurrency = max(1, review_concurrency)
     
     @property
     def name(self) -> str:
@@ -78,6 +151,9 @@ class TestCaseGenerationWorkflow(BaseWorkflow):
                 - project_id: 项目 ID（必需）
                 - historical_prd_limit: 检索历史 PRD 数量（默认 5）
                 - historical_case_limit: 检索历史用例数量（默认 5）
+                - historical_prds / historical_cases: 已检索的历史 PRD / 用例（可选，
+                  提供时跳过对应的检索阶段，如批量生成时统一检索）
+                - generation_mode: 生成模式 "thorough"、"fast" 或 "pipelined"（默认 default_mode）
                 
         Returns:
             WorkflowResult: 包含生成的测试用例和元数据
@@ -88,126 +164,99 @@ class TestCaseGenerationWorkflow(BaseWorkflow):
                 error="缺少必需的 project_id 参数"
             )
         
+        mode = context.get('generation_mode') or self.default_mode
+        if mode not in GENERATION_MODES:
+            return WorkflowResult(
+                success=False,
+                error=f"未知的生成模式: {mode}，可选: {', '.join(GENERATION_MODES)}"
+            )
+        
         project_id = context['project_id']
-        errors = []
         warnings = []
         
+        retrieval_stages = [
+            WorkflowStage(
+                name='retrieve_prds',
+                func=self._retrieve_prds,
+                inputs=['requirement', 'project_id', 'historical_prd_limit'],
+                output='historical_prds',
+                required=False,
+                default_factory=lambda state: [],
+                warning="无法检索历史 PRD，将继续执行"
+            ),
+            WorkflowStage(
+                name='retrieve_cases',
+                func=self._retrieve_cases,
+                inputs=['requirement', 'project_id', 'historical_case_limit'],
+                output='historical_cases',
+                required=False,
+                default_factory=lambda state: [],
+                warning="无法检索历史测试用例，将继续执行"
+            ),
+        ]
+        if mode == MODE_FAST:
+            stages = retrieval_stages + self._fast_stages()
+        elif mode == MODE_PIPELINED:
+            stages = retrieval_stages + self._pipelined_stages()
+        else:
+            stages = retrieval_stages + self._thorough_stages()
+        
+        initial_state = {
+            'requirement': requirement,
+            'project_id': project_id,
+            'historical_prd_limit': context.get('historical_prd_limit', 5),
+            'historical_case_limit': context.get('historical_case_limit', 5),
+        }
+        for key in ('historical_prds', 'historical_cases'):
+            if key in context:
+                initial_state[key] = context[key]
+        stages = [stage for stage in stages if stage.output_key not in initial_state]
+        
         try:
-            # 步骤 1: 检索历史知识
-            logger.info(f"步骤 1: 检索历史知识 (project_id={project_id})")
-            historical_prds = []
-            historical_cases = []
-            
-            try:
-                prd_limit = context.get('historical_prd_limit', 5)
-                historical_prds = await self.search_prd_tool.execute(
-                    query=requirement,
-                    project_id=project_id,
-                    limit=prd_limit
-                )
-                logger.info(f"检索到 {len(historical_prds)} 个相关 PRD")
-            except Exception as e:
-                logger.warning(f"检索历史 PRD 失败: {e}")
-                warnings.append("无法检索历史 PRD，将继续执行")
-            
-            try:
-                case_limit = context.get('historical_case_limit', 5)
-                historical_cases = await self.search_testcase_tool.execute(
-                    query=requirement,
-                    project_id=project_id,
-                    limit=case_limit
-                )
-                logger.info(f"检索到 {len(historical_cases)} 个相关测试用例")
-            except Exception as e:
-                logger.warning(f"检索历史测试用例失败: {e}")
-                warnings.append("无法检索历史测试用例，将继续执行")
+            graph = await self.run_stages(stages, initial_state)
+            warnings = graph.warnings
+            state = graph.state
+            if 'draft' in state:
+                state['analysis'], state['test_designs'] = state['draft']
+            if 'reviewed' in state:
+                state['test_designs'], state['review'] = state['reviewed']
             
-            # 步骤 2: 分析需求
-            logger.info("步骤 2: 分析需求")
-            try:
-                analysis_result = await self.requirement_agent.analyze(
-                    requirement=requirement,
-                    context={'historical_prds': historical_prds}
-                )
-                logger.info(f"需求分析完成: {len(analysis_result.functional_points)} 个功能点")
-            except Exception as e:
-                logger.error(f"需求分析失败: {e}")
+            if not graph.success:
+                error_prefix = self.STAGE_ERRORS.get(graph.failed_stage, "工作流执行失败")
+                metadata = {
+                    'step': graph.failed_stage,
+                    'mode': mode,
+                    'warnings': warnings,
+                    **graph.metadata()
+                }
+                if 'analysis' in state:
+                    metadata['analysis'] = state['analysis'].to_dict()
+                if 'review' in state:
+                    metadata['review'] = state['review'].to_dict()
                 return WorkflowResult(
                     success=False,
-                    error=f"需求分析失败: {str(e)}",
-                    metadata={'step': 'requirement_analysis', 'warnings': warnings}
+                    error=f"{error_prefix}: {str(graph.error)}",
+                    metadata=metadata
                 )
             
-            # 步骤 3: 设计测试用例
-            logger.info("步骤 3: 设计测试用例")
-            try:
-                test_designs = await self.test_design_agent.design_tests(
-                    analysis=analysis_result,
-                    historical_cases=historical_cases
-                )
-                logger.info(f"测试设计完成: 生成 {len(test_designs)} 个测试用例")
-            except Exception as e:
-                logger.error(f"测试设计失败: {e}")
-                return WorkflowResult(
-                    success=False,
-                    error=f"测试设计失败: {str(e)}",
-                    metadata={
-                        'step': 'test_design',
-                        'analysis': analysis_result.to_dict(),
-                        'warnings': warnings
-                    }
-                )
+            analysis_result = state['analysis']
+            review_result = state['review']
+            test_designs = state['test_designs']
+            formatted_cases = state['test_cases']
             
-            # 步骤 4: 质量审查
-            logger.info("步骤 4: 质量审查")
-            try:
-                review_result = await self.quality_review_agent.review(
-                    test_cases=test_designs,
-                    requirement=requirement,
-                    analysis=analysis_result
-                )
-                logger.info(
-                    f"质量审查完成: 覆盖率 {review_result.coverage_score}%, "
-                    f"批准 {len(review_result.approved_cases)} 个用例"
-                )
-            except Exception as e:
-                logger.warning(f"质量审查失败: {e}")
-                # 质量审查失败时，使用所有测试用例
-                from ..agent.quality_review_agent import ReviewResult
-                review_result = ReviewResult(
-                    coverage_score=0,
-                    issues=[],
-                    suggestions=[],
-                    approved_cases=list(range(len(test_designs))),
-                    rejected_cases=[],
-                    overall_quality='unknown'
-                )
-                warnings.append("质量审查失败，已批准所有测试用例")
-            
-            # 步骤 5: 格式化输出
-            logger.info("步骤 5: 格式化输出")
-            try:
-                # 只格式化批准的测试用例
-                approved_designs = [
-                    test_designs[i] for i in review_result.approved_cases
-                ]
-                
-                formatted_cases = await self.format_tool.execute(
-                    test_cases=approved_designs
-                )
-                logger.info(f"格式化完成: {len(formatted_cases)} 个测试用例")
-            except Exception as e:
-                logger.error(f"格式化失败: {e}")
-                return WorkflowResult(
-                    success=False,
-                    error=f"格式化失败: {str(e)}",
-                    metadata={
-                        'step': 'formatting',
-                        'analysis': analysis_result.to_dict(),
-                        'review': review_result.to_dict(),
-                        'warnings': warnings
-                    }
-                )
+            metadata = {
+                'mode': mode,
+                'coverage_score': review_result.coverage_score,
+                'total_generated': len(test_designs),
+                'approved_count': len(review_result.approved_cases),
+                'rejected_count': len(review_result.rejected_cases),
+                'warnings': warnings,
+                'historical_prds_count': len(state['historical_prds']),
+                'historical_cases_count': len(state['historical_cases']),
+                **graph.metadata()
+            }
+            if 'local_review' in state:
+                metadata['local_review'] = state['local_review'].to_dict()
             
             # 返回成功结果
             return WorkflowResult(
@@ -217,15 +266,7 @@ class TestCaseGenerationWorkflow(BaseWorkflow):
                     'analysis': analysis_result.to_dict(),
                     'review': review_result.to_dict()
                 },
-                metadata={
-                    'coverage_score': review_result.coverage_score,
-                    'total_generated': len(test_designs),
-                    'approved_count': len(approved_designs),
-                    'rejected_count': len(review_result.rejected_cases),
-                    'warnings': warnings,
-                    'historical_prds_count': len(historical_prds),
-                    'historical_cases_count': len(historical_cases)
-                }
+                metadata=metadata
             )
             
         except Exception as e:
@@ -235,3 +276,369 @@ class TestCaseGenerationWorkflow(BaseWorkflow):
                 error=f"工作流执行失败: {str(e)}",
                 metadata={'warnings': warnings}
             )
+    
+    def _thorough_stages(self) -> List[WorkflowStage]:
+        """完整模式：需求分析、测试设计、LLM 质量审查"""
+        return [
+            WorkflowStage(
+                name='requirement_analysis',
+                func=self._analyze_requirement,
+                inputs=['requirement', 'historical_prds'],
+                output='analysis'
+            ),
+            WorkflowStage(
+                name='test_design',
+                func=self._design_tests,
+                inputs=['analysis', 'historical_cases'],
+                output='test_designs'
+            ),
+            WorkflowStage(
+                name='quality_review',
+                func=self._review,
+                inputs=['test_designs', 'requirement', 'analysis'],
+                output='review',
+                required=False,
+                default_factory=self._approve_all,
+                warning="质量审查失败，已批准所有测试用例"
+            ),
+            WorkflowStage(
+                name='formatting',
+                func=self._format,
+                inputs=['test_designs', 'review'],
+                output='test_cases'
+            ),
+        ]
+    
+    def _pipelined_stages(self) -> List[WorkflowStage]:
+        """流水线模式：需求分析，流式测试设计与分批质量审查重叠进行"""
+        return [
+            WorkflowStage(
+                name='requirement_analysis',
+                func=self._analyze_requirement,
+                inputs=['requirement', 'historical_prds'],
+                output='analysis'
+            ),
+            WorkflowStage(
+                name='design_and_review',
+                func=self._design_and_review,
+                inputs=['requirement', 'analysis', 'historical_cases'],
+                output='reviewed'
+            ),
+            WorkflowStage(
+                name='formatting',
+                func=self._format_reviewed,
+                inputs=['reviewed'],
+                output='test_cases'
+            ),
+        ]
+    
+    def _fast_stages(self) -> List[WorkflowStage]:
+        """快速模式：一次调用完成分析和设计，本地规则审查，评分过低时升级为 LLM 审查"""
+        return [
+            WorkflowStage(
+                name='analysis_and_design',
+                func=self._draft,
+                inputs=['requirement', 'historical_prds', 'historical_cases'],
+                output='draft'
+            ),
+            WorkflowStage(
+                name='local_review',
+                func=self._local_review,
+                inputs=['draft'],
+                output='local_review',
+                required=False,
+                default_factory=self._escalate_all,
+                warning="本地规则审查失败，将使用 LLM 审查"
+            ),
+            WorkflowStage(
+                name='quality_review',
+                func=self._review_draft,
+                inputs=['draft', 'requirement', 'local_review'],
+                output='review',
+                required=False,
+                condition=lambda state: state['local_review'].escalate,
+                default_factory=lambda state: state['local_review'].review,
+                warning="质量审查失败，已使用本地规则审查结果"
+            ),
+            WorkflowStage(
+                name='formatting',
+                func=self._format_draft,
+                inputs=['draft', 'review'],
+                output='test_cases'
+            ),
+        ]
+    
+    async def _retrieve_prds(
+        self,
+        requirement: str,
+        project_id: Any,
+        historical_prd_limit: int
+    ) -> List[Dict[str, Any]]:
+        """步骤 1a: 检索历史 PRD"""
+        logger.info(f"步骤 1: 检索历史 PRD (project_id={project_id})")
+        historical_prds = await self.search_prd_tool.execute(
+            query=requirement,
+            project_id=project_id,
+            limit=historical_prd_limit
+        )
+        logger.info(f"检索到 {len(historical_prds)} 个相关 PRD")
+        return historical_prds
+    
+    async def _retrieve_cases(
+        self,
+        requirement: str,
+        project_id: Any,
+        historical_case_limit: int
+    ) -> List[Dict[str, Any]]:
+        """步骤 1b: 检索历史测试用例"""
+        logger.info(f"步骤 1: 检索历史测试用例 (project_id={project_id})")
+        historical_cases = await self.search_testcase_tool.execute(
+            query=requirement,
+            project_id=project_id,
+            limit=historical_case_limit
+        )
+        logger.info(f"检索到 {len(historical_cases)} 个相关测试用例")
+        return historical_cases
+    
+    async def _analyze_requirement(
+        self,
+        requirement: str,
+        historical_prds: List[Dict[str, Any]]
+    ) -> AnalysisResult:
+        """步骤 2: 分析需求"""
+        logger.info("步骤 2: 分析需求")
+        analysis_result = await self.requirement_agent.analyze(
+            requirement=requirement,
+            context={'historical_prds': historical_prds}
+        )
+        logger.info(f"需求分析完成: {len(analysis_result.functional_points)} 个功能点")
+        return analysis_result
+    
+    async def _design_tests(
+        self,
+        analysis: AnalysisResult,
+        historical_cases: List[Dict[str, Any]]
+    ) -> List[TestCaseDesign]:
+        """步骤 3: 设计测试用例"""
+        logger.info("步骤 3: 设计测试用例")
+        test_designs = await self.test_design_agent.design_tests(
+            analysis=analysis,
+            historical_cases=historical_cases
+        )
+        logger.info(f"测试设计完成: 生成 {len(test_designs)} 个测试用例")
+        return test_designs
+    
+    async def _review(
+        self,
+        test_designs: List[TestCaseDesign],
+        requirement: str,
+        analysis: AnalysisResult
+    ) -> ReviewResult:
+        """步骤 4: 质量审查"""
+        logger.info("步骤 4: 质量审查")
+        review_result = await self.quality_review_agent.review(
+            test_cases=test_designs,
+            requirement=requirement,
+            analysis=analysis
+        )
+        logger.info(
+            f"质量审查完成: 覆盖率 {review_result.coverage_score}%, "
+            f"批准 {len(review_result.approved_cases)} 个用例"
+        )
+        return review_result
+    
+    async def _design_and_review(
+        self,
+        requirement: str,
+        analysis: AnalysisResult,
+        historical_cases: List[Dict[str, Any]]
+    ) -> StageOutput:
+        """流水线模式步骤 3-4: 流式设计测试用例，每凑满一批即提交并发审查"""
+        logger.info("步骤 3: 流式设计测试用例，分批并发质量审查")
+        designs: List[TestCaseDesign] = []
+        batches: List[Tuple[int, int, asyncio.Task]] = []
+        semaphore = asyncio.Semaphore(self.review_concurrency)
+        
+        async def review_batch(batch: List[TestCaseDesign]) -> ReviewResult:
+            async with semaphore:
+                return await self.quality_review_agent.review(
+                    test_cases=batch,
+                    requirement=requirement,
+                    analysis=analysis,
+                    partial=True
+                )
+        
+        def submit() -> None:
+            offset = batches[-1][0] + batches[-1][1] if batches else 0
+            batch = designs[offset:]
+            batches.append((offset, len(batch), asyncio.create_task(review_batch(batch))))
+        
+        try:
+            async for design in self.test_design_agent.design_tests_stream(
+                analysis=analysis,
+                historical_cases=historical_cases
+            ):
+                designs.append(design)
+                if len(designs) % self.review_batch_size == 0:
+                    submit()
+            if len(designs) % self.review_batch_size:
+                submit()
+            outcomes = await asyncio.gather(
+                *(task for _, _, task in batches), return_exceptions=True
+            )
+        finally:
+            # 设计失败或被取消时停止进行中的审查
+            for _, _, task in batches:
+                task.cancel()
+            await asyncio.gather(*(task for _, _, task in batches), return_exceptions=True)
+        
+        reviews = []
+        failed = 0
+        for (offset, size, _), outcome in zip(batches, outcomes):
+            if isinstance(outcome, DeadlineExceeded):
+                raise outcome
+            if isinstance(outcome, Exception):
+                logger.warning(f"用例 {offset}-{offset + size - 1} 质量审查失败: {outcome}")
+                failed += 1
+                outcome = self._approve_all({'test_designs': designs[offset:offset + size]})
+            reviews.append((offset, size, outcome))
+        review = merge_reviews(reviews)
+        
+        logger.info(
+            f"测试设计和质量审查完成: 生成 {len(designs)} 个测试用例，分 {len(batches)} 批审查，"
+            f"批准 {len(review.approved_cases)} 个"
+        )
+        warnings = [f"{failed} 批测试用例质量审查失败，已批准这些用例"] if failed else []
+        return StageOutput(value=(designs, review), warnings=warnings)
+    
+    async def _format_reviewed(
+        self,
+        reviewed: Tuple[List[TestCaseDesign], ReviewResult]
+    ) -> List[Dict[str, Any]]:
+        """流水线模式步骤 5: 格式化输出"""
+        return await self._format(*reviewed)
+    
+    def _approve_all(self, state: Dict[str, Any]) -> ReviewResult:
+        """质量审查失败时，批准所有测试用例"""
+        return ReviewResult(
+            coverage_score=0,
+            issues=[],
+            suggestions=[],
+            approved_cases=list(range(len(state['test_designs']))),
+            rejected_cases=[],
+            overall_quality='unknown'
+        )
+    
+    async def _draft(
+        self,
+        requirement: str,
+        historical_prds: List[Dict[str, Any]],
+        historical_cases: List[Dict[str, Any]]
+    ) -> Tuple[AnalysisResult, List[TestCaseDesign]]:
+        """快速模式步骤 2: 一次调用完成需求分析和测试设计"""
+        logger.info("步骤 2: 快速生成（需求分析 + 测试设计）")
+        return await self.test_design_agent.draft_tests(
+            requirement=requirement,
+            historical_prds=historical_prds,
+            historical_cases=historical_cases
+        )
+    
+    async def _local_review(
+        self,
+        draft: Tuple[AnalysisResult, List[TestCaseDesign]]
+    ) -> LocalReview:
+        """快速模式步骤 3: 按本地质量规则和覆盖率审查"""
+        analysis, test_designs = draft
+        logger.info("步骤 3: 本地规则审查")
+        cases = [design.to_dict() for design in test_designs]
+        case_issues = await self.check_quality_tool.execute_batch(test_cases=cases)
+        coverage = await self.validate_coverage_tool.execute(
+            test_cases=cases,
+            requirement_analysis=analysis.to_dict()
+        )
+        
+        approved, rejected, issues, suggestions = [], [], [], []
+        for index, found in enumerate(case_issues):
+            errors = [issue['message'] for issue in found if issue['severity'] == 'error']
+            if errors:
+                rejected.append((index, "; ".join(errors)))
+            else:
+                approved.append(index)
+            for issue in found:
+                if issue['severity'] == 'warning' and issue['message'] not in suggestions:
+                    suggestions.append(issue['message'])
+        issues.extend(f"功能点未覆盖: {point}" for point in coverage['uncovered_points'])
+        
+        quality_score = round(len(approved) * 100 / max(len(test_designs), 1))
+        coverage_score = round(coverage['overall_score'])
+        lowest = min(quality_score, coverage_score)
+        if lowest >= 85:
+            overall_quality = 'excellent'
+        elif lowest >= self.review_threshold:
+            overall_quality = 'good'
+        else:
+            overall_quality = 'needs_improvement'
+        
+        escalate = lowest < self.review_threshold
+        logger.info(
+            f"本地规则审查完成: 质量 {quality_score}, 覆盖率 {coverage_score}"
+            f"{'，升级为 LLM 审查' if escalate else ''}"
+        )
+        return LocalReview(
+            review=ReviewResult(
+                coverage_score=coverage_score,
+                issues=issues,
+                suggestions=suggestions,
+                approved_cases=approved,
+                rejected_cases=rejected,
+                overall_quality=overall_quality
+            ),
+            quality_score=quality_score,
+            coverage_score=coverage_score,
+            escalate=escalate
+        )
+    
+    def _escalate_all(self, state: Dict[str, Any]) -> LocalReview:
+        """本地规则审查失败时，升级为 LLM 审查（LLM 审查也失败时批准所有测试用例）"""
+        _, test_designs = state['draft']
+        return LocalReview(
+            review=self._approve_all({'test_designs': test_designs}),
+            quality_score=0,
+            coverage_score=0,
+            escalate=True
+        )
+    
+    async def _review_draft(
+        self,
+        draft: Tuple[AnalysisResult, List[TestCaseDesign]],
+        requirement: str,
+        local_review: LocalReview
+    ) -> ReviewResult:
+        """快速模式步骤 4: 本地评分低于阈值时升级为 LLM 质量审查"""
+        analysis, test_designs = draft
+        return await self._review(test_designs, requirement, analysis)
+    
+    async def _format_draft(
+        self,
+        draft: Tuple[AnalysisResult, List[TestCaseDesign]],
+        review: ReviewResult
+    ) -> List[Dict[str, Any]]:
+        """快速模式步骤 5: 格式化输出"""
+        return await self._format(draft[1], review)
+    
+    async def _format(
+        self,
+        test_designs: List[TestCaseDesign],
+        review: ReviewResult
+    ) -> List[Dict[str, Any]]:
+        """步骤 5: 格式化输出（只格式化批准的测试用例）"""
+        logger.info("步骤 5: 格式化输出")
+        approved_designs = [
+            test_designs[i] for i in review.approved_cases
+        ]
+        
+        formatted_cases = await self.format_tool.execute(
+            test_cases=[design.to_dict() for design in approved_designs]
+        )
+        logger.info(f"格式化完成: {len(formatted_cases)} 个测试用例")
+        return formatted_cases
@@ -2,20 +2,55 @@
 测试用例优化工作流
 
 分析现有测试用例的质量，识别缺失的测试点，并生成补充测试用例。
+审计模式（mode='audit'）下分页遍历整个项目的测试用例，生成项目级审计报告。
 """
 
 import logging
+import os
+import tempfile
+import uuid
+from collections import Counter
 from typing import Any, Dict, List, Optional
+from urllib.parse import quote
 
+from ..executor import get_pool
+from ..serialization import dumps
 from .base import BaseWorkflow, WorkflowError, WorkflowResult
-from ..tool.retrieval_tools import SearchTestCaseTool, SearchPRDTool
-from ..tool.validation_tools import ValidateCoverageTool, CheckQualityTool
+from .stage_graph import WorkflowStage
+from ..tool.retrieval_tools import SearchTestCaseTool, SearchPRDTool, ListTestCasesTool, ListPRDsTool
+from ..tool.validation_tools import (
+    ValidateCoverageTool,
+    CheckQualityTool,
+    NearDuplicateIndex,
+    case_signature,
+)
 from ..tool.generation_tools import GenerateTestCaseTool, FormatTestCaseTool
-from ..agent.requirement_analysis_agent import RequirementAnalysisAgent
+from ..agent.requirement_analysis_agent import RequirementAnalysisAgent, AnalysisResult
 from ..agent.test_design_agent import TestDesignAgent
 
 logger = logging.getLogger(__name__)
 
+# 未配置审计报告目录时使用的默认目录
+DEFAULT_AUDIT_REPORT_DIR = os.path.join(tempfile.gettempdir(), "testcase_audits")
+
+
+def audit_report_path(directory: str, project_id: Any, report_id: str) -> str:
+    """
+    审计报告的文件路径
+
+    项目 ID 和报告 ID 都经过转义，路径总是位于 directory 之内。
+
+    Args:
+        directory: 报告目录
+        project_id: 项目 ID
+        report_id: 报告 ID（通常是后台任务 ID）
+
+    Returns:
+        报告文件路径（.jsonl）
+    """
+    filename = f"{quote(str(project_id), safe='')}-{quote(str(report_id), safe='')}.jsonl"
+    return os.path.join(directory, filename)
+
 
 class TestCaseOptimizationWorkflow(BaseWorkflow):
     """
@@ -27,6 +62,14 @@ class TestCaseOptimizationWorkflow(BaseWorkflow):
     3. 识别缺失的测试点
     4. 生成补充测试用例
     5. 返回优化建议和补充用例
+    
+    质量检查与 PRD 检索、需求分析互不依赖，由阶段图并发执行。
+    
+    审计模式按页流式拉取项目内全部测试用例，按批次执行质量检查和近似重复检测，
+    并统计 PRD 关联覆盖情况；明细逐批追加写入 JSON Lines 报告文件，不在内存中累积。
+    内存占用仍与用例总数成正比：NearDuplicateIndex 为每个用例保存签名（_signatures）
+    和聚类父节点（_parent），prd_case_counts 随关联的 PRD 增长，每个用例约 1 KB，
+    5 万个用例约 50 MB。
     """
     
     def __init__(
@@ -37,7 +80,10 @@ class TestCaseOptimizationWorkflow(BaseWorkflow):
         check_quality_tool: CheckQualityTool,
         requirement_analysis_agent: RequirementAnalysisAgent,
         test_design_agent: TestDesignAgent,
-        format_testcase_tool: FormatTestCaseTool
+        format_testcase_tool: FormatTestCaseTool,
+        list_testcases_tool: Optional[ListTestCasesTool] = None,
+        list_prds_tool: Optional[ListPRDsTool] = None,
+        report_dir: Optional[str] = None
     ):
         """
         初始化工作流
@@ -50,6 +96,9 @@ class TestCaseOptimizationWorkflow(BaseWorkflow):
             requirement_analysis_agent: 需求分析 Agent
             test_design_agent: 测试设计 Agent
             format_testcase_tool: 测试用例格式化工具
+            list_testcases_tool: 测试用例列表工具（审计模式必需）
+            list_prds_tool: PRD 列表工具（审计模式下用于统计 PRD 覆盖情况）
+            report_dir: 审计报告目录（默认 DEFAULT_AUDIT_REPORT_DIR）
         """
         self.search_testcase_tool = search_testcase_tool
         self.search_prd_tool = search_prd_tool
@@ -58,6 +107,9 @@ class TestCaseOptimizationWorkflow(BaseWorkflow):
         self.requirement_analysis_agent = requirement_analysis_agent
         self.test_design_agent = test_design_agent
         self.format_testcase_tool = format_testcase_tool
+        self.list_testcases_tool = list_testcases_tool
+        self.list_prds_tool = list_prds_tool
+        self.report_dir = report_dir or DEFAULT_AUDIT_REPORT_DIR
     
     @property
     def name(self) -> str:
@@ -82,9 +134,12 @@ class TestCaseOptimizationWorkflow(BaseWorkflow):
                 - existing_cases: 现有测试用例列表（可选，如果不提供则通过搜索获取）
                 - prd_limit: PRD 检索数量限制（默认 5）
                 - testcase_limit: 测试用例检索数量限制（默认 10）
+                - mode: 设为 'audit' 时对整个项目执行审计（不需要 requirement）
+                - chunk_size: 审计模式每批处理的用例数量（默认 1000）
                 
         Returns:
-            WorkflowResult: 包含质量问题、缺失测试点、补充用例和优化建议
+            WorkflowResult: 包含质量问题、缺失测试点、补充用例和优化建议；
+            审计模式下包含审计摘要和报告文件路径
         """
         if not context or 'project_id' not in context:
             return WorkflowResult(
@@ -92,6 +147,13 @@ class TestCaseOptimizationWorkflow(BaseWorkflow):
                 error="缺少必需的 project_id 参数"
             )
         
+        if context.get('mode') == 'audit':
+            # 报告只写入配置的目录，不接受调用方给出的路径
+            return await self.run_audit(
+                context['project_id'],
+                chunk_size=int(context.get('chunk_size', 1000))
+            )
+        
         if not requirement:
             return WorkflowResult(
                 success=False,
@@ -99,30 +161,88 @@ class TestCaseOptimizationWorkflow(BaseWorkflow):
             )
         
         project_id = context['project_id']
-        prd_limit = context.get('prd_limit', 5)
-        testcase_limit = context.get('testcase_limit', 10)
-        
         warnings = []
         
+        def has_cases(state: Dict[str, Any]) -> bool:
+            return bool(state['existing_cases'])
+        
+        stages = [
+            WorkflowStage(
+                name='fetch_existing_cases',
+                func=self._fetch_existing_cases,
+                inputs=['requirement', 'project_id', 'testcase_limit', 'provided_cases'],
+                output='existing_cases',
+                required=False,
+                default_factory=lambda state: [],
+                warning="搜索现有测试用例失败: {error}"
+            ),
+            WorkflowStage(
+                name='quality_check',
+                func=self._check_quality,
+                inputs=['existing_cases'],
+                output='quality_issues',
+                required=False,
+                default_factory=lambda state: [],
+                warning="质量检查失败: {error}",
+                condition=has_cases
+            ),
+            WorkflowStage(
+                name='retrieve_prds',
+                func=self._retrieve_prds,
+                inputs=['requirement', 'project_id', 'prd_limit'],
+                output='historical_prds',
+                required=False,
+                default_factory=lambda state: [],
+                warning="检索 PRD 失败: {error}"
+            ),
+            WorkflowStage(
+                name='requirement_analysis',
+                func=self._analyze_requirement,
+                inputs=['requirement', 'historical_prds', 'existing_cases'],
+                output='analysis',
+                condition=has_cases
+            ),
+            WorkflowStage(
+                name='coverage_check',
+                func=self._check_coverage,
+                inputs=['existing_cases', 'analysis', 'project_id'],
+                output='coverage_report',
+                required=False,
+                default_factory=lambda state: {},
+                warning="覆盖率检查失败: {error}",
+                condition=has_cases
+            ),
+            WorkflowStage(
+                name='generate_supplements',
+                func=self._generate_supplements,
+                inputs=['analysis', 'existing_cases', 'coverage_report'],
+                output='supplementary_cases',
+                required=False,
+                default_factory=lambda state: [],
+                warning="生成补充测试用例失败: {error}",
+                condition=lambda state: bool(state['coverage_report'].get('missing_coverage', []))
+            ),
+        ]
+        
         try:
-            # 步骤 1: 获取现有测试用例
-            logger.info(f"步骤 1: 获取现有测试用例 (project_id={project_id})")
+            graph = await self.run_stages(stages, {
+                'requirement': requirement,
+                'project_id': project_id,
+                'prd_limit': context.get('prd_limit', 5),
+                'testcase_limit': context.get('testcase_limit', 10),
+                'provided_cases': context.get('existing_cases'),
+            })
+            warnings = graph.warnings
+            state = graph.state
             
-            existing_cases = context.get('existing_cases')
-            if not existing_cases:
-                # 如果没有提供现有用例，通过搜索获取
-                try:
-                    existing_cases = await self.search_testcase_tool.execute(
-                        query=requirement,
-                        project_id=project_id,
-                        limit=testcase_limit
-                    )
-                    logger.info(f"通过搜索找到 {len(existing_cases)} 个现有测试用例")
-                except Exception as e:
-                    logger.warning(f"搜索现有测试用例失败: {e}")
-                    warnings.append(f"搜索现有测试用例失败: {str(e)}")
-                    existing_cases = []
+            if not graph.success:
+                return WorkflowResult(
+                    success=False,
+                    error=f"需求分析失败: {str(graph.error)}",
+                    metadata={'warnings': warnings, **graph.metadata()}
+                )
             
+            existing_cases = state['existing_cases']
             if not existing_cases:
                 logger.warning("没有找到现有测试用例，无法进行优化")
                 return WorkflowResult(
@@ -142,97 +262,10 @@ class TestCaseOptimizationWorkflow(BaseWorkflow):
                     }
                 )
             
-            # 步骤 2: 质量检查
-            logger.info("步骤 2: 执行质量检查")
-            quality_issues = []
-            
-            for case in existing_cases:
-                try:
-                    issues = await self.check_quality_tool.execute(case)
-                    if issues:
-                        quality_issues.extend([
-                            {
-                                'case_id': case.get('id'),
-                                'case_title': case.get('title'),
-                                'issues': issues
-                            }
-                        ])
-                except Exception as e:
-                    logger.warning(f"质量检查失败 (case_id={case.get('id')}): {e}")
-                    warnings.append(f"质量检查失败: {str(e)}")
-            
-            logger.info(f"发现 {len(quality_issues)} 个测试用例存在质量问题")
-            
-            # 步骤 3: 检索相关 PRD 并分析需求
-            logger.info("步骤 3: 检索相关 PRD 并分析需求")
-            
-            historical_prds = []
-            try:
-                historical_prds = await self.search_prd_tool.execute(
-                    query=requirement,
-                    project_id=project_id,
-                    limit=prd_limit
-                )
-                logger.info(f"检索到 {len(historical_prds)} 个相关 PRD")
-            except Exception as e:
-                logger.warning(f"检索 PRD 失败: {e}")
-                warnings.append(f"检索 PRD 失败: {str(e)}")
-            
-            # 分析需求
-            try:
-                analysis_result = await self.requirement_analysis_agent.analyze(
-                    requirement=requirement,
-                    context={'historical_prds': historical_prds}
-                )
-                logger.info("需求分析完成")
-            except Exception as e:
-                logger.error(f"需求分析失败: {e}")
-                return WorkflowResult(
-                    success=False,
-                    error=f"需求分析失败: {str(e)}",
-                    metadata={'warnings': warnings}
-                )
-            
-            # 步骤 4: 识别缺失的测试点（覆盖率检查）
-            logger.info("步骤 4: 识别缺失的测试点")
-            
-            try:
-                coverage_report = await self.validate_coverage_tool.execute(
-                    test_cases=existing_cases,
-                    requirement_analysis=analysis_result.to_dict()
-                )
-                
-                missing_points = coverage_report.get('missing_coverage', [])
-                logger.info(f"识别到 {len(missing_points)} 个缺失的测试点")
-            except Exception as e:
-                logger.warning(f"覆盖率检查失败: {e}")
-                warnings.append(f"覆盖率检查失败: {str(e)}")
-                missing_points = []
-            
-            # 步骤 5: 生成补充测试用例
-            logger.info("步骤 5: 生成补充测试用例")
-            
-            supplementary_cases = []
-            if missing_points:
-                try:
-                    # 使用测试设计 Agent 生成补充用例
-                    test_designs = await self.test_design_agent.design_tests(
-                        analysis=analysis_result,
-                        context={
-                            'historical_cases': existing_cases,
-                            'focus_points': missing_points  # 聚焦于缺失的测试点
-                        }
-                    )
-                    
-                    # 格式化补充用例
-                    supplementary_cases = await self.format_testcase_tool.execute(
-                        [tc.to_dict() for tc in test_designs]
-                    )
-                    
-                    logger.info(f"生成 {len(supplementary_cases)} 个补充测试用例")
-                except Exception as e:
-                    logger.warning(f"生成补充测试用例失败: {e}")
-                    warnings.append(f"生成补充测试用例失败: {str(e)}")
+            quality_issues = state['quality_issues']
+            coverage_report = state['coverage_report']
+            missing_points = coverage_report.get('missing_coverage', [])
+            supplementary_cases = state['supplementary_cases']
             
             # 步骤 6: 生成优化建议
             logger.info("步骤 6: 生成优化建议")
@@ -251,15 +284,16 @@ class TestCaseOptimizationWorkflow(BaseWorkflow):
                     'missing_points': missing_points,
                     'supplementary_cases': supplementary_cases,
                     'optimization_suggestions': optimization_suggestions,
-                    'requirement_analysis': analysis_result.to_dict(),
-                    'coverage_report': coverage_report if 'coverage_report' in locals() else {}
+                    'requirement_analysis': state['analysis'].to_dict(),
+                    'coverage_report': coverage_report
                 },
                 metadata={
                     'existing_cases_count': len(existing_cases),
                     'quality_issues_count': len(quality_issues),
                     'missing_points_count': len(missing_points),
                     'supplementary_cases_count': len(supplementary_cases),
-                    'warnings': warnings
+                    'warnings': warnings,
+                    **graph.metadata()
                 }
             )
             
@@ -271,6 +305,398 @@ class TestCaseOptimizationWorkflow(BaseWorkflow):
                 metadata={'warnings': warnings}
             )
     
+    async def _fetch_existing_cases(
+        self,
+        requirement: str,
+        project_id: Any,
+        testcase_limit: int,
+        provided_cases: Optional[List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """步骤 1: 获取现有测试用例（未提供时通过搜索获取）"""
+        logger.info(f"步骤 1: 获取现有测试用例 (project_id={project_id})")
+        if provided_cases:
+            return provided_cases
+        
+        existing_cases = await self.search_testcase_tool.execute(
+            query=requirement,
+            project_id=project_id,
+            limit=testcase_limit
+        )
+        logger.info(f"通过搜索找到 {len(existing_cases)} 个现有测试用例")
+        return existing_cases
+    
+    async def _check_quality(self, existing_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """步骤 2: 批量质量检查"""
+        logger.info("步骤 2: 执行质量检查")
+        case_issues = await self.check_quality_tool.execute_batch(existing_cases)
+        
+        quality_issues = [
+            {
+                'case_id': case.get('id'),
+                'case_title': case.get('title'),
+                'issues': issues
+            }
+            for case, issues in zip(existing_cases, case_issues)
+            if issues
+        ]
+        
+        logger.info(f"发现 {len(quality_issues)} 个测试用例存在质量问题")
+        return quality_issues
+    
+    async def _retrieve_prds(
+        self,
+        requirement: str,
+        project_id: Any,
+        prd_limit: int
+    ) -> List[Dict[str, Any]]:
+        """步骤 3a: 检索相关 PRD"""
+        logger.info("步骤 3: 检索相关 PRD")
+        historical_prds = await self.search_prd_tool.execute(
+            query=requirement,
+            project_id=project_id,
+            limit=prd_limit
+        )
+        logger.info(f"检索到 {len(historical_prds)} 个相关 PRD")
+        return historical_prds
+    
+    async def _analyze_requirement(
+        self,
+        requirement: str,
+        historical_prds: List[Dict[str, Any]],
+        existing_cases: List[Dict[str, Any]]
+    ) -> AnalysisResult:
+        """步骤 3b: 分析需求"""
+        logger.info("步骤 3: 分析需求")
+        analysis_result = await self.requirement_analysis_agent.analyze(
+            requirement=requirement,
+            context={'historical_prds': historical_prds}
+        )
+        logger.info("需求分析完成")
+        return analysis_result
+    
+    async def _check_coverage(
+        self,
+        existing_cases: List[Dict[str, Any]],
+        analysis: AnalysisResult,
+        project_id: Any
+    ) -> Dict[str, Any]:
+        """步骤 4: 识别缺失的测试点（覆盖率检查，通过项目关键词索引查找）"""
+        logger.info("步骤 4: 识别缺失的测试点")
+        coverage_report = await self.validate_coverage_tool.execute(
+            test_cases=existing_cases,
+            requirement_analysis=analysis.to_dict(),
+            project_id=project_id
+        )
+        logger.info(f"识别到 {len(coverage_report.get('missing_coverage', []))} 个缺失的测试点")
+        return coverage_report
+    
+    async def _generate_supplements(
+        self,
+        analysis: AnalysisResult,
+        existing_cases: List[Dict[str, Any]],
+        coverage_report: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """步骤 5: 生成补充测试用例"""
+        logger.info("步骤 5: 生成补充测试用例")
+        missing_points = coverage_report.get('missing_coverage', [])
+        
+        # 使用测试设计 Agent 生成补充用例
+        test_designs = await self.test_design_agent.design_tests(
+            analysis=analysis,
+            context={
+                'historical_cases': existing_cases,
+                'focus_points': missing_points  # 聚焦于缺失的测试点
+            }
+        )
+        
+        # 格式化补充用例
+        supplementary_cases = await self.format_testcase_tool.execute(
+            [tc.to_dict() for tc in test_designs]
+        )
+        
+        logger.info(f"生成 {len(supplementary_cases)} 个补充测试用例")
+        return supplementary_cases
+    
+    async def run_audit(
+        self,
+        project_id: Any,
+        chunk_size: int = 1000,
+        report_id: Optional[str] = None
+    ) -> WorkflowResult:
+        """
+        执行项目级测试套件审计
+        
+        报告写入 report_dir 下的 <项目 ID>-<报告 ID>.jsonl，文件读写在共享线程池中执行。
+        
+        Args:
+            project_id: 项目 ID
+            chunk_size: 每批处理的用例数量
+            report_id: 报告 ID（默认随机生成；后台任务使用任务 ID）
+            
+        Returns:
+            WorkflowResult: 包含审计摘要、最大的近似重复簇和报告文件路径
+        """
+        if self.list_testcases_tool is None:
+            return WorkflowResult(
+                success=False,
+                error="审计模式需要配置测试用例列表工具"
+            )
+        
+        chunk_size = max(int(chunk_size), 1)
+        report_path = audit_report_path(self.report_dir, project_id, report_id or uuid.uuid4().hex)
+        warnings: List[str] = []
+        summary: Dict[str, Any] = {
+            'total_cases': 0,
+            'cases_with_issues': 0,
+            'issue_counts': Counter(),
+            'unlinked_cases': 0,
+        }
+        prd_case_counts: Counter = Counter()
+        duplicate_index = NearDuplicateIndex()
+        chunk_count = 0
+        
+        logger.info(f"开始项目审计 (project_id={project_id}, chunk_size={chunk_size})")
+        
+        pool = get_pool("thread")
+        report = None
+        try:
+            report = await pool.run(self._open_report, report_path)
+            # 步骤 1: 分页拉取用例，按批次检查质量和近似重复
+            chunk: List[Dict[str, Any]] = []
+            async for page in self.list_testcases_tool.iter_pages(project_id=project_id):
+                chunk.extend(page)
+                if len(chunk) >= chunk_size:
+                    chunk_count += 1
+                    await self._audit_chunk(
+                        chunk, chunk_count, report, summary,
+                        prd_case_counts, duplicate_index, warnings
+                    )
+                    chunk = []
+            if chunk:
+                chunk_count += 1
+                await self._audit_chunk(
+                    chunk, chunk_count, report, summary,
+                    prd_case_counts, duplicate_index, warnings
+                )
+            
+            # 步骤 2: 输出近似重复簇
+            clusters = duplicate_index.clusters()
+            await self._write_records(report, [
+                {'type': 'duplicate_cluster', 'case_ids': cluster, 'size': len(cluster)}
+                for cluster in clusters
+            ])
+            summary['duplicate_clusters'] = len(clusters)
+            summary['duplicate_cases'] = sum(len(cluster) for cluster in clusters)
+            
+            # 步骤 3: 分页拉取 PRD，统计关联覆盖情况
+            if self.list_prds_tool is not None:
+                await self._audit_prd_coverage(
+                    project_id, report, summary, prd_case_counts, warnings
+                )
+            
+            summary['issue_counts'] = dict(summary['issue_counts'].most_common())
+            await self._write_records(report, [{'type': 'summary', **summary}])
+    
+        except Exception as e:
+            logger.exception(f"项目审计失败: {e}")
+            return WorkflowResult(
+                success=False,
+                error=f"项目审计失败: {str(e)}",
+                metadata={
+                    'mode': 'audit',
+                    'report_path': report_path,
+                    'processed_cases': summary['total_cases'],
+                    'warnings': warnings
+                }
+            )
+        finally:
+            if report is not None:
+                await pool.run(report.close)
+        
+        logger.info(
+            f"项目审计完成: {summary['total_cases']} 个测试用例，"
+            f"{summary['cases_with_issues']} 个存在质量问题，"
+            f"{summary['duplicate_clusters']} 个近似重复簇"
+        )
+        
+        return WorkflowResult(
+            success=True,
+            data={
+                'summary': summary,
+                'top_duplicate_clusters': clusters[:10],
+                'optimization_suggestions': self._generate_audit_suggestions(summary),
+                'report_path': report_path
+            },
+            metadata={
+                'mode': 'audit',
+                'chunk_count': chunk_count,
+                'chunk_size': chunk_size,
+                'warnings': warnings
+            }
+        )
+    
+    async def _audit_chunk(
+        self,
+        chunk: List[Dict[str, Any]],
+        chunk_number: int,
+        report: Any,
+        summary: Dict[str, Any],
+        prd_case_counts: Counter,
+        duplicate_index: NearDuplicateIndex,
+        warnings: List[str]
+    ) -> None:
+        """
+        审计一批测试用例并将明细写入报告
+        
+        Args:
+            chunk: 当前批次的测试用例
+            chunk_number: 批次序号（从 1 开始）
+            report: 报告文件
+            summary: 审计摘要（原地更新）
+            prd_case_counts: 各 PRD 关联的用例数量（原地更新）
+            duplicate_index: 近似重复索引（原地更新）
+            warnings: 警告列表（原地更新）
+        """
+        offset = summary['total_cases']
+        summary['total_cases'] += len(chunk)
+        
+        try:
+            case_issues = await self.check_quality_tool.execute_batch(chunk)
+        except Exception as e:
+            logger.warning(f"第 {chunk_number} 批质量检查失败: {e}")
+            warnings.append(f"第 {chunk_number} 批质量检查失败: {str(e)}")
+            case_issues = [[] for _ in chunk]
+        
+        records = []
+        for index, (case, issues) in enumerate(zip(chunk, case_issues)):
+            case_id = case.get('id') or f"#{offset + index}"
+            
+            if case.get('prd_id'):
+                prd_case_counts[case['prd_id']] += 1
+            else:
+                summary['unlinked_cases'] += 1
+            
+            duplicate_index.add(case_id, case_signature(case))
+            
+            if issues:
+                summary['cases_with_issues'] += 1
+                summary['issue_counts'].update(issue['rule'] for issue in issues)
+                records.append({
+                    'type': 'quality',
+                    'case_id': case_id,
+                    'case_title': case.get('title'),
+                    'issues': issues
+                })
+        
+        await self._write_records(report, records)
+        logger.info(f"第 {chunk_number} 批审计完成: 累计 {summary['total_cases']} 个测试用例")
+    
+    async def _audit_prd_coverage(
+        self,
+        project_id: Any,
+        report: Any,
+        summary: Dict[str, Any],
+        prd_case_counts: Counter,
+        warnings: List[str]
+    ) -> None:
+        """
+        统计 PRD 关联覆盖情况，并将未被任何用例关联的 PRD 写入报告
+        
+        Args:
+            project_id: 项目 ID
+            report: 报告文件
+            summary: 审计摘要（原地更新）
+            prd_case_counts: 各 PRD 关联的用例数量
+            warnings: 警告列表（原地更新）
+        """
+        total_prds = 0
+        covered_prds = 0
+        try:
+            async for page in self.list_prds_tool.iter_pages(project_id=project_id):
+                records = []
+                for prd in page:
+                    total_prds += 1
+                    if prd_case_counts.get(prd.get('id'), 0) > 0:
+                        covered_prds += 1
+                    else:
+                        records.append({
+                            'type': 'uncovered_prd',
+                            'prd_id': prd.get('id'),
+                            'prd_title': prd.get('title')
+                        })
+                await self._write_records(report, records)
+        except Exception as e:
+            logger.warning(f"PRD 覆盖统计失败: {e}")
+            warnings.append(f"PRD 覆盖统计失败: {str(e)}")
+            return
+        
+        summary['total_prds'] = total_prds
+        summary['covered_prds'] = covered_prds
+        summary['uncovered_prds'] = total_prds - covered_prds
+        summary['prd_coverage'] = round(covered_prds / max(total_prds, 1) * 100, 2)
+    
+    @staticmethod
+    def _open_report(path: str) -> Any:
+        """创建报告目录并打开报告文件（在线程池中调用）"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, 'w', encoding='utf-8')
+    
+    @staticmethod
+    def _append(report: Any, text: str) -> None:
+        """追加写入并刷新（在线程池中调用）"""
+        report.write(text)
+        report.flush()
+    
+    async def _write_records(self, report: Any, records: List[Dict[str, Any]]) -> None:
+        """将记录以 JSON Lines 格式追加写入报告（文件写入在共享线程池中执行，不阻塞事件循环）"""
+        if not records:
+            return
+        await get_pool("thread").run(self._append, report, ''.join(dumps(record) + '\n' for record in records))
+    
+    def _generate_audit_suggestions(self, summary: Dict[str, Any]) -> List[str]:
+        """
+        根据审计摘要生成优化建议
+        
+        Args:
+            summary: 审计摘要
+            
+        Returns:
+            优化建议列表
+        """
+        suggestions = []
+        total_cases = summary['total_cases']
+        
+        if total_cases == 0:
+            return ["项目中没有测试用例，建议先创建基础测试用例"]
+        
+        if summary['cases_with_issues']:
+            suggestions.append(
+                f"{summary['cases_with_issues']}/{total_cases} 个测试用例存在质量问题，详见审计报告"
+            )
+            for rule, count in list(summary['issue_counts'].items())[:3]:
+                suggestions.append(f"'{rule}' 问题出现 {count} 次，建议统一修复")
+        
+        if summary.get('duplicate_clusters'):
+            suggestions.append(
+                f"发现 {summary['duplicate_clusters']} 组近似重复用例"
+                f"（共 {summary['duplicate_cases']} 个），建议合并或删除冗余用例"
+            )
+        
+        if summary.get('uncovered_prds'):
+            suggestions.append(
+                f"{summary['uncovered_prds']} 个 PRD 没有关联任何测试用例，建议补充测试用例"
+            )
+        
+        if summary['unlinked_cases']:
+            suggestions.append(
+                f"{summary['unlinked_cases']} 个测试用例未关联 PRD，建议补充关联以便追踪覆盖率"
+            )
+        
+        if not suggestions:
+            suggestions.append("测试套件质量良好，未发现明显问题")
+        
+        return suggestions
+    
     def _generate_optimization_suggestions(
         self,
         quality_issues: List[Dict[str, Any]],
@@ -0,0 +1,10 @@
+"""
+离线基准测试
+
+在不依赖真实 Claude/DeepSeek 和 Go 后端的情况下测量服务的吞吐量和延迟：
+- fake_llm: 模拟 LLM API（可配置延迟分布、token 流速和 429 注入）
+- fake_backend: 模拟 Go 后端的搜索和用例 API
+- harness: 启动模拟服务和被测服务，按指定并发驱动 /ai/generate 和 /ai/chat/stream
+
+使用方法见 bench/README.md，入口为 ``python -m bench``。
+"""
@@ -0,0 +1,83 @@
+"""
+压测入口
+
+示例：
+    python -m bench --scenarios generate chat_stream --concurrency 1 8 32 --requests 50 \\
+        --llm-latency lognormal:0.8,0.4 --tokens-per-second 60 --rate-limit 0.02 \\
+        --output bench-results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from .fake_backend import FakeBackendConfig
+from .fake_llm import FakeLLMConfig
+from .harness import SCENARIOS, BenchConfig, format_report, run_benchmark
+from .latency import LatencyModel
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="AI 服务离线压测")
+    parser.add_argument("--scenarios", nargs="+", default=["generate", "chat_stream"],
+                        choices=sorted(SCENARIOS), help="压测场景")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32], help="并发级别")
+    parser.add_argument("--requests", type=int, default=50, help="每个并发级别的请求数")
+    parser.add_argument("--warmup", type=int, default=2, help="每个场景的预热请求数")
+    parser.add_argument("--app-mode", choices=["process", "inprocess"], default="process",
+                        help="被测服务运行方式")
+    parser.add_argument("--timeout", type=float, default=300.0, help="单个请求的超时时间（秒）")
+    parser.add_argument("--llm-latency", default="lognormal:0.8,0.4",
+                        help="模拟 LLM 首 token 延迟分布（如 0.5、uniform:0.2,0.8、lognormal:0.8,0.4）")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0, help="模拟 LLM 流式输出速率")
+    parser.add_argument("--chunk-chars", type=int, default=4, help="每个流式块的字符数")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="模拟 LLM 返回 429 的概率")
+    parser.add_argument("--test-cases", type=int, default=5, help="每次测试设计返回的用例数")
+    parser.add_argument("--backend-latency", default="uniform:0.01,0.05", help="模拟后端延迟分布")
+    parser.add_argument("--corpus-size", type=int, default=200, help="模拟后端每个项目的用例数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", help="将报告写入 JSON 文件")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    config = BenchConfig(
+        scenarios=args.scenarios,
+        concurrency=args.concurrency,
+        requests=args.requests,
+        warmup=args.warmup,
+        app_mode=args.app_mode,
+        request_timeout=args.timeout,
+        llm=FakeLLMConfig(
+            latency=LatencyModel.parse(args.llm_latency),
+            tokens_per_second=args.tokens_per_second,
+            chunk_chars=args.chunk_chars,
+            rate_limit_probability=args.rate_limit,
+            test_case_count=args.test_cases,
+            seed=args.seed,
+        ),
+        backend=FakeBackendConfig(
+            latency=LatencyModel.parse(args.backend_latency),
+            corpus_size=args.corpus_size,
+            seed=args.seed,
+        ),
+    )
+
+    report = asyncio.run(run_benchmark(config))
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n报告已写入 {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
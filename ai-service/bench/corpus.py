@@ -0,0 +1,218 @@
+"""
+合成语料
+
+生成结构接近真实数据的测试用例、需求分析结果和 LLM 响应文本，供微基准测试使用。
+同一组参数和随机种子总是生成相同的语料，保证多次测量之间可比。
+"""
+
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+LANGUAGES = ("zh", "en", "mixed")
+
+_ZH_MODULES = ["用户登录", "用户注册", "订单管理", "在线支付", "购物车", "个人中心", "消息通知", "权限管理"]
+_EN_MODULES = ["user login", "user registration", "order management", "online payment",
+               "shopping cart", "user profile", "notification", "access control"]
+
+_ZH_SCENARIOS = ["正常流程", "输入为空", "超出最大长度", "并发提交", "网络中断后重试", "权限不足", "数据已被删除", "会话过期"]
+_EN_SCENARIOS = ["happy path", "empty input", "maximum length exceeded", "concurrent submission",
+                 "retry after network failure", "insufficient permission", "record already deleted", "session expired"]
+
+_ZH_ACTIONS = ["打开{module}页面", "在输入框中输入测试数据", "点击提交按钮", "等待系统处理完成", "刷新页面",
+               "切换到另一个账号", "检查数据库中的记录", "返回上一页", "修改表单字段后再次提交", "查看操作日志"]
+_EN_ACTIONS = ["Open the {module} page", "Enter the test data into the form", "Click the submit button",
+               "Wait for the request to complete", "Refresh the page", "Switch to another account",
+               "Check the record in the database", "Navigate back", "Edit a field and submit again",
+               "Inspect the audit log"]
+
+_ZH_EXPECTED = ["页面正常加载", "输入内容正确显示", "系统提示操作成功", "列表中显示最新数据", "系统给出明确的错误提示",
+                "按钮处于禁用状态", "数据库记录与输入一致", "页面跳转到结果页"]
+_EN_EXPECTED = ["The page loads without errors", "The input is displayed correctly", "A success message is shown",
+                "The list shows the latest data", "A clear error message is displayed", "The button is disabled",
+                "The stored record matches the input", "The user is redirected to the result page"]
+
+_TYPES = ["functional", "boundary", "exception"]
+_PRIORITIES = ["high", "medium", "low", "P0", "P2", "高", "中"]
+
+
+def _vocabulary(language: str, rng: random.Random) -> Dict[str, List[str]]:
+    """按语言选择词表（mixed 为每个用例随机选择）"""
+    if language == "mixed":
+        language = rng.choice(("zh", "en"))
+    if language == "zh":
+        return {"modules": _ZH_MODULES, "scenarios": _ZH_SCENARIOS, "actions": _ZH_ACTIONS, "expected": _ZH_EXPECTED}
+    if language == "en":
+        return {"modules": _EN_MODULES, "scenarios": _EN_SCENARIOS, "actions": _EN_ACTIONS, "expected": _EN_EXPECTED}
+    raise ValueError(f"不支持的语言: {language}，可选: {LANGUAGES}")
+
+
+def generate_test_cases(
+    count: int,
+    language: str = "zh",
+    min_steps: int = 3,
+    max_steps: int = 8,
+    duplicate_ratio: float = 0.1,
+    seed: Optional[int] = 0
+) -> List[Dict[str, Any]]:
+    """
+    生成测试用例（工具使用的结构：steps 为 step_number / action / expected 字典列表）
+
+    Args:
+        count: 用例数量
+        language: zh / en / mixed
+        min_steps: 每个用例的最少步骤数
+        max_steps: 每个用例的最多步骤数
+        duplicate_ratio: 近似重复用例的比例（复制已有用例并做少量修改）
+        seed: 随机种子
+
+    Returns:
+        测试用例列表
+    """
+    rng = random.Random(seed)
+    cases: List[Dict[str, Any]] = []
+    for index in range(count):
+        if cases and rng.random() < duplicate_ratio:
+            source = rng.choice(cases)
+            case = json.loads(json.dumps(source, ensure_ascii=False))
+            case["title"] = f"{source['title']} ({index + 1})"
+            cases.append(case)
+            continue
+
+        words = _vocabulary(language, rng)
+        module = rng.choice(words["modules"])
+        scenario = rng.choice(words["scenarios"])
+        zh = words["modules"] is _ZH_MODULES
+        steps = [
+            {
+                "step_number": step + 1,
+                "action": rng.choice(words["actions"]).format(module=module),
+                "expected": rng.choice(words["expected"]),
+            }
+            for step in range(rng.randint(min_steps, max_steps))
+        ]
+        cases.append({
+            "title": f"测试{module}-{scenario}-{index + 1}" if zh else f"Test {module} - {scenario} #{index + 1}",
+            "preconditions": f"{module}功能已上线，测试账号已准备" if zh
+            else f"The {module} feature is deployed and a test account exists",
+            "steps": steps,
+            "expected_result": f"{module}在{scenario}场景下的处理结果符合需求" if zh
+            else f"The {module} feature behaves as specified for the {scenario} scenario",
+            "priority": rng.choice(_PRIORITIES),
+            "type": rng.choice(_TYPES),
+        })
+    return cases
+
+
+def generate_requirement_analysis(
+    points: int,
+    language: str = "zh",
+    seed: Optional[int] = 0
+) -> Dict[str, Any]:
+    """
+    生成需求分析结果（ValidateCoverageTool 使用的结构）
+
+    Args:
+        points: 功能点数量（异常条件和约束各为其一半）
+        language: zh / en / mixed
+        seed: 随机种子
+
+    Returns:
+        需求分析字典
+    """
+    rng = random.Random(seed)
+    functional_points = []
+    for index in range(points):
+        words = _vocabulary(language, rng)
+        module = rng.choice(words["modules"])
+        scenario = rng.choice(words["scenarios"])
+        functional_points.append(
+            f"{module} {scenario} 功能点{index + 1}" if words["modules"] is _ZH_MODULES
+            else f"{module} supports {scenario} handling (point {index + 1})"
+        )
+    half = max(points // 2, 1)
+    return {
+        "feature_name": "synthetic feature",
+        "description": "synthetic requirement analysis",
+        "functional_points": functional_points,
+        "business_rules": [f"rule {index + 1}" for index in range(half)],
+        "input_specs": {f"field_{index}": {"type": "string", "required": True} for index in range(half)},
+        "output_specs": {"result": {"type": "object"}},
+        "exception_conditions": [f"exception {index + 1}" for index in range(half)],
+        "constraints": [f"constraint {index + 1}" for index in range(half)],
+        "acceptance_criteria": [f"criterion {index + 1}" for index in range(half)],
+    }
+
+
+def to_design_items(test_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    转换为测试设计 Agent 的输出结构（steps 为字符串列表，带 rationale）
+
+    Args:
+        test_cases: generate_test_cases 生成的用例
+
+    Returns:
+        设计条目列表
+    """
+    return [
+        {
+            "title": case["title"],
+            "preconditions": case["preconditions"],
+            "steps": [step["action"] for step in case["steps"]],
+            "expected_result": case["expected_result"],
+            "priority": case["priority"],
+            "type": case["type"],
+            "rationale": case["expected_result"],
+        }
+        for case in test_cases
+    ]
+
+
+def generate_review(count: int, reject_ratio: float = 0.1, seed: Optional[int] = 0) -> Dict[str, Any]:
+    """
+    生成质量审查结果（QualityReviewAgent 期望的 LLM 输出结构）
+
+    Args:
+        count: 被审查的用例数量
+        reject_ratio: 被拒绝用例的比例
+        seed: 随机种子
+
+    Returns:
+        审查结果字典
+    """
+    rng = random.Random(seed)
+    approved, rejected = [], []
+    for index in range(count):
+        if rng.random() < reject_ratio:
+            rejected.append([index, "预期结果不够明确，无法验证"])
+        else:
+            approved.append(index)
+    return {
+        "coverage_score": 82,
+        "issues": [f"用例 {index} 的步骤缺少测试数据" for index, _ in rejected],
+        "suggestions": ["补充并发场景", "补充边界值用例"],
+        "approved_cases": approved,
+        "rejected_cases": rejected,
+        "overall_quality": "good",
+    }
+
+
+def render_llm_response(payload: Any, style: str = "plain") -> str:
+    """
+    将数据渲染为 LLM 风格的响应文本
+
+    Args:
+        payload: 要序列化的数据
+        style: plain（纯 JSON）、fenced（```json 代码块）或 prose（前后带说明文字，需要回退提取）
+
+    Returns:
+        响应文本
+    """
+    body = json.dumps(payload, ensure_ascii=False, indent=2)
+    if style == "plain":
+        return body
+    if style == "fenced":
+        return f"```json\n{body}\n```"
+    if style == "prose":
+        return f"以下是根据需求生成的结果：\n\n{body}\n\n如需调整，请告诉我。"
+    raise ValueError(f"不支持的响应格式: {style}")
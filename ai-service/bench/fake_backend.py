@@ -0,0 +1,177 @@
+"""
+模拟 Go 后端
+
+提供服务调用的 Go 后端 API 子集，响应格式与真实后端一致：
+- POST /api/v1/projects/{id}/search: 混合搜索（PRD / 测试用例）
+- GET  /api/v1/projects/{id}/testcases、/prds: 分页列表
+- GET  /api/v1/projects/{id}/testcases/{case_id}/recommendations: 相关用例推荐
+- POST /api/v1/projects/{id}/testcases、PUT .../testcases/{case_id}: 保存和更新用例
+"""
+
+import asyncio
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+
+from .latency import LatencyModel
+
+_MODULES = ["登录", "注册", "订单", "支付", "购物车", "个人中心", "消息通知", "权限管理"]
+_PRIORITIES = ["P0", "P1", "P2", "P3"]
+
+
+@dataclass
+class FakeBackendConfig:
+    """
+    模拟后端配置
+
+    Attributes:
+        latency: 每个请求的处理延迟
+        corpus_size: 每个项目的测试用例数（PRD 数为其 1/10）
+        seed: 随机种子
+    """
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    corpus_size: int = 200
+    seed: Optional[int] = None
+
+
+def _build_testcases(count: int) -> List[Dict[str, Any]]:
+    cases = []
+    for index in range(count):
+        module = _MODULES[index % len(_MODULES)]
+        cases.append({
+            "id": index + 1,
+            "title": f"{module}功能测试用例 {index + 1}",
+            "precondition": f"{module}模块数据已准备",
+            "steps": [
+                {"step_order": 1, "description": f"进入{module}页面", "expected": "页面正常加载"},
+                {"step_order": 2, "description": f"执行{module}操作 {index + 1}", "expected": "操作成功"},
+            ],
+            "expected_result": f"{module}操作结果符合预期",
+            "priority": _PRIORITIES[index % len(_PRIORITIES)],
+            "type": "functional",
+            "module": module,
+        })
+    return cases
+
+
+def _build_prds(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": index + 1,
+            "title": f"{_MODULES[index % len(_MODULES)]}需求文档 v{index + 1}",
+            "content": f"{_MODULES[index % len(_MODULES)]}模块的功能需求描述。" * 20,
+            "version": f"v{index + 1}",
+            "status": "approved",
+        }
+        for index in range(count)
+    ]
+
+
+def _page(items: List[Dict[str, Any]], page: int, page_size: int) -> Dict[str, Any]:
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 100)
+    start = (page - 1) * page_size
+    return {
+        "items": items[start:start + page_size],
+        "total": len(items),
+        "page": page,
+        "page_size": page_size,
+        "total_pages": math.ceil(len(items) / page_size) if items else 0,
+    }
+
+
+def create_fake_backend_app(config: Optional[FakeBackendConfig] = None) -> FastAPI:
+    """
+    创建模拟 Go 后端应用
+
+    Args:
+        config: 模拟配置
+
+    Returns:
+        FastAPI 应用（请求计数在 app.state.request_count 中）
+    """
+    config = config or FakeBackendConfig()
+    rng = random.Random(config.seed)
+    testcases = _build_testcases(config.corpus_size)
+    prds = _build_prds(max(config.corpus_size // 10, 1))
+    next_id = {"value": len(testcases) + 1}
+
+    app = FastAPI(title="Fake Go Backend")
+    app.state.config = config
+    app.state.request_count = 0
+
+    async def simulate_latency():
+        app.state.request_count += 1
+        latency = config.latency.sample(rng)
+        if latency:
+            await asyncio.sleep(latency)
+
+    @app.post("/api/v1/projects/{project_id}/search")
+    async def search(project_id: str, request: Request):
+        await simulate_latency()
+        body = await request.json()
+        limit = int(body.get("limit", 10))
+        source = prds if body.get("type") == "prd" else testcases
+
+        results = []
+        for rank, item in enumerate(rng.sample(source, min(limit, len(source)))):
+            content = item.get("content") or item.get("expected_result", "")
+            metadata = {key: value for key, value in item.items() if key not in ("id", "title", "content")}
+            results.append({
+                "id": item["id"],
+                "title": item["title"],
+                "content": content,
+                "score": round(0.95 - rank * 0.01, 4),
+                "metadata": metadata,
+            })
+        return {"code": 200, "data": {"results": results, "total": len(results)}}
+
+    @app.get("/api/v1/projects/{project_id}/testcases")
+    async def list_testcases(project_id: str, page: int = 1, page_size: int = 20):
+        await simulate_latency()
+        return {"code": 200, "data": _page(testcases, page, page_size)}
+
+    @app.get("/api/v1/projects/{project_id}/prds")
+    async def list_prds(project_id: str, page: int = 1, page_size: int = 20):
+        await simulate_latency()
+        return {"code": 200, "data": _page(prds, page, page_size)}
+
+    @app.get("/api/v1/projects/{project_id}/testcases/{case_id}/recommendations")
+    async def recommendations(project_id: str, case_id: int, limit: int = 10):
+        await simulate_latency()
+        related = [case for case in testcases if case["id"] != case_id][:limit]
+        return {
+            "code": 200,
+            "data": {
+                "results": [
+                    {
+                        "id": case["id"],
+                        "title": case["title"],
+                        "content": case["expected_result"],
+                        "score": 0.9,
+                        "metadata": {"priority": case["priority"]},
+                    }
+                    for case in related
+                ]
+            },
+        }
+
+    @app.post("/api/v1/projects/{project_id}/testcases")
+    async def create_testcase(project_id: str, request: Request):
+        await simulate_latency()
+        body = await request.json()
+        case = {**body, "id": next_id["value"]}
+        next_id["value"] += 1
+        testcases.append(case)
+        return {"code": 0, "data": case}
+
+    @app.put("/api/v1/projects/{project_id}/testcases/{case_id}")
+    async def update_testcase(project_id: str, case_id: int, request: Request):
+        await simulate_latency()
+        body = await request.json()
+        return {"code": 0, "data": {**body, "id": case_id}}
+
+    return app
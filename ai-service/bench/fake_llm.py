@@ -0,0 +1,283 @@
+"""
+模拟 LLM API
+
+同时提供 Claude（/v1/messages）和 OpenAI 兼容（/v1/chat/completions、/chat/completions）接口。
+根据 prompt 中的标记返回各 Agent 能够解析的 JSON，使完整的生成流程可以离线运行：
+- 需求分析 → 结构化分析结果
+- 测试设计 → 测试用例数组
+- 质量审查 → 全部通过的审查结果
+- 任务分类 → generate_test_cases
+- 其他（对话）→ 固定长度的中文文本
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .latency import LatencyModel
+
+
+@dataclass
+class FakeLLMConfig:
+    """
+    模拟 LLM 配置
+
+    Attributes:
+        latency: 首个 token 前的延迟（非流式请求为整体延迟）
+        tokens_per_second: 流式输出速率，0 表示不限速
+        chunk_chars: 每个流式块的字符数（近似一个 token）
+        rate_limit_probability: 返回 429 的概率
+        retry_after: 429 响应的 Retry-After（秒）
+        test_case_count: 测试设计返回的用例数
+        chat_chars: 对话回复的字符数
+        seed: 随机种子
+    """
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    tokens_per_second: float = 50.0
+    chunk_chars: int = 4
+    rate_limit_probability: float = 0.0
+    retry_after: float = 1.0
+    test_case_count: int = 5
+    chat_chars: int = 400
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeLLMStats:
+    """模拟 LLM 的请求统计"""
+    requests: int = 0
+    rate_limited: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    output_chars: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "max_in_flight": self.max_in_flight,
+            "output_chars": self.output_chars,
+        }
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    """拼接请求中的所有消息文本"""
+    parts: List[str] = []
+    system = body.get("system")
+    if isinstance(system, str):
+        parts.append(system)
+    elif isinstance(system, list):
+        parts.extend(block.get("text", "") for block in system if isinstance(block, dict))
+
+    for message in body.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+        else:
+            parts.append(str(content))
+    return "\n".join(parts)
+
+
+def _analysis_response() -> str:
+    return json.dumps({
+        "functional_points": ["用户名密码登录", "验证码校验", "登录失败锁定"],
+        "business_rules": ["连续 5 次失败锁定账户 30 分钟", "验证码 60 秒内有效"],
+        "input_specs": {
+            "username": {"type": "string", "range": "4-20 个字符", "required": True},
+            "password": {"type": "string", "format": "8-32 位，包含字母和数字"},
+        },
+        "output_specs": {"token": {"type": "string", "description": "登录凭证"}},
+        "exception_conditions": ["用户名不存在", "密码错误", "验证码过期"],
+        "constraints": ["登录接口响应时间小于 1 秒"],
+    }, ensure_ascii=False)
+
+
+def _design_response(count: int) -> str:
+    types = ["functional", "boundary", "exception"]
+    priorities = ["high", "medium", "low"]
+    cases = [
+        {
+            "title": f"验证登录场景 {index + 1}",
+            "preconditions": "用户已注册且账户状态正常",
+            "steps": ["打开登录页面", f"输入第 {index + 1} 组用户名和密码", "点击登录按钮"],
+            "expected_result": "系统按照业务规则返回对应的登录结果",
+            "priority": priorities[index % len(priorities)],
+            "type": types[index % len(types)],
+            "rationale": "覆盖登录主流程及异常分支",
+        }
+        for index in range(count)
+    ]
+    return "```json\n" + json.dumps(cases, ensure_ascii=False) + "\n```"
+
+
+def _review_response(count: int) -> str:
+    return json.dumps({
+        "coverage_score": 85,
+        "issues": [],
+        "suggestions": ["补充并发登录场景"],
+        "approved_cases": list(range(count)),
+        "rejected_cases": [],
+        "overall_quality": "good",
+    }, ensure_ascii=False)
+
+
+def _chat_response(length: int) -> str:
+    sentence = "好的，我们先梳理登录功能的主要测试点，再逐项设计用例。"
+    repeats = length // len(sentence) + 1
+    return (sentence * repeats)[:length]
+
+
+def build_reply(prompt: str, config: FakeLLMConfig) -> str:
+    """
+    根据 prompt 生成回复
+
+    Args:
+        prompt: 请求中的全部消息文本
+        config: 模拟配置
+
+    Returns:
+        回复文本
+    """
+    if "请分析以下需求" in prompt:
+        return _analysis_response()
+    if "设计全面的测试用例" in prompt:
+        return _design_response(config.test_case_count)
+    if "请审查以下测试用例" in prompt:
+        return _review_response(config.test_case_count)
+    if "判断任务类型" in prompt:
+        return "generate_test_cases"
+    return _chat_response(config.chat_chars)
+
+
+def _sse(data: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def create_fake_llm_app(config: Optional[FakeLLMConfig] = None) -> FastAPI:
+    """
+    创建模拟 LLM 应用
+
+    Args:
+        config: 模拟配置
+
+    Returns:
+        FastAPI 应用（统计信息在 app.state.stats 中）
+    """
+    config = config or FakeLLMConfig()
+    rng = random.Random(config.seed)
+    stats = FakeLLMStats()
+
+    app = FastAPI(title="Fake LLM")
+    app.state.config = config
+    app.state.stats = stats
+
+    async def stream_chunks(text: str) -> AsyncIterator[str]:
+        """按配置的速率切分文本"""
+        step = max(config.chunk_chars, 1)
+        interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        start = time.perf_counter()
+        for index, offset in enumerate(range(0, len(text), step)):
+            if interval:
+                # 按绝对时间对齐，避免 sleep 误差累积
+                delay = start + index * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield text[offset:offset + step]
+
+    async def handle(request: Request, flavor: str):
+        body = await request.json()
+        stats.requests += 1
+
+        if config.rate_limit_probability and rng.random() < config.rate_limit_probability:
+            stats.rate_limited += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"type": "rate_limit_error", "message": "Rate limit exceeded"}},
+                headers={"Retry-After": f"{config.retry_after:g}"},
+            )
+
+        prompt = _prompt_text(body)
+        reply = build_reply(prompt, config)
+        input_tokens = max(len(prompt) // max(config.chunk_chars, 1), 1)
+        output_tokens = max(len(reply) // max(config.chunk_chars, 1), 1)
+        latency = config.latency.sample(rng)
+
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(latency)
+                stats.output_chars += len(reply)
+            finally:
+                stats.in_flight -= 1
+
+            if flavor == "claude":
+                return {
+                    "id": "msg_fake",
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [{"type": "text", "text": reply}],
+                    "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+                }
+            return {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}}],
+                "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens},
+            }
+
+        async def events() -> AsyncIterator[str]:
+            try:
+                await asyncio.sleep(latency)
+                if flavor == "claude":
+                    yield _sse({
+                        "type": "message_start",
+                        "message": {"usage": {"input_tokens": input_tokens, "output_tokens": 1}},
+                    })
+                    async for chunk in stream_chunks(reply):
+                        stats.output_chars += len(chunk)
+                        yield _sse({
+                            "type": "content_block_delta",
+                            "index": 0,
+                            "delta": {"type": "text_delta", "text": chunk},
+                        })
+                    yield _sse({"type": "message_delta", "usage": {"output_tokens": output_tokens}})
+                    yield _sse({"type": "message_stop"})
+                else:
+                    async for chunk in stream_chunks(reply):
+                        stats.output_chars += len(chunk)
+                        yield _sse({"choices": [{"index": 0, "delta": {"content": chunk}}]})
+                    yield _sse({
+                        "choices": [],
+                        "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens},
+                    })
+                    yield "data: [DONE]\n\n"
+            finally:
+                stats.in_flight -= 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/messages")
+    async def claude_messages(request: Request):
+        return await handle(request, "claude")
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat_completions(request: Request):
+        return await handle(request, "openai")
+
+    @app.post("/chat/completions")
+    async def deepseek_chat_completions(request: Request):
+        return await handle(request, "openai")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats.to_dict()
+
+    return app
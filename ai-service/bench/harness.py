@@ -0,0 +1,355 @@
+"""
+压测编排
+
+启动模拟 LLM 和模拟 Go 后端，再启动被测服务（独立进程或当前进程），
+按每个并发级别以闭环方式发送固定数量的请求并汇总结果。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import uvicorn
+
+from .fake_backend import FakeBackendConfig, create_fake_backend_app
+from .fake_llm import FakeLLMConfig, create_fake_llm_app
+from .stats import MemorySampler, RequestSample, summarize
+
+logger = logging.getLogger(__name__)
+
+SERVICE_ROOT = Path(__file__).resolve().parent.parent
+HOST = "127.0.0.1"
+
+GENERATE_MESSAGE = "请帮我生成用户登录功能的测试用例：支持用户名密码登录，连续失败 5 次锁定账户，需要验证码"
+CHAT_MESSAGE = "帮我梳理一下用户登录功能的测试思路"
+
+
+@dataclass
+class BenchConfig:
+    """
+    压测配置
+
+    Attributes:
+        scenarios: 场景列表（generate / chat_stream）
+        concurrency: 并发级别列表
+        requests: 每个并发级别的请求数
+        warmup: 每个场景正式测量前的预热请求数
+        app_mode: process（独立进程运行被测服务）或 inprocess（与压测客户端同进程）
+        request_timeout: 单个请求的超时时间（秒）
+        llm: 模拟 LLM 配置
+        backend: 模拟后端配置
+    """
+    scenarios: List[str] = field(default_factory=lambda: ["generate", "chat_stream"])
+    concurrency: List[int] = field(default_factory=lambda: [1, 8, 32])
+    requests: int = 50
+    warmup: int = 2
+    app_mode: str = "process"
+    request_timeout: float = 300.0
+    llm: FakeLLMConfig = field(default_factory=FakeLLMConfig)
+    backend: FakeBackendConfig = field(default_factory=FakeBackendConfig)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+class _InLoopServer:
+    """在当前事件循环中运行的 uvicorn 服务"""
+
+    def __init__(self, app, port: int):
+        config = uvicorn.Config(app, host=HOST, port=port, log_level="warning", lifespan="on")
+        self.server = uvicorn.Server(config)
+        # 信号由压测进程自己处理
+        self.server.install_signal_handlers = lambda: None
+        self.url = f"http://{HOST}:{port}"
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            if self._task.done():
+                self._task.result()
+                raise RuntimeError(f"服务启动失败: {self.url}")
+            await asyncio.sleep(0.01)
+
+    async def stop(self) -> None:
+        self.server.should_exit = True
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class _ServiceProcess:
+    """独立进程中运行的被测服务"""
+
+    def __init__(self, port: int, env: Dict[str, str]):
+        self.port = port
+        self.url = f"http://{HOST}:{port}"
+        self.env = env
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    async def start(self, timeout: float = 30.0) -> None:
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", HOST, "--port", str(self.port),
+             "--log-level", "warning"],
+            cwd=str(SERVICE_ROOT),
+            env={**os.environ, **self.env},
+        )
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"被测服务退出，返回码 {self.process.returncode}")
+                try:
+                    response = await client.get(f"{self.url}/health", timeout=1.0)
+                    if response.status_code == 200:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.1)
+        raise RuntimeError("等待被测服务启动超时")
+
+    async def stop(self) -> None:
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.to_thread(self.process.wait, 10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def _configure_inprocess_service(env: Dict[str, str]) -> None:
+    """让当前进程中的服务指向模拟服务（重置已创建的单例）"""
+    from app.api import endpoints
+    from app.config import settings
+
+    settings.BRCONNECTOR_BASE_URL = env["BRCONNECTOR_BASE_URL"]
+    settings.BRCONNECTOR_API_KEY = env["BRCONNECTOR_API_KEY"]
+    settings.GO_BACKEND_URL = env["GO_BACKEND_URL"]
+    endpoints._agent = None
+    endpoints._br_client = None
+    endpoints._conversation_manager = None
+
+
+async def _run_generate(client: httpx.AsyncClient, base_url: str, index: int) -> RequestSample:
+    start = time.perf_counter()
+    try:
+        response = await client.post(
+            f"{base_url}/ai/generate",
+            json={"message": GENERATE_MESSAGE, "project_id": "bench", "conversation_id": f"bench-gen-{index}"},
+        )
+        latency = time.perf_counter() - start
+        ok = response.status_code == 200 and response.json().get("success") is True
+        error = None if ok else response.text[:200]
+        return RequestSample(latency=latency, ok=ok, status=response.status_code, error=error)
+    except httpx.HTTPError as e:
+        return RequestSample(latency=time.perf_counter() - start, ok=False, error=type(e).__name__)
+
+
+async def _run_chat_stream(client: httpx.AsyncClient, base_url: str, index: int) -> RequestSample:
+    start = time.perf_counter()
+    first_byte = None
+    done = False
+    error = None
+    try:
+        async with client.stream(
+            "POST",
+            f"{base_url}/ai/chat/stream",
+            json={"message": CHAT_MESSAGE, "project_id": "bench", "conversation_id": f"bench-chat-{index}"},
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return RequestSample(
+                    latency=time.perf_counter() - start, ok=False, status=response.status_code
+                )
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event.get("type") == "content" and first_byte is None:
+                    first_byte = time.perf_counter() - start
+                elif event.get("type") == "done":
+                    done = True
+                elif event.get("type") == "error":
+                    error = str(event.get("error"))[:200]
+        return RequestSample(
+            latency=time.perf_counter() - start,
+            ok=done and error is None,
+            status=200,
+            first_byte=first_byte,
+            error=error,
+        )
+    except httpx.HTTPError as e:
+        return RequestSample(latency=time.perf_counter() - start, ok=False, error=type(e).__name__)
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient, str, int], Awaitable[RequestSample]]] = {
+    "generate": _run_generate,
+    "chat_stream": _run_chat_stream,
+}
+
+
+async def run_level(
+    scenario: str,
+    base_url: str,
+    concurrency: int,
+    requests: int,
+    timeout: float
+) -> List[RequestSample]:
+    """
+    以闭环方式运行一个并发级别：concurrency 个 worker 共享 requests 个请求
+
+    Args:
+        scenario: 场景名称
+        base_url: 被测服务地址
+        concurrency: 并发数
+        requests: 请求总数
+        timeout: 单个请求的超时时间
+
+    Returns:
+        请求样本
+    """
+    driver = SCENARIOS[scenario]
+    samples: List[RequestSample] = []
+    counter = iter(range(requests))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def worker():
+            for index in counter:
+                samples.append(await driver(client, base_url, index))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+async def run_benchmark(config: BenchConfig) -> Dict[str, Any]:
+    """
+    运行完整的压测
+
+    Args:
+        config: 压测配置
+
+    Returns:
+        压测报告（配置和每个场景/并发级别的结果）
+    """
+    unknown = [name for name in config.scenarios if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"未知场景: {unknown}，可选: {sorted(SCENARIOS)}")
+
+    llm_app = create_fake_llm_app(config.llm)
+    backend_app = create_fake_backend_app(config.backend)
+    llm_server = _InLoopServer(llm_app, _free_port())
+    backend_server = _InLoopServer(backend_app, _free_port())
+    await llm_server.start()
+    await backend_server.start()
+
+    env = {
+        "BRCONNECTOR_BASE_URL": llm_server.url,
+        "BRCONNECTOR_API_KEY": "bench-key",
+        "GO_BACKEND_URL": backend_server.url,
+        "LOG_LEVEL": "WARNING",
+    }
+
+    if config.app_mode == "process":
+        service = _ServiceProcess(_free_port(), env)
+        service_pid = None
+    elif config.app_mode == "inprocess":
+        _configure_inprocess_service(env)
+        from main import app as service_app
+        service = _InLoopServer(service_app, _free_port())
+        service_pid = os.getpid()
+    else:
+        raise ValueError(f"未知的运行模式: {config.app_mode}")
+
+    results: List[Dict[str, Any]] = []
+    try:
+        await service.start()
+        if config.app_mode == "process":
+            service_pid = service.pid
+
+        for scenario in config.scenarios:
+            if config.warmup:
+                await run_level(scenario, service.url, 1, config.warmup, config.request_timeout)
+
+            for concurrency in config.concurrency:
+                llm_stats = llm_app.state.stats
+                llm_requests_before = llm_stats.requests
+                rate_limited_before = llm_stats.rate_limited
+                llm_stats.max_in_flight = llm_stats.in_flight
+                backend_requests_before = backend_app.state.request_count
+
+                sampler = MemorySampler(service_pid)
+                sampler.start()
+                start = time.perf_counter()
+                samples = await run_level(
+                    scenario, service.url, concurrency, config.requests, config.request_timeout
+                )
+                wall_time = time.perf_counter() - start
+                memory = await sampler.stop()
+
+                summary = summarize(samples, wall_time)
+                summary.update({
+                    "scenario": scenario,
+                    "concurrency": concurrency,
+                    "memory": memory,
+                    "llm_requests": llm_stats.requests - llm_requests_before,
+                    "llm_rate_limited": llm_stats.rate_limited - rate_limited_before,
+                    "llm_max_in_flight": llm_stats.max_in_flight,
+                    "backend_requests": backend_app.state.request_count - backend_requests_before,
+                })
+                results.append(summary)
+                logger.info(f"完成 {scenario} @ {concurrency}: {summary['throughput_rps']} rps")
+    finally:
+        await service.stop()
+        await llm_server.stop()
+        await backend_server.stop()
+
+    return {
+        "config": {
+            "requests": config.requests,
+            "app_mode": config.app_mode,
+            "llm_latency": str(config.llm.latency),
+            "llm_tokens_per_second": config.llm.tokens_per_second,
+            "llm_rate_limit_probability": config.llm.rate_limit_probability,
+            "backend_latency": str(config.backend.latency),
+        },
+        "results": results,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """将压测报告格式化为文本表格"""
+    header = (
+        f"{'scenario':<12} {'conc':>5} {'ok/req':>9} {'rps':>8} {'p50ms':>9} {'p95ms':>9} "
+        f"{'p99ms':>9} {'ttfb50':>8} {'rssPeakMB':>10} {'llm':>6} {'429':>5} {'errors'}"
+    )
+    lines = [header, "-" * len(header)]
+    for row in report["results"]:
+        latency = row["latency_ms"]
+        ttfb = row.get("first_byte_ms", {}).get("p50")
+        lines.append(
+            f"{row['scenario']:<12} {row['concurrency']:>5} "
+            f"{row['ok']:>4}/{row['requests']:<4} {row['throughput_rps']:>8.2f} "
+            f"{latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f} "
+            f"{(f'{ttfb:.1f}' if ttfb is not None else '-'):>8} "
+            f"{(row['memory']['rss_peak_mb'] or 0):>10.1f} "
+            f"{row['llm_requests']:>6} {row['llm_rate_limited']:>5} "
+            f"{row['errors'] or ''}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,87 @@
+"""
+延迟分布
+
+用简短的字符串描述模拟服务的延迟，例如：
+- ``0.5`` 或 ``fixed:0.5``: 固定 0.5 秒
+- ``uniform:0.2,0.8``: 0.2 到 0.8 秒均匀分布
+- ``normal:1.0,0.2``: 均值 1.0 秒、标准差 0.2 秒的正态分布（截断到 0 以上）
+- ``lognormal:1.0,0.5``: 中位数 1.0 秒、sigma 0.5 的对数正态分布（长尾，接近真实 LLM 延迟）
+- ``exp:0.5``: 均值 0.5 秒的指数分布
+"""
+
+import math
+import random
+from dataclasses import dataclass
+from typing import Tuple
+
+_ARITY = {
+    "fixed": 1,
+    "uniform": 2,
+    "normal": 2,
+    "lognormal": 2,
+    "exp": 1,
+}
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """延迟分布"""
+    kind: str = "fixed"
+    params: Tuple[float, ...] = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """
+        解析延迟描述
+
+        Args:
+            spec: 延迟描述字符串
+
+        Returns:
+            LatencyModel
+
+        Raises:
+            ValueError: 描述格式无效
+        """
+        spec = (spec or "0").strip()
+        if ":" in spec:
+            kind, _, raw = spec.partition(":")
+        else:
+            kind, raw = "fixed", spec
+        kind = kind.strip().lower()
+
+        if kind not in _ARITY:
+            raise ValueError(f"不支持的延迟分布: {kind}")
+
+        try:
+            params = tuple(float(value) for value in raw.split(","))
+        except ValueError:
+            raise ValueError(f"延迟参数无效: {spec}")
+
+        if len(params) != _ARITY[kind]:
+            raise ValueError(f"延迟分布 {kind} 需要 {_ARITY[kind]} 个参数: {spec}")
+        if any(value < 0 for value in params):
+            raise ValueError(f"延迟参数不能为负数: {spec}")
+
+        return cls(kind=kind, params=params)
+
+    def sample(self, rng: random.Random) -> float:
+        """采样一次延迟（秒，不小于 0）"""
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            low, high = self.params
+            value = rng.uniform(low, high)
+        elif self.kind == "normal":
+            mean, stddev = self.params
+            value = rng.gauss(mean, stddev)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        else:
+            mean = self.params[0]
+            value = rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        return max(value, 0.0)
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{','.join(f'{value:g}' for value in self.params)}"
@@ -0,0 +1,609 @@
+"""
+CPU 密集型工具和解析函数的微基准测试
+
+这些函数直接运行在事件循环线程上，耗时会阻塞其他请求。每个基准在 10 / 1,000 / 10,000
+个合成用例上测量单次调用的耗时（ops/sec）和内存分配（tracemalloc 峰值），
+并与保存的基线比较，超出容差时以非零状态退出。
+
+示例：
+    python -m bench.micro                          # 运行并与基线比较
+    python -m bench.micro --filter parse --sizes 10 1000
+    python -m bench.micro --save-baseline          # 更新基线
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import gc
+import inspect
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .corpus import (
+    generate_requirement_analysis,
+    generate_review,
+    generate_test_cases,
+    render_llm_response,
+    to_design_items,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10, 1000, 10000]
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "micro.json"
+
+# 分配量差异低于该值时视为噪声
+_ALLOC_NOISE_BYTES = 4096
+
+
+@dataclass
+class MicroBenchmark:
+    """
+    基准定义
+
+    Attributes:
+        name: 基准名称（group.case）
+        setup: 接收 (size, language)，返回被测的无参函数（可以是协程函数）
+        max_size: 允许的最大规模（平方复杂度的基准在更大规模上不运行）
+    """
+    name: str
+    setup: Callable[[int, str], Callable[[], Any]]
+    max_size: Optional[int] = None
+
+
+@dataclass
+class BenchmarkResult:
+    """单个基准在某个规模上的测量结果（时间单位为秒）"""
+    name: str
+    size: int
+    rounds: int
+    iterations: int
+    min: float
+    mean: float
+    median: float
+    stddev: float
+    peak_alloc_bytes: int
+    retained_bytes: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+    @property
+    def ops_per_sec(self) -> float:
+        return 1.0 / self.mean if self.mean > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": self.size,
+            "rounds": self.rounds,
+            "iterations": self.iterations,
+            "min": self.min,
+            "mean": self.mean,
+            "median": self.median,
+            "stddev": self.stddev,
+            "ops_per_sec": self.ops_per_sec,
+            "peak_alloc_bytes": self.peak_alloc_bytes,
+            "retained_bytes": self.retained_bytes,
+        }
+
+
+BENCHMARKS: Dict[str, MicroBenchmark] = {}
+
+
+def register(name: str, max_size: Optional[int] = None):
+    """注册基准（装饰 setup 函数）"""
+    def decorator(setup: Callable[[int, str], Callable[[], Any]]):
+        BENCHMARKS[name] = MicroBenchmark(name=name, setup=setup, max_size=max_size)
+        return setup
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# 工具
+# ---------------------------------------------------------------------------
+
+@register("format_test_case.execute")
+def _format_test_case(size: int, language: str):
+    from app.tool.generation_tools import FormatTestCaseTool
+
+    tool = FormatTestCaseTool()
+    cases = generate_test_cases(size, language=language)
+    return lambda: tool.execute(test_cases=cases)
+
+
+@register("check_quality.execute_batch")
+def _check_quality_batch(size: int, language: str):
+    from app.tool.validation_tools import CheckQualityTool
+
+    tool = CheckQualityTool()
+    cases = generate_test_cases(size, language=language)
+    return lambda: tool.execute_batch(test_cases=cases)
+
+
+@register("check_quality.execute_per_case")
+def _check_quality_per_case(size: int, language: str):
+    from app.tool.validation_tools import CheckQualityTool
+
+    tool = CheckQualityTool()
+    cases = generate_test_cases(size, language=language)
+
+    async def run():
+        for case in cases:
+            await tool.execute(test_case=case)
+    return run
+
+
+@register("check_duplication.execute", max_size=100)
+def _check_duplication(size: int, language: str):
+    from app.tool.validation_tools import CheckDuplicationTool
+
+    tool = CheckDuplicationTool()
+    cases = generate_test_cases(size, language=language)
+    return lambda: tool.execute(test_cases=cases)
+
+
+@register("near_duplicate_index.add")
+def _near_duplicate_index(size: int, language: str):
+    from app.tool.validation_tools import NearDuplicateIndex, case_signature
+
+    cases = generate_test_cases(size, language=language)
+
+    def run():
+        index = NearDuplicateIndex()
+        for i, case in enumerate(cases):
+            index.add(i, case_signature(case))
+        return index.clusters()
+    return run
+
+
+@register("rerank.fused")
+def _rerank_fused(size: int, language: str):
+    import random
+
+    from app.keyword_index import KeywordIndex
+    from app.rerank import Reranker
+
+    rng = random.Random(size)
+    candidates = [
+        {
+            **case,
+            "id": f"tc-{i}",
+            "score": rng.random(),
+            "metadata": {"priority": rng.choice(["P0", "P1", "P2", "P3"]), "created_at": f"2024-05-{i % 28 + 1:02d}"},
+        }
+        for i, case in enumerate(generate_test_cases(size, language=language))
+    ]
+    reranker = Reranker()
+    index = KeywordIndex()
+    query = candidates[0]["title"]
+    # 候选首次出现时写入项目索引，基准测量的是索引已预热后的重排
+    reranker.rerank(query, candidates, index=index)
+    return lambda: reranker.rerank(query, candidates, index=index, limit=50)
+
+
+@register("keyword_index.search")
+def _keyword_index_search(size: int, language: str):
+    from app.keyword_index import KeywordIndex, index_documents
+
+    cases = [{**case, "id": f"tc-{i}"} for i, case in enumerate(generate_test_cases(size, language=language))]
+    index = KeywordIndex(cache_size=0)
+    index_documents(index, cases)
+    query = cases[0]["title"]
+    # 不缓存 BM25 分数，测量的是每次查询的倒排表求交集和打分
+    return lambda: index.search(query, limit=20, mode="and")
+
+
+@register("validate_coverage.execute")
+def _validate_coverage(size: int, language: str):
+    from app.tool.validation_tools import ValidateCoverageTool
+
+    tool = ValidateCoverageTool()
+    cases = generate_test_cases(size, language=language)
+    analysis = generate_requirement_analysis(20, language=language)
+    return lambda: tool.execute(test_cases=cases, requirement_analysis=analysis)
+
+
+# ---------------------------------------------------------------------------
+# LLM 响应解析
+# ---------------------------------------------------------------------------
+
+@register("parse.test_designs")
+def _parse_test_designs(size: int, language: str):
+    from app.agent.test_design_agent import TestDesignAgent
+
+    agent = TestDesignAgent(None)
+    response = render_llm_response(to_design_items(generate_test_cases(size, language=language)), "fenced")
+    return lambda: agent._parse_test_designs(response)
+
+
+@register("parse.review")
+def _parse_review(size: int, language: str):
+    from app.agent.quality_review_agent import QualityReviewAgent
+
+    agent = QualityReviewAgent(None)
+    response = render_llm_response(generate_review(size), "fenced")
+    return lambda: agent._parse_review(response)
+
+
+@register("parse.requirement_analysis")
+def _parse_requirement_analysis(size: int, language: str):
+    from app.agent.requirement_analysis_agent import RequirementAnalysisAgent
+
+    agent = RequirementAnalysisAgent(None)
+    analysis = generate_requirement_analysis(size, language=language)
+    # Agent 的输出结构不包含 ParseRequirementTool 的概要字段
+    for key in ("feature_name", "description", "acceptance_criteria"):
+        analysis.pop(key)
+    response = render_llm_response(analysis, "fenced")
+    return lambda: agent._parse_analysis(response)
+
+
+@register("parse.test_points_fallback")
+def _parse_test_points_fallback(size: int, language: str):
+    from app.tool.understanding_tools import ExtractTestPointsTool
+
+    tool = ExtractTestPointsTool(None)
+    points = [
+        {"type": item["type"], "description": item["title"], "priority": item["priority"],
+         "rationale": item["rationale"]}
+        for item in to_design_items(generate_test_cases(size, language=language))
+    ]
+    # 带说明文字的响应会先触发 JSONDecodeError，再走正则提取
+    response = render_llm_response(points, "prose")
+    return lambda: tool._parse_response(response)
+
+
+@register("parse.generated_test_case")
+def _parse_generated_test_case(size: int, language: str):
+    from app.tool.generation_tools import GenerateTestCaseTool
+
+    tool = GenerateTestCaseTool(None)
+    case = generate_test_cases(1, language=language, min_steps=8, max_steps=8)[0]
+    response = render_llm_response(case, "plain")
+    # 单个用例的解析与规模无关，按 size 次调用计
+    return lambda: [tool._parse_response(response) for _ in range(size)]
+
+
+# ---------------------------------------------------------------------------
+# 测量
+# ---------------------------------------------------------------------------
+
+def _make_runner(func: Callable[[], Any], loop: asyncio.AbstractEventLoop) -> Callable[[int], float]:
+    """返回一个执行 n 次被测函数并返回总耗时的函数"""
+    probe = func()
+    if inspect.isawaitable(probe):
+        loop.run_until_complete(probe)
+
+        async def repeat(n: int) -> float:
+            start = time.perf_counter()
+            for _ in range(n):
+                await func()
+            return time.perf_counter() - start
+
+        return lambda n: loop.run_until_complete(repeat(n))
+
+    def run(n: int) -> float:
+        start = time.perf_counter()
+        for _ in range(n):
+            func()
+        return time.perf_counter() - start
+
+    return run
+
+
+def _measure_allocations(func: Callable[[], Any], loop: asyncio.AbstractEventLoop) -> Dict[str, int]:
+    """用 tracemalloc 测量一次调用的峰值分配和调用后仍保留的内存"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        if inspect.isawaitable(result):
+            result = loop.run_until_complete(result)
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return {"peak_alloc_bytes": max(peak - before, 0), "retained_bytes": max(current - before, 0)}
+
+
+def measure(
+    name: str,
+    size: int,
+    func: Callable[[], Any],
+    rounds: int = 5,
+    min_time: float = 0.5,
+    loop: Optional[asyncio.AbstractEventLoop] = None
+) -> BenchmarkResult:
+    """
+    测量被测函数
+
+    先执行一次作为预热并估算单次耗时，再按 min_time / rounds 确定每轮的调用次数，
+    最后单独执行一次统计内存分配（tracemalloc 会显著拖慢执行，不与计时混在一起）。
+
+    Args:
+        name: 基准名称
+        size: 语料规模
+        func: 被测的无参函数（可以返回协程）
+        rounds: 计时轮数
+        min_time: 计时总时长下限（秒）
+        loop: 运行协程使用的事件循环（默认新建）
+
+    Returns:
+        测量结果
+    """
+    own_loop = loop is None
+    loop = loop or asyncio.new_event_loop()
+    try:
+        start = time.perf_counter()
+        run = _make_runner(func, loop)
+        estimate = max(time.perf_counter() - start, 1e-7)
+        iterations = max(1, int(min_time / rounds / estimate))
+
+        timings = [run(iterations) / iterations for _ in range(rounds)]
+        allocations = _measure_allocations(func, loop)
+    finally:
+        if own_loop:
+            loop.close()
+
+    return BenchmarkResult(
+        name=name,
+        size=size,
+        rounds=rounds,
+        iterations=iterations,
+        min=min(timings),
+        mean=statistics.fmean(timings),
+        median=statistics.median(timings),
+        stddev=statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        **allocations,
+    )
+
+
+def select_benchmarks(patterns: Optional[List[str]] = None) -> List[MicroBenchmark]:
+    """按名称子串或通配符筛选基准"""
+    if not patterns:
+        return list(BENCHMARKS.values())
+    return [
+        benchmark for name, benchmark in BENCHMARKS.items()
+        if any(pattern in name or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+    ]
+
+
+def run_suite(
+    benchmarks: List[MicroBenchmark],
+    sizes: List[int],
+    language: str = "mixed",
+    rounds: int = 5,
+    min_time: float = 0.5
+) -> List[BenchmarkResult]:
+    """
+    在所有规模上运行基准
+
+    Args:
+        benchmarks: 基准列表
+        sizes: 语料规模列表
+        language: 语料语言
+        rounds: 每个基准的计时轮数
+        min_time: 每个基准的计时总时长下限（秒）
+
+    Returns:
+        测量结果（超过 max_size 的组合被跳过）
+    """
+    results = []
+    loop = asyncio.new_event_loop()
+    try:
+        for benchmark in benchmarks:
+            for size in sizes:
+                if benchmark.max_size is not None and size > benchmark.max_size:
+                    logger.info(f"跳过 {benchmark.name}[{size}]：超过最大规模 {benchmark.max_size}")
+                    continue
+                func = benchmark.setup(size, language)
+                result = measure(benchmark.name, size, func, rounds=rounds, min_time=min_time, loop=loop)
+                logger.info(f"{result.key}: {result.ops_per_sec:.2f} ops/s")
+                results.append(result)
+    finally:
+        loop.close()
+    return results
+
+
+def environment() -> Dict[str, str]:
+    """记录运行环境（不同环境之间的基线不可直接比较）"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, Any]]:
+    """读取基线文件，不存在时返回 None"""
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: Path, results: List[BenchmarkResult], language: str) -> None:
+    """保存基线（同名基准会被覆盖，其他条目保留）"""
+    existing = load_baseline(path) or {}
+    entries = existing.get("benchmarks", {})
+    entries.update({result.key: result.to_dict() for result in results})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"environment": environment(), "language": language, "benchmarks": dict(sorted(entries.items()))},
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+        f.write("\n")
+
+
+def compare(
+    results: List[BenchmarkResult],
+    baseline: Dict[str, Any],
+    time_tolerance: float = 0.5,
+    alloc_tolerance: float = 0.10
+) -> List[Dict[str, Any]]:
+    """
+    与基线比较
+
+    Args:
+        results: 本次测量结果
+        baseline: load_baseline 的结果
+        time_tolerance: 最小耗时允许的相对增长
+        alloc_tolerance: 峰值分配允许的相对增长
+
+    Returns:
+        每个结果的比较记录，status 为 regression / improved / ok / new
+    """
+    entries = baseline.get("benchmarks", {})
+    comparisons = []
+    for result in results:
+        base = entries.get(result.key)
+        if base is None:
+            comparisons.append({"key": result.key, "status": "new"})
+            continue
+
+        # 最小值受调度和 GC 干扰最小，比平均值更适合跨次比较
+        time_ratio = result.min / base["min"] if base["min"] > 0 else 1.0
+        alloc_delta = result.peak_alloc_bytes - base["peak_alloc_bytes"]
+        alloc_ratio = (
+            result.peak_alloc_bytes / base["peak_alloc_bytes"] if base["peak_alloc_bytes"] > 0 else 1.0
+        )
+
+        reasons = []
+        if time_ratio > 1 + time_tolerance:
+            reasons.append(f"耗时 {time_ratio:.2f}x")
+        if alloc_ratio > 1 + alloc_tolerance and alloc_delta > _ALLOC_NOISE_BYTES:
+            reasons.append(f"分配 {alloc_ratio:.2f}x")
+
+        if reasons:
+            status = "regression"
+        elif time_ratio < 1 - time_tolerance:
+            status = "improved"
+        else:
+            status = "ok"
+        comparisons.append({
+            "key": result.key,
+            "status": status,
+            "time_ratio": round(time_ratio, 3),
+            "alloc_ratio": round(alloc_ratio, 3),
+            "reasons": reasons,
+        })
+    return comparisons
+
+
+def _format_bytes(value: int) -> str:
+    if value >= 1024 * 1024:
+        return f"{value / (1024 * 1024):.1f}M"
+    if value >= 1024:
+        return f"{value / 1024:.1f}K"
+    return f"{value}B"
+
+
+def format_results(results: List[BenchmarkResult], comparisons: Optional[List[Dict[str, Any]]] = None) -> str:
+    """将结果格式化为文本表格"""
+    by_key = {item["key"]: item for item in comparisons or []}
+    header = (
+        f"{'benchmark':<42} {'ops/s':>11} {'mean':>11} {'stddev':>9} {'peak':>9} {'kept':>9} {'vs base':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for result in results:
+        comparison = by_key.get(result.key)
+        if comparison is None:
+            versus = ""
+        elif comparison["status"] == "new":
+            versus = "new"
+        else:
+            versus = f"{comparison['time_ratio']:.2f}x"
+            if comparison["status"] == "regression":
+                versus += " !"
+        lines.append(
+            f"{result.key:<42} {result.ops_per_sec:>11.2f} {result.mean * 1000:>9.3f}ms "
+            f"{result.stddev / result.mean * 100 if result.mean else 0:>8.1f}% "
+            f"{_format_bytes(result.peak_alloc_bytes):>9} {_format_bytes(result.retained_bytes):>9} {versus:>9}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bench.micro", description="CPU 密集型函数微基准")
+    parser.add_argument("--filter", nargs="+", help="按名称子串或通配符筛选基准")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="语料规模")
+    parser.add_argument("--language", choices=["zh", "en", "mixed"], default="mixed", help="语料语言")
+    parser.add_argument("--rounds", type=int, default=5, help="计时轮数")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每个基准的计时总时长下限（秒）")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="基线文件")
+    parser.add_argument("--save-baseline", action="store_true", help="将结果写入基线文件")
+    # 共享机器上计时的波动可达 30% 以上；分配量是确定的，容差可以收紧
+    parser.add_argument("--time-tolerance", type=float, default=0.5, help="最小耗时允许的相对增长")
+    parser.add_argument("--alloc-tolerance", type=float, default=0.10, help="峰值分配允许的相对增长")
+    parser.add_argument("--output", help="将结果写入 JSON 文件")
+    parser.add_argument("--list", action="store_true", help="只列出基准名称")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    # 回退解析等路径会逐次输出警告，测量时只保留错误日志
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+    benchmarks = select_benchmarks(args.filter)
+    if args.list:
+        print("\n".join(benchmark.name for benchmark in benchmarks))
+        return 0
+    if not benchmarks:
+        print(f"没有匹配的基准: {args.filter}", file=sys.stderr)
+        return 2
+
+    results = run_suite(benchmarks, args.sizes, args.language, args.rounds, args.min_time)
+
+    comparisons = None
+    baseline = load_baseline(args.baseline)
+    if baseline is not None and not args.save_baseline:
+        if baseline.get("environment", {}).get("python") != platform.python_version():
+            print(f"注意：基线使用 Python {baseline['environment'].get('python')} 生成，结果仅供参考")
+        comparisons = compare(results, baseline, args.time_tolerance, args.alloc_tolerance)
+
+    print(format_results(results, comparisons))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"environment": environment(), "results": [result.to_dict() for result in results],
+                 "comparisons": comparisons},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, args.language)
+        print(f"\n基线已写入 {args.baseline}")
+        return 0
+
+    regressions = [item for item in comparisons or [] if item["status"] == "regression"]
+    if regressions:
+        print("\n性能回退：")
+        for item in regressions:
+            print(f"  {item['key']}: {', '.join(item['reasons'])}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
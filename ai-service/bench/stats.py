@@ -0,0 +1,171 @@
+"""
+统计工具：延迟分位数、吞吐量和进程内存
+"""
+
+import asyncio
+import os
+import resource
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class RequestSample:
+    """单个请求的测量结果"""
+    latency: float
+    ok: bool
+    status: int = 0
+    first_byte: Optional[float] = None
+    error: Optional[str] = None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    计算分位数（线性插值）
+
+    Args:
+        values: 样本
+        pct: 百分位（0-100）
+
+    Returns:
+        分位数，样本为空时返回 0
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(samples: List[RequestSample], wall_time: float) -> Dict[str, Any]:
+    """
+    汇总一轮压测的结果
+
+    Args:
+        samples: 请求样本
+        wall_time: 本轮总耗时（秒）
+
+    Returns:
+        汇总字典（延迟单位为毫秒）
+    """
+    latencies = [sample.latency for sample in samples if sample.ok]
+    first_bytes = [sample.first_byte for sample in samples if sample.ok and sample.first_byte is not None]
+    errors: Dict[str, int] = {}
+    for sample in samples:
+        if not sample.ok:
+            # HTTP 错误按状态码归类，应用层失败（200 但 success=false 或流中出现 error 事件）归为 failed
+            if sample.status and sample.status != 200:
+                key = f"http_{sample.status}"
+            elif sample.status:
+                key = "failed"
+            else:
+                key = sample.error or "error"
+            errors[key] = errors.get(key, 0) + 1
+
+    summary: Dict[str, Any] = {
+        "requests": len(samples),
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(len(latencies) / wall_time, 3) if wall_time > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies) * 1000, 1) if latencies else 0.0,
+        },
+    }
+    if first_bytes:
+        summary["first_byte_ms"] = {
+            "p50": round(percentile(first_bytes, 50) * 1000, 1),
+            "p95": round(percentile(first_bytes, 95) * 1000, 1),
+            "p99": round(percentile(first_bytes, 99) * 1000, 1),
+        }
+    return summary
+
+
+def rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """
+    获取进程当前的常驻内存
+
+    Linux 上读取 /proc/<pid>/status；其他平台只能获取当前进程的峰值（ru_maxrss）。
+
+    Args:
+        pid: 进程 ID（默认当前进程）
+
+    Returns:
+        字节数，无法获取时返回 None
+    """
+    status_path = f"/proc/{pid or os.getpid()}/status"
+    try:
+        with open(status_path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if pid is None or pid == os.getpid():
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以字节为单位，Linux 以 KB 为单位
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+    return None
+
+
+class MemorySampler:
+    """后台定期采样进程内存，记录峰值"""
+
+    def __init__(self, pid: Optional[int] = None, interval: float = 0.2):
+        """
+        Args:
+            pid: 被测进程 ID（默认当前进程）
+            interval: 采样间隔（秒）
+        """
+        self.pid = pid
+        self.interval = interval
+        self.start_bytes: Optional[int] = None
+        self.peak_bytes: Optional[int] = None
+        self.end_bytes: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _sample(self) -> Optional[int]:
+        value = rss_bytes(self.pid)
+        if value is not None:
+            self.peak_bytes = max(self.peak_bytes or 0, value)
+        return value
+
+    async def _run(self):
+        while True:
+            self._sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """开始采样"""
+        self.start_bytes = self._sample()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Dict[str, Optional[float]]:
+        """
+        停止采样
+
+        Returns:
+            起始、峰值和结束时的内存（MB）
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.end_bytes = self._sample()
+
+        def to_mb(value: Optional[int]) -> Optional[float]:
+            return round(value / (1024 * 1024), 1) if value is not None else None
+
+        return {
+            "rss_start_mb": to_mb(self.start_bytes),
+            "rss_peak_mb": to_mb(self.peak_bytes),
+            "rss_end_mb": to_mb(self.end_bytes),
+        }
@@ -2,17 +2,24 @@
 AI Test Assistant Service - Main Entry Point
 
 This is the main FastAPI application for the AI Test Assistant service.
-It provides endpoints for test case generation using LangChain and Claude 4.5 Sonnet.
+It provides endpoints for test case generation using Claude 4.5 Sonnet.
 """
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import sys
 
 from app.config import settings
 from app.api import router
+from app.api.endpoints import FastJSONResponse, shutdown_job_manager, start_job_manager
+from app.api.warmup import get_warmup_state, reset_warmup_state, warm_up
+from app.executor import shutdown_executors
+from app.metrics import CONTENT_TYPE, REGISTRY
+from app.tracing import TracingMiddleware, configure_tracing, tracer
 
 
 # Configure logging
@@ -35,18 +42,64 @@ async def lifespan(app: FastAPI):
     logger.info(f"Service URL: http://{settings.HOST}:{settings.PORT}")
     
     # Startup
+    configure_tracing(settings.TRACING_EXPORTER, settings.TRACING_FILE_PATH)
+    start_job_manager()
+    
+    # Warm up in the background: /health answers right away, /ready turns green once warm
+    warmup_task = None
+    state = reset_warmup_state()
+    if settings.WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(warm_up(timeout=settings.WARMUP_TIMEOUT, state=state))
     yield
     
     # Shutdown
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+        try:
+            await warmup_task
+        except asyncio.CancelledError:
+            pass
+    await shutdown_job_manager()
+    save_search_indexes()
+    save_execution_stats()
+    shutdown_executors()
+    tracer.shutdown()
     logger.info("👋 Shutting down AI Test Assistant Service...")
 
 
+def save_search_indexes() -> None:
+    """Write changed keyword index snapshots (skipped when no index was ever built in this process)"""
+    if not settings.SEARCH_INDEX_DIR or "app.keyword_index" not in sys.modules:
+        return
+    from app.keyword_index import save_project_indexes
+    try:
+        saved = save_project_indexes(settings.SEARCH_INDEX_DIR)
+    except OSError as e:
+        logger.warning(f"Failed to save keyword index snapshots: {e}")
+        return
+    logger.info(f"Saved {saved} keyword index snapshot(s) to {settings.SEARCH_INDEX_DIR}")
+
+
+def save_execution_stats() -> None:
+    """Write changed execution statistics snapshots (skipped when no results were ever ingested or loaded)"""
+    if not settings.EXECUTION_STATS_DIR or "app.execution_history" not in sys.modules:
+        return
+    from app.execution_history import save_project_stats
+    try:
+        saved = save_project_stats(settings.EXECUTION_STATS_DIR)
+    except OSError as e:
+        logger.warning(f"Failed to save execution statistics snapshots: {e}")
+        return
+    logger.info(f"Saved {saved} execution statistics snapshot(s) to {settings.EXECUTION_STATS_DIR}")
+
+
 # Create FastAPI application
 app = FastAPI(
     title="AI Test Assistant Service",
-    description="AI-powered test case generation service using LangChain and Claude 4.5 Sonnet",
+    description="AI-powered test case generation service using Claude 4.5 Sonnet",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -58,6 +111,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tracing (one server span per request, continuing the caller's trace)
+app.add_middleware(TracingMiddleware)
+
 # Include API router
 app.include_router(router, prefix="/ai")
 
@@ -72,13 +128,30 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 once the agent graph is built and connections are warm, 503 before"""
+    state = get_warmup_state()
+    if not settings.WARMUP_ENABLED:
+        return {"status": "ready", "warmup": "disabled"}
+    return JSONResponse(status_code=200 if state.ready else 503, content=state.to_dict())
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
     return {
         "message": "AI Test Assistant Service",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "ready": "/ready",
+        "metrics": "/metrics"
     }
 
 
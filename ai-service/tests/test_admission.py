@@ -0,0 +1,248 @@
+"""
+API 准入控制测试
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agent.test_engineer_agent import AgentResponse, TaskType
+from app.api import endpoints
+from app.api.admission import (
+    LANE_FAST,
+    LANE_INTERACTIVE,
+    LANE_STANDARD,
+    AdmissionController,
+    AdmissionRejected,
+    lane_for_task,
+)
+from app.metrics import ADMISSION_REJECTED
+from main import app
+
+
+def test_lane_for_task():
+    """不调用 LLM 的任务走快速车道，无法预判的请求按长任务处理"""
+    assert lane_for_task(TaskType.REGRESSION_RECOMMENDATION) == LANE_FAST
+    assert lane_for_task(TaskType.GENERATE_TEST_CASES) == LANE_STANDARD
+    assert lane_for_task(None) == LANE_STANDARD
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        AdmissionController(max_concurrent=0)
+    with pytest.raises(ValueError):
+        AdmissionController().enqueue("bulk")
+
+
+@pytest.mark.asyncio
+async def test_grants_immediately_when_idle():
+    controller = AdmissionController(max_concurrent=2, reserved_slots=0)
+
+    async with controller.admit(LANE_STANDARD) as ticket:
+        assert ticket.granted
+        assert controller.active == 1
+
+    assert controller.active == 0
+    assert controller.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_reserved_slots_keep_fast_lane_open():
+    """standard 车道占满可用名额后，预留名额仍可用于快速车道"""
+    controller = AdmissionController(max_concurrent=3, max_queue=10, reserved_slots=1)
+    long_tasks = [controller.enqueue(LANE_STANDARD) for _ in range(3)]
+
+    assert [ticket.granted for ticket in long_tasks] == [True, True, False]
+    fast = controller.enqueue(LANE_FAST)
+    assert fast.granted
+    assert controller.active == 3
+
+
+@pytest.mark.asyncio
+async def test_release_grants_by_lane_priority():
+    """空出的名额优先分配给高优先级车道，同一车道先来先服务"""
+    controller = AdmissionController(max_concurrent=1, max_queue=10, reserved_slots=0)
+    running = controller.enqueue(LANE_STANDARD)
+    standard = controller.enqueue(LANE_STANDARD)
+    interactive = controller.enqueue(LANE_INTERACTIVE)
+    fast_first = controller.enqueue(LANE_FAST)
+    fast_second = controller.enqueue(LANE_FAST)
+
+    assert [controller.position(t) for t in (fast_first, fast_second, interactive, standard)] == [1, 2, 3, 4]
+
+    previous = running
+    for expected in (fast_first, fast_second, interactive, standard):
+        controller.release(previous)
+        assert expected.granted
+        assert controller.active == 1
+        previous = expected
+
+
+@pytest.mark.asyncio
+async def test_queue_full_rejected_with_retry_after():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, reserved_slots=0)
+    controller.enqueue(LANE_STANDARD)
+    controller.enqueue(LANE_STANDARD)
+
+    before = ADMISSION_REJECTED.value(lane=LANE_STANDARD, reason="queue_full")
+    with pytest.raises(AdmissionRejected) as exc_info:
+        controller.enqueue(LANE_STANDARD)
+
+    assert exc_info.value.reason == "queue_full"
+    # 默认服务时间 60 秒，前面排着 1 个请求
+    assert exc_info.value.retry_after == 120
+    assert ADMISSION_REJECTED.value(lane=LANE_STANDARD, reason="queue_full") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_wait_timeout_leaves_queue():
+    controller = AdmissionController(max_concurrent=1, max_queue=5, max_wait=0.05, reserved_slots=0)
+    controller.enqueue(LANE_STANDARD)
+    waiting = controller.enqueue(LANE_STANDARD)
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await controller.wait(waiting)
+
+    assert exc_info.value.reason == "timeout"
+    assert controller.queued == 0
+    assert waiting.released
+
+
+@pytest.mark.asyncio
+async def test_positions_report_progress_until_granted():
+    controller = AdmissionController(max_concurrent=1, max_queue=5, max_wait=5, reserved_slots=0)
+    running = controller.enqueue(LANE_STANDARD)
+    ahead = controller.enqueue(LANE_STANDARD)
+    ticket = controller.enqueue(LANE_STANDARD)
+    positions = []
+
+    async def consume():
+        async for position in controller.positions(ticket):
+            positions.append(position)
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0.01)
+    controller.release(running)
+    await asyncio.sleep(0.01)
+    controller.release(ahead)
+    await asyncio.wait_for(task, 1)
+
+    assert positions == [2, 1]
+    assert ticket.granted
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    controller = AdmissionController(max_concurrent=1, max_queue=5, max_wait=5, reserved_slots=0)
+    running = controller.enqueue(LANE_STANDARD)
+
+    async def admitted():
+        async with controller.admit(LANE_STANDARD):
+            pass
+
+    task = asyncio.create_task(admitted())
+    await asyncio.sleep(0.01)
+    assert controller.queued == 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert controller.queued == 0
+    controller.release(running)
+    controller.release(running)
+    assert controller.active == 0
+
+
+@pytest.mark.asyncio
+async def test_service_time_estimate_follows_releases():
+    controller = AdmissionController(max_concurrent=1, reserved_slots=0)
+    for _ in range(30):
+        controller.release(controller.enqueue(LANE_FAST))
+
+    assert controller.snapshot()[LANE_FAST]["service_time_seconds"] < 0.1
+    assert controller.retry_after(LANE_FAST) == 1
+
+
+# ============================================================================
+# 端点
+# ============================================================================
+
+@pytest.fixture
+def saturated_controller():
+    """只有一个名额且已被占用、不允许排队的控制器"""
+    controller = AdmissionController(max_concurrent=1, max_queue=0, max_wait=0.2, reserved_slots=0)
+    controller.enqueue(LANE_STANDARD)
+    with patch.object(endpoints, "_admission", controller):
+        yield controller
+
+
+def _mock_agent(task_type):
+    agent = Mock()
+    agent.predict_task_type = Mock(return_value=task_type)
+    agent.process_request = AsyncMock(return_value=AgentResponse(
+        success=True, task_type=TaskType.REGRESSION_RECOMMENDATION, data={"test_cases": []}
+    ))
+    return agent
+
+
+def test_generate_returns_429_when_queue_full(saturated_controller):
+    agent = _mock_agent(None)
+    with patch.object(endpoints, "get_agent", return_value=agent):
+        response = TestClient(app).post("/ai/generate", json={"message": "生成登录测试用例", "project_id": "1"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    agent.process_request.assert_not_called()
+
+
+def test_generate_fast_lane_uses_reserved_slot():
+    controller = AdmissionController(max_concurrent=2, max_queue=0, reserved_slots=1)
+    controller.enqueue(LANE_STANDARD)
+    agent = _mock_agent(TaskType.REGRESSION_RECOMMENDATION)
+    with patch.object(endpoints, "_admission", controller), patch.object(endpoints, "get_agent", return_value=agent):
+        response = TestClient(app).post("/ai/generate", json={"message": "推荐回归用例", "project_id": "1"})
+
+    assert response.status_code == 200
+    assert response.json()["metadata"]["admission"]["lane"] == LANE_FAST
+    assert controller.active == 1
+
+
+def test_chat_stream_reports_queue_position(saturated_controller):
+    saturated_controller.max_queue = 1
+    with patch.object(endpoints, "get_br_client", return_value=Mock()):
+        response = TestClient(app).post("/ai/chat/stream", json={"message": "你好", "project_id": "1"})
+
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events[0] == {"type": "queued", "position": 1}
+    assert events[-1]["type"] == "error"
+    assert events[-1]["retry_after"] >= 1
+    assert saturated_controller.queued == 0
+
+
+def test_chat_stream_returns_429_when_queue_full(saturated_controller):
+    with patch.object(endpoints, "get_br_client", return_value=Mock()):
+        response = TestClient(app).post("/ai/chat/stream", json={"message": "你好", "project_id": "1"})
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+def test_generate_passes_generation_mode_to_agent():
+    agent = _mock_agent(None)
+    with patch.object(endpoints, "_admission", AdmissionController()), patch.object(endpoints, "get_agent", return_value=agent):
+        response = TestClient(app).post(
+            "/ai/generate", json={"message": "生成登录测试用例", "project_id": "1", "mode": "fast"}
+        )
+
+    assert response.status_code == 200
+    assert agent.process_request.call_args.kwargs["context"]["generation_mode"] == "fast"
+
+
+def test_generate_rejects_unknown_generation_mode():
+    response = TestClient(app).post(
+        "/ai/generate", json={"message": "生成登录测试用例", "project_id": "1", "mode": "turbo"}
+    )
+    assert response.status_code == 422
@@ -0,0 +1,435 @@
+"""
+批量测试用例生成和 LLM 限流测试
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agent.quality_review_agent import ReviewResult
+from app.agent.requirement_analysis_agent import AnalysisResult
+from app.agent.test_design_agent import TestCaseDesign, TestDesignAgent
+from app.api import endpoints
+from app.deadline import get_deadline, remaining_time
+from app.integration.brconnector_client import BRConnectorClient, RateLimitError
+from app.integration.rate_limiter import AdaptiveRateLimiter, limiter_scope, run_limited
+from app.workflow.batch_generation_workflow import BatchTestCaseGenerationWorkflow, dedupe_documents
+from app.workflow.test_case_generation_workflow import TestCaseGenerationWorkflow
+from main import app
+
+
+# ============================================================================
+# 文档去重
+# ============================================================================
+
+def test_dedupe_documents_shares_documents_across_queries():
+    shared = {"id": "1", "title": "登录", "content": "a"}
+    results = [
+        [shared, {"id": "1", "title": "登录", "content": "a"}, {"id": "2", "content": "b"}],
+        [{"id": "1", "title": "登录", "content": "a"}, {"title": "无 id", "content": "c"}],
+        None,
+    ]
+
+    deduped, unique = dedupe_documents(results, limit=5)
+
+    assert [doc.get("id") for doc in deduped[0]] == ["1", "2"]
+    assert deduped[1][0] is deduped[0][0]
+    assert deduped[2] == []
+    assert unique == 3
+
+
+def test_dedupe_documents_respects_limit():
+    documents = [{"title": f"t{i}", "content": "x"} for i in range(5)]
+    deduped, _ = dedupe_documents([documents + documents], limit=3)
+    assert [doc["title"] for doc in deduped[0]] == ["t0", "t1", "t2"]
+
+
+# ============================================================================
+# 限流器
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_limiter_caps_concurrency():
+    limiter = AdaptiveRateLimiter(max_concurrency=2)
+    running = peak = 0
+
+    async def call():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    results = await asyncio.gather(*(limiter.run(call) for _ in range(6)))
+
+    assert results == ["ok"] * 6
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_backs_off_and_retries_on_rate_limit():
+    limiter = AdaptiveRateLimiter(max_concurrency=4, base_backoff=0.01)
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RateLimitError("Rate limit exceeded", retry_after=0.02)
+        return "ok"
+
+    assert await limiter.run(call) == "ok"
+    assert attempts == 2
+    assert limiter.rate_limited == 1
+    assert limiter.concurrency == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_gives_up_after_max_retries():
+    limiter = AdaptiveRateLimiter(max_concurrency=1, max_retries=1, base_backoff=0.001)
+
+    async def call():
+        raise RateLimitError("Rate limit exceeded")
+
+    with pytest.raises(RateLimitError):
+        await limiter.run(call)
+    assert limiter.rate_limited == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_recovers_concurrency_after_successes():
+    limiter = AdaptiveRateLimiter(max_concurrency=4, increase_every=2)
+    limiter.concurrency = 1
+
+    async def call():
+        return None
+
+    for _ in range(4):
+        await limiter.run(call)
+    assert limiter.concurrency == 3
+
+
+@pytest.mark.asyncio
+async def test_run_limited_without_limiter_calls_directly():
+    async def call():
+        return 42
+
+    assert await run_limited(call) == 42
+
+
+@pytest.mark.asyncio
+async def test_client_retries_rate_limited_request_inside_limiter_scope():
+    client = BRConnectorClient(api_key="test-key", base_url="https://api.test.com")
+    limited = httpx.Response(429, headers={"Retry-After": "0"}, text="slow down")
+    ok = httpx.Response(200, json={"id": "msg", "content": [{"type": "text", "text": "hi"}]})
+
+    with patch.object(client.client, "post", AsyncMock(side_effect=[limited, ok])) as post:
+        with limiter_scope(AdaptiveRateLimiter(max_concurrency=2)):
+            result = await client.chat(messages=[{"role": "user", "content": "hi"}])
+
+    assert result["id"] == "msg"
+    assert post.await_count == 2
+    await client.close()
+
+
+class FakeUpstream:
+    """伪造的流式上游：记录同时打开的流数，前 rate_limited 次打开返回 429"""
+
+    def __init__(self, chunks, rate_limited=0, delay=0.005):
+        self.chunks = chunks
+        self.rate_limited = rate_limited
+        self.delay = delay
+        self.opened = 0
+        self.open_streams = 0
+        self.peak = 0
+
+    @asynccontextmanager
+    async def stream(self, method, url, **kwargs):
+        self.opened += 1
+        self.open_streams += 1
+        self.peak = max(self.peak, self.open_streams)
+        try:
+            if self.rate_limited:
+                self.rate_limited -= 1
+                yield httpx.Response(429, headers={"Retry-After": "0"})
+                return
+            lines = [
+                "data: " + json.dumps({"choices": [{"delta": {"content": chunk}}]}) for chunk in self.chunks
+            ] + ["data: [DONE]"]
+            yield httpx.Response(200, stream=_SlowLines(lines, self.delay))
+        finally:
+            self.open_streams -= 1
+
+
+class _SlowLines(httpx.AsyncByteStream):
+    def __init__(self, lines, delay):
+        self.lines = lines
+        self.delay = delay
+
+    async def __aiter__(self):
+        for line in self.lines:
+            await asyncio.sleep(self.delay)
+            yield (line + "\n").encode()
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_limiter_slot_and_retries_rate_limit():
+    client = BRConnectorClient(api_key="test-key", base_url="https://api.test.com")
+    upstream = FakeUpstream(["你", "好"], rate_limited=1)
+    limiter = AdaptiveRateLimiter(max_concurrency=2)
+
+    with patch.object(client.client, "stream", upstream.stream):
+        with limiter_scope(limiter):
+            stream = await client.chat([{"role": "user", "content": "hi"}], stream=True)
+        # 限流器在发起调用时取得，之后在其他上下文中迭代也经由限流器
+        first = await stream.__anext__()
+        assert first["choices"][0]["delta"]["content"] == "你"
+        assert limiter.in_flight == 1
+        assert len([event async for event in stream]) == 1
+
+    assert upstream.opened == 2
+    assert limiter.rate_limited == 1
+    assert limiter.in_flight == 0
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_releases_limiter_slot_when_closed_early():
+    client = BRConnectorClient(api_key="test-key", base_url="https://api.test.com")
+    upstream = FakeUpstream(["a", "b", "c"])
+    limiter = AdaptiveRateLimiter(max_concurrency=1)
+
+    with patch.object(client.client, "stream", upstream.stream), limiter_scope(limiter):
+        stream = client.chat_stream([{"role": "user", "content": "hi"}])
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+
+    assert upstream.open_streams == 0
+    assert limiter.in_flight == 0
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_rate_limit_gives_up_after_max_retries():
+    client = BRConnectorClient(api_key="test-key", base_url="https://api.test.com")
+    upstream = FakeUpstream(["a"], rate_limited=5)
+
+    with patch.object(client.client, "stream", upstream.stream):
+        with limiter_scope(AdaptiveRateLimiter(max_concurrency=2, max_retries=1)):
+            with pytest.raises(RateLimitError):
+                async for _ in client.chat_stream([{"role": "user", "content": "hi"}]):
+                    pass
+
+    assert upstream.opened == 2
+    await client.close()
+
+
+def test_rate_limit_error_carries_retry_after():
+    client = BRConnectorClient(api_key="test-key")
+    with pytest.raises(RateLimitError) as exc_info:
+        client._handle_response(httpx.Response(429, headers={"Retry-After": "7"}))
+    assert exc_info.value.retry_after == 7.0
+
+
+# ============================================================================
+# 批量工作流
+# ============================================================================
+
+def _analysis() -> AnalysisResult:
+    return AnalysisResult(
+        functional_points=["功能点"],
+        business_rules=[],
+        input_specs={},
+        output_specs={},
+        exception_conditions=[],
+        constraints=[]
+    )
+
+
+def _design(title: str) -> TestCaseDesign:
+    return TestCaseDesign(
+        title=title,
+        preconditions="无",
+        steps=["执行操作"],
+        expected_result="结果正确",
+        priority="high",
+        type="functional",
+        rationale="主流程"
+    )
+
+
+@pytest.fixture
+def generation_workflow():
+    requirement_agent = AsyncMock()
+
+    async def analyze(requirement, context):
+        if "失败" in requirement:
+            raise ValueError("需求分析失败")
+        return _analysis()
+
+    requirement_agent.analyze.side_effect = analyze
+
+    design_agent = AsyncMock()
+    design_agent.design_tests.side_effect = lambda analysis, historical_cases: [_design("用例")]
+
+    review_agent = AsyncMock()
+    review_agent.review.return_value = ReviewResult(
+        coverage_score=80, issues=[], suggestions=[], approved_cases=[0], rejected_cases=[], overall_quality="good"
+    )
+
+    search_prd_tool = AsyncMock()
+    search_prd_tool.name = "search_prd"
+    search_prd_tool.execute.side_effect = lambda query, project_id, limit: [
+        {"id": "shared", "title": "公共 PRD", "content": "..."},
+        {"id": query, "title": query, "content": "..."},
+    ]
+    search_case_tool = AsyncMock()
+    search_case_tool.name = "search_test_case"
+    search_case_tool.execute.side_effect = RuntimeError("backend down")
+
+    format_tool = AsyncMock()
+    format_tool.execute.side_effect = lambda test_cases: test_cases
+
+    return TestCaseGenerationWorkflow(
+        requirement_agent=requirement_agent,
+        test_design_agent=design_agent,
+        quality_review_agent=review_agent,
+        search_prd_tool=search_prd_tool,
+        search_testcase_tool=search_case_tool,
+        format_tool=format_tool
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_shares_retrieval_and_reports_each_requirement(generation_workflow):
+    batch = BatchTestCaseGenerationWorkflow(generation_workflow, max_concurrency=2)
+    requirements = ["登录", "注册", "登录", "失败的需求"]
+
+    result = await batch.execute(requirements, {"project_id": "1"})
+
+    # 相同的需求只检索一次，公共文档只算一次
+    assert generation_workflow.search_prd_tool.execute.await_count == 3
+    assert result.metadata["retrieval"]["queries"] == 3
+    assert result.metadata["retrieval"]["unique_prds"] == 4
+    assert result.metadata["succeeded"] == 3
+    assert result.metadata["failed"] == 1
+
+    items = result.data["results"]
+    assert [item["index"] for item in items] == [0, 1, 2, 3]
+    assert items[0]["success"] is True
+    assert "无法检索历史测试用例，将继续执行" in items[0]["metadata"]["warnings"]
+    assert items[3]["success"] is False
+    prd_context = generation_workflow.requirement_agent.analyze.call_args_list[0].kwargs["context"]["historical_prds"]
+    assert [doc["id"] for doc in prd_context][0] == "shared"
+
+
+@pytest.mark.asyncio
+async def test_batch_streams_results_as_they_finish(generation_workflow):
+    delays = {"慢": 0.05, "快": 0.0}
+
+    async def analyze(requirement, context):
+        await asyncio.sleep(delays[requirement])
+        return _analysis()
+
+    generation_workflow.requirement_agent.analyze.side_effect = analyze
+    batch = BatchTestCaseGenerationWorkflow(generation_workflow, max_concurrency=2)
+
+    plan = await batch.prepare(["慢", "快"], {"project_id": "1"})
+    order = [item.index async for item in batch.stream(plan)]
+
+    assert order == [1, 0]
+
+
+@pytest.mark.asyncio
+async def test_batch_retrieval_and_generation_share_one_deadline(generation_workflow):
+    remaining = []
+
+    async def search(query, project_id, limit):
+        await asyncio.sleep(0.2)
+        return []
+
+    async def analyze(requirement, context):
+        remaining.append(remaining_time())
+        return _analysis()
+
+    generation_workflow.search_prd_tool.execute.side_effect = search
+    generation_workflow.requirement_agent.analyze.side_effect = analyze
+    batch = BatchTestCaseGenerationWorkflow(generation_workflow)
+
+    plan = await batch.prepare(["登录"], {"project_id": "1", "timeout": 1.0})
+    assert plan.deadline is not None
+    [item] = [item async for item in batch.stream(plan)]
+
+    # 生成阶段只剩检索之后的时间，而不是重新计算一次完整的超时时间
+    assert item.result.success is True
+    assert 0 < remaining[0] <= 0.8
+    assert get_deadline() is None
+
+
+@pytest.mark.asyncio
+async def test_batch_uses_deadline_from_request_arrival(generation_workflow):
+    batch = BatchTestCaseGenerationWorkflow(generation_workflow)
+    plan = await batch.prepare(["登录"], {"project_id": "1", "timeout": 60}, deadline=time.monotonic() - 1)
+    [item] = [item async for item in batch.stream(plan)]
+
+    assert item.result.success is False
+    assert generation_workflow.requirement_agent.analyze.await_count == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_requires_project_id(generation_workflow):
+    result = await BatchTestCaseGenerationWorkflow(generation_workflow).execute(["登录"], {})
+    assert result.success is False
+
+
+def test_batch_endpoint_streams_events(generation_workflow):
+    batch = BatchTestCaseGenerationWorkflow(generation_workflow, max_concurrency=2)
+    with patch.object(endpoints, "_batch_workflow", batch):
+        response = TestClient(app).post(
+            "/ai/generate/batch", json={"project_id": "1", "requirements": ["登录", "注册"]}
+        )
+
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [event["type"] for event in events] == ["start", "retrieved", "result", "result", "done"]
+    assert sorted(event["index"] for event in events if event["type"] == "result") == [0, 1]
+    assert events[-1]["succeeded"] == 2
+
+
+def test_batch_endpoint_rejects_oversized_batch():
+    with patch.object(endpoints.settings, "BATCH_MAX_REQUIREMENTS", 1):
+        response = TestClient(app).post(
+            "/ai/generate/batch", json={"project_id": "1", "requirements": ["登录", "注册"]}
+        )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_pipelined_batch_respects_concurrency_cap(generation_workflow):
+    client = BRConnectorClient(api_key="test-key", base_url="https://api.test.com")
+    design = json.dumps([{
+        "title": "用例", "preconditions": "无", "steps": ["执行操作"],
+        "expected_result": "结果正确", "priority": "high", "type": "functional"
+    }], ensure_ascii=False)
+    upstream = FakeUpstream([design[i:i + 20] for i in range(0, len(design), 20)])
+    generation_workflow.test_design_agent = TestDesignAgent(client)
+    batch = BatchTestCaseGenerationWorkflow(generation_workflow, max_concurrency=2)
+
+    with patch.object(client.client, "stream", upstream.stream):
+        result = await batch.execute(
+            ["登录", "注册", "登出", "找回密码", "修改资料"], {"project_id": "1", "generation_mode": "pipelined"}
+        )
+
+    assert result.metadata["succeeded"] == 5
+    assert upstream.opened == 5
+    # 流式设计调用在整个流期间占用限流器名额
+    assert upstream.peak == 2
+    await client.close()
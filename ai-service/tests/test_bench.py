@@ -0,0 +1,277 @@
+"""
+压测工具测试
+"""
+
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from bench import micro
+from bench.corpus import generate_test_cases, render_llm_response, to_design_items
+from bench.fake_backend import FakeBackendConfig, create_fake_backend_app
+from bench.fake_llm import FakeLLMConfig, build_reply, create_fake_llm_app
+from bench.latency import LatencyModel
+from bench.stats import RequestSample, percentile, summarize
+
+
+class TestLatencyModel:
+    """延迟分布测试"""
+
+    def test_parse_plain_number(self):
+        model = LatencyModel.parse("0.5")
+        assert model == LatencyModel(kind="fixed", params=(0.5,))
+        assert model.sample(random.Random(0)) == 0.5
+
+    @pytest.mark.parametrize("spec", ["uniform:0.2,0.8", "normal:1,0.2", "lognormal:0.8,0.4", "exp:0.5"])
+    def test_samples_are_non_negative_and_reproducible(self, spec):
+        model = LatencyModel.parse(spec)
+        first = [model.sample(random.Random(7)) for _ in range(5)]
+        second = [model.sample(random.Random(7)) for _ in range(5)]
+        assert first == second
+        assert all(value >= 0 for value in first)
+
+    def test_uniform_bounds(self):
+        model = LatencyModel.parse("uniform:0.2,0.8")
+        rng = random.Random(1)
+        assert all(0.2 <= model.sample(rng) <= 0.8 for _ in range(100))
+
+    @pytest.mark.parametrize("spec", ["gamma:1", "uniform:1", "fixed:abc", "fixed:-1"])
+    def test_invalid_specs(self, spec):
+        with pytest.raises(ValueError):
+            LatencyModel.parse(spec)
+
+    def test_str_round_trip(self):
+        model = LatencyModel.parse("lognormal:0.8,0.4")
+        assert LatencyModel.parse(str(model)) == model
+
+
+class TestStats:
+    """统计汇总测试"""
+
+    def test_percentile_interpolates(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == pytest.approx(50.5)
+        assert percentile(values, 99) == pytest.approx(99.01)
+        assert percentile([], 50) == 0.0
+        assert percentile([3.0], 95) == 3.0
+
+    def test_summarize_counts_errors_by_kind(self):
+        samples = [
+            RequestSample(latency=0.1, ok=True, status=200, first_byte=0.05),
+            RequestSample(latency=0.3, ok=True, status=200, first_byte=0.07),
+            RequestSample(latency=0.2, ok=False, status=503),
+            RequestSample(latency=0.2, ok=False, status=200, error="boom"),
+            RequestSample(latency=1.0, ok=False, error="ReadTimeout"),
+        ]
+
+        summary = summarize(samples, wall_time=2.0)
+
+        assert summary["requests"] == 5
+        assert summary["ok"] == 2
+        assert summary["throughput_rps"] == 1.0
+        assert summary["latency_ms"]["p50"] == 200.0
+        assert summary["latency_ms"]["max"] == 300.0
+        assert summary["first_byte_ms"]["p50"] == 60.0
+        assert summary["errors"] == {"http_503": 1, "failed": 1, "ReadTimeout": 1}
+
+
+class TestFakeLLM:
+    """模拟 LLM 测试"""
+
+    def test_build_reply_routes_by_prompt(self):
+        config = FakeLLMConfig(test_case_count=3, chat_chars=50)
+
+        analysis = json.loads(build_reply("请分析以下需求，并以 JSON 格式返回", config))
+        assert "functional_points" in analysis
+
+        design = build_reply("请为以下需求设计全面的测试用例", config)
+        cases = json.loads(design.strip("`").removeprefix("json"))
+        assert len(cases) == 3
+
+        review = json.loads(build_reply("请审查以下测试用例", config))
+        assert review["approved_cases"] == [0, 1, 2]
+
+        assert build_reply("请判断任务类型", config) == "generate_test_cases"
+        assert len(build_reply("你好", config)) == 50
+
+    def test_claude_non_streaming_response(self):
+        app = create_fake_llm_app(FakeLLMConfig(chat_chars=20))
+        client = TestClient(app)
+
+        response = client.post("/v1/messages", json={"messages": [{"role": "user", "content": "你好"}]})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["content"][0]["text"]) == 20
+        assert data["usage"]["output_tokens"] == 5
+        assert app.state.stats.requests == 1
+
+    def test_openai_streaming_response(self):
+        app = create_fake_llm_app(FakeLLMConfig(chat_chars=12, chunk_chars=4, tokens_per_second=0))
+        client = TestClient(app)
+
+        response = client.post(
+            "/v1/chat/completions",
+            json={"stream": True, "messages": [{"role": "user", "content": "你好"}]},
+        )
+
+        lines = [line[6:] for line in response.text.splitlines() if line.startswith("data: ")]
+        assert lines[-1] == "[DONE]"
+        chunks = [json.loads(line) for line in lines[:-1]]
+        text = "".join(c["choices"][0]["delta"]["content"] for c in chunks if c["choices"])
+        assert len(text) == 12
+        assert chunks[-1]["usage"]["completion_tokens"] == 3
+        assert app.state.stats.in_flight == 0
+
+    def test_rate_limit_injection(self):
+        app = create_fake_llm_app(FakeLLMConfig(rate_limit_probability=1.0, retry_after=2))
+        client = TestClient(app)
+
+        response = client.post("/v1/messages", json={"messages": []})
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "2"
+        assert app.state.stats.rate_limited == 1
+
+
+class TestFakeBackend:
+    """模拟后端测试"""
+
+    def test_list_paging(self):
+        app = create_fake_backend_app(FakeBackendConfig(corpus_size=45))
+        client = TestClient(app)
+
+        data = client.get("/api/v1/projects/p1/testcases", params={"page": 3, "page_size": 20}).json()["data"]
+
+        assert data["total"] == 45
+        assert data["total_pages"] == 3
+        assert [item["id"] for item in data["items"]] == [41, 42, 43, 44, 45]
+
+    def test_search_honours_limit_and_type(self):
+        app = create_fake_backend_app(FakeBackendConfig(corpus_size=50, seed=1))
+        client = TestClient(app)
+
+        response = client.post("/api/v1/projects/p1/search", json={"query": "登录", "type": "prd", "limit": 3})
+
+        results = response.json()["data"]["results"]
+        assert len(results) == 3
+        assert all("需求文档" in item["title"] for item in results)
+        assert app.state.request_count == 1
+
+    def test_create_testcase_returns_code_zero(self):
+        app = create_fake_backend_app(FakeBackendConfig(corpus_size=10))
+        client = TestClient(app)
+
+        response = client.post("/api/v1/projects/p1/testcases", json={"title": "新用例"})
+
+        assert response.json() == {"code": 0, "data": {"title": "新用例", "id": 11}}
+
+
+class TestCorpus:
+    """合成语料测试"""
+
+    def test_generation_is_deterministic(self):
+        assert generate_test_cases(50, language="mixed", seed=3) == generate_test_cases(50, language="mixed", seed=3)
+        assert generate_test_cases(50, seed=3) != generate_test_cases(50, seed=4)
+
+    @pytest.mark.parametrize("language", ["zh", "en", "mixed"])
+    def test_case_structure(self, language):
+        cases = generate_test_cases(100, language=language, min_steps=3, max_steps=8)
+
+        assert len(cases) == 100
+        for case in cases:
+            assert {"title", "preconditions", "steps", "expected_result", "priority", "type"} <= set(case)
+            assert 3 <= len(case["steps"]) <= 8
+            assert [step["step_number"] for step in case["steps"]] == list(range(1, len(case["steps"]) + 1))
+
+    def test_invalid_language(self):
+        with pytest.raises(ValueError):
+            generate_test_cases(1, language="fr")
+
+    def test_render_styles(self):
+        items = to_design_items(generate_test_cases(2))
+
+        assert json.loads(render_llm_response(items, "plain")) == items
+        assert render_llm_response(items, "fenced").startswith("```json\n")
+        assert not render_llm_response(items, "prose").startswith("[")
+
+
+class TestMicroBenchmarks:
+    """微基准测试"""
+
+    def test_measure_sync_and_async(self):
+        def sync_func():
+            return [0] * 1000
+
+        async def async_func():
+            return [0] * 1000
+
+        for func in (sync_func, async_func):
+            result = micro.measure("demo", 1, func, rounds=2, min_time=0.01)
+            assert result.rounds == 2
+            assert result.iterations >= 1
+            assert 0 < result.min <= result.mean
+            assert result.ops_per_sec > 0
+            assert result.peak_alloc_bytes >= 8000
+
+    def test_every_benchmark_runs_on_small_corpus(self):
+        results = micro.run_suite(micro.select_benchmarks(), [10], rounds=1, min_time=0)
+
+        assert {result.name for result in results} == set(micro.BENCHMARKS)
+
+    def test_max_size_skips_quadratic_benchmarks(self):
+        benchmarks = micro.select_benchmarks(["check_duplication"])
+        results = micro.run_suite(benchmarks, [10, 1000], rounds=1, min_time=0)
+
+        assert [result.key for result in results] == ["check_duplication.execute[10]"]
+
+    def test_select_by_substring_and_glob(self):
+        assert all(b.name.startswith("parse.") for b in micro.select_benchmarks(["parse.*"]))
+        assert [b.name for b in micro.select_benchmarks(["format_test"])] == ["format_test_case.execute"]
+
+    def _result(self, min_time=0.001, peak=100_000):
+        return micro.BenchmarkResult(
+            name="demo", size=10, rounds=3, iterations=10, min=min_time, mean=min_time,
+            median=min_time, stddev=0.0, peak_alloc_bytes=peak, retained_bytes=0,
+        )
+
+    def test_compare_flags_regressions(self, tmp_path):
+        path = tmp_path / "baseline.json"
+        micro.save_baseline(path, [self._result()], "zh")
+        baseline = micro.load_baseline(path)
+
+        comparisons = micro.compare(
+            [self._result(min_time=0.002), self._result(peak=200_000), self._result(min_time=0.0004)],
+            baseline,
+            time_tolerance=0.5,
+            alloc_tolerance=0.1,
+        )
+
+        assert [item["status"] for item in comparisons] == ["regression", "regression", "improved"]
+        assert comparisons[0]["time_ratio"] == 2.0
+        assert comparisons[1]["alloc_ratio"] == 2.0
+
+    def test_compare_ignores_small_allocation_noise(self, tmp_path):
+        path = tmp_path / "baseline.json"
+        micro.save_baseline(path, [self._result(peak=1000)], "zh")
+
+        comparisons = micro.compare([self._result(peak=3000)], micro.load_baseline(path))
+
+        assert comparisons[0]["status"] == "ok"
+
+    def test_new_benchmark_and_missing_baseline(self, tmp_path):
+        assert micro.load_baseline(tmp_path / "missing.json") is None
+        assert micro.compare([self._result()], {"benchmarks": {}}) == [{"key": "demo[10]", "status": "new"}]
+
+    def test_stored_baseline_covers_default_run(self):
+        baseline = micro.load_baseline(micro.DEFAULT_BASELINE)
+
+        expected = {
+            f"{benchmark.name}[{size}]"
+            for benchmark in micro.BENCHMARKS.values()
+            for size in micro.DEFAULT_SIZES
+            if benchmark.max_size is None or size <= benchmark.max_size
+        }
+        assert expected <= set(baseline["benchmarks"])
@@ -10,7 +10,10 @@ from app.integration.brconnector_client import (
     BRConnectorError,
     RateLimitError,
     APIError,
+    _record_usage,
 )
+from app.metrics import LLM_TOKENS
+from app.deadline import DeadlineExceeded, deadline_scope
 
 
 @pytest.fixture
@@ -206,15 +209,115 @@ async def test_chat_simple_with_system(client):
             system="You are a helpful assistant",
         )
         
-        # Verify system message was included
+        # Claude API: system prompt goes into the top-level system field as a cacheable block
         call_args = mock_post.call_args
         payload = call_args.kwargs["json"]
         messages = payload["messages"]
         
+        assert payload["system"] == [{
+            "type": "text",
+            "text": "You are a helpful assistant",
+            "cache_control": {"type": "ephemeral"},
+        }]
+        assert len(messages) == 1
+        assert messages[0]["role"] == "user"
+
+
+@pytest.mark.asyncio
+async def test_chat_simple_with_system_openai_compatible():
+    """OpenAI-compatible APIs keep the system prompt as the first message"""
+    client = BRConnectorClient(api_key="test-key", base_url="https://api.deepseek.com")
+    mock_response = Mock(spec=httpx.Response)
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"choices": [{"message": {"content": "Response"}}]}
+    
+    with patch.object(client.client, "post", return_value=mock_response) as mock_post:
+        await client.chat_simple(
+            "User message",
+            system="You are a helpful assistant",
+            cached_context="Reference documents",
+        )
+        
+        payload = mock_post.call_args.kwargs["json"]
+        messages = payload["messages"]
+        
+        assert "system" not in payload
         assert len(messages) == 2
-        assert messages[0]["role"] == "system"
-        assert messages[0]["content"] == "You are a helpful assistant"
-        assert messages[1]["role"] == "user"
+        assert messages[0] == {"role": "system", "content": "You are a helpful assistant"}
+        assert messages[1] == {"role": "user", "content": "Reference documents\n\nUser message"}
+    
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_chat_simple_marks_cached_context(client):
+    """Stable context is sent before the prompt as a cacheable block"""
+    mock_response = Mock(spec=httpx.Response)
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"content": [{"type": "text", "text": "Response"}]}
+    
+    with patch.object(client.client, "post", return_value=mock_response) as mock_post:
+        await client.chat_simple("User message", cached_context="Reference documents")
+        
+        payload = mock_post.call_args.kwargs["json"]
+        
+        assert "system" not in payload
+        assert payload["messages"] == [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "Reference documents", "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": "User message"},
+            ],
+        }]
+
+
+@pytest.mark.asyncio
+async def test_chat_moves_system_messages_and_can_disable_caching():
+    """System role messages are lifted into the system field; caching can be turned off"""
+    client = BRConnectorClient(api_key="test-key", base_url="https://test.api.com", prompt_caching=False)
+    mock_response = Mock(spec=httpx.Response)
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"content": [{"type": "text", "text": "Response"}]}
+    messages = [
+        {"role": "system", "content": "System prompt"},
+        {"role": "user", "content": [
+            {"type": "text", "text": "Context", "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": "Question"},
+        ]},
+    ]
+    
+    with patch.object(client.client, "post", return_value=mock_response) as mock_post:
+        await client.chat(messages)
+        
+        payload = mock_post.call_args.kwargs["json"]
+        
+        assert payload["system"] == [{"type": "text", "text": "System prompt"}]
+        assert payload["messages"][0]["content"][0] == {"type": "text", "text": "Context"}
+    
+    # Caller's messages are not modified
+    assert messages[1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    await client.close()
+
+
+def test_record_usage_counts_cache_tokens():
+    """Cache reads and writes are counted separately for Claude and OpenAI-compatible usage"""
+    before = {t: LLM_TOKENS.value(model="cache-model", type=t) for t in ("input", "cache_read", "cache_write")}
+    
+    _record_usage("cache-model", {
+        "input_tokens": 10,
+        "output_tokens": 5,
+        "cache_read_input_tokens": 800,
+        "cache_creation_input_tokens": 200,
+    })
+    _record_usage("cache-model", {
+        "prompt_tokens": 1000,
+        "completion_tokens": 5,
+        "prompt_tokens_details": {"cached_tokens": 768},
+    })
+    
+    assert LLM_TOKENS.value(model="cache-model", type="input") == before["input"] + 1010
+    assert LLM_TOKENS.value(model="cache-model", type="cache_read") == before["cache_read"] + 1568
+    assert LLM_TOKENS.value(model="cache-model", type="cache_write") == before["cache_write"] + 200
 
 
 @pytest.mark.asyncio
@@ -278,3 +381,53 @@ async def test_dynamic_configuration(client):
         assert url == "https://override.api.com/v1/messages"
         assert headers["Authorization"] == "Bearer override-key"
         assert payload["model"] == "override-model"
+
+
+@pytest.mark.asyncio
+async def test_chat_timeout_clamped_to_deadline(client):
+    """Test request timeout is clamped to the request deadline"""
+    mock_response = Mock(spec=httpx.Response)
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"content": [{"type": "text", "text": "Hi"}]}
+    
+    with patch.object(client.client, "post", return_value=mock_response) as mock_post:
+        await client.chat([{"role": "user", "content": "Hi"}])
+        assert mock_post.call_args.kwargs["timeout"] is httpx.USE_CLIENT_DEFAULT
+        
+        with deadline_scope(5.0):
+            await client.chat([{"role": "user", "content": "Hi"}])
+        
+        timeout = mock_post.call_args.kwargs["timeout"]
+        assert timeout.connect <= 5.0
+        assert timeout.read <= 5.0
+
+
+@pytest.mark.asyncio
+async def test_chat_deadline_exceeded(client):
+    """Test no request is sent once the deadline has passed"""
+    with patch.object(client.client, "post") as mock_post:
+        with deadline_scope(0.0):
+            with pytest.raises(DeadlineExceeded):
+                await client.chat([{"role": "user", "content": "Hi"}])
+        
+        mock_post.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_closes_upstream_when_consumer_stops(client):
+    """Test upstream stream is closed when the consumer stops early"""
+    closed = []
+    
+    async def upstream():
+        try:
+            for text in ["a", "b", "c"]:
+                yield {"type": "content_block_delta", "delta": {"type": "text_delta", "text": text}}
+        finally:
+            closed.append(True)
+    
+    with patch.object(client, "chat", AsyncMock(return_value=upstream())):
+        stream = client.chat_stream([{"role": "user", "content": "Hi"}])
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+    
+    assert closed == [True]
@@ -0,0 +1,92 @@
+"""
+检索上下文打包测试
+"""
+
+from app.context_packing import (
+    document_text,
+    estimate_tokens,
+    extract_excerpt,
+    format_passages,
+    pack_passages,
+    split_sentences,
+)
+
+ORDER_PRD = (
+    "订单模块负责订单的完整生命周期。系统支持多种支付方式。"
+    "订单创建后需要在 30 分钟内完成支付。超时未支付的订单自动取消并释放库存。"
+    "管理员可以在后台查看全部订单。用户可以按月导出订单报表。"
+)
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("用户登录") == 4
+    assert estimate_tokens("login flow") == 3
+
+
+def test_split_sentences():
+    assert split_sentences("第一句。第二句！\nHello world. Next") == ["第一句。", "第二句！", "Hello world.", "Next"]
+
+
+def test_excerpt_keeps_relevant_sentences_in_original_order():
+    excerpt = extract_excerpt(ORDER_PRD, frozenset({"超时", "支付"}), max_tokens=50)
+
+    assert "超时未支付的订单自动取消并释放库存。" in excerpt
+    assert excerpt.index("系统支持多种支付方式") < excerpt.index("超时未支付")
+    assert "管理员" not in excerpt
+    assert estimate_tokens(excerpt) <= 50
+
+
+def test_excerpt_falls_back_to_leading_sentences():
+    excerpt = extract_excerpt(ORDER_PRD, frozenset({"登录"}), max_tokens=30)
+
+    assert excerpt.startswith("订单模块负责订单的完整生命周期。")
+    assert excerpt.endswith("…")
+
+
+def test_pack_selects_by_score_and_drops_near_duplicates():
+    documents = [
+        {"id": "prd-1", "title": "订单 v1", "content": ORDER_PRD, "score": 0.71},
+        {"id": "prd-2", "title": "订单 v2", "content": ORDER_PRD + "新增。", "score": 0.93},
+        {"id": "prd-3", "title": "会员积分", "content": "会员下单后获得积分。", "score": 0.8},
+        {"id": "prd-2", "title": "订单 v2", "content": ORDER_PRD, "score": 0.93},
+    ]
+
+    passages = pack_passages("订单超时未支付", documents)
+
+    assert [passage.document["id"] for passage in passages] == ["prd-2", "prd-3"]
+    assert passages[0].score == 0.93
+
+
+def test_pack_respects_token_budget_and_passage_limit():
+    topics = ["订单", "支付", "库存", "物流", "优惠券", "发票"]
+    documents = [
+        {"id": i, "title": topic, "content": f"{topic}模块的订单支付规则。" * 10 + f"{topic}的其他说明。", "score": 1 - i / 10}
+        for i, topic in enumerate(topics)
+    ]
+
+    passages = pack_passages("订单支付", documents, budget_tokens=120, excerpt_tokens=50)
+    assert sum(passage.tokens for passage in passages) <= 120
+    assert 1 < len(passages) < 6
+
+    assert len(pack_passages("订单支付", documents, max_passages=2)) == 2
+    assert pack_passages("订单支付", None) == []
+
+
+def test_document_text_for_structured_cases():
+    case = {"title": "登录", "steps": [{"action": "输入密码"}, "点击登录"], "expected_result": "进入首页"}
+
+    assert document_text(case) == "输入密码\n点击登录\n进入首页"
+
+
+def test_format_passages():
+    passages = pack_passages("登录", [{"title": "测试登录", "module": "认证"}, {"title": "测试注销", "content": "点击注销。"}])
+
+    text = format_passages("参考历史测试用例：", passages, details=lambda p: [f"模块: {p.document.get('module', 'N/A')}"])
+
+    assert text == (
+        "参考历史测试用例：\n"
+        "\n1. 测试登录\n   模块: 认证\n"
+        "\n2. 测试注销\n   模块: N/A\n   点击注销。\n"
+    )
+    assert format_passages("参考：", []) == ""
@@ -0,0 +1,71 @@
+"""
+请求截止时间的单元测试
+"""
+
+import asyncio
+
+import pytest
+
+from app.deadline import (
+    DeadlineExceeded,
+    check_deadline,
+    clamp_timeout,
+    deadline_scope,
+    get_deadline,
+    remaining_time,
+)
+
+
+def test_no_deadline_by_default():
+    """测试默认没有截止时间"""
+    assert get_deadline() is None
+    assert remaining_time() is None
+    assert clamp_timeout(30.0) == 30.0
+    assert clamp_timeout(None) is None
+    check_deadline()
+
+
+def test_deadline_scope_clamps_timeout():
+    """测试截止时间收紧组件超时"""
+    with deadline_scope(5.0):
+        assert 4.0 < remaining_time() <= 5.0
+        assert clamp_timeout(30.0) <= 5.0
+        assert clamp_timeout(1.0) == 1.0
+        assert clamp_timeout(None) <= 5.0
+
+    assert get_deadline() is None
+
+
+def test_nested_scope_cannot_extend_deadline():
+    """测试内层作用域不能放宽外层截止时间"""
+    with deadline_scope(1.0) as outer:
+        with deadline_scope(100.0) as inner:
+            assert inner == outer
+        with deadline_scope(0.5) as inner:
+            assert inner < outer
+        with deadline_scope(None) as inner:
+            assert inner == outer
+
+
+def test_expired_deadline_raises():
+    """测试截止时间已到"""
+    with deadline_scope(0.0):
+        with pytest.raises(DeadlineExceeded):
+            check_deadline()
+        with pytest.raises(DeadlineExceeded):
+            clamp_timeout(30.0)
+
+
+def test_deadline_exceeded_is_timeout_error():
+    """测试 DeadlineExceeded 可被现有的超时处理捕获"""
+    assert issubclass(DeadlineExceeded, asyncio.TimeoutError)
+
+
+@pytest.mark.asyncio
+async def test_deadline_propagates_to_tasks():
+    """测试截止时间传播到子任务"""
+    async def child():
+        return get_deadline()
+
+    with deadline_scope(10.0) as deadline:
+        assert await asyncio.create_task(child()) == deadline
@@ -0,0 +1,186 @@
+"""
+API 端点辅助函数的单元测试
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.api.endpoints import HEARTBEAT, coalesce_chunks, iterate_until_disconnected
+
+
+class FakeRequest:
+    """在指定时间后断开的请求"""
+
+    def __init__(self, disconnect_after: float):
+        self.disconnect_at = time.monotonic() + disconnect_after
+
+    async def is_disconnected(self) -> bool:
+        return time.monotonic() >= self.disconnect_at
+
+
+@pytest.mark.asyncio
+async def test_iterate_until_disconnected_passes_items():
+    """测试客户端未断开时透传全部数据"""
+    async def source():
+        for i in range(3):
+            yield i
+
+    items = [item async for item in iterate_until_disconnected(FakeRequest(10.0), source())]
+
+    assert items == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_iterate_until_disconnected_cancels_upstream():
+    """测试客户端断开后取消正在等待的上游读取并关闭上游"""
+    events = []
+
+    async def source():
+        try:
+            yield 'first'
+            await asyncio.sleep(10)
+            yield 'never'
+        except asyncio.CancelledError:
+            events.append('cancelled')
+            raise
+        finally:
+            events.append('closed')
+
+    start = time.monotonic()
+    items = [
+        item async for item in iterate_until_disconnected(
+            FakeRequest(0.1), source(), poll_interval=0.02
+        )
+    ]
+
+    assert items == ['first']
+    assert events == ['cancelled', 'closed']
+    assert time.monotonic() - start < 1.0
+
+
+# ============================================================================
+# 流式块合并
+# ============================================================================
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_chunks_merges_rapid_deltas():
+    async def source():
+        for i in range(200):
+            yield f"t{i} "
+            if i % 50 == 0:
+                await asyncio.sleep(0)
+
+    chunks = await _collect(coalesce_chunks(source(), max_delay=0.05, max_chars=10_000))
+
+    assert len(chunks) < 10
+    assert "".join(chunks) == "".join(f"t{i} " for i in range(200))
+
+
+@pytest.mark.asyncio
+async def test_coalesce_chunks_flushes_by_size_and_time():
+    async def source():
+        for _ in range(5):
+            yield "abcd"
+        await asyncio.sleep(0.1)
+        yield "late"
+
+    chunks = await _collect(coalesce_chunks(source(), max_delay=0.02, max_chars=8, heartbeat_interval=None))
+
+    assert chunks == ["abcdabcd", "abcdabcd", "abcd", "late"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_chunks_emits_heartbeats_while_idle():
+    async def source():
+        yield "a"
+        await asyncio.sleep(0.25)
+        yield "b"
+
+    chunks = await _collect(coalesce_chunks(source(), max_delay=0.01, heartbeat_interval=0.05))
+
+    assert chunks[0] == "a"
+    assert chunks[-1] == "b"
+    assert chunks.count(HEARTBEAT) >= 2
+
+
+@pytest.mark.asyncio
+async def test_coalesce_chunks_does_not_read_ahead_of_slow_consumer():
+    """下游没有读取时，上游最多只被预读一块"""
+    produced = []
+
+    async def source():
+        for i in range(100):
+            produced.append(i)
+            yield str(i)
+
+    stream = coalesce_chunks(source(), max_delay=0.01, max_chars=1)
+    first = await stream.__anext__()
+    await asyncio.sleep(0.05)
+
+    assert first == "0"
+    assert len(produced) <= 2
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_chunks_close_cancels_pending_upstream_read():
+    events = []
+
+    async def source():
+        try:
+            yield "first"
+            await asyncio.sleep(10)
+            yield "never"
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        finally:
+            events.append("closed")
+
+    stream = coalesce_chunks(
+        iterate_until_disconnected(FakeRequest(10.0), source()), max_delay=0.01, heartbeat_interval=None
+    )
+    assert await stream.__anext__() == "first"
+    await stream.aclose()
+
+    assert events == ["cancelled", "closed"]
+
+
+def test_chat_stream_sends_coalesced_frames():
+    from fastapi.testclient import TestClient
+    from unittest.mock import Mock, patch
+
+    from app.api import endpoints
+    from app.api.admission import AdmissionController
+    from app.agent.conversation_manager import ConversationManager
+    from main import app
+
+    tokens = [f"词{i}" for i in range(300)]
+
+    async def chat_stream(messages, **kwargs):
+        for token in tokens:
+            yield token
+
+    br_client = Mock()
+    br_client.chat_stream = chat_stream
+    manager = ConversationManager()
+    with patch.object(endpoints, "get_br_client", return_value=br_client), \
+            patch.object(endpoints, "get_conversation_manager", return_value=manager), \
+            patch.object(endpoints, "_admission", AdmissionController()):
+        response = TestClient(app).post(
+            "/ai/chat/stream", json={"message": "你好", "project_id": "1", "conversation_id": "c-stream"}
+        )
+
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    contents = [event["content"] for event in events if event["type"] == "content"]
+    assert events[0]["type"] == "start" and events[-1]["type"] == "done"
+    assert 0 < len(contents) < len(tokens)
+    assert "".join(contents) == "".join(tokens)
+    assert manager.get_conversation("c-stream").messages[-1].content == "".join(tokens)
@@ -0,0 +1,272 @@
+"""
+测试执行历史导入与 APFD 优先级测试
+"""
+
+import pytest
+
+from app.config import settings
+from app.execution_history import (
+    ExecutionRecord,
+    ExecutionStats,
+    annotate_history,
+    apfd,
+    get_project_stats,
+    ingest_results,
+    parse_results,
+    prioritize,
+    reset_project_stats,
+    save_project_stats,
+    snapshot_path,
+)
+from app.impact_graph import get_project_graph, reset_project_graphs
+from app.keyword_index import get_project_index, index_documents, reset_project_indexes
+
+NOW = 1_700_000_000.0
+DAY = 86400.0
+
+
+@pytest.fixture(autouse=True)
+def _clean_history():
+    reset_project_stats()
+    reset_project_graphs()
+    reset_project_indexes()
+    yield
+    reset_project_stats()
+    reset_project_graphs()
+    reset_project_indexes()
+
+
+CSV_RESULTS = """Case_ID,Status,Duration,Timestamp,Module,Run_ID
+tc-1,passed,30,2024-05-01T10:00:00Z,订单中心,r1
+tc-2,FAILED,90,2024-05-01T10:01:00Z,支付中心,r1
+tc-3,skipped,,,,r1
+,passed,1,,,r1
+tc-1,失败,,2024-05-02T10:00:00Z,订单中心,r2
+"""
+
+JSON_RESULTS = """{"results": [
+    {"id": "tc-1", "passed": true, "duration_ms": 1500},
+    {"case_id": "tc-2", "outcome": "error", "executed_at": 1714557600},
+    {"case_id": "tc-3", "status": "blocked"},
+    "not a record"
+]}"""
+
+JUNIT_RESULTS = """<?xml version="1.0" encoding="UTF-8"?>
+<testsuites>
+  <testsuite name="login" timestamp="2024-05-01T10:00:00">
+    <testcase name="test_login" id="tc-1" time="12.5"/>
+    <testcase name="tc-2" time="3"><failure message="boom"/></testcase>
+  </testsuite>
+  <testsuite name="pay">
+    <testcase name="tc-3" time="1"><skipped/></testcase>
+    <testcase name="tc-4" module="支付中心"><error/></testcase>
+  </testsuite>
+</testsuites>"""
+
+
+def test_parse_csv_results():
+    records = parse_results(CSV_RESULTS)
+
+    assert records[0] == ExecutionRecord("tc-1", False, 30.0, 1714557600.0, "订单中心", "r1")
+    assert records[1].failed is True and records[1].duration == 90.0
+    assert records[2] is None  # 跳过
+    assert records[3] is None  # 没有用例 ID
+    assert records[4].failed is True and records[4].duration is None and records[4].run_id == "r2"
+
+
+def test_parse_json_results():
+    records = parse_results(JSON_RESULTS)
+
+    assert records[0] == ExecutionRecord("tc-1", False, 1.5)
+    assert records[1] == ExecutionRecord("tc-2", True, None, 1714557600.0)
+    assert records[2:] == [None, None]
+    assert parse_results('[{"id": 1, "result": "pass"}]') == [ExecutionRecord("1", False)]
+    with pytest.raises(ValueError):
+        parse_results('{"total": 3}')
+    with pytest.raises(ValueError):
+        parse_results("{broken", format="json")
+
+
+def test_parse_junit_results():
+    records = parse_results(JUNIT_RESULTS)
+
+    assert records[0] == ExecutionRecord("tc-1", False, 12.5, 1714557600.0)
+    assert records[1] == ExecutionRecord("tc-2", True, 3.0, 1714557600.0)
+    assert records[2] is None
+    assert records[3] == ExecutionRecord("tc-4", True, None, None, "支付中心")
+    with pytest.raises(ValueError):
+        parse_results("<testsuite>", format="junit")
+    with pytest.raises(ValueError):
+        parse_results("a,b", format="xlsx")
+
+
+def test_stats_accumulate_per_case():
+    stats = ExecutionStats()
+    stats.add_records([
+        ExecutionRecord("a", False, 60.0, NOW - 3 * DAY),
+        ExecutionRecord("a", True, 120.0, NOW - 2 * DAY),
+        ExecutionRecord("a", False, None, NOW - 5 * DAY),
+    ], now=NOW)
+
+    case = stats.get("a")
+    assert (case.runs, case.failures) == (3, 1)
+    assert case.failure_rate == pytest.approx(1 / 3)
+    assert case.mean_duration == 90.0
+    assert case.last_failure == NOW - 2 * DAY
+    assert case.last_run == NOW - 2 * DAY
+    assert stats.get("missing") is None
+    assert "a" in stats and len(stats) == 1
+
+
+def test_failure_probability_uses_rate_and_recency():
+    stats = ExecutionStats()
+    stats.add_records(
+        [ExecutionRecord("stable", False, 60.0)] * 18
+        + [ExecutionRecord("flaky", i % 2 == 0, 60.0) for i in range(18)]
+        + [ExecutionRecord("recent", False, 60.0)] * 17 + [ExecutionRecord("recent", True, 60.0, NOW - DAY)]
+        + [ExecutionRecord("old", False, 60.0)] * 17 + [ExecutionRecord("old", True, 60.0, NOW - 365 * DAY)],
+        now=NOW - 400 * DAY
+    )
+
+    features = stats.features(["stable", "flaky", "recent", "old", "unknown"], now=NOW)
+    stable, flaky, recent, old, unknown = features["failure_probability"].tolist()
+
+    assert stable == pytest.approx(0.1 / 20)
+    assert unknown == pytest.approx(0.05)  # 先验失败率
+    assert recent > flaky > old > stable  # 昨天刚失败过的用例风险最高
+    assert features["minutes"][:4].tolist() == [1.0] * 4
+    assert features["known"].tolist() == [True] * 4 + [False]
+
+
+def test_prioritize_orders_by_faults_per_minute():
+    stats = ExecutionStats()
+    stats.add_records(
+        [ExecutionRecord("slow-flaky", i < 5, 600.0) for i in range(10)]
+        + [ExecutionRecord("fast-flaky", i < 3, 60.0) for i in range(10)]
+        + [ExecutionRecord("fast-stable", False, 30.0) for _ in range(10)],
+        now=NOW - 365 * DAY
+    )
+    cases = [{"id": "fast-stable"}, {"id": "slow-flaky"}, {"id": "fast-flaky"}, {"id": "new", "estimated_minutes": 5}]
+
+    ordered = prioritize(cases, stats, now=NOW)
+
+    # 慢用例失败率更高，但单位时间内更可能发现故障的是快速的不稳定用例
+    assert [case["id"] for case in ordered] == ["fast-flaky", "slow-flaky", "fast-stable", "new"]
+    assert {case["id"]: case["estimated_minutes"] for case in ordered} == {
+        "fast-flaky": 1.0, "slow-flaky": 10.0, "fast-stable": 0.5, "new": 5,
+    }
+    assert annotate_history([], stats) == []
+
+    # 按单位时间期望发现故障数排序后，故障发现得更早
+    faults = {"slow-flaky": {"f1"}, "fast-flaky": {"f2"}}
+    minutes = {case["id"]: case["estimated_minutes"] for case in ordered}
+    assert apfd([case["id"] for case in ordered], faults, minutes) > apfd([case["id"] for case in cases], faults, minutes)
+
+
+def test_apfd_matches_classic_formula():
+    order = ["a", "b", "c", "d", "e"]
+    faults = {"a": {"f1"}, "c": {"f1", "f2"}, "e": {"f3"}}
+
+    # TF = 1, 3, 5；n = 5，m = 3
+    assert apfd(order, faults) == pytest.approx(1 - (1 + 3 + 5) / 15 + 1 / 10)
+    assert apfd(order, {}) == 0.0
+    # 考虑时长：把耗时长的 a 放在后面时 c 发现故障更早
+    assert apfd(["c", "a"], {"a": {"f1"}, "c": {"f1"}}, {"a": 10, "c": 1}) > apfd(
+        ["a", "c"], {"a": {"f1"}, "c": {"f1"}}, {"a": 10, "c": 1}
+    )
+
+
+def test_ingest_feeds_stats_and_co_failures():
+    index_documents(get_project_index("p1"), [{"id": "tc-1", "title": "下单", "module": "订单中心"}])
+    results = """case_id,status,module,run_id
+tc-1,failed,,r1
+tc-2,failed,支付中心,r1
+tc-1,failed,,r2
+tc-2,failed,支付中心,r2
+tc-3,passed,物流中心,r3
+"""
+
+    summary = ingest_results("p1", results, now=NOW)
+
+    assert summary.to_dict() == {"records": 5, "skipped": 0, "cases": 3, "failure_runs": 2}
+    stats = get_project_stats("p1")
+    assert stats.get("tc-1").failures == 2
+    assert list(stats.failure_runs) == [["支付中心", "订单中心"]] * 2
+    # 模块由索引中的用例补全
+    assert get_project_graph("p1").edges()["订单中心"]["支付中心"] == pytest.approx(1.0)
+
+
+def test_stats_snapshot_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXECUTION_STATS_DIR", str(tmp_path))
+    ingest_results("project/1", JUNIT_RESULTS, now=NOW)
+    ingest_results("project/1", JUNIT_RESULTS, now=NOW)
+    stats = get_project_stats("project/1")
+
+    assert save_project_stats() == 1
+    assert save_project_stats() == 0  # 没有变化的统计不重复写入
+
+    reset_project_stats()
+    reset_project_graphs()
+    restored = get_project_stats("project/1")
+    assert restored is not stats
+    assert restored.get("tc-1") == stats.get("tc-1")
+    assert restored.get("tc-4").last_failure == NOW
+    assert list(restored.failure_runs) == list(stats.failure_runs)
+    # 共同失败数据写回项目依赖图
+    assert get_project_graph("project/1").edges() == {}  # tc-2 没有模块，只有支付中心失败
+    assert get_project_graph("project/1")._failure_runs["支付中心"] == 2
+
+    # 加载后可以继续累加
+    restored.add_records([ExecutionRecord("tc-5", True)], now=NOW)
+    assert restored.get("tc-5").failures == 1
+
+    with open(snapshot_path(str(tmp_path), "broken"), "wb") as file:
+        file.write(b"not a snapshot")
+    assert len(get_project_stats("broken")) == 0
+
+
+def test_ingest_endpoint(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    client = TestClient(app)
+    response = client.post("/ai/projects/p1/executions?format=junit", content=JUNIT_RESULTS.encode())
+    assert response.status_code == 200
+    assert response.json() == {
+        "success": True, "project_id": "p1", "records": 3, "skipped": 1, "cases": 3, "failure_runs": 1,
+    }
+    assert get_project_stats("p1").get("tc-2").failures == 1
+
+    assert client.post("/ai/projects/p1/executions", content=b'{"total": 1}').status_code == 400
+    assert client.post("/ai/projects/p1/executions?format=xlsx", content=b"a").status_code == 422
+    monkeypatch.setattr(settings, "EXECUTION_UPLOAD_MAX_BYTES", 10)
+    assert client.post("/ai/projects/p1/executions", content=CSV_RESULTS.encode()).status_code == 413
+
+
+def test_ingest_endpoint_rejects_oversized_upload_early(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    monkeypatch.setattr(settings, "EXECUTION_UPLOAD_MAX_BYTES", 100)
+    client = TestClient(app)
+
+    # Content-Length 超限时不读取请求体
+    response = client.post("/ai/projects/p1/executions", content=b"x" * 10, headers={"Content-Length": "1000"})
+    assert response.status_code == 413
+    assert client.post(
+        "/ai/projects/p1/executions", content=b"x", headers={"Content-Length": "abc"}
+    ).status_code == 400
+
+    # 分块上传（没有 Content-Length）累计超限即拒绝
+    def chunks():
+        for _ in range(50):
+            yield b"tc-1,passed\n" * 4
+
+    assert client.post("/ai/projects/p1/executions", content=chunks()).status_code == 413
+    assert len(get_project_stats("p1")) == 0
+
+    small = client.post("/ai/projects/p1/executions", content=iter([b"case_id,status\n", b"tc-1,failed\n"]))
+    assert small.status_code == 200
+    assert small.json()["records"] == 1
@@ -0,0 +1,245 @@
+"""
+CPU 工作池测试
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from app.deadline import DeadlineExceeded, deadline_scope, remaining_time
+from app.executor import ExecutorSaturated, WorkerPool, get_pool, shutdown_executors
+from app.metrics import EXECUTOR_REJECTED, EXECUTOR_TASKS
+from app.tool.base import BaseTool
+from app.tool.validation_tools import CheckDuplicationTool, find_duplicate_pairs
+
+
+def _pid() -> int:
+    return os.getpid()
+
+
+class _DemoTool(BaseTool):
+    cpu_bound = "thread"
+    offload_threshold = 3
+
+    def __init__(self):
+        super().__init__(name="demo_cpu", description="demo")
+
+    async def execute(self, items, **kwargs):
+        return await self.run_cpu_bound(lambda: (threading.get_ident(), len(items)), size=len(items))
+
+
+@pytest.fixture
+def pool():
+    worker_pool = WorkerPool("thread", max_workers=1, max_queue=0, queue_timeout=0.05)
+    yield worker_pool
+    worker_pool.shutdown()
+
+
+@pytest.fixture(autouse=True, scope="module")
+def shared_pools():
+    yield
+    shutdown_executors()
+
+
+@pytest.mark.asyncio
+async def test_thread_pool_runs_off_loop_thread():
+    """线程池中的函数不在事件循环线程上执行"""
+    worker_pool = WorkerPool("thread", max_workers=2)
+    try:
+        ident = await worker_pool.run(threading.get_ident)
+        assert ident != threading.get_ident()
+        assert worker_pool.in_flight == 0
+    finally:
+        worker_pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_pool_runs_in_child_process():
+    """进程池中的函数在子进程中执行"""
+    worker_pool = WorkerPool("process", max_workers=1)
+    try:
+        assert await worker_pool.run(_pid) != os.getpid()
+        assert await worker_pool.run(find_duplicate_pairs, [{"title": "a"}, {"title": "a"}], 0.3) == [(0, 1, 1.0)]
+    finally:
+        worker_pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_thread_pool_propagates_context():
+    """线程池中的函数可以看到调用方的截止时间"""
+    worker_pool = WorkerPool("thread", max_workers=1)
+    try:
+        with deadline_scope(30):
+            remaining = await worker_pool.run(remaining_time)
+        assert remaining is not None and 0 < remaining <= 30
+    finally:
+        worker_pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_exceptions_propagate(pool):
+    """函数抛出的异常原样传给调用方，名额被释放"""
+    def fail():
+        raise KeyError("boom")
+
+    before = EXECUTOR_TASKS.value(pool="thread", status="error")
+    with pytest.raises(KeyError):
+        await pool.run(fail)
+
+    assert pool.in_flight == 0
+    assert EXECUTOR_TASKS.value(pool="thread", status="error") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_rejects_after_queue_timeout(pool):
+    """池饱和且等待超时时抛出 ExecutorSaturated"""
+    release = threading.Event()
+    first = asyncio.create_task(pool.run(release.wait, 5))
+    await asyncio.sleep(0.01)
+    assert pool.in_flight == 1
+
+    before = EXECUTOR_REJECTED.value(pool="thread")
+    with pytest.raises(ExecutorSaturated):
+        await pool.run(lambda: None)
+    assert EXECUTOR_REJECTED.value(pool="thread") == before + 1
+    assert pool.waiting == 0
+
+    release.set()
+    assert await first is True
+    assert pool.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_waiters_get_slots_in_order():
+    """池饱和时调用方排队等待，按先来先服务的顺序执行"""
+    worker_pool = WorkerPool("thread", max_workers=1, max_queue=0, queue_timeout=5)
+    order = []
+    try:
+        tasks = []
+        for index in range(4):
+            tasks.append(asyncio.create_task(worker_pool.run(lambda i=index: (time.sleep(0.01), order.append(i)))))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+    finally:
+        worker_pool.shutdown()
+
+    assert order == [0, 1, 2, 3]
+    assert worker_pool.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot(pool):
+    """等待中被取消的调用方不占用名额"""
+    pool.queue_timeout = None
+    release = threading.Event()
+    first = asyncio.create_task(pool.run(release.wait, 5))
+    await asyncio.sleep(0.01)
+
+    waiter = asyncio.create_task(pool.run(lambda: None))
+    await asyncio.sleep(0.01)
+    assert pool.waiting == 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    release.set()
+    await first
+    assert pool.in_flight == 0
+    assert await pool.run(lambda: "ok") == "ok"
+
+
+@pytest.mark.asyncio
+async def test_slot_held_until_worker_finishes(pool):
+    """调用方被取消后，名额在工作线程真正结束时才释放"""
+    release = threading.Event()
+    task = asyncio.create_task(pool.run(release.wait, 5))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert pool.in_flight == 1
+    release.set()
+    for _ in range(100):
+        if pool.in_flight == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert pool.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_expired_deadline_fails_fast(pool):
+    """截止时间已到时不再提交任务"""
+    with deadline_scope(-1):
+        with pytest.raises(DeadlineExceeded):
+            await pool.run(lambda: None)
+    assert pool.in_flight == 0
+
+
+def test_invalid_pool_kind():
+    with pytest.raises(ValueError):
+        WorkerPool("fiber")
+
+
+def test_get_pool_is_shared():
+    assert get_pool("thread") is get_pool("thread")
+    assert get_pool("thread") is not get_pool("process")
+
+
+def test_invalid_cpu_bound_declaration():
+    """cpu_bound 只能是 None、thread 或 process"""
+    with pytest.raises(TypeError):
+        class _BadTool(BaseTool):
+            cpu_bound = "gpu"
+
+            async def execute(self, **kwargs):
+                return None
+
+
+@pytest.mark.asyncio
+async def test_base_tool_dispatch_respects_threshold():
+    """输入规模低于阈值时在事件循环线程执行，否则派发到线程池"""
+    tool = _DemoTool()
+
+    small_ident, _ = await tool.execute(items=[1, 2])
+    large_ident, count = await tool.execute(items=[1, 2, 3])
+
+    assert small_ident == threading.get_ident()
+    assert large_ident != threading.get_ident()
+    assert count == 3
+
+
+@pytest.mark.asyncio
+async def test_duplication_check_does_not_block_event_loop():
+    """重复检测在进程池中执行时事件循环仍能处理其他任务"""
+    tool = CheckDuplicationTool()
+    test_cases = [
+        {
+            "title": f"测试用户登录场景 {i}",
+            "steps": [{"action": "输入用户名和密码" * 20, "expected": f"登录结果 {i}" * 20}] * 5,
+            "expected_result": "系统返回正确的登录结果" * 10,
+        }
+        for i in range(40)
+    ]
+    ticks = 0
+    stop = asyncio.Event()
+
+    async def ticker():
+        nonlocal ticks
+        while not stop.is_set():
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    report = await tool.execute(test_cases=test_cases)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker_task
+
+    assert report["total_cases"] == 40
+    # 计算期间事件循环持续运行（每 5ms 一次，允许一定的调度误差）
+    assert ticks >= elapsed / 0.005 / 4
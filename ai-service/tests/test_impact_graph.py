@@ -0,0 +1,159 @@
+"""
+模块依赖图与回归用例集合覆盖测试
+"""
+
+import pytest
+
+from app.impact_graph import (
+    ModuleGraph,
+    ModuleImpact,
+    case_minutes,
+    coverage_items,
+    get_project_graph,
+    record_failure_run,
+    reset_project_graphs,
+    select_cover,
+)
+from app.keyword_index import get_project_index, index_documents, reset_project_indexes
+
+
+@pytest.fixture(autouse=True)
+def _clean_graphs():
+    reset_project_indexes()
+    reset_project_graphs()
+    yield
+    reset_project_indexes()
+    reset_project_graphs()
+
+
+def _case(case_id, module, priority="P2", case_type="functional", prd=None, minutes=None):
+    case = {"id": case_id, "title": case_id, "module": module, "priority": priority, "type": case_type}
+    if prd is not None:
+        case["prd_id"] = prd
+    if minutes is not None:
+        case["estimated_minutes"] = minutes
+    return case
+
+
+def test_shared_prds_link_modules():
+    graph = ModuleGraph()
+    graph.add_cases([
+        _case("a1", "订单", prd="prd-1"),
+        _case("a2", "订单", prd="prd-2"),
+        _case("b1", "支付", prd="prd-1"),
+        _case("c1", "物流", prd="prd-3"),
+    ])
+
+    edges = graph.edges()
+    assert edges["订单"]["支付"] == pytest.approx(0.3)  # 订单的 2 个 PRD 中 1 个与支付共享
+    assert edges["支付"]["订单"] == pytest.approx(0.6)
+    assert "物流" not in edges.get("订单", {})
+
+
+def test_co_failures_need_enough_runs_and_combine_with_noisy_or():
+    graph = ModuleGraph()
+    graph.add_failure_run(["订单", "支付"])
+    assert graph.edges() == {}  # 只失败过一次，不足以建立关联
+
+    graph.add_failure_run(["订单"])
+    assert graph.edges()["订单"]["支付"] == pytest.approx(0.5)
+
+    graph.add_dependency("订单", "支付", 0.5)
+    assert graph.edges()["订单"]["支付"] == pytest.approx(0.75)  # 1 - 0.5 × 0.5
+
+
+def test_impact_propagates_breadth_first_with_best_path():
+    graph = ModuleGraph()
+    graph.add_dependency("用户", "订单", 0.8)
+    graph.add_dependency("订单", "支付", 0.5)
+    graph.add_dependency("用户", "支付", 0.3)
+    graph.add_dependency("支付", "对账", 0.9)
+    graph.add_dependency("订单", "用户", 1.0)
+
+    impacts = graph.impact(["用户"])
+
+    assert impacts["用户"] == ModuleImpact("用户", 1.0, 0)
+    assert impacts["订单"].score == pytest.approx(0.8)
+    assert impacts["支付"].score == pytest.approx(0.4)  # 经订单的 0.8 × 0.5 高于直接依赖的 0.3
+    assert impacts["支付"].via == "订单"
+    assert impacts["对账"].score == pytest.approx(0.27)  # 默认最多 2 层：用户 → 支付 → 对账
+
+    assert graph.impact(["用户"], max_depth=3)["对账"].score == pytest.approx(0.36)
+    assert set(graph.impact(["用户"], min_score=0.5)) == {"用户", "订单"}
+    assert set(graph.impact(["用户"], max_depth=0)) == {"用户"}
+
+
+def test_copy_does_not_touch_original():
+    graph = ModuleGraph()
+    graph.add_dependency("a", "b", 0.5)
+
+    copied = graph.copy()
+    copied.add_dependency("b", "c", 0.5)
+
+    assert "c" in copied.impact(["a"])
+    assert "c" not in graph.impact(["a"])
+
+
+def test_project_graph_follows_keyword_index():
+    index = get_project_index("p1")
+    index_documents(index, [_case("a", "订单", prd="prd-1"), _case("b", "支付", prd="prd-1")])
+
+    graph = get_project_graph("p1")
+    assert graph.edges()["订单"]["支付"] == pytest.approx(0.6)
+
+    index_documents(index, [_case("b", "支付", prd="prd-2")])
+    assert get_project_graph("p1") is graph
+    assert graph.edges() == {}
+
+    record_failure_run("p1", ["订单", "支付"])
+    record_failure_run("p1", ["订单", "支付"])
+    assert graph.edges()["订单"]["支付"] == pytest.approx(1.0)
+
+
+def test_coverage_items_and_minutes():
+    p0 = _case("a", "订单", priority="P0", case_type="Boundary", prd="prd-1", minutes=3)
+    assert coverage_items(p0, "订单") == {
+        ("module", "订单"), ("type", "订单", "boundary"), ("prd", "prd-1"), ("case", "a"),
+    }
+    assert case_minutes(p0) == 3
+    assert case_minutes({"metadata": {"duration_minutes": "2.5"}}) == 2.5
+    assert case_minutes({"estimated_minutes": "abc"}) == 1.0
+
+
+def test_select_cover_prefers_cases_covering_more_risk():
+    impacts = {"订单": ModuleImpact("订单", 1.0, 0), "支付": ModuleImpact("支付", 0.5, 1, "订单")}
+    cases = [
+        _case("o1", "订单"),
+        _case("o2", "订单"),  # 与 o1 覆盖相同，不需要
+        _case("o3", "订单", case_type="boundary"),
+        _case("p1", "支付"),
+        _case("x1", "物流"),  # 不在影响范围内
+    ]
+
+    selection = select_cover(cases, impacts)
+
+    assert [case["id"] for case in selection.cases] == ["o1", "o3", "p1"]
+    assert selection.covered_weight == selection.total_weight == 4.0
+    assert selection.minutes == 3.0
+
+    limited = select_cover(cases, impacts, max_cases=1)
+    assert [case["id"] for case in limited.cases] == ["o1"]
+
+
+def test_select_cover_respects_time_budget():
+    impacts = {"订单": ModuleImpact("订单", 1.0, 0)}
+    cases = [
+        _case("slow", "订单", prd="prd-1", minutes=10),
+        _case("fast", "订单", minutes=1),
+        _case("prd", "订单", case_type="ui", prd="prd-1", minutes=2),
+    ]
+
+    selection = select_cover(cases, impacts, time_budget=5)
+
+    assert [case["id"] for case in selection.cases] == ["fast", "prd"]
+    assert selection.minutes == 3.0
+    assert selection.covered_weight == selection.total_weight  # slow 覆盖的内容已全部被更快的用例覆盖
+
+    tight = select_cover(cases, impacts, time_budget=1)
+    assert [case["id"] for case in tight.cases] == ["fast"]
+    assert tight.covered_weight < tight.total_weight
@@ -0,0 +1,94 @@
+"""
+冷启动导入测试
+
+在全新的解释器中导入应用，检查重量级模块没有在启动时被加载，且导入耗时不超过预算。
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.lazy import lazy_exports
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# `import main` 的耗时上限（秒）。本地通常在 0.5 秒左右，留出余量给较慢的 CI 机器
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "1.5"))
+
+# 启动时不应加载的模块：备用的 weaviate 客户端，以及只在首次请求构建 Agent 时才需要的生成链路
+DEFERRED_MODULES = [
+    "weaviate",
+    "app.integration.weaviate_client",
+    "app.workflow.test_case_generation_workflow",
+    "app.workflow.batch_generation_workflow",
+    "app.tool.validation_tools",
+    "app.agent.test_design_agent",
+    "app.rerank",
+    "app.keyword_index",
+    "app.impact_graph",
+    "app.execution_history",
+    "numpy",
+]
+
+
+def _import_in_fresh_interpreter(module: str) -> dict:
+    """在子进程中导入模块，返回耗时和已加载的模块列表"""
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(json.dumps({'elapsed': elapsed, 'modules': sorted(sys.modules)}))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=SERVICE_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=60,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def main_import():
+    return _import_in_fresh_interpreter("main")
+
+
+def test_startup_does_not_load_deferred_modules(main_import):
+    loaded = set(main_import["modules"])
+    assert [name for name in DEFERRED_MODULES if name in loaded] == []
+
+
+def test_startup_import_within_budget(main_import):
+    assert main_import["elapsed"] < IMPORT_BUDGET_SECONDS
+
+
+@pytest.mark.parametrize("package", ["app.agent", "app.integration", "app.tool", "app.workflow"])
+def test_package_import_is_lazy(package):
+    """导入包本身不加载任何子模块，也不会触发循环导入"""
+    loaded = _import_in_fresh_interpreter(package)["modules"]
+    assert [name for name in loaded if name.startswith(package + ".")] == []
+
+
+def test_lazy_exports_resolve_and_cache():
+    import app.workflow as workflow
+
+    stage_output = workflow.StageOutput
+    from app.workflow.stage_graph import StageOutput
+
+    assert stage_output is StageOutput
+    assert "StageOutput" in vars(workflow)
+    assert "TestCaseGenerationWorkflow" in dir(workflow)
+    with pytest.raises(AttributeError):
+        workflow.NotAWorkflow
+
+
+def test_lazy_exports_unknown_name_error_message():
+    getattr_, _ = lazy_exports("app.tool", {})
+    with pytest.raises(AttributeError, match="app.tool.*Missing"):
+        getattr_("Missing")
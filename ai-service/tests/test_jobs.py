@@ -0,0 +1,382 @@
+"""
+后台任务测试
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.api.admission import LANE_FAST, LANE_STANDARD, AdmissionController
+from app.api.jobs import (
+    JOB_CANCELLED,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    Job,
+    JobManager,
+    JobQueueFull,
+    JobStore,
+)
+from app.progress import progress_scope, report_progress
+from app.workflow.stage_graph import StageGraphExecutor, WorkflowStage
+from main import app
+
+
+async def _wait_finished(manager: JobManager, job_id: str) -> Job:
+    async for _ in manager.events(job_id):
+        pass
+    job = manager.get(job_id)
+    assert job.finished
+    return job
+
+
+# ============================================================================
+# 进度通知
+# ============================================================================
+
+def test_report_progress_without_listener_is_noop():
+    report_progress("stage_started", stage="a")
+
+
+@pytest.mark.asyncio
+async def test_stage_graph_reports_progress():
+    events = []
+
+    async def analyze():
+        return 1
+
+    async def design(analysis):
+        return analysis + 1
+
+    stages = [
+        WorkflowStage(name="analysis", func=analyze),
+        WorkflowStage(name="design", func=design, inputs=["analysis"]),
+    ]
+    with progress_scope(lambda event, fields: events.append((event, fields.get("stage")))):
+        await StageGraphExecutor(stages, name="demo").run()
+
+    assert events == [
+        ("stage_started", "analysis"),
+        ("stage_finished", "analysis"),
+        ("stage_started", "design"),
+        ("stage_finished", "design"),
+    ]
+
+
+def test_failing_listener_does_not_break_caller():
+    def listener(event, fields):
+        raise RuntimeError("boom")
+
+    with progress_scope(listener):
+        report_progress("stage_started")
+
+
+# ============================================================================
+# 存储
+# ============================================================================
+
+def test_store_round_trip(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"), ttl=60)
+    job = Job(job_id="j1", request={"message": "登录"}, events=[{"type": "queued"}])
+    store.save(job)
+
+    loaded = store.load("j1")
+    assert loaded == job
+    assert store.load("missing") is None
+
+
+def test_store_expires_finished_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"), ttl=60)
+    fresh = Job(job_id="fresh", request={}, status=JOB_SUCCEEDED, finished_at=time.time())
+    old = Job(job_id="old", request={}, status=JOB_SUCCEEDED, finished_at=time.time() - 120)
+    running = Job(job_id="running", request={}, status=JOB_RUNNING, started_at=time.time() - 120)
+    for job in (fresh, old, running):
+        store.save(job)
+
+    assert store.load("old") is None
+    assert store.purge_expired() == 1
+    assert store.load("fresh") is not None
+    assert store.load("running") is not None
+
+
+def test_restart_marks_unfinished_jobs_failed(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    store.save(Job(job_id="queued", request={}))
+    store.save(Job(job_id="done", request={}, status=JOB_SUCCEEDED, finished_at=time.time()))
+    store.close()
+
+    JobManager(runner=None, store=JobStore(path))
+    reopened = JobStore(path)
+
+    assert reopened.load("queued").status == JOB_FAILED
+    assert reopened.load("done").status == JOB_SUCCEEDED
+
+
+# ============================================================================
+# 管理器
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_job_runs_and_records_progress():
+    async def runner(job):
+        report_progress("stage_started", stage="analysis")
+        return {"success": True, "echo": job.request["message"]}
+
+    manager = JobManager(runner)
+    try:
+        job = await manager.submit({"message": "登录"})
+        assert job.status == JOB_QUEUED
+
+        finished = await _wait_finished(manager, job.job_id)
+    finally:
+        await manager.shutdown()
+
+    assert finished.status == JOB_SUCCEEDED
+    assert finished.result == {"success": True, "echo": "登录"}
+    assert [event["type"] for event in finished.events] == ["queued", "started", "stage_started", "finished"]
+    # 结束的任务只保存在存储中
+    assert manager.store.load(job.job_id).status == JOB_SUCCEEDED
+
+
+@pytest.mark.asyncio
+async def test_failed_result_and_exception_mark_job_failed():
+    async def runner(job):
+        if job.request["raise"]:
+            raise ValueError("bad input")
+        return {"success": False, "error": "无法确定任务类型"}
+
+    manager = JobManager(runner)
+    try:
+        unsuccessful = await manager.submit({"raise": False})
+        crashed = await manager.submit({"raise": True})
+        unsuccessful = await _wait_finished(manager, unsuccessful.job_id)
+        crashed = await _wait_finished(manager, crashed.job_id)
+    finally:
+        await manager.shutdown()
+
+    assert (unsuccessful.status, unsuccessful.error) == (JOB_FAILED, "无法确定任务类型")
+    assert (crashed.status, crashed.error) == (JOB_FAILED, "bad input")
+
+
+@pytest.mark.asyncio
+async def test_workers_limit_concurrency_and_queue_size():
+    release = asyncio.Event()
+    running = []
+
+    async def runner(job):
+        running.append(job.job_id)
+        await release.wait()
+        return {"success": True}
+
+    manager = JobManager(runner, workers=1, max_queue=1)
+    try:
+        first = await manager.submit({})
+        await asyncio.sleep(0.01)
+        second = await manager.submit({})
+        with pytest.raises(JobQueueFull) as exc_info:
+            await manager.submit({})
+        assert exc_info.value.retry_after >= 1
+
+        await asyncio.sleep(0.01)
+        assert running == [first.job_id]
+        assert manager.get(second.job_id).status == JOB_QUEUED
+
+        release.set()
+        await _wait_finished(manager, second.job_id)
+        assert running == [first.job_id, second.job_id]
+    finally:
+        await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancel_queued_and_running_jobs():
+    started = asyncio.Event()
+
+    async def runner(job):
+        started.set()
+        await asyncio.sleep(10)
+        return {"success": True}
+
+    manager = JobManager(runner, workers=1)
+    try:
+        running = await manager.submit({})
+        queued = await manager.submit({})
+        await started.wait()
+
+        assert manager.cancel(queued.job_id).status == JOB_CANCELLED
+        manager.cancel(running.job_id)
+        cancelled = await _wait_finished(manager, running.job_id)
+        assert cancelled.status == JOB_CANCELLED
+        assert manager.cancel("missing") is None
+    finally:
+        await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_jobs_wait_for_admission_lane():
+    admission = AdmissionController(max_concurrent=2, reserved_slots=1)
+    running = []
+
+    async def runner(job):
+        running.append(job.request["name"])
+        return {"success": True}
+
+    manager = JobManager(runner, workers=2, admission=admission, lane_for_job=lambda job: job.request["lane"])
+    try:
+        # 同步请求占满 standard 车道，任务保持排队
+        ticket = admission.enqueue(LANE_STANDARD)
+        standard = await manager.submit({"name": "standard", "lane": LANE_STANDARD})
+        await asyncio.sleep(0.01)
+        assert manager.get(standard.job_id).status == JOB_QUEUED
+        assert admission.queued == 1
+
+        # fast 车道可以使用预留名额
+        fast = await manager.submit({"name": "fast", "lane": LANE_FAST})
+        assert (await _wait_finished(manager, fast.job_id)).status == JOB_SUCCEEDED
+        assert running == ["fast"]
+
+        admission.release(ticket)
+        assert (await _wait_finished(manager, standard.job_id)).status == JOB_SUCCEEDED
+        assert running == ["fast", "standard"]
+        assert admission.active == 0
+    finally:
+        await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancel_job_waiting_for_admission():
+    admission = AdmissionController(max_concurrent=1, reserved_slots=0)
+
+    async def runner(job):
+        return {"success": True}
+
+    manager = JobManager(runner, workers=1, admission=admission)
+    try:
+        ticket = admission.enqueue(LANE_STANDARD)
+        job = await manager.submit({})
+        await asyncio.sleep(0.01)
+
+        manager.cancel(job.job_id)
+        assert (await _wait_finished(manager, job.job_id)).status == JOB_CANCELLED
+        assert admission.queued == 0
+        admission.release(ticket)
+        assert admission.active == 0
+    finally:
+        await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_expired_jobs_are_purged_periodically(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"), ttl=60)
+    store.save(Job(job_id="old", request={}, status=JOB_SUCCEEDED, finished_at=time.time() - 120))
+
+    manager = JobManager(runner=None, store=store, purge_interval=0.01)
+    try:
+        manager.start()
+        await asyncio.sleep(0.05)
+        # 没有提交任何任务，过期任务也已被清理
+        assert store.purge_expired() == 0
+    finally:
+        await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_fails_unfinished_jobs():
+    async def runner(job):
+        await asyncio.sleep(10)
+
+    manager = JobManager(runner, workers=1)
+    job = await manager.submit({})
+    await asyncio.sleep(0.01)
+    await manager.shutdown()
+
+    stored = manager.store.load(job.job_id)
+    assert stored.status == JOB_FAILED
+    assert stored.events[-1]["type"] == "finished"
+
+
+# ============================================================================
+# 端点
+# ============================================================================
+
+@pytest.fixture
+def job_client():
+    """使用内存存储和伪造执行函数的客户端"""
+    async def runner(job):
+        report_progress("stage_started", stage="requirement_analysis")
+        return {"success": True, "task_type": "GENERATE_TEST_CASES", "test_cases": [{"title": job.request["message"]}]}
+
+    with TestClient(app) as client, patch.object(endpoints, "_job_manager", JobManager(runner)):
+        yield client
+
+
+def test_job_endpoints_submit_poll_and_stream(job_client):
+    response = job_client.post("/ai/jobs", json={"message": "登录功能", "project_id": "1"})
+    assert response.status_code == 202
+    body = response.json()
+    assert body["events_url"].endswith(f"/ai/jobs/{body['job_id']}/events")
+
+    stream = job_client.get(f"/ai/jobs/{body['job_id']}/events")
+    events = [json.loads(line[len("data: "):]) for line in stream.text.splitlines() if line.startswith("data: ")]
+    assert [event["type"] for event in events] == ["queued", "started", "stage_started", "finished"]
+
+    job = job_client.get(f"/ai/jobs/{body['job_id']}").json()["job"]
+    assert job["status"] == JOB_SUCCEEDED
+    assert job["result"]["test_cases"] == [{"title": "登录功能"}]
+
+
+def test_unknown_job_returns_404(job_client):
+    assert job_client.get("/ai/jobs/missing").status_code == 404
+    assert job_client.get("/ai/jobs/missing/events").status_code == 404
+    assert job_client.delete("/ai/jobs/missing").status_code == 404
+
+
+class FakeAuditWorkflow:
+    """把报告写入配置目录的伪造审计工作流"""
+
+    def __init__(self, report_dir):
+        self.report_dir = report_dir
+
+    async def run_audit(self, project_id, chunk_size=1000, report_id=None):
+        from app.workflow.test_case_optimization_workflow import audit_report_path
+        from app.workflow.base import WorkflowResult
+
+        path = audit_report_path(self.report_dir, project_id, report_id)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"case_id": "tc-1", "chunk_size": chunk_size}) + "\n")
+        return WorkflowResult(success=True, data={"report_path": path})
+
+
+def test_audit_job_report_download(tmp_path, monkeypatch):
+    monkeypatch.setattr(endpoints.settings, "AUDIT_REPORT_DIR", str(tmp_path))
+    agent = type("Agent", (), {"get_workflow": lambda self, name: FakeAuditWorkflow(str(tmp_path))})()
+
+    with TestClient(app) as client, \
+            patch.object(endpoints, "_job_manager", JobManager(endpoints._run_job)), \
+            patch.object(endpoints, "get_agent", return_value=agent):
+        response = client.post("/ai/audits", json={"project_id": "../p1", "chunk_size": 50})
+        assert response.status_code == 202
+        body = response.json()
+        assert body["report_url"].endswith(f"/ai/jobs/{body['job_id']}/report")
+
+        client.get(body["events_url"])
+        job = client.get(body["status_url"]).json()["job"]
+        assert job["status"] == JOB_SUCCEEDED
+        assert job["result"]["data"]["report_path"] == str(tmp_path / f"..%2Fp1-{body['job_id']}.jsonl")
+
+        report = client.get(body["report_url"])
+        assert report.status_code == 200
+        assert report.headers["content-type"] == "application/x-ndjson"
+        assert json.loads(report.text) == {"case_id": "tc-1", "chunk_size": 50}
+
+        # 生成任务没有报告
+        generate = client.post("/ai/jobs", json={"message": "登录功能", "project_id": "1"}).json()
+        assert client.get(f"/ai/jobs/{generate['job_id']}/report").status_code == 409
+        assert client.get("/ai/jobs/missing/report").status_code == 404
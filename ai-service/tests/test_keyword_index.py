@@ -0,0 +1,271 @@
+"""
+项目关键词倒排索引测试
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import numpy as np
+import pytest
+
+from app import keyword_index
+from app.config import settings
+from app.keyword_index import (
+    INDEX_SOURCE,
+    KeywordIndex,
+    Segmenter,
+    ensure_indexed,
+    get_project_index,
+    index_documents,
+    recall_documents,
+    reset_project_indexes,
+    save_project_indexes,
+    snapshot_path,
+    tokenize,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_indexes():
+    reset_project_indexes()
+    yield
+    reset_project_indexes()
+
+
+def _case(case_id, title, content="", priority="P2", module=None, updated_at=None):
+    metadata = {"priority": priority}
+    if module is not None:
+        metadata["module"] = module
+    if updated_at is not None:
+        metadata["updated_at"] = updated_at
+    return {"id": case_id, "title": title, "content": content, "metadata": metadata}
+
+
+def test_tokenize_combines_bigrams_dictionary_words_and_ascii():
+    terms = tokenize("输入验证码后 Login 成功，中")
+
+    assert {"输入", "入验", "验证", "证码", "码后"} <= set(terms)
+    assert "验证码" in terms  # 词典词
+    assert {"login", "成功", "中"} <= set(terms)
+    # 二元组不跨越标点和空格
+    assert "功中" not in terms
+
+
+def test_segmenter_finds_overlapping_words_and_accepts_new_words():
+    segmenter = Segmenter(["第三方", "第三方登录", "短信验证", "验证码"])
+    assert segmenter.cut("使用第三方登录") == ["第三方", "第三方登录"]
+    assert segmenter.cut("短信验证码") == ["短信验证", "验证码"]
+
+    segmenter.add_words(["灰度开关", "短"])
+    assert segmenter.cut("打开灰度开关") == ["灰度开关"]
+    assert "灰度开关" in tokenize("打开灰度开关", segmenter)
+
+
+def test_boolean_queries():
+    index = KeywordIndex()
+    index.add("a", "用户登录 密码 校验")
+    index.add("b", "用户注册 手机号")
+    index.add("c", "登录 超时 提示")
+
+    assert index.match("用户") == ["a", "b"]
+    assert index.match("登录 用户") == ["a"]
+    assert index.match("密码 手机号", mode="or") == ["a", "b"]
+    assert index.match("登录", exclude="超时") == ["a"]
+    assert index.match("不存在") == []
+    assert index.match("!!!") == []
+    with pytest.raises(ValueError):
+        index.match("登录", mode="xor")
+
+
+def test_updates_tombstone_old_rows_and_keep_statistics_consistent():
+    index = KeywordIndex()
+    index.add("a", "支付 超时")
+    index.add("b", "订单 列表")
+    version = index.version
+
+    index.add("a", "订单 导出")
+    assert index.version > version
+    assert len(index) == 2
+    assert index.match("支付") == []
+    assert index.match("订单") == ["b", "a"]
+    assert index.score_documents("支付", ["a"])[0] == 0
+
+    # 失效行不计入文档频率：与只写入新内容的索引打分一致
+    fresh = KeywordIndex()
+    fresh.add("b", "订单 列表")
+    fresh.add("a", "订单 导出")
+    assert np.allclose(index.score_documents("订单 导出", ["a", "b"]), fresh.score_documents("订单 导出", ["a", "b"]))
+
+    assert index.remove("b") is True
+    assert index.remove("b") is False
+    assert index.match("订单") == ["a"]
+
+
+def test_compaction_renumbers_rows(monkeypatch):
+    monkeypatch.setattr(keyword_index, "_COMPACT_MIN_DEAD", 4)
+    index = KeywordIndex()
+    index.add("keep", "购物车 结算")
+    for version in range(10):
+        index.add("moving", f"优惠券 版本{version}")
+
+    assert len(index._ids) < 11  # 已压缩过
+    assert index._dead <= 4
+    assert index.match("优惠券") == ["moving"]
+    assert index.match("结算") == ["keep"]
+    assert index.document("moving") == {}
+    assert index.rows(["keep"]).tolist() == [0]
+    assert index._ids[index.rows(["moving"])[0]] == "moving"
+
+
+def test_search_ranks_boolean_matches_by_bm25():
+    index = KeywordIndex()
+    index.add("a", "退款 流程")
+    index.add("b", "退款 超时 退款 超时")
+    index.add("c", "发票 抬头")
+
+    results = index.search("退款 超时", limit=5)
+    assert [doc_id for doc_id, _ in results] == ["b", "a"]
+    assert results[0][1] > results[1][1] > 0
+    assert index.search("退款 超时", mode="and") == results[:1]
+    assert index.search("退款", limit=0) == []
+
+
+def test_ensure_indexed_only_rewrites_changed_documents():
+    index = KeywordIndex()
+    cases = [_case("c1", "登录"), _case("c2", "注销")]
+    rows = ensure_indexed(index, cases)
+    assert rows.tolist() == [0, 1]
+    version = index.version
+
+    ensure_indexed(index, cases)
+    assert index.version == version
+
+    ensure_indexed(index, [_case("c1", "登录", priority="P0")])
+    assert index.version > version
+
+    # 本地召回的文档只带原始字段，不会覆盖索引中的全文
+    recalled = {**index.document("c2"), "source": INDEX_SOURCE}
+    version = index.version
+    ensure_indexed(index, [recalled])
+    assert index.version == version
+
+
+def test_recall_documents_restores_stored_fields():
+    index = KeywordIndex()
+    index_documents(index, [
+        _case("c1", "余额支付", content="支付超时后订单关闭", priority="P0", module="支付中心"),
+        _case("c2", "订单列表", module="订单中心"),
+        {"title": "没有 ID 的支付用例"},
+    ])
+
+    recalled = recall_documents(index, "支付中心")
+
+    assert [case["id"] for case in recalled] == ["c1"]
+    assert recalled[0]["priority"] == "P0"
+    assert recalled[0]["module"] == "支付中心"
+    assert recalled[0]["source"] == INDEX_SOURCE
+    assert [case["id"] for case in recall_documents(index, "支付")] == ["c1"]
+
+
+def test_snapshot_round_trip(tmp_path):
+    index = KeywordIndex()
+    index_documents(index, [
+        _case("c1", "验证码登录", priority="P1", updated_at="2024-04-01T00:00:00Z"),
+        _case("c2", "订单导出"),
+        {"title": "没有 ID 的用例", "content": "退款"},
+    ])
+    index.add("c2", "订单 批量导出")
+    path = str(tmp_path / "snapshots" / "p1.npz")
+
+    index.save(path)
+    loaded = KeywordIndex.load(path)
+
+    assert loaded.saved_version == loaded.version
+    assert len(loaded) == len(index) == 3
+    assert loaded.match("验证码") == ["c1"]
+    assert loaded.match("退款") == [("title", "没有 ID 的用例")]
+    assert loaded.document("c1")["priority"] == "P1"
+    for query in ("订单 导出", "验证码 登录", "退款"):
+        assert np.allclose(
+            loaded.score_documents(query, ["c1", "c2"]),
+            index.score_documents(query, ["c1", "c2"]),
+        )
+    assert np.array_equal(
+        loaded.static_features(loaded.rows(["c1"]))[0], index.static_features(index.rows(["c1"]))[0]
+    )
+
+    # 加载后可以继续增量更新
+    loaded.add("c3", "库存扣减")
+    assert loaded.match("库存") == ["c3"]
+
+
+def test_project_indexes_load_and_save_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_INDEX_DIR", str(tmp_path))
+    index = get_project_index("project/1")
+    index.add("c1", "会话超时")
+
+    assert save_project_indexes() == 1
+    assert save_project_indexes() == 0  # 没有变化的索引不重复写入
+
+    reset_project_indexes()
+    restored = get_project_index("project/1")
+    assert restored is not index
+    assert restored.match("会话超时") == ["c1"]
+
+    # 损坏的快照被忽略
+    with open(snapshot_path(str(tmp_path), "broken"), "wb") as file:
+        file.write(b"not a snapshot")
+    assert len(get_project_index("broken")) == 0
+
+
+def test_snapshot_signatures_survive_restart(tmp_path):
+    """签名跨进程稳定：换一个 PYTHONHASHSEED 重新加载快照后，未变化的用例不重新写入"""
+    path = str(tmp_path / "p1.npz")
+    cases = [
+        _case("c1", "验证码登录", "输入验证码", priority="P1", module="认证", updated_at="2024-04-01T00:00:00Z"),
+        {"id": "c2", "title": "订单导出", "steps": [{"action": "导出"}], "expected_result": "生成 CSV"},
+    ]
+    script = textwrap.dedent(f"""
+        import sys
+        from app.keyword_index import KeywordIndex, ensure_indexed
+        cases = {cases!r}
+        if sys.argv[1] == "save":
+            index = KeywordIndex()
+            ensure_indexed(index, cases)
+            index.save({path!r})
+        else:
+            index = KeywordIndex.load({path!r})
+            version = index.version
+            ensure_indexed(index, cases)
+            print(index.version - version, len(index._signatures))
+    """)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def run(mode, seed):
+        env = {**os.environ, "PYTHONHASHSEED": seed}
+        completed = subprocess.run(
+            [sys.executable, "-c", script, mode], cwd=root, env=env, capture_output=True, text=True, check=True
+        )
+        return completed.stdout.split()
+
+    run("save", "1")
+    assert run("load", "2") == ["0", "2"]
+
+
+def test_keyword_lookup_in_microseconds():
+    rng = np.random.default_rng(0)
+    words = ["登录", "注册", "支付", "订单", "库存", "物流", "优惠券", "发票", "退款", "超时"]
+    index = KeywordIndex()
+    for i in range(10_000):
+        index.add(f"tc-{i}", " ".join(rng.choice(words, 5)))
+
+    index.match("优惠券 退款")
+    start = time.perf_counter()
+    for _ in range(100):
+        index.search("优惠券 退款", limit=10, mode="and")
+    elapsed = (time.perf_counter() - start) / 100
+
+    assert elapsed < 0.005
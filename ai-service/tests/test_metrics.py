@@ -0,0 +1,192 @@
+"""
+运行指标的单元测试
+"""
+
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, Mock, patch
+
+from app.integration.brconnector_client import BRConnectorClient, _record_retry
+from app.metrics import (
+    LLM_REQUEST_DURATION,
+    LLM_RETRIES,
+    LLM_TIME_TO_FIRST_TOKEN,
+    LLM_TOKENS,
+    STAGE_DURATION,
+    TOOL_DURATION,
+    MetricsRegistry,
+)
+from app.tool.base import BaseTool, ToolError
+from app.workflow.stage_graph import StageGraphExecutor, WorkflowStage
+
+
+class EchoTool(BaseTool):
+    """测试用工具"""
+
+    def __init__(self, name: str, fail: bool = False):
+        super().__init__(name=name, description="回显输入")
+        self.fail = fail
+
+    async def execute(self, value=None, **kwargs):
+        if self.fail:
+            raise ToolError(self.name, "失败")
+        return value
+
+
+class SubEchoTool(EchoTool):
+    """继承 execute 的子类"""
+    pass
+
+
+def test_counter_and_histogram_render():
+    """测试计数器和直方图的文本格式输出"""
+    registry = MetricsRegistry()
+    counter = registry.counter("requests", "请求数", ["path"])
+    histogram = registry.histogram("latency_seconds", "耗时", ["path"], buckets=[0.1, 1.0])
+
+    counter.inc(path="/a")
+    counter.inc(2, path="/a")
+    histogram.observe(0.05, path="/a")
+    histogram.observe(0.5, path="/a")
+    histogram.observe(5, path="/a")
+
+    text = registry.render()
+
+    assert "# TYPE requests counter" in text
+    assert 'requests_total{path="/a"} 3' in text
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{path="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{path="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{path="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{path="/a"} 3' in text
+    assert histogram.snapshot(path="/a")["sum"] == pytest.approx(5.55)
+
+
+def test_metric_label_validation():
+    """测试标签校验和重复注册"""
+    registry = MetricsRegistry()
+    counter = registry.counter("events", "事件数", ["kind"])
+
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="x")
+
+    assert registry.counter("events", "事件数", ["kind"]) is counter
+    with pytest.raises(ValueError):
+        registry.histogram("events", "事件数", ["kind"])
+
+
+def test_label_values_escaped():
+    """测试标签值转义"""
+    registry = MetricsRegistry()
+    registry.counter("errors", "错误数", ["message"]).inc(message='a "b"\n')
+
+    assert 'errors_total{message="a \\"b\\"\\n"} 1' in registry.render()
+
+
+@pytest.mark.asyncio
+async def test_tool_execute_instrumented():
+    """测试工具 execute 自动记录耗时和状态"""
+    ok_tool = SubEchoTool("metrics_echo_ok")
+    failing_tool = EchoTool("metrics_echo_fail", fail=True)
+
+    assert await ok_tool.execute(value=1) == 1
+    with pytest.raises(ToolError):
+        await failing_tool.execute()
+
+    assert TOOL_DURATION.snapshot(tool="metrics_echo_ok", status="ok")["count"] == 1
+    assert TOOL_DURATION.snapshot(tool="metrics_echo_fail", status="error")["count"] == 1
+    # 继承的 execute 不会被重复包装
+    assert SubEchoTool.execute is EchoTool.execute
+
+
+@pytest.mark.asyncio
+async def test_chat_records_duration_and_tokens():
+    """测试非流式请求记录耗时和 token 用量"""
+    client = BRConnectorClient(api_key="test-key", base_url="https://test.api.com", model="metrics-sync")
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {
+        "content": [{"text": "Hello"}],
+        "usage": {"input_tokens": 12, "output_tokens": 5},
+    }
+
+    with patch.object(client.client, "post", AsyncMock(return_value=mock_response)):
+        await client.chat([{"role": "user", "content": "Hi"}])
+
+    assert LLM_REQUEST_DURATION.snapshot(model="metrics-sync", stream="false", status="ok")["count"] == 1
+    assert LLM_TOKENS.value(model="metrics-sync", type="input") == 12
+    assert LLM_TOKENS.value(model="metrics-sync", type="output") == 5
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_records_ttft_and_tokens():
+    """测试流式请求记录首个内容块耗时和 token 用量"""
+    events = [
+        {"type": "message_start", "message": {"usage": {"input_tokens": 20, "output_tokens": 1}}},
+        {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hi"}},
+        {"type": "message_delta", "usage": {"output_tokens": 7}},
+    ]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+
+    client = BRConnectorClient(api_key="test-key", base_url="https://test.api.com", model="metrics-stream")
+    await client.client.aclose()
+    client.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, text=body))
+    )
+
+    chunks = [chunk async for chunk in client.chat_stream([{"role": "user", "content": "Hi"}])]
+
+    assert chunks == ["Hi"]
+    assert LLM_TIME_TO_FIRST_TOKEN.snapshot(model="metrics-stream")["count"] == 1
+    assert LLM_REQUEST_DURATION.snapshot(model="metrics-stream", stream="true", status="ok")["count"] == 1
+    assert LLM_TOKENS.value(model="metrics-stream", type="input") == 20
+    assert LLM_TOKENS.value(model="metrics-stream", type="output") == 7
+    await client.close()
+
+
+def test_retry_hook_counts_retries():
+    """测试重试回调按模型计数"""
+    client = Mock(default_model="metrics-retry")
+
+    _record_retry(Mock(args=(client,), kwargs={}))
+    _record_retry(Mock(args=(client,), kwargs={"model": "metrics-retry-override"}))
+
+    assert LLM_RETRIES.value(model="metrics-retry") == 1
+    assert LLM_RETRIES.value(model="metrics-retry-override") == 1
+
+
+@pytest.mark.asyncio
+async def test_stage_duration_recorded():
+    """测试阶段耗时按工作流和阶段记录"""
+    async def ok():
+        return 1
+
+    async def fail():
+        raise RuntimeError("失败")
+
+    executor = StageGraphExecutor([
+        WorkflowStage(name='ok', func=ok),
+        WorkflowStage(name='fail', func=fail, required=False),
+    ], name='metrics_workflow')
+    await executor.run()
+
+    assert STAGE_DURATION.snapshot(workflow='metrics_workflow', stage='ok', status='ok')["count"] == 1
+    assert STAGE_DURATION.snapshot(workflow='metrics_workflow', stage='fail', status='error')["count"] == 1
+
+
+def test_metrics_endpoint():
+    """测试 /metrics 端点"""
+    from main import app
+
+    TOOL_DURATION.observe(0.1, tool="metrics_endpoint", status="ok")
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'ai_tool_execute_duration_seconds_count{tool="metrics_endpoint",status="ok"} 1' in response.text
@@ -0,0 +1,87 @@
+"""
+核心数据模型测试
+"""
+
+import json
+import pickle
+
+import pytest
+
+from app.agent.conversation_manager import Conversation, Message
+from app.agent.quality_review_agent import ReviewResult
+from app.agent.requirement_analysis_agent import AnalysisResult
+from app.agent.test_design_agent import TestCaseDesign
+from app.models import CaseType, Priority, intern_label
+
+
+def _design(**overrides):
+    data = dict(
+        title="登录成功", preconditions="已注册", steps=["输入用户名", "输入密码"],
+        expected_result="进入首页", priority=Priority.HIGH, type=CaseType.FUNCTIONAL, rationale=""
+    )
+    data.update(overrides)
+    return TestCaseDesign(**data)
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("High", Priority.HIGH), (" p0 ", Priority.HIGH), ("中", Priority.MEDIUM), ("P4", Priority.LOW), ("urgent", None),
+])
+def test_priority_parse(value, expected):
+    assert Priority.parse(value) is expected
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("Functional", CaseType.FUNCTIONAL), ("边界值", CaseType.BOUNDARY), ("错误", CaseType.EXCEPTION), ("security", None),
+])
+def test_case_type_parse(value, expected):
+    assert CaseType.parse(value) is expected
+
+
+def test_intern_label_shares_objects():
+    """已知值转换为枚举单例，未知值保留为驻留的小写字符串"""
+    assert intern_label(Priority, "HIGH") is Priority.HIGH
+    first = intern_label(CaseType, "".join(["Secu", "rity"]))
+    second = intern_label(CaseType, "".join(["secur", "ity "]))
+    assert first == "security"
+    assert first is second
+
+
+def test_enum_members_behave_as_strings():
+    assert Priority.HIGH == "high"
+    assert f"{Priority.LOW}" == "low"
+    assert Priority.MEDIUM in frozenset(["medium"])
+    assert json.dumps({"priority": Priority.HIGH}) == '{"priority": "high"}'
+    assert pickle.loads(pickle.dumps(CaseType.BOUNDARY)) is CaseType.BOUNDARY
+
+
+@pytest.mark.parametrize("model", [
+    _design(),
+    AnalysisResult([], [], {}, {}, [], []),
+    ReviewResult(90, [], [], [0], [], "good"),
+    Message(role="user", content="你好"),
+    Conversation(conversation_id="c1", project_id="p1"),
+])
+def test_models_are_slotted(model):
+    assert not hasattr(model, "__dict__")
+    with pytest.raises(AttributeError):
+        model.unknown_field = 1
+
+
+def test_to_dict_is_a_shallow_view():
+    """to_dict 不复制容器，字段顺序与定义一致"""
+    design = _design()
+    data = design.to_dict()
+
+    assert list(data) == [
+        "title", "preconditions", "steps", "expected_result", "priority", "type", "rationale"
+    ]
+    assert data["steps"] is design.steps
+    assert TestCaseDesign.from_dict(data) == design
+
+
+def test_review_result_round_trip_through_json():
+    review = ReviewResult(80, ["问题"], [], [0, 2], [(1, "步骤不完整")], "good")
+
+    restored = ReviewResult.from_dict(json.loads(json.dumps(review.to_dict())))
+
+    assert restored == review
@@ -7,6 +7,7 @@ from unittest.mock import AsyncMock
 from app.agent.quality_review_agent import (
     QualityReviewAgent,
     ReviewResult,
+    merge_reviews,
 )
 from app.agent.requirement_analysis_agent import AnalysisResult
 from app.agent.test_design_agent import TestCaseDesign
@@ -423,3 +424,47 @@ def test_review_result_from_dict():
     assert len(result.rejected_cases) == 1
     assert result.rejected_cases[0] == (3, "拒绝原因")
     assert result.overall_quality == 'excellent'
+
+
+@pytest.mark.asyncio
+async def test_review_partial_batch_adds_note(agent, mock_brconnector, sample_test_cases, sample_analysis):
+    """测试分批审查时提示词说明只是部分用例"""
+    mock_brconnector.chat_simple.return_value = '{"coverage_score": 80, "approved_cases": [0]}'
+    
+    await agent.review(sample_test_cases[:1], "用户登录", sample_analysis, partial=True)
+    partial_prompt = mock_brconnector.chat_simple.call_args.kwargs["prompt"]
+    await agent.review(sample_test_cases[:1], "用户登录", sample_analysis)
+    full_prompt = mock_brconnector.chat_simple.call_args.kwargs["prompt"]
+    
+    assert "全部测试用例中的一批" in partial_prompt
+    assert "全部测试用例中的一批" not in full_prompt
+
+
+def test_merge_reviews_remaps_batch_indices():
+    """测试合并分批审查结果时换算全局索引"""
+    first = ReviewResult(
+        coverage_score=90, issues=["缺少边界值"], suggestions=["补充边界值"],
+        approved_cases=[0, 2], rejected_cases=[(1, "步骤不清晰")], overall_quality="excellent"
+    )
+    second = ReviewResult(
+        coverage_score=60, issues=["缺少边界值", "重复用例"], suggestions=[],
+        approved_cases=[1, 5], rejected_cases=[(0, "与用例 3 重复")], overall_quality="good"
+    )
+    
+    merged = merge_reviews([(3, 2, second), (0, 3, first)])
+    
+    assert merged.approved_cases == [0, 2, 4]
+    assert merged.rejected_cases == [(1, "步骤不清晰"), (3, "与用例 3 重复")]
+    assert merged.coverage_score == 78
+    assert merged.issues == ["缺少边界值", "重复用例"]
+    assert merged.suggestions == ["补充边界值"]
+    assert merged.overall_quality == "good"
+
+
+def test_merge_reviews_unknown_quality_is_lowest():
+    """测试审查失败批次的未知质量等级拉低整体质量"""
+    ok = ReviewResult(80, [], [], [0], [], "excellent")
+    failed = ReviewResult(0, [], [], [0], [], "unknown")
+    
+    assert merge_reviews([(0, 1, ok), (1, 1, failed)]).overall_quality == "unknown"
+    assert merge_reviews([]).overall_quality == "unknown"
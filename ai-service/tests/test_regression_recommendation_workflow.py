@@ -4,11 +4,26 @@ RegressionRecommendationWorkflow 单元测试
 
 import pytest
 from unittest.mock import AsyncMock
+from app.execution_history import ingest_results, reset_project_stats
+from app.impact_graph import reset_project_graphs
+from app.keyword_index import get_project_index, index_documents, reset_project_indexes
 from app.workflow.regression_recommendation_workflow import RegressionRecommendationWorkflow
 from app.workflow.base import WorkflowResult
 from app.tool.retrieval_tools import SearchTestCaseTool
 
 
+@pytest.fixture(autouse=True)
+def clean_keyword_indexes():
+    """每个测试使用空的项目关键词索引和依赖图（重排会把候选写入索引）"""
+    reset_project_indexes()
+    reset_project_graphs()
+    reset_project_stats()
+    yield
+    reset_project_indexes()
+    reset_project_graphs()
+    reset_project_stats()
+
+
 @pytest.fixture
 def mock_search_testcase_tool():
     """创建模拟的 SearchTestCaseTool"""
@@ -351,6 +366,160 @@ async def test_execute_unexpected_error(workflow, mock_search_testcase_tool):
     assert "部分模块检索失败" in result.metadata['warnings'][0]
 
 
+@pytest.mark.asyncio
+async def test_execute_recalls_indexed_cases_locally(workflow, mock_search_testcase_tool):
+    """测试从项目关键词索引召回后端没有返回的用例"""
+    index_documents(get_project_index('test-project-123'), [
+        {'id': 'saved-1', 'title': '优惠券叠加使用', 'priority': 'P0', 'module': '营销中心'},
+        {'id': 'saved-2', 'title': '满减活动', 'priority': 'P3', 'module': '营销中心'},
+        {'id': 'other', 'title': '订单导出', 'priority': 'P0', 'module': '订单中心'},
+    ])
+    mock_search_testcase_tool.execute.return_value = [
+        {'id': 'saved-2', 'title': '满减活动', 'score': 0.9, 'metadata': {'priority': 'P3', 'module': '营销中心'}},
+    ]
+    
+    result = await workflow.execute({'changed_modules': ['营销中心']}, {'project_id': 'test-project-123'})
+    
+    assert result.success is True
+    cases = {case['id']: case for case in result.data['recommended_cases']}
+    assert set(cases) == {'saved-1', 'saved-2'}
+    assert cases['saved-1']['source'] == 'keyword_index'
+    assert cases['saved-2']['score'] == 0.9  # 后端结果优先保留
+    assert result.metadata['local_candidates'] == 2
+    assert result.metadata['unique_candidates'] == 2
+    
+    # 本地召回同样遵守优先级过滤
+    result = await workflow.execute(
+        {'changed_modules': ['营销中心']},
+        {'project_id': 'test-project-123', 'priority_filter': 'p0'}
+    )
+    assert {case['id'] for case in result.data['recommended_cases']} == {'saved-1', 'saved-2'}
+    assert result.metadata['local_candidates'] == 1
+
+
+@pytest.mark.asyncio
+async def test_execute_searches_impacted_downstream_modules(workflow, mock_search_testcase_tool):
+    """测试沿模块依赖图检索受影响的下游模块，并丢弃影响范围外的结果"""
+    # 订单和支付的用例关联同一份 PRD
+    index_documents(get_project_index('test-project-123'), [
+        {'id': 'o-prd', 'title': '下单', 'module': '订单中心', 'prd_id': 'prd-1'},
+        {'id': 'p-prd', 'title': '支付回调', 'module': '支付中心', 'prd_id': 'prd-1'},
+    ])
+    results = {
+        '订单中心': [
+            {'id': 'o1', 'title': '订单创建', 'score': 0.9, 'metadata': {'priority': 'P1', 'module': '订单中心'}},
+            {'id': 'x1', 'title': '物流轨迹', 'score': 0.8, 'metadata': {'priority': 'P0', 'module': '物流中心'}},
+        ],
+        '支付中心': [
+            {'id': 'p1', 'title': '支付成功', 'score': 0.7, 'metadata': {'priority': 'P1', 'module': '支付中心'}},
+        ],
+    }
+    mock_search_testcase_tool.execute.side_effect = lambda query, module, **kwargs: results[module]
+    
+    result = await workflow.execute(
+        {'changed_modules': ['订单中心'], 'change_description': '下单接口增加优惠券校验'},
+        {'project_id': 'test-project-123'}
+    )
+    
+    assert result.success is True
+    # 后端按模块过滤，模块内用变更描述做语义检索
+    calls = [call.kwargs for call in mock_search_testcase_tool.execute.call_args_list]
+    assert [(call['module'], call['query']) for call in calls] == [
+        ('订单中心', '下单接口增加优惠券校验'),
+        ('支付中心', '下单接口增加优惠券校验'),
+    ]
+    cases = {case['id']: case for case in result.data['recommended_cases']}
+    assert set(cases) == {'o1', 'p1', 'o-prd', 'p-prd'}  # 物流中心不受影响
+    assert cases['o1']['impact_score'] == 1.0
+    assert cases['p1']['impact_module'] == '支付中心'
+    assert cases['p1']['impact_score'] == 0.6
+    assert [impact['module'] for impact in result.metadata['impacted_modules']] == ['订单中心', '支付中心']
+    assert result.metadata['selection'] is None
+    
+    # 请求中的失败历史只叠加在本次计算上
+    result = await workflow.execute(
+        {'changed_modules': ['物流中心']},
+        {'project_id': 'test-project-123', 'failure_history': [['物流中心', '订单中心']] * 2}
+    )
+    assert [impact['module'] for impact in result.metadata['impacted_modules']][:2] == ['物流中心', '订单中心']
+    result = await workflow.execute({'changed_modules': ['物流中心']}, {'project_id': 'test-project-123'})
+    assert [impact['module'] for impact in result.metadata['impacted_modules']] == ['物流中心']
+
+
+@pytest.mark.asyncio
+async def test_execute_selects_covering_cases_within_budget(workflow, mock_search_testcase_tool):
+    """测试候选超过推荐数量时用集合覆盖选出更小的用例集合"""
+    test_cases = [
+        {'id': f'case{i}', 'title': f'测试{i}', 'score': 0.9 - i * 0.05,
+         'metadata': {'priority': 'P2', 'module': '模块A', 'type': case_type, 'estimated_minutes': 2}}
+        for i, case_type in enumerate(['functional', 'functional', 'boundary', 'functional', 'exception'])
+    ]
+    mock_search_testcase_tool.execute.return_value = test_cases
+    
+    result = await workflow.execute({'changed_modules': ['模块A']}, {'project_id': 'test-project-123', 'limit': 4})
+    
+    assert result.success is True
+    assert [case['id'] for case in result.data['recommended_cases']] == ['case0', 'case2', 'case4']
+    selection = result.metadata['selection']
+    assert selection['covered_weight'] == selection['total_weight']
+    assert selection['estimated_minutes'] == 6
+    
+    # 时间预算：只够执行两个用例
+    result = await workflow.execute(
+        {'changed_modules': ['模块A']},
+        {'project_id': 'test-project-123', 'time_budget': 4}
+    )
+    assert len(result.data['recommended_cases']) == 2
+    assert result.metadata['selection']['estimated_minutes'] == 4
+    assert result.metadata['selection']['covered_weight'] < result.metadata['selection']['total_weight']
+
+
+@pytest.mark.asyncio
+async def test_execute_prioritizes_by_execution_history(workflow, mock_search_testcase_tool):
+    """测试按执行历史做 APFD 风格的优先级排序，并用历史时长计算时间预算"""
+    ingest_results('test-project-123', """case_id,status,duration
+case1,passed,600
+case1,failed,600
+case2,passed,60
+case2,failed,60
+case3,passed,30
+case3,passed,30
+""")
+    mock_search_testcase_tool.execute.return_value = [
+        {'id': 'case1', 'title': '测试1', 'score': 0.9, 'metadata': {'priority': 'P0', 'type': 'functional'}},
+        {'id': 'case2', 'title': '测试2', 'score': 0.8, 'metadata': {'priority': 'P1', 'type': 'boundary'}},
+        {'id': 'case3', 'title': '测试3', 'score': 0.7, 'metadata': {'priority': 'P2', 'type': 'ui'}},
+    ]
+    
+    result = await workflow.execute({'changed_modules': ['模块A']}, {'project_id': 'test-project-123'})
+    cases = result.data['recommended_cases']
+    assert [case['id'] for case in cases] == ['case1', 'case2', 'case3']  # 默认按相关度
+    assert [case['estimated_minutes'] for case in cases] == [10.0, 1.0, 0.5]
+    assert result.metadata['prioritization'] == 'relevance'
+    
+    result = await workflow.execute(
+        {'changed_modules': ['模块A']},
+        {'project_id': 'test-project-123', 'prioritization': 'apfd'}
+    )
+    cases = result.data['recommended_cases']
+    assert [case['id'] for case in cases] == ['case2', 'case1', 'case3']
+    assert cases[0]['faults_per_minute'] > cases[1]['faults_per_minute'] > cases[2]['faults_per_minute']
+    
+    # 时间预算按历史平均时长计算：10 分钟的 case1 放不下
+    result = await workflow.execute(
+        {'changed_modules': ['模块A']},
+        {'project_id': 'test-project-123', 'time_budget': 5}
+    )
+    assert [case['id'] for case in result.data['recommended_cases']] == ['case2', 'case3']
+    
+    result = await workflow.execute(
+        {'changed_modules': ['模块A']},
+        {'project_id': 'test-project-123', 'prioritization': 'random'}
+    )
+    assert result.success is False
+    assert "不支持的排序方式" in result.error
+
+
 def test_get_ranking_criteria(workflow):
     """测试获取排名标准"""
     criteria = workflow._get_ranking_criteria()
@@ -360,3 +529,5 @@ def test_get_ranking_criteria(workflow):
     assert 'description' in criteria
     assert '优先级' in criteria['primary']
     assert '相似度分数' in criteria['secondary']
+    assert '集合覆盖' in criteria['selection']
+    assert 'apfd' in criteria['prioritization']
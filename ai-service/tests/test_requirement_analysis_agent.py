@@ -103,8 +103,9 @@ async def test_analyze_with_historical_context(agent, mock_brconnector):
     
     # 验证历史上下文被包含在提示词中
     call_args = mock_brconnector.chat_simple.call_args
-    assert "订单管理系统" in call_args.kwargs['prompt']
-    assert "支付系统" in call_args.kwargs['prompt']
+    assert "订单管理系统" in call_args.kwargs['cached_context']
+    assert "支付系统" in call_args.kwargs['cached_context']
+    assert "订单管理系统" not in call_args.kwargs['prompt']
 
 
 @pytest.mark.asyncio
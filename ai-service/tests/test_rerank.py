@@ -0,0 +1,137 @@
+"""
+检索结果本地重排测试
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from app.keyword_index import KeywordIndex, get_project_index, priority_weight, reset_project_indexes
+from app.rerank import Reranker, RerankWeights
+
+NOW = 1_714_521_600.0  # 2024-05-01T00:00:00Z
+DAY = 86400.0
+
+
+@pytest.fixture(autouse=True)
+def _clean_indexes():
+    reset_project_indexes()
+    yield
+    reset_project_indexes()
+
+
+def _case(case_id, title, score=0.5, priority="P2", content="", created_at=None):
+    metadata = {"priority": priority}
+    if created_at is not None:
+        metadata["created_at"] = created_at
+    return {"id": case_id, "title": title, "content": content, "score": score, "metadata": metadata}
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("P0", 4), ("p1", 3), ("High", 3), ("p3", 1), ("low", 1), ("中", 2), (None, 0), ("urgent", 0),
+])
+def test_priority_weight(value, expected):
+    assert priority_weight(value) == expected
+
+
+def test_bm25_prefers_documents_matching_rare_terms():
+    index = KeywordIndex()
+    index.add("a", "用户登录 密码 校验")
+    index.add("b", "用户注册 手机号")
+    index.add("c", "用户 资料")
+
+    scores = index.score_documents("登录密码", ["a", "b", "c", "missing"])
+
+    assert scores[0] > 0
+    assert scores[1] == scores[2] == scores[3] == 0
+
+
+def test_bm25_index_updates_and_removes_documents():
+    index = KeywordIndex()
+    index.add("a", "支付 超时")
+    index.add("b", "订单 列表")
+    version = index.version
+    first = index.scores("支付")
+    assert index.scores("支付") is first  # 同一版本命中缓存
+
+    index.add("a", "订单 导出")
+    assert index.version > version
+    assert index.score_documents("支付", ["a"])[0] == 0
+    assert index.score_documents("导出", ["a"])[0] > 0
+
+    assert index.remove("b") is True
+    assert index.remove("b") is False
+    assert "b" not in index and len(index) == 1
+    assert index.score_documents("订单", ["b"])[0] == 0
+
+
+def test_rerank_fuses_text_relevance_priority_and_recency():
+    candidates = [
+        _case("old", "退款 超时 处理", score=0.8, priority="P1", created_at="2020-01-01T00:00:00Z"),
+        _case("fresh", "退款 超时 处理", score=0.8, priority="P1", created_at="2024-04-30T00:00:00Z"),
+        _case("p0", "首页 横幅", score=0.8, priority="P0", created_at="2024-04-30T00:00:00Z"),
+        _case("p3", "首页 横幅", score=0.8, priority="p3", created_at="2024-04-30T00:00:00Z"),
+    ]
+
+    ranked = Reranker().rerank("退款超时", candidates, now=NOW)
+
+    assert [case["id"] for case in ranked] == ["fresh", "old", "p0", "p3"]
+    assert ranked[0]["rerank_score"] > ranked[1]["rerank_score"]
+    assert "rerank_score" not in candidates[0]
+
+
+def test_rerank_is_stable_and_honours_limit():
+    candidates = [_case(f"c{i}", "相同标题", score=0.5) for i in range(6)]
+    reranker = Reranker(RerankWeights(bm25=0, vector=1, priority=0, recency=0))
+
+    assert [case["id"] for case in reranker.rerank("x", candidates)] == [f"c{i}" for i in range(6)]
+    assert [case["id"] for case in reranker.rerank("x", candidates, limit=2)] == ["c0", "c1"]
+    assert reranker.rerank("x", candidates, limit=0) == []
+    assert reranker.rerank("x", []) == []
+
+
+def test_project_index_is_reused_and_refreshed_when_candidates_change():
+    index = get_project_index("p1")
+    assert get_project_index("p1") is index
+    reranker = Reranker(RerankWeights(bm25=0, vector=0, priority=1, recency=0))
+
+    reranker.rerank("登录", [_case("c1", "登录", priority="P3"), _case("c2", "注销", priority="P2")], index=index)
+    assert len(index) == 2
+    version = index.version
+
+    # 未变化的候选不会重新写入
+    reranker.rerank("登录", [_case("c1", "登录", priority="P3")], index=index)
+    assert index.version == version
+
+    # 优先级变化后重新写入索引
+    ranked = reranker.rerank("登录", [_case("c1", "登录", priority="P0"), _case("c2", "注销", priority="P2")], index=index)
+    assert [case["id"] for case in ranked] == ["c1", "c2"]
+    assert index.version > version
+
+
+def test_rerank_ten_thousand_candidates_in_milliseconds():
+    rng = np.random.default_rng(0)
+    words = ["登录", "注册", "支付", "订单", "库存", "物流", "优惠券", "发票", "退款", "超时"]
+    candidates = [
+        _case(
+            f"tc-{i}",
+            " ".join(rng.choice(words, 3)),
+            score=float(rng.random()),
+            priority=["P0", "P1", "P2", "P3"][i % 4],
+            content=" ".join(rng.choice(words, 6)),
+            created_at="2024-03-01T00:00:00Z",
+        )
+        for i in range(10_000)
+    ]
+    reranker = Reranker()
+    index = get_project_index("bench")
+    reranker.rerank("支付 超时 退款", candidates, index=index)
+
+    start = time.perf_counter()
+    ranked = reranker.rerank("订单 物流", candidates, index=index, limit=50)
+    elapsed = time.perf_counter() - start
+
+    assert len(ranked) == 50
+    assert ranked[0]["rerank_score"] >= ranked[-1]["rerank_score"]
+    assert elapsed < 0.25
@@ -11,6 +11,7 @@ from app.tool.retrieval_tools import (
     SearchPRDTool,
     SearchTestCaseTool,
     GetRelatedCasesTool,
+    ListTestCasesTool,
 )
 from app.tool.base import ToolError
 
@@ -245,6 +246,56 @@ async def test_search_testcase_tool_with_priority_filter(search_testcase_tool):
         assert results[0]["metadata"]["priority"] == "high"
 
 
+@pytest.mark.asyncio
+async def test_search_tools_pass_caller_limit_and_threshold(search_prd_tool, search_testcase_tool):
+    """limit 和 threshold 透传给后端，后端多返回时在本地截断"""
+    results = [
+        {"id": f"doc-{i}", "title": f"文档 {i}", "content": "...", "score": 0.9, "metadata": {"priority": "high"}}
+        for i in range(6)
+    ]
+    mock_response = {"code": 200, "data": {"results": results}}
+
+    for tool in (search_prd_tool, search_testcase_tool):
+        with patch.object(tool.http_client, 'post', new_callable=AsyncMock) as mock_post:
+            mock_post.return_value = MagicMock(status_code=200, json=lambda: mock_response)
+
+            found = await tool.execute(query="用户登录", limit=3, threshold=0.55, project_id="project-123")
+
+        body = mock_post.call_args.kwargs["json"]
+        assert body["limit"] == 3
+        assert body["score_threshold"] == 0.55
+        assert [item["id"] for item in found] == ["doc-0", "doc-1", "doc-2"]
+
+    with patch.object(search_testcase_tool.http_client, 'post', new_callable=AsyncMock) as mock_post:
+        mock_post.return_value = MagicMock(status_code=200, json=lambda: mock_response)
+
+        found = await search_testcase_tool.execute(query="用户登录", limit=2, project_id="project-123", priority="high")
+
+    body = mock_post.call_args.kwargs["json"]
+    assert body["limit"] == 2
+    assert body["priority"] == "high"
+    assert len(found) == 2
+
+
+@pytest.mark.asyncio
+async def test_search_testcase_tool_filters_by_module(search_testcase_tool):
+    """模块名称传给后端过滤，后端未过滤时本地丢弃其他模块的用例"""
+    results = [
+        {"id": "tc-1", "title": "下单", "score": 0.9, "metadata": {"module": "订单中心"}},
+        {"id": "tc-2", "title": "支付", "score": 0.8, "metadata": {"module": "支付中心"}},
+        {"id": "tc-3", "title": "旧后端", "score": 0.7, "metadata": {}},
+    ]
+    mock_response = {"code": 200, "data": {"results": results}}
+
+    with patch.object(search_testcase_tool.http_client, 'post', new_callable=AsyncMock) as mock_post:
+        mock_post.return_value = MagicMock(status_code=200, json=lambda: mock_response)
+
+        found = await search_testcase_tool.execute(query="优惠券校验", project_id="project-123", module="订单中心")
+
+    assert mock_post.call_args.kwargs["json"]["module"] == "订单中心"
+    assert [item["id"] for item in found] == ["tc-1", "tc-3"]
+
+
 # ============================================================================
 # GetRelatedCasesTool 测试
 # ============================================================================
@@ -316,3 +367,74 @@ async def test_get_related_cases_tool_missing_project_id(get_related_cases_tool)
         )
     
     assert "project_id 是必需参数" in str(exc_info.value)
+
+
+# ============================================================================
+# ListTestCasesTool 测试
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_list_testcases_tool_iter_pages(backend_url):
+    """测试分页遍历全部测试用例并转换字段格式"""
+    tool = ListTestCasesTool(backend_url=backend_url)
+    
+    def make_page(page, ids):
+        return MagicMock(
+            status_code=200,
+            json=lambda: {
+                "code": 200,
+                "message": "success",
+                "data": {
+                    "items": [
+                        {
+                            "id": case_id,
+                            "title": f"测试用例 {case_id}",
+                            "precondition": "用户已登录",
+                            "expected_result": "操作成功",
+                            "priority": "high",
+                            "type": "functional",
+                            "prd_id": "prd-1",
+                            "steps": [
+                                {"step_order": 2, "description": "提交", "expected": "成功"},
+                                {"step_order": 1, "description": "填写表单", "expected": None},
+                            ]
+                        }
+                        for case_id in ids
+                    ],
+                    "total": 3,
+                    "page": page,
+                    "page_size": 2,
+                    "total_pages": 2
+                }
+            }
+        )
+    
+    with patch.object(tool.http_client, 'get', new_callable=AsyncMock) as mock_get:
+        mock_get.side_effect = [make_page(1, ["tc-1", "tc-2"]), make_page(2, ["tc-3"])]
+        
+        pages = [page async for page in tool.iter_pages(project_id="project-123", page_size=2)]
+    
+    assert [[case["id"] for case in page] for page in pages] == [["tc-1", "tc-2"], ["tc-3"]]
+    case = pages[0][0]
+    assert case["preconditions"] == "用户已登录"
+    assert [step["action"] for step in case["steps"]] == ["填写表单", "提交"]
+    assert case["prd_id"] == "prd-1"
+    
+    assert mock_get.call_count == 2
+    assert "project-123/testcases" in mock_get.call_args_list[0][0][0]
+    assert mock_get.call_args_list[1][1]["params"] == {"page": 2, "page_size": 2}
+
+
+@pytest.mark.asyncio
+async def test_list_testcases_tool_api_error(backend_url):
+    """测试列表 API 返回错误"""
+    tool = ListTestCasesTool(backend_url=backend_url)
+    
+    with patch.object(tool.http_client, 'get', new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = MagicMock(status_code=500, text="Internal Server Error")
+        
+        with pytest.raises(ToolError) as exc_info:
+            async for _ in tool.iter_pages(project_id="project-123"):
+                pass
+    
+    assert "500" in str(exc_info.value)
@@ -0,0 +1,97 @@
+"""
+JSON 序列化测试（orjson 后端与标准库回退后端）
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+import pytest
+
+from app import serialization
+from app.models import Priority
+from app.serialization import dumps, dumps_bytes, dumps_prompt, loads, sse_content_frame, sse_frame
+
+
+@dataclass(slots=True)
+class _Point:
+    x: int
+    label: str
+
+
+SAMPLE = {
+    "title": "用户登录 \"成功\"",
+    "priority": Priority.HIGH,
+    "steps": [{"step_number": 1, "action": "输入\n密码"}],
+    "score": 87.5,
+    "ok": True,
+    "missing": None,
+    "created_at": datetime(2024, 5, 1, 12, 30, 0),
+    "point": _Point(1, "a"),
+    3: "int key",
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson 未安装")
+    return request.param
+
+
+def test_dumps_is_compact_and_keeps_non_ascii(backend):
+    text = dumps(SAMPLE)
+
+    assert "用户登录" in text
+    assert ", " not in text and '": ' not in text
+    assert loads(text) == {
+        "title": "用户登录 \"成功\"",
+        "priority": "high",
+        "steps": [{"step_number": 1, "action": "输入\n密码"}],
+        "score": 87.5,
+        "ok": True,
+        "missing": None,
+        "created_at": "2024-05-01T12:30:00",
+        "point": {"x": 1, "label": "a"},
+        "3": "int key",
+    }
+
+
+def test_backends_produce_identical_output(monkeypatch):
+    if serialization.orjson is None:
+        pytest.skip("orjson 未安装")
+    fast = dumps_bytes(SAMPLE)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert dumps_bytes(SAMPLE) == fast
+
+
+def test_default_is_used_for_unknown_types(backend):
+    class Token:
+        pass
+
+    assert loads(dumps({"token": Token()}, default=lambda obj: "token")) == {"token": "token"}
+    with pytest.raises(TypeError):
+        dumps({"token": Token()})
+
+
+def test_loads_raises_stdlib_decode_error(backend):
+    with pytest.raises(json.JSONDecodeError):
+        loads("{not json")
+    assert loads(b'{"a": [1, 2]}') == {"a": [1, 2]}
+
+
+def test_prompt_json_is_smaller_than_indented(backend):
+    analysis = {"functional_points": ["登录", "注销"], "input_specs": {"username": {"type": "string"}}}
+
+    assert len(dumps_prompt(analysis)) < len(json.dumps(analysis, ensure_ascii=False, indent=2))
+    assert loads(dumps_prompt(analysis)) == analysis
+
+
+def test_sse_frames(backend):
+    assert sse_frame({"type": "done", "id": "c-1"}) == b'data: {"type":"done","id":"c-1"}\n\n'
+    chunk = '换行\n与 "引号" </script>'
+    assert sse_content_frame(chunk) == sse_frame({"type": "content", "content": chunk})
+    payload = sse_content_frame(chunk)[len(b"data: "):-2]
+    assert json.loads(payload) == {"type": "content", "content": chunk}
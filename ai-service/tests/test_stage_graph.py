@@ -0,0 +1,358 @@
+"""
+阶段图执行器的单元测试
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.deadline import DeadlineExceeded, deadline_scope
+from app.workflow.base import WorkflowError
+from app.workflow.stage_graph import StageGraphExecutor, StageOutput, WorkflowStage
+
+
+def make_stage_func(value, delay=0.0, calls=None):
+    """创建返回固定值的阶段函数"""
+    async def func(**kwargs):
+        if calls is not None:
+            calls.append(kwargs)
+        if delay:
+            await asyncio.sleep(delay)
+        return value
+    return func
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_run_concurrently():
+    """测试互不依赖的阶段并发执行"""
+    executor = StageGraphExecutor([
+        WorkflowStage(name='a', func=make_stage_func(1, delay=0.2)),
+        WorkflowStage(name='b', func=make_stage_func(2, delay=0.2)),
+        WorkflowStage(name='c', func=make_stage_func(3, delay=0.2)),
+    ])
+
+    start = time.perf_counter()
+    result = await executor.run()
+    elapsed = time.perf_counter() - start
+
+    assert result.success is True
+    assert result.state['a'] == 1
+    assert result.state['b'] == 2
+    assert result.state['c'] == 3
+    assert elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_dependent_stage_receives_inputs():
+    """测试依赖阶段接收上游输出"""
+    async def add(x, y):
+        return x + y
+
+    executor = StageGraphExecutor([
+        WorkflowStage(name='sum', func=add, inputs=['x', 'y']),
+        WorkflowStage(name='x_stage', func=make_stage_func(2), output='x'),
+    ])
+
+    result = await executor.run({'y': 3})
+
+    assert result.success is True
+    assert result.state['sum'] == 5
+
+
+@pytest.mark.asyncio
+async def test_optional_stage_failure_uses_default_and_warning():
+    """测试可选阶段失败时使用默认值并记录警告"""
+    async def fail():
+        raise RuntimeError("连接失败")
+
+    executor = StageGraphExecutor([
+        WorkflowStage(
+            name='search',
+            func=fail,
+            required=False,
+            default_factory=lambda state: [],
+            warning="检索失败: {error}"
+        ),
+        WorkflowStage(name='count', func=make_stage_func(0), inputs=['search']),
+    ])
+
+    result = await executor.run()
+
+    assert result.success is True
+    assert result.state['search'] == []
+    assert result.warnings == ["检索失败: 连接失败"]
+    assert isinstance(result.errors['search'], RuntimeError)
+
+
+@pytest.mark.asyncio
+async def test_required_stage_failure_stops_graph():
+    """测试必需阶段失败时终止执行并取消其他阶段"""
+    cancelled = []
+
+    async def fail():
+        raise ValueError("分析失败")
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    executor = StageGraphExecutor([
+        WorkflowStage(name='analysis', func=fail),
+        WorkflowStage(name='slow', func=slow),
+        WorkflowStage(name='design', func=make_stage_func(1), inputs=['analysis']),
+    ])
+
+    result = await executor.run()
+
+    assert result.success is False
+    assert result.failed_stage == 'analysis'
+    assert str(result.error) == "分析失败"
+    assert 'design' not in result.state
+    assert cancelled == [True]
+
+
+@pytest.mark.asyncio
+async def test_stage_retries():
+    """测试阶段失败后重试"""
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("临时错误")
+        return 'ok'
+
+    executor = StageGraphExecutor([
+        WorkflowStage(name='flaky', func=flaky, retries=2),
+    ])
+
+    result = await executor.run()
+
+    assert result.success is True
+    assert result.state['flaky'] == 'ok'
+    assert len(attempts) == 3
+
+
+@pytest.mark.asyncio
+async def test_stage_timeout():
+    """测试阶段超时"""
+    executor = StageGraphExecutor([
+        WorkflowStage(name='slow', func=make_stage_func(1, delay=1.0), timeout=0.05),
+    ])
+
+    result = await executor.run()
+
+    assert result.success is False
+    assert result.failed_stage == 'slow'
+    assert isinstance(result.error, WorkflowError)
+    assert str(result.error) == "阶段 'slow' 执行超时（0.05秒）"
+
+
+@pytest.mark.asyncio
+async def test_condition_skips_stage():
+    """测试条件不满足时跳过阶段"""
+    calls = []
+    executor = StageGraphExecutor([
+        WorkflowStage(
+            name='generate',
+            func=make_stage_func([1], calls=calls),
+            inputs=['missing'],
+            default_factory=lambda state: [],
+            condition=lambda state: bool(state['missing'])
+        ),
+    ])
+
+    result = await executor.run({'missing': []})
+
+    assert result.success is True
+    assert result.state['generate'] == []
+    assert result.skipped == ['generate']
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_skipped_producer_declared_after_consumer():
+    """测试被跳过的阶段声明在依赖它的阶段之后时，依赖它的阶段仍然执行"""
+    calls = []
+    executor = StageGraphExecutor([
+        WorkflowStage(name='consumer', func=make_stage_func(2, calls=calls), inputs=['producer']),
+        WorkflowStage(
+            name='producer',
+            func=make_stage_func(1),
+            condition=lambda state: False,
+            required=False,
+            default=0
+        ),
+    ])
+
+    result = await executor.run()
+
+    assert result.success is True
+    assert result.skipped == ['producer']
+    assert calls == [{'producer': 0}]
+    assert result.state['consumer'] == 2
+
+
+@pytest.mark.asyncio
+async def test_condition_error_fails_stage():
+    """测试执行条件抛出异常时按阶段失败处理"""
+    def broken(state):
+        raise KeyError('flag')
+
+    optional = StageGraphExecutor([
+        WorkflowStage(
+            name='optional',
+            func=make_stage_func(1),
+            condition=broken,
+            required=False,
+            default=0,
+            warning="可选阶段失败: {error}"
+        ),
+        WorkflowStage(name='next', func=make_stage_func(2), inputs=['optional']),
+    ])
+    result = await optional.run()
+
+    assert result.success is True
+    assert result.state == {'optional': 0, 'next': 2}
+    assert isinstance(result.errors['optional'], KeyError)
+    assert result.warnings == ["可选阶段失败: 'flag'"]
+
+    required = StageGraphExecutor([
+        WorkflowStage(name='required', func=make_stage_func(1), condition=broken),
+    ])
+    result = await required.run()
+
+    assert result.success is False
+    assert result.failed_stage == 'required'
+    assert isinstance(result.error, KeyError)
+
+
+@pytest.mark.asyncio
+async def test_warnings_follow_declaration_order():
+    """测试警告按阶段声明顺序汇总"""
+    async def slow_warning():
+        await asyncio.sleep(0.05)
+        return StageOutput(value=1, warnings=["第一个"])
+
+    async def fast_warning():
+        return StageOutput(value=2, warnings=["第二个"])
+
+    executor = StageGraphExecutor([
+        WorkflowStage(name='first', func=slow_warning),
+        WorkflowStage(name='second', func=fast_warning),
+    ])
+
+    result = await executor.run()
+
+    assert result.state['first'] == 1
+    assert result.state['second'] == 2
+    assert result.warnings == ["第一个", "第二个"]
+
+
+@pytest.mark.asyncio
+async def test_unresolved_dependency_raises():
+    """测试无法满足的依赖"""
+    executor = StageGraphExecutor([
+        WorkflowStage(name='a', func=make_stage_func(1), inputs=['b']),
+        WorkflowStage(name='b', func=make_stage_func(1), inputs=['a']),
+    ])
+
+    with pytest.raises(WorkflowError):
+        await executor.run()
+
+
+def test_duplicate_stage_names_rejected():
+    """测试重复的阶段名称"""
+    with pytest.raises(WorkflowError):
+        StageGraphExecutor([
+            WorkflowStage(name='a', func=make_stage_func(1)),
+            WorkflowStage(name='a', func=make_stage_func(2), output='other'),
+        ])
+
+
+@pytest.mark.asyncio
+async def test_metadata_contains_stage_timings():
+    """测试元数据包含阶段耗时"""
+    executor = StageGraphExecutor([
+        WorkflowStage(name='a', func=make_stage_func(1)),
+        WorkflowStage(name='b', func=make_stage_func(2), inputs=['a']),
+    ])
+
+    result = await executor.run()
+    metadata = result.metadata()
+
+    assert set(metadata['stage_timings']) == {'a', 'b'}
+    assert all(duration >= 0 for duration in metadata['stage_timings'].values())
+
+
+@pytest.mark.asyncio
+async def test_stage_timeout_clamped_to_deadline():
+    """测试阶段超时收紧到请求剩余时间"""
+    executor = StageGraphExecutor([
+        WorkflowStage(name='slow', func=make_stage_func(1, delay=1.0), timeout=10.0),
+    ])
+
+    start = time.perf_counter()
+    with deadline_scope(0.1):
+        result = await executor.run()
+
+    assert time.perf_counter() - start < 0.5
+    assert result.success is False
+    assert isinstance(result.error, DeadlineExceeded)
+    # 报告收紧后的超时时间，并说明由请求截止时间造成
+    message = str(result.error)
+    assert "受请求截止时间限制" in message
+    assert "阶段超时 10.0 秒" in message
+    effective = float(message.split("执行超时（")[1].split("秒")[0])
+    assert 0 < effective <= 0.1
+
+
+@pytest.mark.asyncio
+async def test_stage_without_timeout_stops_at_deadline():
+    """测试没有设置超时的阶段在请求截止时间停止"""
+    executor = StageGraphExecutor([
+        WorkflowStage(name='slow', func=make_stage_func(1, delay=1.0), retries=2),
+    ])
+
+    start = time.perf_counter()
+    with deadline_scope(0.1):
+        result = await executor.run()
+
+    assert time.perf_counter() - start < 0.5
+    assert isinstance(result.error, DeadlineExceeded)
+    assert "受请求截止时间限制，未设置阶段超时" in str(result.error)
+
+
+@pytest.mark.asyncio
+async def test_no_retry_after_deadline():
+    """测试截止时间不足时不再重试，且可选阶段也会终止执行"""
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        raise RuntimeError("临时错误")
+
+    async def expired():
+        raise DeadlineExceeded("请求截止时间已到")
+
+    executor = StageGraphExecutor([
+        WorkflowStage(name='flaky', func=flaky, retries=3, retry_delay=1.0),
+    ])
+    with deadline_scope(0.5):
+        result = await executor.run()
+
+    assert len(attempts) == 1
+    assert result.success is False
+
+    executor = StageGraphExecutor([
+        WorkflowStage(name='optional', func=expired, required=False),
+        WorkflowStage(name='next', func=make_stage_func(1), inputs=['optional']),
+    ])
+    result = await executor.run()
+
+    assert result.failed_stage == 'optional'
+    assert 'next' not in result.state
@@ -8,6 +8,7 @@ import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from app.tool.storage_tools import SaveTestCaseTool, UpdateTestCaseTool
 from app.tool.base import ToolError
+from app.keyword_index import get_project_index, reset_project_indexes
 
 
 # ============================================================================
@@ -365,3 +366,48 @@ async def test_update_test_case_tool_url_construction():
         url = call_args[0][0]
         assert url == "http://localhost:8080/api/v1/projects/project-123/testcases/test-456"
         assert "//" not in url.replace("http://", "")
+
+
+# ============================================================================
+# 关键词索引更新测试
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_save_and_update_feed_project_keyword_index():
+    """测试保存和更新成功后写入项目关键词索引"""
+    reset_project_indexes()
+    save_tool = SaveTestCaseTool(go_backend_url="http://localhost:8080")
+    update_tool = UpdateTestCaseTool(go_backend_url="http://localhost:8080")
+    test_case = {
+        "title": "验证码登录",
+        "steps": [{"step_number": 1, "action": "输入短信验证码", "expected": "登录成功"}],
+        "expected_result": "登录成功",
+        "priority": "P1",
+    }
+    
+    saved = MagicMock(status_code=200)
+    saved.json.return_value = {"code": 0, "data": {"id": "tc-1", "created_at": "2024-01-01T00:00:00Z"}}
+    updated = MagicMock(status_code=200)
+    updated.json.return_value = {"code": 0, "data": {"version": 2}}
+    
+    try:
+        with patch("httpx.AsyncClient") as mock_client:
+            client = mock_client.return_value.__aenter__.return_value
+            client.post = AsyncMock(return_value=saved)
+            client.put = AsyncMock(return_value=updated)
+            
+            await save_tool.execute(project_id="project-kw", test_case=test_case)
+            index = get_project_index("project-kw")
+            assert index.match("验证码") == ["tc-1"]
+            assert index.document("tc-1")["priority"] == "P1"
+            
+            await update_tool.execute(
+                project_id="project-kw",
+                test_case_id="tc-1",
+                test_case={**test_case, "title": "扫码登录", "expected_result": "跳转首页"}
+            )
+            assert index.match("扫码") == ["tc-1"]
+            assert index.match("首页") == ["tc-1"]
+            assert len(index) == 1
+    finally:
+        reset_project_indexes()
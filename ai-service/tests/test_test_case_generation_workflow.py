@@ -2,6 +2,8 @@
 测试用例生成工作流的单元测试
 """
 
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 
@@ -363,3 +365,305 @@ async def test_workflow_result_to_dict(workflow):
     assert "data" in result_dict
     assert "error" in result_dict
     assert "metadata" in result_dict
+
+
+@pytest.mark.asyncio
+async def test_workflow_records_stage_timings(workflow):
+    """测试元数据记录各阶段耗时"""
+    result = await workflow.execute(
+        requirement="实现用户登录功能",
+        context={"project_id": 1}
+    )
+    
+    timings = result.metadata["stage_timings"]
+    assert set(timings) == {
+        "retrieve_prds",
+        "retrieve_cases",
+        "requirement_analysis",
+        "test_design",
+        "quality_review",
+        "formatting",
+    }
+
+
+@pytest.mark.asyncio
+async def test_workflow_uses_prefetched_retrieval(
+    workflow,
+    mock_requirement_agent,
+    mock_search_prd_tool,
+    mock_search_testcase_tool
+):
+    """测试上下文中提供已检索的历史数据时跳过检索阶段"""
+    prds = [{"id": "9", "title": "批量检索的 PRD", "content": "..."}]
+    result = await workflow.execute(
+        requirement="实现用户登录功能",
+        context={"project_id": 1, "historical_prds": prds, "historical_cases": []}
+    )
+    
+    assert result.success is True
+    mock_search_prd_tool.execute.assert_not_called()
+    mock_search_testcase_tool.execute.assert_not_called()
+    assert mock_requirement_agent.analyze.call_args.kwargs["context"] == {"historical_prds": prds}
+    assert "retrieve_prds" not in result.metadata["stage_timings"]
+
+
+def _draft(functional_points):
+    """快速模式的 draft_tests 返回值"""
+    analysis = AnalysisResult(
+        functional_points=functional_points,
+        business_rules=[],
+        input_specs={},
+        output_specs={},
+        exception_conditions=["密码错误"],
+        constraints=[]
+    )
+    designs = [
+        TestCaseDesign(
+            title="测试有效用户登录",
+            preconditions="用户已注册",
+            steps=["输入用户名", "输入密码", "点击登录"],
+            expected_result="登录成功，返回 token",
+            priority="high",
+            type="functional",
+            rationale="主流程测试"
+        ),
+        TestCaseDesign(
+            title="测试密码错误",
+            preconditions="用户已注册",
+            steps=["输入用户名", "输入错误密码", "点击登录"],
+            expected_result="提示密码错误，停留在登录页",
+            priority="high",
+            type="exception",
+            rationale="异常流程测试"
+        )
+    ]
+    return analysis, designs
+
+
+@pytest.mark.asyncio
+async def test_workflow_fast_mode_uses_single_call_and_local_review(
+    workflow,
+    mock_requirement_agent,
+    mock_test_design_agent,
+    mock_quality_review_agent
+):
+    """测试快速模式一次调用生成，本地评分达标时不调用 LLM 审查"""
+    mock_test_design_agent.draft_tests.return_value = _draft(["用户登录"])
+    
+    result = await workflow.execute(
+        requirement="实现用户登录功能",
+        context={"project_id": 1, "generation_mode": "fast"}
+    )
+    
+    assert result.success is True
+    mock_test_design_agent.draft_tests.assert_awaited_once()
+    mock_requirement_agent.analyze.assert_not_called()
+    mock_test_design_agent.design_tests.assert_not_called()
+    mock_quality_review_agent.review.assert_not_called()
+    assert result.metadata["mode"] == "fast"
+    assert result.metadata["local_review"] == {
+        "quality_score": 100, "coverage_score": 80, "escalated": False
+    }
+    assert result.metadata["skipped_stages"] == ["quality_review"]
+    assert result.data["review"]["approved_cases"] == [0, 1]
+    assert result.data["analysis"]["functional_points"] == ["用户登录"]
+
+
+@pytest.mark.asyncio
+async def test_workflow_fast_mode_escalates_low_scores_to_llm_review(
+    workflow,
+    mock_test_design_agent,
+    mock_quality_review_agent
+):
+    """测试快速模式本地评分低于阈值时升级为 LLM 审查"""
+    mock_test_design_agent.draft_tests.return_value = _draft(["用户登录", "找回密码", "修改手机号"])
+    
+    result = await workflow.execute(
+        requirement="实现用户登录功能",
+        context={"project_id": 1, "generation_mode": "fast"}
+    )
+    
+    assert result.success is True
+    mock_quality_review_agent.review.assert_awaited_once()
+    assert result.metadata["local_review"]["escalated"] is True
+    assert result.metadata["coverage_score"] == 90
+    assert "skipped_stages" not in result.metadata
+
+
+@pytest.mark.asyncio
+async def test_workflow_fast_mode_falls_back_to_local_review(
+    workflow,
+    mock_test_design_agent,
+    mock_quality_review_agent
+):
+    """测试升级的 LLM 审查失败时使用本地审查结果"""
+    mock_test_design_agent.draft_tests.return_value = _draft(["用户登录", "找回密码", "修改手机号"])
+    mock_quality_review_agent.review.side_effect = Exception("审查失败")
+    
+    result = await workflow.execute(
+        requirement="实现用户登录功能",
+        context={"project_id": 1, "generation_mode": "fast"}
+    )
+    
+    assert result.success is True
+    assert "质量审查失败，已使用本地规则审查结果" in result.metadata["warnings"]
+    assert "功能点未覆盖: 找回密码" in result.data["review"]["issues"]
+
+
+@pytest.mark.asyncio
+async def test_workflow_fast_mode_draft_failure(workflow, mock_test_design_agent):
+    """测试快速生成失败"""
+    mock_test_design_agent.draft_tests.side_effect = ValueError("快速生成失败: 无效响应")
+    
+    result = await workflow.execute(
+        requirement="实现用户登录功能",
+        context={"project_id": 1, "generation_mode": "fast"}
+    )
+    
+    assert result.success is False
+    assert result.error.startswith("测试用例生成失败")
+    assert result.metadata["step"] == "analysis_and_design"
+
+
+@pytest.mark.asyncio
+async def test_workflow_rejects_unknown_mode(workflow):
+    """测试未知的生成模式"""
+    result = await workflow.execute(
+        requirement="实现用户登录功能",
+        context={"project_id": 1, "generation_mode": "turbo"}
+    )
+    
+    assert result.success is False
+    assert "未知的生成模式" in result.error
+
+
+def _design(index):
+    return TestCaseDesign(
+        title=f"测试场景 {index}",
+        preconditions="用户已注册",
+        steps=["输入用户名", "输入密码"],
+        expected_result="登录成功，返回 token",
+        priority="high",
+        type="functional",
+        rationale=""
+    )
+
+
+@pytest.mark.asyncio
+async def test_workflow_pipelined_mode_reviews_while_designing(
+    mock_requirement_agent,
+    mock_test_design_agent,
+    mock_search_prd_tool,
+    mock_search_testcase_tool,
+    mock_format_tool
+):
+    """测试流水线模式在设计完成前开始审查，并把批内索引换算为全局索引"""
+    events = []
+    
+    async def design_stream(analysis, historical_cases):
+        for index in range(5):
+            events.append(f"design {index}")
+            yield _design(index)
+            await asyncio.sleep(0.01)
+    
+    async def review(test_cases, requirement, analysis, partial):
+        events.append(f"review {test_cases[0].title}")
+        assert partial is True
+        # 每批拒绝批内第一个用例
+        return ReviewResult(
+            coverage_score=80, issues=[], suggestions=[],
+            approved_cases=list(range(1, len(test_cases))),
+            rejected_cases=[(0, "重复")], overall_quality="good"
+        )
+    
+    mock_test_design_agent.design_tests_stream = design_stream
+    review_agent = AsyncMock()
+    review_agent.review.side_effect = review
+    workflow = TestCaseGenerationWorkflow(
+        requirement_agent=mock_requirement_agent,
+        test_design_agent=mock_test_design_agent,
+        quality_review_agent=review_agent,
+        search_prd_tool=mock_search_prd_tool,
+        search_testcase_tool=mock_search_testcase_tool,
+        format_tool=mock_format_tool,
+        review_batch_size=2
+    )
+    
+    result = await workflow.execute(
+        requirement="实现用户登录功能",
+        context={"project_id": 1, "generation_mode": "pipelined"}
+    )
+    
+    assert result.success is True
+    assert review_agent.review.await_count == 3
+    assert events.index("review 测试场景 0") < events.index("design 4")
+    assert result.data["review"]["approved_cases"] == [1, 3]
+    assert result.data["review"]["rejected_cases"] == [(0, "重复"), (2, "重复"), (4, "重复")]
+    assert result.metadata["total_generated"] == 5
+    formatted = mock_format_tool.execute.call_args.kwargs["test_cases"]
+    assert [case["title"] for case in formatted] == ["测试场景 1", "测试场景 3"]
+
+
+@pytest.mark.asyncio
+async def test_workflow_pipelined_mode_approves_failed_batches(
+    workflow,
+    mock_test_design_agent,
+    mock_quality_review_agent
+):
+    """测试流水线模式某批审查失败时批准该批用例并记录警告"""
+    async def design_stream(analysis, historical_cases):
+        for index in range(7):
+            yield _design(index)
+    
+    async def review(test_cases, requirement, analysis, partial):
+        if test_cases[0].title == "测试场景 5":
+            raise ValueError("审查失败")
+        return ReviewResult(80, [], [], list(range(len(test_cases))), [], "good")
+    
+    mock_test_design_agent.design_tests_stream = design_stream
+    mock_quality_review_agent.review.side_effect = review
+    
+    result = await workflow.execute(
+        requirement="实现用户登录功能",
+        context={"project_id": 1, "generation_mode": "pipelined"}
+    )
+    
+    assert result.success is True
+    assert result.data["review"]["approved_cases"] == list(range(7))
+    assert result.data["review"]["overall_quality"] == "unknown"
+    assert "1 批测试用例质量审查失败，已批准这些用例" in result.metadata["warnings"]
+
+
+@pytest.mark.asyncio
+async def test_workflow_pipelined_mode_design_failure_cancels_reviews(
+    workflow,
+    mock_test_design_agent,
+    mock_quality_review_agent
+):
+    """测试流水线模式设计失败时取消进行中的审查"""
+    cancelled = asyncio.Event()
+    
+    async def design_stream(analysis, historical_cases):
+        for index in range(5):
+            yield _design(index)
+        await asyncio.sleep(0.01)
+        raise ValueError("测试设计失败: 响应中断")
+    
+    async def review(test_cases, requirement, analysis, partial):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    mock_test_design_agent.design_tests_stream = design_stream
+    mock_quality_review_agent.review.side_effect = review
+    
+    result = await workflow.execute(
+        requirement="实现用户登录功能",
+        context={"project_id": 1, "generation_mode": "pipelined"}
+    )
+    
+    assert result.success is False
+    assert result.metadata["step"] == "design_and_review"
+    assert cancelled.is_set()
@@ -2,6 +2,9 @@
 TestCaseOptimizationWorkflow 单元测试
 """
 
+import json
+from pathlib import Path
+
 import pytest
 from unittest.mock import AsyncMock
 from app.workflow.test_case_optimization_workflow import TestCaseOptimizationWorkflow
@@ -120,7 +123,7 @@ async def test_execute_success(
     }
     
     # 模拟质量检查结果
-    mock_check_quality_tool.execute.return_value = ['标题过于简单']
+    mock_check_quality_tool.execute_batch.return_value = [['标题过于简单']]
     
     # 模拟 PRD 搜索结果
     mock_search_prd_tool.execute.return_value = [
@@ -330,7 +333,7 @@ async def test_execute_quality_check_failure(
     }
     
     # 模拟质量检查抛出异常
-    mock_check_quality_tool.execute.side_effect = Exception("质量检查失败")
+    mock_check_quality_tool.execute_batch.side_effect = Exception("质量检查失败")
     
     # 模拟其他工具
     mock_search_prd_tool.execute.return_value = []
@@ -371,7 +374,7 @@ async def test_execute_requirement_analysis_failure(
     }
     
     # 模拟工具
-    mock_check_quality_tool.execute.return_value = []
+    mock_check_quality_tool.execute_batch.return_value = [[]]
     mock_search_prd_tool.execute.return_value = []
     
     # 模拟需求分析失败
@@ -405,7 +408,7 @@ async def test_execute_no_missing_points(
     }
     
     # 模拟工具
-    mock_check_quality_tool.execute.return_value = []
+    mock_check_quality_tool.execute_batch.return_value = [[]]
     mock_search_prd_tool.execute.return_value = []
     mock_requirement_analysis_agent.analyze.return_value = AnalysisResult(
         functional_points=[],
@@ -451,7 +454,7 @@ async def test_execute_generate_supplements_failure(
     }
     
     # 模拟工具
-    mock_check_quality_tool.execute.return_value = []
+    mock_check_quality_tool.execute_batch.return_value = [[]]
     mock_search_prd_tool.execute.return_value = []
     mock_requirement_analysis_agent.analyze.return_value = AnalysisResult(
         functional_points=[],
@@ -546,3 +549,163 @@ def test_generate_optimization_suggestions_few_cases(workflow):
     
     assert len(suggestions) > 0
     assert any('数量较少' in s for s in suggestions)
+
+
+# ============================================================================
+# 审计模式测试
+# ============================================================================
+
+class FakeListTool:
+    """按预设分页返回数据的列表工具"""
+    
+    def __init__(self, pages):
+        self.pages = pages
+    
+    async def iter_pages(self, project_id, **kwargs):
+        for page in self.pages:
+            yield page
+
+
+def make_audit_case(case_id, title, prd_id=None):
+    """创建审计用测试用例"""
+    return {
+        'id': case_id,
+        'title': title,
+        'preconditions': '用户已注册并处于登出状态',
+        'steps': [
+            {'action': f'{title}：打开页面并填写表单', 'expected': '表单正常显示'},
+            {'action': f'{title}：点击提交按钮', 'expected': '提交成功'}
+        ],
+        'expected_result': f'{title}的结果符合需求描述',
+        'priority': 'high',
+        'type': 'functional',
+        'prd_id': prd_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_execute_audit_mode(
+    workflow,
+    mock_search_testcase_tool,
+    mock_requirement_analysis_agent,
+    tmp_path
+):
+    """测试审计模式分批处理全部用例并写入报告"""
+    pages = [
+        [
+            make_audit_case('tc-1', '测试用户使用手机号登录系统', 'prd-1'),
+            make_audit_case('tc-2', '登录', 'prd-1'),
+        ],
+        [
+            make_audit_case('tc-3', '测试用户使用手机号登录系统', None),
+            make_audit_case('tc-4', '测试订单使用优惠券支付后金额正确', 'prd-2'),
+        ],
+        [
+            make_audit_case('tc-5', '测试管理员导出月度销售报表', 'prd-2'),
+        ],
+    ]
+    workflow.check_quality_tool = CheckQualityTool()
+    workflow.list_testcases_tool = FakeListTool(pages)
+    workflow.list_prds_tool = FakeListTool([[
+        {'id': 'prd-1', 'title': '登录'},
+        {'id': 'prd-2', 'title': '支付'},
+        {'id': 'prd-3', 'title': '消息通知'},
+    ]])
+    workflow.report_dir = str(tmp_path)
+    
+    result = await workflow.execute(
+        requirement='',
+        context={
+            'project_id': 'proj-001',
+            'mode': 'audit',
+            'chunk_size': 3
+        }
+    )
+    
+    assert result.success is True
+    summary = result.data['summary']
+    assert summary['total_cases'] == 5
+    assert summary['cases_with_issues'] == 1
+    assert summary['issue_counts'] == {'title_length': 1, 'title_format': 1}
+    assert summary['duplicate_clusters'] == 1
+    assert summary['unlinked_cases'] == 1
+    assert summary['total_prds'] == 3
+    assert summary['uncovered_prds'] == 1
+    assert result.data['top_duplicate_clusters'] == [['tc-1', 'tc-3']]
+    report_path = Path(result.data['report_path'])
+    assert report_path.parent == tmp_path
+    assert report_path.name.startswith('proj-001-')
+    assert result.metadata['chunk_count'] == 2
+    
+    records = [json.loads(line) for line in report_path.read_text(encoding='utf-8').splitlines()]
+    assert [record['type'] for record in records] == [
+        'quality', 'duplicate_cluster', 'uncovered_prd', 'summary'
+    ]
+    assert records[0]['case_id'] == 'tc-2'
+    assert records[2]['prd_id'] == 'prd-3'
+    
+    # 审计模式不会走需求检索和分析
+    mock_search_testcase_tool.execute.assert_not_called()
+    mock_requirement_analysis_agent.analyze.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_execute_audit_mode_without_list_tool(workflow):
+    """测试未配置列表工具时审计模式失败"""
+    result = await workflow.execute(
+        requirement='',
+        context={'project_id': 'proj-001', 'mode': 'audit'}
+    )
+    
+    assert result.success is False
+    assert "审计模式" in result.error
+
+
+@pytest.mark.asyncio
+async def test_execute_audit_mode_page_failure(workflow, tmp_path):
+    """测试拉取分页失败时返回已处理数量"""
+    class FailingListTool:
+        async def iter_pages(self, project_id, **kwargs):
+            yield [make_audit_case('tc-1', '测试用户使用手机号登录系统')]
+            raise Exception("后端不可用")
+    
+    workflow.check_quality_tool = CheckQualityTool()
+    workflow.list_testcases_tool = FailingListTool()
+    
+    result = await workflow.execute(
+        requirement='',
+        context={
+            'project_id': 'proj-001',
+            'mode': 'audit',
+            'chunk_size': 1
+        }
+    )
+    
+    assert result.success is False
+    assert "后端不可用" in result.error
+    assert result.metadata['processed_cases'] == 1
+
+
+@pytest.mark.asyncio
+async def test_audit_report_stays_in_report_dir(workflow, tmp_path):
+    """测试审计报告只写入配置的目录：忽略调用方给出的路径，项目 ID 被转义"""
+    workflow.check_quality_tool = CheckQualityTool()
+    workflow.list_testcases_tool = FakeListTool([[make_audit_case('tc-1', '测试用户使用手机号登录系统')]])
+    workflow.report_dir = str(tmp_path / 'reports')
+    target = tmp_path / 'victim.txt'
+    target.write_text('keep', encoding='utf-8')
+    
+    result = await workflow.execute(
+        requirement='',
+        context={'project_id': '../../victim', 'mode': 'audit', 'report_path': str(target)}
+    )
+    
+    assert result.success is True
+    assert target.read_text(encoding='utf-8') == 'keep'
+    report_path = Path(result.data['report_path'])
+    assert report_path.parent == tmp_path / 'reports'
+    assert report_path.name.startswith('..%2F..%2Fvictim-')
+    assert report_path.exists()
+    
+    result = await workflow.run_audit('proj-001', report_id='job/1')
+    assert Path(result.data['report_path']).name == 'proj-001-job%2F1.jsonl'
@@ -5,6 +5,7 @@ TestDesignAgent 单元测试
 import pytest
 from unittest.mock import AsyncMock
 from app.agent.test_design_agent import (
+    JsonArrayItemParser,
     TestDesignAgent,
     TestCaseDesign,
 )
@@ -402,3 +403,111 @@ def test_test_case_design_from_dict():
     assert len(test_case.steps) == 3
     assert test_case.priority == 'high'
     assert test_case.type == 'functional'
+
+
+@pytest.mark.asyncio
+async def test_draft_tests_returns_analysis_and_designs(agent, mock_brconnector):
+    """测试快速模式一次调用返回分析结果和测试用例"""
+    mock_brconnector.chat_simple.return_value = """```json
+{
+  "analysis": {
+    "functional_points": ["用户登录"],
+    "exception_conditions": ["密码错误"]
+  },
+  "test_cases": [
+    {
+      "title": "测试有效用户登录",
+      "preconditions": "用户已注册",
+      "steps": ["输入用户名和密码", "点击登录"],
+      "expected_result": "登录成功，返回 token",
+      "priority": "High",
+      "type": "Functional"
+    }
+  ]
+}
+```"""
+    
+    analysis, designs = await agent.draft_tests(
+        "用户登录功能",
+        historical_prds=[{"title": "认证系统", "content": "..."}],
+        historical_cases=[{"title": "测试登录"}]
+    )
+    
+    assert mock_brconnector.chat_simple.await_count == 1
+    cached_context = mock_brconnector.chat_simple.call_args.kwargs["cached_context"]
+    assert "认证系统" in cached_context and "测试登录" in cached_context
+    assert analysis.functional_points == ["用户登录"]
+    assert analysis.business_rules == []
+    assert analysis.input_specs == {}
+    assert len(designs) == 1
+    assert designs[0].priority == "high"
+    assert designs[0].rationale == ""
+
+
+@pytest.mark.asyncio
+async def test_draft_tests_rejects_array_response(agent, mock_brconnector):
+    """测试快速模式的响应缺少 test_cases 时抛出 ValueError"""
+    mock_brconnector.chat_simple.return_value = '[{"title": "只有用例"}]'
+    
+    with pytest.raises(ValueError, match="快速生成失败"):
+        await agent.draft_tests("用户登录功能")
+
+
+@pytest.mark.asyncio
+async def test_draft_tests_llm_error(agent, mock_brconnector):
+    """测试快速模式 LLM 调用失败时原样抛出"""
+    mock_brconnector.chat_simple.side_effect = BRConnectorError("API 调用失败")
+    
+    with pytest.raises(BRConnectorError):
+        await agent.draft_tests("用户登录功能")
+
+
+def test_json_array_item_parser_handles_split_chunks():
+    """测试增量解析：元素跨越任意分块边界，字符串内的括号和引号不影响解析"""
+    text = '好的：\n```json\n[{"title": "a \\"}[", "steps": ["x", {"y": 1}]}, {invalid}, {"title": "b"}]\n```'
+    
+    for size in (1, 4, len(text)):
+        parser = JsonArrayItemParser()
+        items = []
+        for start in range(0, len(text), size):
+            items.extend(parser.feed(text[start:start + size]))
+        assert items == [{"title": 'a "}[', "steps": ["x", {"y": 1}]}, {"title": "b"}]
+
+
+def _stream(*chunks):
+    async def stream(messages, **kwargs):
+        for chunk in chunks:
+            yield chunk
+    return stream
+
+
+@pytest.mark.asyncio
+async def test_design_tests_stream_yields_cases_as_they_complete(agent, mock_brconnector, sample_analysis):
+    """测试流式设计在后续用例生成前产出已完成的用例"""
+    produced = []
+    
+    async def stream(messages, **kwargs):
+        yield '```json\n[{"title": "测试登录", "preconditions": "已注册", "steps": ["登录"], '
+        yield '"expected_result": "成功", "priority": "High", "type": "functional"},'
+        # 第二个用例开始生成时，第一个用例已经产出
+        assert len(produced) == 1
+        yield '{"title": "测试登出", "preconditions": "已登录", "steps": "登出", '
+        yield '"expected_result": "成功", "priority": "low", "type": "functional"}]\n```'
+    
+    mock_brconnector.chat_stream = stream
+    async for design in agent.design_tests_stream(sample_analysis):
+        produced.append(design)
+    
+    assert [design.title for design in produced] == ["测试登录", "测试登出"]
+    assert produced[0].priority == "high"
+    assert produced[1].steps == ["登出"]
+
+
+@pytest.mark.asyncio
+async def test_design_tests_stream_without_valid_cases(agent, mock_brconnector, sample_analysis):
+    """测试流式设计没有有效用例时抛出 ValueError"""
+    mock_brconnector.chat_stream = _stream("抱歉，无法设计测试用例")
+    
+    with pytest.raises(ValueError, match="没有有效的测试用例"):
+        async for _ in agent.design_tests_stream(sample_analysis):
+            pass
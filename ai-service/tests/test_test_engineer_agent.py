@@ -5,6 +5,7 @@ TestEngineerAgent 单元测试
 import pytest
 import asyncio
 from unittest.mock import AsyncMock, MagicMock
+from app.deadline import remaining_time
 from app.agent.test_engineer_agent import TestEngineerAgent, AgentResponse, TaskType
 from app.integration.brconnector_client import BRConnectorClient
 from app.workflow.base import BaseWorkflow, WorkflowResult
@@ -379,6 +380,29 @@ async def test_process_request_timeout(agent, mock_llm_client, mock_workflows):
     assert response.metadata['timeout_seconds'] == 0.5
 
 
+@pytest.mark.asyncio
+async def test_process_request_propagates_deadline(agent, mock_llm_client, mock_workflows):
+    """测试请求超时作为截止时间传播到工作流"""
+    mock_llm_client.chat.return_value = "generate_test_cases"
+    seen = []
+
+    async def record_deadline(*args, **kwargs):
+        seen.append(remaining_time())
+        return WorkflowResult(success=True, data={'result': 'ok'})
+
+    mock_workflows['test_case_generation'].execute_mock.side_effect = record_deadline
+
+    response = await agent.process_request(
+        message="生成测试用例",
+        context={'project_id': 'test-project-123'},
+        timeout=30.0
+    )
+
+    assert response.success is True
+    assert seen[0] is not None and 0 < seen[0] <= 30.0
+    assert remaining_time() is None
+
+
 @pytest.mark.asyncio
 async def test_process_request_performance_monitoring(agent, mock_llm_client):
     """测试性能监控"""
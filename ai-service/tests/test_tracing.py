@@ -0,0 +1,203 @@
+"""
+链路追踪的单元测试
+"""
+
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock
+
+from app.agent.test_engineer_agent import TestEngineerAgent
+from app.integration.brconnector_client import BRConnectorClient
+from app.tool.base import BaseTool
+from app.tool.retrieval_tools import SearchPRDTool
+from app.tracing import (
+    FileSpanExporter,
+    InMemorySpanExporter,
+    SpanContext,
+    current_span,
+    httpx_event_hooks,
+    parse_traceparent,
+    trace_headers,
+    tracer,
+)
+from app.workflow.base import BaseWorkflow, WorkflowResult
+
+
+@pytest.fixture
+def exporter():
+    """安装内存导出器"""
+    exporter = InMemorySpanExporter()
+    tracer.add_exporter(exporter)
+    yield exporter
+    tracer.remove_exporter(exporter)
+
+
+class LookupTool(BaseTool):
+    """测试用工具"""
+
+    def __init__(self):
+        super().__init__(name="trace_lookup", description="查询")
+
+    async def execute(self, **kwargs):
+        return {"found": True}
+
+
+class LookupWorkflow(BaseWorkflow):
+    """调用工具的测试工作流"""
+
+    def __init__(self):
+        self.tool = LookupTool()
+
+    @property
+    def name(self) -> str:
+        return "test_case_generation"
+
+    @property
+    def description(self) -> str:
+        return "测试工作流"
+
+    async def execute(self, input_data, context=None):
+        data = await self.tool.execute(query=input_data)
+        return WorkflowResult(success=True, data=data)
+
+
+def test_traceparent_round_trip():
+    """测试 traceparent 解析和生成"""
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    context = parse_traceparent(header)
+
+    assert context == SpanContext("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+    assert context.to_traceparent() == header
+    assert parse_traceparent("invalid") is None
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert parse_traceparent(None) is None
+
+
+def test_nested_spans_and_errors(exporter):
+    """测试嵌套 span 的父子关系和异常状态"""
+    with tracer.start_span("outer") as outer:
+        with pytest.raises(ValueError):
+            with tracer.start_span("inner"):
+                raise ValueError("失败")
+        assert current_span() is outer
+        assert trace_headers() == {"traceparent": outer.context.to_traceparent()}
+
+    assert current_span() is None
+    assert trace_headers() == {}
+
+    inner, finished_outer = exporter.get_finished_spans()
+    assert inner.name == "inner"
+    assert inner.parent_span_id == outer.context.span_id
+    assert inner.context.trace_id == outer.context.trace_id
+    assert inner.status_code == "ERROR"
+    assert inner.events[0]["attributes"]["exception.type"] == "ValueError"
+    assert finished_outer.parent_span_id is None
+    assert finished_outer.duration_seconds >= 0
+
+
+def test_file_exporter_writes_jsonl(tmp_path):
+    """测试文件导出器输出 OTLP JSON 风格的记录"""
+    path = tmp_path / "traces.jsonl"
+    exporter = FileSpanExporter(str(path))
+    tracer.add_exporter(exporter)
+    try:
+        with tracer.start_span("work", attributes={"key": "value"}):
+            pass
+    finally:
+        tracer.remove_exporter(exporter)
+        exporter.shutdown()
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert len(records) == 1
+    assert records[0]["name"] == "work"
+    assert records[0]["kind"] == "SPAN_KIND_INTERNAL"
+    assert records[0]["attributes"] == {"key": "value"}
+    assert records[0]["endTimeUnixNano"] >= records[0]["startTimeUnixNano"]
+
+
+@pytest.mark.asyncio
+async def test_agent_workflow_tool_spans(exporter):
+    """测试 Agent、工作流和工具的 span 层级"""
+    llm_client = AsyncMock(spec=BRConnectorClient)
+    llm_client.chat.return_value = "generate_test_cases"
+    agent = TestEngineerAgent(llm_client=llm_client, workflows={})
+    agent.register_workflow(LookupWorkflow())
+
+    response = await agent.process_request("生成测试用例", {"project_id": "p1"})
+
+    assert response.success is True
+    spans = {span.name: span for span in exporter.get_finished_spans(response.metadata["trace_id"])}
+    agent_span = spans["agent.process_request"]
+    workflow_span = spans["workflow.test_case_generation"]
+    tool_span = spans["tool.trace_lookup"]
+
+    assert workflow_span.parent_span_id == agent_span.context.span_id
+    assert tool_span.parent_span_id == workflow_span.context.span_id
+    assert agent_span.attributes["task_type"] == "generate_test_cases"
+
+
+@pytest.mark.asyncio
+async def test_backend_requests_carry_traceparent():
+    """测试发往 Go 后端的请求携带 traceparent"""
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("traceparent"))
+        return httpx.Response(200, json={})
+
+    tool = SearchPRDTool(backend_url="http://backend")
+    assert tool.http_client.event_hooks["request"]
+
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), event_hooks=httpx_event_hooks()
+    ) as client:
+        await client.get("http://backend/untraced")
+        with tracer.start_span("tool.search_prd") as span:
+            await client.get("http://backend/traced")
+
+    assert seen == [None, span.context.to_traceparent()]
+    await tool.http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_span_records_first_token(exporter):
+    """测试流式 LLM 请求的 span 记录首个内容块事件"""
+    events = [{"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hi"}}]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+
+    client = BRConnectorClient(api_key="test-key", base_url="https://test.api.com", model="trace-model")
+    await client.client.aclose()
+    client.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, text=body))
+    )
+
+    with tracer.start_span("request") as parent:
+        chunks = [chunk async for chunk in client.chat_stream([{"role": "user", "content": "Hi"}])]
+
+    assert chunks == ["Hi"]
+    llm_span = next(span for span in exporter.get_finished_spans() if span.name == "llm.chat")
+    assert llm_span.kind == "CLIENT"
+    assert llm_span.parent_span_id == parent.context.span_id
+    assert llm_span.attributes["http.status_code"] == 200
+    assert [event["name"] for event in llm_span.events] == ["first_token"]
+    await client.close()
+
+
+def test_middleware_continues_incoming_trace(exporter):
+    """测试 HTTP 中间件延续调用方的 trace 并在响应中返回 traceparent"""
+    from main import app
+
+    incoming = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    response = TestClient(app).get("/health", headers={"traceparent": incoming})
+
+    returned = parse_traceparent(response.headers["traceparent"])
+    assert returned.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    server_span = exporter.get_finished_spans(returned.trace_id)[-1]
+    assert server_span.kind == "SERVER"
+    assert server_span.name == "GET /health"
+    assert server_span.parent_span_id == "00f067aa0ba902b7"
+    assert server_span.attributes["http.status_code"] == 200
@@ -5,10 +5,15 @@
 """
 
 import pytest
+from app.keyword_index import KeywordIndex, get_project_index, reset_project_indexes
 from app.tool.validation_tools import (
     ValidateCoverageTool,
+    compute_coverage,
     CheckDuplicationTool,
     CheckQualityTool,
+    NearDuplicateIndex,
+    case_signature,
+    signature_similarity,
 )
 
 
@@ -161,6 +166,80 @@ async def test_validate_coverage_tool_empty_cases():
     assert len(report["uncovered_points"]) == 2
 
 
+@pytest.mark.asyncio
+async def test_validate_coverage_tool_uses_project_keyword_index():
+    """测试传入 project_id 时通过项目关键词索引判断功能点覆盖"""
+    reset_project_indexes()
+    tool = ValidateCoverageTool()
+    requirement_analysis = {
+        "functional_points": ["验证码登录", "找回密码", "注销功能"],
+        "exception_conditions": [],
+        "constraints": []
+    }
+    test_cases = [
+        {"id": "tc-1", "title": "短信验证码登录", "expected_result": "登录成功"},
+        {"id": "tc-2", "title": "忘记密码", "content": "通过邮箱找回密码"},
+    ]
+    # 项目中的其他用例不计入本次覆盖率
+    get_project_index("project-cov").add("other", "注销功能")
+    
+    try:
+        report = await tool.execute(
+            test_cases=test_cases,
+            requirement_analysis=requirement_analysis,
+            project_id="project-cov"
+        )
+        
+        assert sorted(report["covered_points"]) == ["找回密码", "验证码登录"]
+        assert report["uncovered_points"] == ["注销功能"]
+        assert "tc-1" in get_project_index("project-cov")
+    finally:
+        reset_project_indexes()
+
+
+@pytest.mark.asyncio
+async def test_validate_coverage_same_result_with_and_without_index():
+    """测试传入 project_id 与否覆盖判断一致，且没有 id 的草稿用例不写入项目索引"""
+    reset_project_indexes()
+    tool = ValidateCoverageTool()
+    requirement_analysis = {
+        "functional_points": [
+            "check loginpage flow", "export csv", "account precondition", "reset password", "删除账号"
+        ],
+        "exception_conditions": [],
+        "constraints": []
+    }
+    test_cases = [
+        {"title": "login", "expected_result": "loginpage ok"},
+        {"title": "login", "expected_result": "csv exported"},
+        {"id": "tc-1", "title": "profile", "preconditions": "account exists", "expected_result": "shown"},
+        {"id": "tc-2", "title": "重置", "steps": [{"action": "reset password by email"}]},
+    ]
+    
+    try:
+        scanned = await tool.execute(test_cases=test_cases, requirement_analysis=requirement_analysis)
+        indexed = await tool.execute(
+            test_cases=test_cases,
+            requirement_analysis=requirement_analysis,
+            project_id="project-drafts"
+        )
+        
+        assert indexed["covered_points"] == scanned["covered_points"]
+        assert indexed["uncovered_points"] == scanned["uncovered_points"]
+        assert sorted(scanned["covered_points"]) == [
+            "account precondition", "check loginpage flow", "export csv", "reset password"
+        ]
+        assert len(get_project_index("project-drafts")) == 2
+        
+        # 全部用例都有 id 时两种方式结果也相同
+        saved = [dict(tc, id=f"case-{i}") for i, tc in enumerate(test_cases)]
+        assert compute_coverage(saved, requirement_analysis, KeywordIndex()) == compute_coverage(
+            saved, requirement_analysis
+        )
+    finally:
+        reset_project_indexes()
+
+
 # ============================================================================
 # CheckDuplicationTool 测试
 # ============================================================================
@@ -402,3 +481,115 @@ async def test_check_quality_tool_valid_priority_and_type():
         if issue["rule"] in ["invalid_priority", "invalid_type"]
     ]
     assert len(priority_issues) == 0
+
+
+@pytest.mark.asyncio
+async def test_check_quality_tool_batch_matches_single():
+    """测试批量检查与单个检查结果一致"""
+    tool = CheckQualityTool()
+    
+    test_cases = [
+        {
+            "title": "测试用户登录功能",
+            "preconditions": "用户已注册且账户未被锁定",
+            "steps": [
+                {"step_number": 1, "action": "打开页面", "expected": ""},
+                {"step_number": 2, "action": "", "expected": "显示结果"}
+            ],
+            "expected_result": "用户成功登录系统",
+            "priority": "high",
+            "type": "functional"
+        },
+        {
+            "title": "登录",
+            "preconditions": "",
+            "steps": "输入用户名",
+            "expected_result": "成功",
+            "priority": "P9",
+            "type": "unknown"
+        },
+        {}
+    ]
+    
+    batch_issues = await tool.execute_batch(test_cases)
+    
+    assert len(batch_issues) == len(test_cases)
+    for test_case, issues in zip(test_cases, batch_issues):
+        assert issues == await tool.execute(test_case=test_case)
+
+
+@pytest.mark.asyncio
+async def test_check_quality_tool_batch_process_pool():
+    """测试超过阈值时使用进程池批量检查"""
+    tool = CheckQualityTool(process_pool_threshold=4, chunk_size=2)
+    
+    test_cases = [
+        {"title": f"测试用例 {i}", "preconditions": "", "steps": [], "expected_result": ""}
+        for i in range(5)
+    ]
+    
+    batch_issues = await tool.execute_batch(test_cases)
+    
+    assert len(batch_issues) == 5
+    assert batch_issues == await CheckQualityTool().execute_batch(test_cases)
+    for issues in batch_issues:
+        rules = [issue["rule"] for issue in issues]
+        assert "missing_preconditions" in rules
+        assert "insufficient_steps" in rules
+
+
+# ============================================================================
+# NearDuplicateIndex 测试
+# ============================================================================
+
+LOGIN_CASE = {
+    "title": "测试用户使用正确的用户名和密码登录系统",
+    "steps": [
+        {"action": "打开登录页面并输入正确的用户名和密码", "expected": "输入框正常显示内容"},
+        {"action": "点击登录按钮提交表单", "expected": "页面跳转到系统首页"}
+    ],
+    "expected_result": "用户成功登录并在首页显示用户名"
+}
+
+PAYMENT_CASE = {
+    "title": "测试订单使用优惠券后的支付金额计算",
+    "steps": [
+        {"action": "在购物车中选择商品并进入结算页面", "expected": "显示订单金额"},
+        {"action": "选择满减优惠券并确认支付", "expected": "支付金额扣除优惠"}
+    ],
+    "expected_result": "订单支付成功且金额正确"
+}
+
+
+def test_case_signature_similarity():
+    """测试签名相似度估计"""
+    near_copy = dict(LOGIN_CASE, title=LOGIN_CASE["title"] + "（回归）")
+    
+    assert signature_similarity(case_signature(LOGIN_CASE), case_signature(LOGIN_CASE)) == 1.0
+    assert signature_similarity(case_signature(LOGIN_CASE), case_signature(near_copy)) >= 0.75
+    assert signature_similarity(case_signature(LOGIN_CASE), case_signature(PAYMENT_CASE)) < 0.3
+
+
+def test_near_duplicate_index_clusters():
+    """测试近似重复用例聚类"""
+    index = NearDuplicateIndex()
+    
+    assert index.add("tc-1", case_signature(LOGIN_CASE)) == []
+    assert index.add("tc-2", case_signature(PAYMENT_CASE)) == []
+    assert index.add("tc-3", case_signature(dict(LOGIN_CASE))) == ["tc-1"]
+    index.add("tc-4", case_signature(dict(LOGIN_CASE, title=LOGIN_CASE["title"] + "（回归）")))
+    
+    assert len(index) == 4
+    assert index.clusters() == [["tc-1", "tc-3", "tc-4"]]
+
+
+def test_near_duplicate_index_bounded_buckets():
+    """测试大量相同用例时分桶容量受限"""
+    index = NearDuplicateIndex(bucket_capacity=4)
+    signature = case_signature(LOGIN_CASE)
+    
+    for i in range(100):
+        index.add(i, signature)
+    
+    assert all(len(bucket) <= 4 for bucket in index._buckets.values())
+    assert index.clusters() == [list(range(100))]
@@ -0,0 +1,146 @@
+"""
+启动预热与就绪检查测试
+"""
+
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import endpoints, warmup
+from app.api.warmup import (
+    WARMUP_FAILED,
+    WARMUP_READY,
+    WarmupState,
+    render_prompt_templates,
+    warm_up,
+)
+from main import app
+
+
+class _Tool:
+    def __init__(self, name, http_client):
+        self.name = name
+        self.backend_url = "http://backend"
+        self.http_client = http_client
+
+
+class _Agent:
+    PROMPT_TEMPLATE = "需求：{requirement}\n```json\n{{\"a\": 1}}\n```"
+
+
+class _BrokenAgent:
+    PROMPT_TEMPLATE = "需求：{requirement}\n{\"a\": 1}"
+
+
+def _fake_graph(components):
+    workflow = SimpleNamespace(**{f"c{i}": c for i, c in enumerate(components)})
+    return SimpleNamespace(workflows={"test_case_generation": workflow})
+
+
+@pytest.fixture
+def requests_seen():
+    return []
+
+
+@pytest.fixture
+def transport(requests_seen):
+    def handler(request):
+        requests_seen.append(str(request.url))
+        if request.url.host == "down":
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200)
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def patched_endpoints(transport):
+    br_client = SimpleNamespace(client=httpx.AsyncClient(transport=transport), default_base_url="http://llm")
+
+    def patch_graph(components):
+        return patch.multiple(
+            endpoints,
+            get_agent=Mock(return_value=_fake_graph(components)),
+            get_br_client=Mock(return_value=br_client),
+            get_conversation_manager=Mock(),
+            get_admission_controller=Mock(),
+        )
+
+    return patch_graph
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_one_connection_per_pool(patched_endpoints, transport, requests_seen):
+    shared = httpx.AsyncClient(transport=transport)
+    components = [_Agent(), _Tool("search_prd", shared), _Tool("search_prd_again", shared),
+                  _Tool("search_testcase", httpx.AsyncClient(transport=transport))]
+
+    with patched_endpoints(components):
+        state = await warm_up(timeout=1, state=WarmupState())
+
+    assert state.status == WARMUP_READY
+    assert state.ready
+    assert set(state.connections) == {"llm", "backend:search_prd", "backend:search_testcase"}
+    assert sorted(requests_seen) == ["http://backend/health", "http://backend/health", "http://llm"]
+    assert set(state.steps) == {"agent", "prompts", "connections"}
+
+
+@pytest.mark.asyncio
+async def test_warm_up_connection_failure_is_a_warning(patched_endpoints, transport):
+    tool = _Tool("search_prd", httpx.AsyncClient(transport=transport))
+    tool.backend_url = "http://down"
+
+    with patched_endpoints([tool]):
+        state = await warm_up(timeout=1, state=WarmupState())
+
+    assert state.ready
+    assert state.connections["backend:search_prd"] == "error: ConnectError"
+    assert len(state.warnings) == 1
+
+
+@pytest.mark.asyncio
+async def test_warm_up_fails_on_broken_prompt_template(patched_endpoints):
+    with patched_endpoints([_BrokenAgent()]):
+        state = await warm_up(timeout=1, state=WarmupState())
+
+    assert state.status == WARMUP_FAILED
+    assert "_BrokenAgent.PROMPT_TEMPLATE" in state.error
+    assert not state.ready
+
+
+def test_render_prompt_templates_of_real_agent_graph():
+    """生产 Agent 图中的所有提示词模板都能渲染"""
+    with patch.multiple(endpoints, _agent=None, _br_client=None):
+        agent = endpoints.get_agent()
+        components = warmup._graph_components(agent)
+
+    assert render_prompt_templates(components) >= 4
+
+
+def test_ready_endpoint_reflects_warmup_state():
+    client = TestClient(app)
+    with patch.object(warmup, "_state", WarmupState()):
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "pending"
+
+        warmup.get_warmup_state().status = WARMUP_READY
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+
+
+def test_lifespan_runs_warm_up(patched_endpoints):
+    with patched_endpoints([_Agent()]), TestClient(app) as client:
+        for _ in range(100):
+            response = client.get("/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.01)
+
+    assert response.status_code == 200
+    assert response.json()["connections"] == {"llm": "ok (200)"}
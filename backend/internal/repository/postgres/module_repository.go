@@ -10,6 +10,7 @@ import (
 type ModuleRepository interface {
 	Create(module *project.Module) error
 	GetByID(id string) (*project.Module, error)
+	GetByName(projectID, name string) (*project.Module, error)
 	GetTree(projectID string) ([]*project.Module, error)
 	Update(module *project.Module) error
 	Delete(id string) error
@@ -41,6 +42,18 @@ func (r *moduleRepository) GetByID(id string) (*project.Module, error) {
 	return &module, nil
 }
 
+// GetByName 根据项目和名称获取模块（同名时取排序最靠前的模块）
+func (r *moduleRepository) GetByName(projectID, name string) (*project.Module, error) {
+	var module project.Module
+	err := r.db.Where("project_id = ? AND name = ?", projectID, name).
+		Order("sort_order ASC, created_at ASC").
+		First(&module).Error
+	if err != nil {
+		return nil, err
+	}
+	return &module, nil
+}
+
 // GetTree 获取模块树（递归查询所有模块）
 func (r *moduleRepository) GetTree(projectID string) ([]*project.Module, error) {
 	var modules []*project.Module
@@ -2,6 +2,7 @@ package search
 
 import (
 	"context"
+	"errors"
 	"fmt"
 	"sort"
 	"strconv"
@@ -21,6 +22,7 @@ type SearchService struct {
 	embeddingManager *weaviate.EmbeddingManager
 	prdRepo          postgres.PRDRepository
 	testcaseRepo     postgres.TestCaseRepository
+	moduleRepo       postgres.ModuleRepository
 }
 
 // SearchConfig 搜索配置
@@ -97,6 +99,7 @@ func NewSearchService(
 		embeddingManager: embeddingManager,
 		prdRepo:          postgres.NewPRDRepository(db),
 		testcaseRepo:     postgres.NewTestCaseRepository(db),
+		moduleRepo:       postgres.NewModuleRepository(db),
 	}
 }
 
@@ -117,8 +120,10 @@ type SearchRequest struct {
 	ScoreThreshold   float32    `json:"score_threshold"`                       // 相似度阈值
 	ProjectID        string     `json:"project_id"`                            // 项目ID（可选）
 	ModuleID         *string    `json:"module_id"`                             // 模块ID（可选）
+	Module           *string    `json:"module"`                                // 模块名称（可选，解析为模块ID过滤）
 	AppVersionID     *string    `json:"app_version_id"`                        // App版本ID（可选）
 	Status           *string    `json:"status"`                                // 状态（可选）
+	Priority         *string    `json:"priority"`                              // 测试用例优先级（可选）
 	IncludeArchived  bool       `json:"include_archived"`                      // 是否包含已归档
 	Alpha            *float32   `json:"alpha"`                                 // 混合检索权重（0-1，0=纯BM25，1=纯向量，默认1）
 }
@@ -167,6 +172,18 @@ func (s *SearchService) Search(ctx context.Context, req *SearchRequest) (*Search
 		req.Alpha = &pureVector
 	}
 
+	// 按模块名称过滤：解析为项目内的模块ID，模块不存在时没有结果
+	if req.Module != nil && req.ModuleID == nil {
+		module, err := s.moduleRepo.GetByName(req.ProjectID, *req.Module)
+		if err != nil {
+			if errors.Is(err, gorm.ErrRecordNotFound) {
+				return &SearchResponse{Results: []SearchResult{}, Total: 0, Query: req.Query, Type: req.Type}, nil
+			}
+			return nil, fmt.Errorf("查询模块失败: %w", err)
+		}
+		req.ModuleID = &module.ID
+	}
+
 	// 生成查询向量
 	embeddingService := s.embeddingManager.GetService()
 	if embeddingService == nil {
@@ -359,23 +376,33 @@ func (s *SearchService) searchTestCases(ctx context.Context, embedding []float32
 			fmt.Printf("⚠️  Found orphaned TestCase vector in Weaviate: %s (not found in PostgreSQL)\n", wr.ID)
 			continue // 跳过无法获取的记录
 		}
+		// 优先级过滤：在重排和截断之前应用，避免过滤后结果不足
+		if req.Priority != nil && !strings.EqualFold(testcase.Priority, *req.Priority) {
+			continue
+		}
+
+		metadata := map[string]interface{}{
+			"code":           testcase.Code,
+			"priority":       testcase.Priority,
+			"type":           testcase.Type,
+			"status":         testcase.Status,
+			"module_id":      testcase.ModuleID,
+			"prd_id":         testcase.PRDID,
+			"app_version_id": testcase.AppVersionID,
+			"created_at":     testcase.CreatedAt,
+		}
+		// 模块名称：AI 服务按模块名称构建回归选择使用的模块依赖图
+		if testcase.Module != nil {
+			metadata["module"] = testcase.Module.Name
+		}
 
 		results = append(results, SearchResult{
-			Type:    SearchTypeTestCase,
-			ID:      testcase.ID,
-			Title:   testcase.Title,
-			Content: s.buildTestCaseContent(testcase),
-			Score:   wr.Score,
-			Metadata: map[string]interface{}{
-				"code":           testcase.Code,
-				"priority":       testcase.Priority,
-				"type":           testcase.Type,
-				"status":         testcase.Status,
-				"module_id":      testcase.ModuleID,
-				"prd_id":         testcase.PRDID,
-				"app_version_id": testcase.AppVersionID,
-				"created_at":     testcase.CreatedAt,
-			},
+			Type:       SearchTypeTestCase,
+			ID:         testcase.ID,
+			Title:      testcase.Title,
+			Content:    s.buildTestCaseContent(testcase),
+			Score:      wr.Score,
+			Metadata:   metadata,
 			Highlights: []string{testcase.Title},
 		})
 	}
@@ -437,6 +464,9 @@ func (s *SearchService) buildTestCaseFilters(req *SearchRequest) map[string]inte
 	if req.Status != nil {
 		filters["status"] = *req.Status
 	}
+	if req.Priority != nil {
+		filters["priority"] = *req.Priority
+	}
 
 	return filters
 }